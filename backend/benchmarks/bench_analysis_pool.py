@@ -0,0 +1,74 @@
+"""
+Benchmark: scan throughput versus ANALYSIS_WORKERS.
+
+Runs the same synthetic scan (in-memory database, generated candles, no
+provider or LLM calls) in-process and with process pools of increasing size,
+and checks that every worker count saves the same bot results.
+
+    cd backend && python benchmarks/bench_analysis_pool.py [--coins 200] [--workers 0 2 4 8]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import MemoryDB, NoDerivatives, SyntheticMarket  # noqa: E402
+from services.analysis_pool import AnalysisPool  # noqa: E402
+from services.scan_orchestrator import ScanOrchestrator  # noqa: E402
+
+# Bots that draw random inputs; their results differ between runs by design
+RANDOMIZED_BOTS = ('Elliott', 'Flow', 'Whale', 'Social')
+
+
+async def run_scan(coins: int, workers: int):
+    orchestrator = ScanOrchestrator(MemoryDB())
+    market = SyntheticMarket(coins)
+    orchestrator.crypto_client = market
+    orchestrator.bot_performance_service.crypto_client = market
+    orchestrator.futures_client = NoDerivatives()
+    orchestrator.analysis_pool = AnalysisPool(workers)
+
+    async def sideways():
+        return 'SIDEWAYS'
+    orchestrator.bot_performance_service.classify_market_regime = sideways
+
+    start = time.perf_counter()
+    try:
+        result = await orchestrator.run_scan(scan_type='all_in_lite')
+    finally:
+        orchestrator.analysis_pool.shutdown()
+    seconds = time.perf_counter() - start
+
+    saved = sorted(
+        (doc['coin'], doc['bot_name'], doc['direction'], doc['confidence'],
+         round(doc['take_profit'], 9), round(doc['stop_loss'], 9))
+        for doc in orchestrator.db.bot_results.documents
+        if not any(name in doc['bot_name'] for name in RANDOMIZED_BOTS)
+    )
+    return result, seconds, saved
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--coins', type=int, default=200)
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 2, 4, os.cpu_count() or 1])
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    print(f"{args.coins} synthetic coins, {os.cpu_count()} CPUs")
+    baseline, baseline_seconds = None, None
+    for workers in dict.fromkeys(args.workers):
+        result, seconds, saved = asyncio.run(run_scan(args.coins, workers))
+        if baseline is None:
+            baseline, baseline_seconds = saved, seconds
+        print(f"workers={workers:<3d} {result['status']:10s} {seconds:7.2f}s  {args.coins / seconds:6.1f} coins/s  "
+              f"x{baseline_seconds / seconds:.2f}  bot results {'identical' if saved == baseline else 'DIFFER'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark: vectorized bot execution versus per-coin ``analyze`` calls.
+
+Runs every bot over synthetic feature rows (default 5,000 coins), once through
+run_bots_batch and once as bots x coins scalar calls, after checking that the
+vectorized bots match their scalar output. End to end, building the result
+dicts dominates; the signal-array line shows the vectorized part alone.
+
+    cd backend && python benchmarks/bench_batch_bots.py [--coins 5000]
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from benchmarks.synthetic import feature_rows  # noqa: E402
+from bots.batch_engine import FeatureTable, _safe_analyze, run_bots_batch, verify_batch_equivalence  # noqa: E402
+from bots.bot_strategies import get_all_bots  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--coins', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    # The zero-price / NaN edge-case rows make some bots log warnings
+    logging.disable(logging.CRITICAL)
+    np.seterr(all='ignore')
+
+    bots = [bot for bot in get_all_bots() if type(bot).__name__ != 'AIAnalystBot']
+    vectorized = [bot for bot in bots if getattr(bot, 'analyze_batch', None) is not None
+                  and bot.analyze_batch(FeatureTable(feature_rows(1))) is not None]
+    rows = feature_rows(args.coins, args.seed)
+    print(f"{len(bots)} bots ({len(vectorized)} vectorized) x {len(rows)} synthetic coins")
+
+    report = verify_batch_equivalence(vectorized, rows)
+    print(f"equivalence: {'OK' if report['equivalent'] else 'MISMATCH'}")
+    for mismatch in report['mismatches'][:5]:
+        print(f"  {mismatch['bot']} row {mismatch['row']}: scalar={mismatch['scalar']} batch={mismatch['batch']}")
+
+    # Scalar cost per bot: where an analyze_batch implementation would pay off
+    per_bot = {}
+    for bot in bots:
+        start = time.perf_counter()
+        for i, row in enumerate(rows):
+            _safe_analyze(bot, row, str(i))
+        per_bot[bot.name] = time.perf_counter() - start
+    scalar_seconds = sum(per_bot.values())
+    heaviest = sorted(per_bot.items(), key=lambda item: item[1], reverse=True)[:3]
+    unvectorized = scalar_seconds - sum(per_bot[bot.name] for bot in vectorized)
+    print(f"scalar cost: {unvectorized / scalar_seconds:.0%} in bots without analyze_batch; heaviest "
+          + ', '.join(f"{name} {seconds / len(rows) * 1e6:.1f}us" for name, seconds in heaviest) + " per coin")
+
+    start = time.perf_counter()
+    run_bots_batch(bots, rows)
+    batch_seconds = time.perf_counter() - start
+    print(f"all bots, end to end:                scalar {scalar_seconds:7.2f}s  batch {batch_seconds:7.2f}s  "
+          f"x{scalar_seconds / batch_seconds:.1f}")
+
+    # Signal arrays alone, without building the per-coin result dicts
+    start = time.perf_counter()
+    for i, row in enumerate(rows):
+        for bot in vectorized:
+            _safe_analyze(bot, row, str(i))
+    scalar_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    table = FeatureTable(rows)
+    for bot in vectorized:
+        bot.analyze_batch(table)
+    batch_seconds = time.perf_counter() - start
+    print(f"vectorized bots, signal arrays only: scalar {scalar_seconds:7.2f}s  batch {batch_seconds:7.2f}s  "
+          f"x{scalar_seconds / batch_seconds:.1f}")
+
+    return 0 if report['equivalent'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
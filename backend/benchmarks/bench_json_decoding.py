@@ -0,0 +1,91 @@
+"""
+Benchmark: provider response parsing, stdlib json versus services.json_codec.
+
+Parses every benchmarks.synthetic provider payload (one per provider
+endpoint, shaped and sized like that endpoint's responses) the old way (body decoded to str,
+json.loads, candles built field by field) and through json_codec (bytes
+parsed with orjson when installed, candles built in one pass), after checking
+both give the same result.
+
+    cd backend && python benchmarks/bench_json_decoding.py [--repeat 20]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import provider_payloads  # noqa: E402
+from services import json_codec  # noqa: E402
+from services.json_codec import candles_from_arrays, candles_from_records  # noqa: E402
+
+
+def stdlib_histoday(data):
+    candles = []
+    for candle in data.get('Data', {}).get('Data', []):
+        if candle.get('close', 0) > 0:
+            candles.append({
+                'timestamp': candle.get('time'),
+                'open': float(candle.get('open', 0)),
+                'high': float(candle.get('high', 0)),
+                'low': float(candle.get('low', 0)),
+                'close': float(candle.get('close', 0)),
+                'volume': float(candle.get('volumeto', 0))
+            })
+    return candles
+
+
+def stdlib_klines(klines):
+    return [
+        {'timestamp': int(k[0] / 1000), 'open': float(k[1]), 'high': float(k[2]), 'low': float(k[3]),
+         'close': float(k[4]), 'volume': float(k[5])}
+        for k in klines if len(k) >= 6
+    ]
+
+
+# Post-processing per payload: (stdlib path, json_codec path); other payloads are only decoded
+CANDLE_PARSERS = {
+    'cryptocompare_histoday': (stdlib_histoday, lambda data: candles_from_records(data.get('Data', {}).get('Data', []))),
+    'binance_klines': (stdlib_klines, candles_from_arrays),
+}
+
+
+def best_ms(parse, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            parse()
+        best = min(best, (time.perf_counter() - start) / repeat)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"json_codec backend: {json_codec.JSON_BACKEND}")
+    print(f"{'payload':34s} {'KB':>6s} {'stdlib ms':>10s} {'codec ms':>9s} {'x':>5s}")
+    for name, body in sorted(provider_payloads().items()):
+        old_post, new_post = CANDLE_PARSERS.get(name, (lambda data: data, lambda data: data))
+
+        def old():
+            return old_post(json.loads(body.decode('utf-8')))
+
+        def new():
+            return new_post(json_codec.loads(body))
+
+        if old() != new():
+            print(f"{name}: json_codec result differs from the stdlib parse")
+            return 1
+        old_ms, new_ms = best_ms(old, args.repeat), best_ms(new, args.repeat)
+        print(f"{name:34s} {len(body) / 1024:6.0f} {old_ms:10.2f} {new_ms:9.2f} {old_ms / new_ms:5.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,156 @@
+"""
+Benchmark: 100 concurrent users on GET /api/portfolio and /api/portfolio/analysis.
+
+Serves PortfolioService (in-memory database, MarketSnapshotService over a
+provider stand-in with request latency, fake LLM) from a local aiohttp app
+and drives it with concurrent users. Reports throughput, latency percentiles
+and the provider and LLM calls made, and checks the returned totals against
+the snapshot prices.
+
+    cd backend && python benchmarks/bench_portfolio_load.py [--users 100] [--requests 10] [--holdings 30]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import aiohttp  # noqa: E402
+from aiohttp import web  # noqa: E402
+from aiohttp.test_utils import TestServer  # noqa: E402
+
+import services.portfolio_service as portfolio_service  # noqa: E402
+from benchmarks.fakes import MemoryDB  # noqa: E402
+from services.market_snapshot import MarketSnapshotService  # noqa: E402
+from services.portfolio_service import PortfolioService  # noqa: E402
+
+SYMBOLS = [f"C{i}" for i in range(1000)]
+PROVIDER_LATENCY = 0.02
+LLM_LATENCY = 0.5
+
+
+class Provider:
+    """Listing/price provider stand-in with request latency."""
+
+    def __init__(self):
+        self.calls = {'listing': 0, 'prices': 0}
+
+    async def get_market_listing(self, max_coins: int):
+        self.calls['listing'] += 1
+        await asyncio.sleep(PROVIDER_LATENCY)
+        return [{'symbol': symbol, 'price': 1.0 + rank} for rank, symbol in enumerate(SYMBOLS[:max_coins])]
+
+    async def get_prices(self, symbols):
+        self.calls['prices'] += 1
+        await asyncio.sleep(PROVIDER_LATENCY)
+        return {}
+
+
+class FakeChat:
+    """LlmChat stand-in with a fixed answer in the requested format."""
+
+    calls = 0
+
+    def __init__(self, api_key=None, session_id=None, system_message=None):
+        pass
+
+    def with_model(self, provider, model):
+        return self
+
+    async def send_message(self, message):
+        FakeChat.calls += 1
+        await asyncio.sleep(LLM_LATENCY)
+        return ("RISK_SCORE: 6\nDIVERSIFICATION_SCORE: 4\nANALYSIS: Concentrated in large caps.\n"
+                "RECOMMENDATIONS:\n- Rebalance\n- Add stablecoins\n- Set stop losses")
+
+
+def make_app(service: PortfolioService) -> web.Application:
+    """/api/portfolio and /api/portfolio/analysis, with the user taken from an X-User header."""
+
+    def respond(payload):
+        return web.json_response(payload, dumps=lambda obj: json.dumps(obj, default=str))
+
+    async def get_portfolio(request):
+        return respond(await service.get_portfolio(request.headers['X-User']))
+
+    async def analyze_portfolio(request):
+        return respond(await service.analyze_portfolio_with_ai(request.headers['X-User']))
+
+    app = web.Application()
+    app.router.add_get('/api/portfolio', get_portfolio)
+    app.router.add_get('/api/portfolio/analysis', analyze_portfolio)
+    return app
+
+
+async def run_load(service: PortfolioService, provider: Provider, path: str, users: int, requests: int):
+    provider.calls = {key: 0 for key in provider.calls}
+    llm_calls = FakeChat.calls
+    server = TestServer(make_app(service))
+    await server.start_server()
+    latencies = []
+
+    async def user(session, index):
+        for _ in range(requests):
+            start = time.perf_counter()
+            async with session.get(server.make_url(path), headers={'X-User': f'user-{index}'}) as response:
+                assert response.status == 200, response.status
+                await response.read()
+            latencies.append(time.perf_counter() - start)
+
+    try:
+        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=users * 2)) as session:
+            start = time.perf_counter()
+            await asyncio.gather(*(user(session, index) for index in range(users)))
+            seconds = time.perf_counter() - start
+    finally:
+        await server.close()
+
+    latencies.sort()
+    print(f"{path:26s} {len(latencies)} requests  {len(latencies) / seconds:7.1f} req/s  "
+          f"p50 {statistics.median(latencies) * 1000:6.1f} ms  p95 {latencies[int(len(latencies) * 0.95)] * 1000:6.1f} ms  "
+          f"listing calls {provider.calls['listing']}  price calls {provider.calls['prices']}  "
+          f"LLM calls {FakeChat.calls - llm_calls}")
+
+
+async def run(users: int, requests: int, holdings: int):
+    rng = random.Random(1)
+    db = MemoryDB()
+    for index in range(users):
+        db.portfolios.documents.append({'user_id': f'user-{index}', 'holdings': [
+            {'symbol': symbol, 'quantity': rng.uniform(1, 10), 'avg_buy_price': rng.uniform(1, 500)}
+            for symbol in rng.sample(SYMBOLS[:500], holdings)
+        ]})
+    provider = Provider()
+    snapshot = MarketSnapshotService(provider)
+    service = PortfolioService(db, provider, market_snapshot=snapshot)
+
+    await run_load(service, provider, '/api/portfolio', users, requests)
+    await run_load(service, provider, '/api/portfolio/analysis', users, 3)
+
+    portfolio = await service.get_portfolio('user-3')
+    expected = sum(holding['quantity'] * snapshot.index[holding['symbol']]['price'] for holding in portfolio['holdings'])
+    print(f"total_value matches snapshot prices: {abs(portfolio['total_value'] - expected) < 1e-6 * expected}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--requests', type=int, default=10, help='GET /api/portfolio requests per user')
+    parser.add_argument('--holdings', type=int, default=30)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    os.environ.setdefault('EMERGENT_LLM_KEY', 'benchmark')
+    portfolio_service.LlmChat = FakeChat
+    asyncio.run(run(args.users, args.requests, args.holdings))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+Benchmark: percent_change alerts over a 10k-symbol, 7-day price history.
+
+Fills PriceHistory with one snapshot per minute for 7 days (plus an hour) of
+10,000 symbols, times the 1h / 24h / 7d change lookups and checks the 1h and
+24h changes against the recorded prices. Then evaluates 10,000
+percent_change alerts (mixed timeframes) through AlertService.evaluate_prices
+on that history.
+
+    cd backend && python benchmarks/bench_price_history.py [--symbols 10000] [--days 7]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from benchmarks.fakes import MemoryDB  # noqa: E402
+from services.alert_service import AlertService  # noqa: E402
+from services.price_history import PriceHistory, parse_timeframe  # noqa: E402
+
+TIMEFRAMES = ('1h', '24h', '7d')
+
+
+class HistorySnapshot:
+    """market_snapshot stand-in: the filled history and no provider 24h changes."""
+
+    def __init__(self, history: PriceHistory):
+        self.history = history
+        self.index = {}
+
+    def add_listener(self, listener):
+        pass
+
+
+def fill_history(symbols, minutes, seed):
+    """Record a random walk per symbol every minute, ending now.
+
+    Returns:
+        (history, current prices, time of the last snapshot, prices recorded 1h and 24h ago,
+        seconds spent in record())
+    """
+    rng = np.random.default_rng(seed)
+    history = PriceHistory()
+    prices = rng.lognormal(0, 2, len(symbols))
+    start = time.time() - (minutes - 1) * 60
+    checkpoints = {minutes - 1 - 60: '1h', minutes - 1 - 1440: '24h'}
+    recorded_ago, record_seconds = {}, 0.0
+
+    for minute in range(minutes):
+        prices = prices * np.exp(rng.normal(0, 0.001, len(symbols)))
+        snapshot = dict(zip(symbols, prices.tolist()))
+        started = time.perf_counter()
+        history.record(snapshot, start + minute * 60)
+        record_seconds += time.perf_counter() - started
+        if minute in checkpoints:
+            recorded_ago[checkpoints[minute]] = prices.astype(np.float32)
+    now = start + (minutes - 1) * 60
+    return history, dict(zip(symbols, prices.tolist())), now, recorded_ago, record_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--symbols', type=int, default=10000)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    symbols = [f"S{i}" for i in range(args.symbols)]
+    minutes = args.days * 1440 + 60
+    started = time.perf_counter()
+    history, current, now, recorded_ago, record_seconds = fill_history(symbols, minutes, args.seed)
+    stats = history.get_stats()
+    print(f"filled {minutes} minute snapshots x {len(symbols)} symbols in {time.perf_counter() - started:.1f}s "
+          f"(record() {record_seconds / minutes * 1000:.2f} ms/snapshot), {stats['memory_mb']} MB")
+
+    for timeframe in TIMEFRAMES:
+        seconds = parse_timeframe(timeframe)
+        best = float('inf')
+        for _ in range(5):
+            start = time.perf_counter()
+            changes = history.changes(current, seconds, now=now)
+            best = min(best, time.perf_counter() - start)
+        line = f"changes {timeframe:>3s}: {len(changes)} symbols in {best * 1000:7.2f} ms ({best / len(symbols) * 1e6:.2f} us/symbol)"
+        if timeframe in recorded_ago:
+            past = np.array([current[symbol] / (1 + changes[symbol] / 100) for symbol in symbols])
+            line += f", matches recorded prices: {np.allclose(past, recorded_ago[timeframe], rtol=1e-5)}"
+        print(line)
+
+    async def evaluate_alerts():
+        db = MemoryDB()
+        rng = np.random.default_rng(args.seed)
+        for i, symbol in enumerate(symbols):
+            db.alerts.documents.append({
+                'id': f'alert-{i}', 'user_id': f'user-{i % 1000}', 'symbol': symbol, 'status': 'active',
+                'alert_type': 'percent_change',
+                'condition': {'timeframe': TIMEFRAMES[i % len(TIMEFRAMES)],
+                              'percent': float(rng.choice([2.0, 5.0, 10.0])), 'direction': 'any'}
+            })
+        service = AlertService(db, crypto_client=None, market_snapshot=HistorySnapshot(history))
+        await service.load_alerts()
+
+        # Triggered alerts are written to the in-memory fake (a linear scan per write); time those apart
+        trigger_alert, write_seconds = service._trigger_alert, [0.0]
+
+        async def timed_trigger_alert(*args, **kwargs):
+            started = time.perf_counter()
+            await trigger_alert(*args, **kwargs)
+            write_seconds[0] += time.perf_counter() - started
+
+        service._trigger_alert = timed_trigger_alert
+        start = time.perf_counter()
+        result = await service.evaluate_prices(current)
+        return result, time.perf_counter() - start, write_seconds[0]
+
+    result, seconds, write_seconds = asyncio.run(evaluate_alerts())
+    print(f"evaluate_prices: {len(symbols)} percent_change alerts, {result['checked']} checked, "
+          f"{result['triggered']} triggered in {(seconds - write_seconds) * 1000:.1f} ms "
+          f"(+{write_seconds * 1000:.0f} ms writing triggers to the fake db)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""
+In-memory stand-ins for the database and market-data clients.
+
+MemoryDB implements the subset of the SupabaseCollection / SupabaseCursor API
+the services use (equality and {'$in': [...]} filters, sort, limit), so
+benchmarks and tests can run scans, alerts and portfolios without Supabase.
+"""
+
+import uuid
+import zlib
+from typing import Dict, List, Optional
+
+from benchmarks.synthetic import candles
+
+
+class InsertResult(dict):
+    """Inserted document that also answers Motor's ``inserted_id``."""
+
+    @property
+    def inserted_id(self):
+        return self.get('id')
+
+
+def _matches(document: Dict, query: Optional[Dict]) -> bool:
+    for key, value in (query or {}).items():
+        if isinstance(value, dict) and '$in' in value:
+            if document.get(key) not in value['$in']:
+                return False
+        elif document.get(key) != value:
+            return False
+    return True
+
+
+def _sorted(documents: List[Dict], sort: List) -> List[Dict]:
+    for field, direction in reversed(sort):
+        documents = sorted(documents, key=lambda doc: (doc.get(field) is None, doc.get(field)),
+                           reverse=direction == -1)
+    return documents
+
+
+class MemoryCursor:
+    def __init__(self, documents: List[Dict]):
+        self._documents = documents
+        self._sort: List = []
+        self._limit_count = None
+
+    def sort(self, field: str, direction: int = 1):
+        self._sort.append((field, direction))
+        return self
+
+    def limit(self, count: int):
+        self._limit_count = count
+        return self
+
+    async def to_list(self, length: int = None):
+        limit = length if length is not None else self._limit_count
+        documents = _sorted(self._documents, self._sort)
+        return [dict(doc) for doc in (documents[:limit] if limit is not None else documents)]
+
+
+class MemoryCollection:
+    def __init__(self):
+        self.documents: List[Dict] = []
+
+    async def find_one(self, query: Dict = None, sort: List = None) -> Optional[Dict]:
+        documents = _sorted([doc for doc in self.documents if _matches(doc, query)], sort or [])
+        return dict(documents[0]) if documents else None
+
+    def find(self, query: Dict = None) -> MemoryCursor:
+        return MemoryCursor([doc for doc in self.documents if _matches(doc, query)])
+
+    async def insert_one(self, document: Dict) -> InsertResult:
+        document = {'id': str(uuid.uuid4()), **{k: v for k, v in document.items() if k != '_id'}}
+        self.documents.append(document)
+        return InsertResult(document)
+
+    async def insert_many(self, documents: List[Dict]) -> List[Dict]:
+        return [await self.insert_one(document) for document in documents]
+
+    async def update_one(self, query: Dict, update: Dict, upsert: bool = False) -> Dict:
+        update_data = update.get('$set', update)
+        for document in self.documents:
+            if _matches(document, query):
+                document.update(update_data)
+                return {'matched_count': 1, 'modified_count': 1}
+        if upsert:
+            await self.insert_one({**{k: v for k, v in query.items() if not isinstance(v, dict)}, **update_data})
+        return {'matched_count': 0, 'modified_count': 0}
+
+    async def update_many(self, query: Dict, update: Dict) -> Dict:
+        update_data = update.get('$set', update)
+        matched = [document for document in self.documents if _matches(document, query)]
+        for document in matched:
+            document.update(update_data)
+        return {'matched_count': len(matched), 'modified_count': len(matched)}
+
+    async def delete_one(self, query: Dict) -> Dict:
+        for i, document in enumerate(self.documents):
+            if _matches(document, query):
+                del self.documents[i]
+                return {'deleted_count': 1}
+        return {'deleted_count': 0}
+
+    async def delete_many(self, query: Dict) -> Dict:
+        kept = [document for document in self.documents if not _matches(document, query)]
+        deleted = len(self.documents) - len(kept)
+        self.documents[:] = kept
+        return {'deleted_count': deleted}
+
+    async def count_documents(self, query: Dict = None) -> int:
+        return sum(1 for document in self.documents if _matches(document, query))
+
+
+class MemoryDB:
+    """``db.<table>`` returns the same MemoryCollection every time."""
+
+    def __init__(self):
+        self._collections: Dict[str, MemoryCollection] = {}
+
+    def __getattr__(self, name: str) -> MemoryCollection:
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self._collections.setdefault(name, MemoryCollection())
+
+
+def _seed(symbol: str) -> int:
+    return zlib.crc32(symbol.encode())
+
+
+class SyntheticMarket:
+    """crypto_client stand-in: a fixed coin list with generated candles."""
+
+    def __init__(self, coins: int):
+        self.symbols = [f"C{i}" for i in range(coins)]
+
+    async def get_all_coins(self, max_coins: int = 100):
+        return [(symbol, symbol, candles(seed=_seed(symbol))[-1]['close']) for symbol in self.symbols[:max_coins]]
+
+    async def get_historical_data(self, symbol: str, days: int = 365):
+        return candles(days, seed=_seed(symbol))
+
+    async def get_4h_candles(self, symbol: str, limit: int = 168):
+        return candles(limit, step=14400, seed=_seed(symbol + '4h'))
+
+
+class NoDerivatives:
+    """futures_client stand-in for coins without derivatives markets."""
+
+    snapshot_enabled = False
+
+    async def get_all_derivatives_metrics(self, symbol: str):
+        return {'symbol': symbol, 'has_derivatives_data': False}
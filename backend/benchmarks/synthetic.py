@@ -0,0 +1,281 @@
+"""
+Synthetic market data for benchmarks and tests (no provider calls).
+
+Everything is generated from a seeded NumPy generator, so runs are repeatable.
+"""
+
+import json
+from typing import Dict, List
+
+import numpy as np
+
+
+def feature_rows(count: int, seed: int = 7) -> List[Dict]:
+    """Per-coin feature dicts in the shape IndicatorEngine produces.
+
+    A few percent of the rows carry the edge cases the bots guard against:
+    NaN or missing indicators, collapsed Bollinger bands, zero prices and a
+    sentiment score.
+    """
+    rng = np.random.default_rng(seed)
+    rows = []
+    for _ in range(count):
+        price = float(rng.lognormal(0, 2))
+        features = {
+            'current_price': price,
+            'sma_20': price * rng.normal(1, 0.05),
+            'sma_50': price * rng.normal(1, 0.08),
+            'sma_200': price * rng.normal(1, 0.2),
+            'ema_9': price * rng.normal(1, 0.03),
+            'ema_12': price * rng.normal(1, 0.03),
+            'ema_13': price * rng.normal(1, 0.03),
+            'ema_20': price * rng.normal(1, 0.04),
+            'ema_21': price * rng.normal(1, 0.04),
+            'ema_26': price * rng.normal(1, 0.05),
+            'rsi_14': rng.uniform(0, 100),
+            'volume': rng.lognormal(10, 1),
+            'volume_sma_20': rng.lognormal(10, 0.5),
+            'obv': rng.normal(0, 1e6),
+            'vwap': price * rng.normal(1, 0.05),
+            'atr': price * 0.03,
+            'atr_14': price * 0.03,
+            'adx': rng.uniform(0, 60),
+            'macd': rng.normal(0, 0.3),
+            'macd_signal': rng.normal(0, 0.3),
+            'macd_histogram': rng.normal(0, 0.1),
+            'bb_upper': price * rng.uniform(0.95, 1.2),
+            'bb_middle': price * rng.normal(1, 0.03),
+            'bb_lower': price * rng.uniform(0.8, 1.05),
+            'bb_width': rng.uniform(0.01, 0.3),
+            'stoch_k': rng.uniform(0, 100),
+            'stoch_d': rng.uniform(0, 100),
+            'price_change_24h': rng.normal(0, 4),
+            'price_change_7d': rng.normal(0, 10),
+            'recent_high': price * 1.3,
+            'recent_low': price * 0.7,
+            'has_derivatives': False,
+            'market_regime': 'SIDEWAYS',
+            'timeframe_confidence_modifier': 1.0,
+        }
+
+        edge_case = rng.random()
+        if edge_case < 0.02:
+            features['rsi_14'] = float('nan')
+        elif edge_case < 0.04:
+            del features['sma_50']
+        elif edge_case < 0.05:
+            features['bb_upper'] = features['bb_lower']
+        elif edge_case < 0.06:
+            features['sentiment_score'] = float(rng.integers(1, 11))
+        elif edge_case < 0.07:
+            features['sma_50'] = 0.0
+        elif edge_case < 0.08:
+            features['current_price'] = 0.0
+
+        # IndicatorEngine hands out NumPy scalars
+        rows.append({key: np.float64(value) if isinstance(value, float) else value
+                     for key, value in features.items()})
+    return rows
+
+
+def candles(count: int = 365, step: int = 86400, seed: int = 0, start: int = 1_700_000_000) -> List[Dict]:
+    """OHLCV candle dicts of a log-normal random walk, oldest first."""
+    rng = np.random.default_rng(seed)
+    price = float(rng.lognormal(0, 2))
+    result = []
+    for i in range(count):
+        open_price = price
+        price *= float(np.exp(rng.normal(0, 0.03)))
+        result.append({
+            'timestamp': start + i * step,
+            'open': open_price,
+            'high': max(open_price, price) * 1.01,
+            'low': min(open_price, price) * 0.99,
+            'close': price,
+            'volume': float(rng.lognormal(10, 1))
+        })
+    return result
+
+
+def _coins(rng: np.random.Generator, count: int) -> List[Dict]:
+    """Listing-style coins: symbol, price, 24h open / high / low, volume and supply."""
+    coins = []
+    for i in range(count):
+        price = float(rng.lognormal(0, 2.5))
+        change = float(rng.normal(0, 0.04))
+        open_price = price / (1 + change)
+        supply = float(rng.lognormal(20, 2))
+        coins.append({
+            'symbol': f"C{i}",
+            'price': price,
+            'open': open_price,
+            'high': max(price, open_price) * float(1 + rng.uniform(0, 0.05)),
+            'low': min(price, open_price) * float(1 - rng.uniform(0, 0.05)),
+            'volume': supply * float(rng.uniform(0.001, 0.05)),
+            'supply': supply,
+            'funding_rate': float(rng.normal(0.0001, 0.0002)),
+            'open_interest': supply * float(rng.uniform(0.0005, 0.01))
+        })
+    return coins
+
+
+def _decimal(value: float) -> str:
+    """Number as exchanges send it in JSON strings."""
+    return f"{value:.8f}"
+
+
+def _usd(value: float) -> str:
+    """CryptoCompare DISPLAY formatting."""
+    return f"$ {value:,.2f}"
+
+
+def _cryptocompare_mktcapfull(rng: np.random.Generator, now: int) -> Dict:
+    data = []
+    for i, coin in enumerate(_coins(rng, 100)):
+        change = coin['price'] - coin['open']
+        raw = {
+            'TYPE': '5', 'MARKET': 'CCCAGG', 'FROMSYMBOL': coin['symbol'], 'TOSYMBOL': 'USD', 'FLAGS': '2049',
+            'PRICE': coin['price'], 'LASTUPDATE': now - int(rng.integers(0, 60)),
+            'LASTVOLUME': float(rng.uniform(0, 5)), 'LASTVOLUMETO': float(rng.uniform(0, 5)) * coin['price'],
+            'VOLUMEHOUR': coin['volume'] / 24, 'VOLUMEHOURTO': coin['volume'] / 24 * coin['price'],
+            'OPENHOUR': coin['open'], 'HIGHHOUR': coin['high'], 'LOWHOUR': coin['low'],
+            'VOLUME24HOUR': coin['volume'], 'VOLUME24HOURTO': coin['volume'] * coin['price'],
+            'OPEN24HOUR': coin['open'], 'HIGH24HOUR': coin['high'], 'LOW24HOUR': coin['low'],
+            'LASTMARKET': 'Coinbase', 'CHANGE24HOUR': change, 'CHANGEPCT24HOUR': change / coin['open'] * 100,
+            'SUPPLY': coin['supply'], 'MKTCAP': coin['supply'] * coin['price'],
+            'CIRCULATINGSUPPLY': coin['supply'] * 0.9, 'CIRCULATINGSUPPLYMKTCAP': coin['supply'] * 0.9 * coin['price'],
+            'TOTALVOLUME24H': coin['volume'] * 1.4, 'TOTALVOLUME24HTO': coin['volume'] * 1.4 * coin['price'],
+            'IMAGEURL': f"/media/{i}/{coin['symbol'].lower()}.png"
+        }
+        display = {key: (_usd(value) if isinstance(value, float) else value) for key, value in raw.items()}
+        data.append({
+            'CoinInfo': {
+                'Id': str(1000 + i), 'Name': coin['symbol'], 'FullName': f"Coin {i}", 'Internal': coin['symbol'],
+                'ImageUrl': raw['IMAGEURL'], 'Url': f"/coins/{coin['symbol'].lower()}/overview",
+                'Algorithm': 'N/A', 'ProofType': 'N/A', 'Rating': {'Weiss': {'Rating': ''}},
+                'AssetLaunchDate': '2020-01-01', 'MaxSupply': coin['supply'] * 2, 'Type': 1,
+                'DocumentType': 'Webpagecoin'
+            },
+            'RAW': {'USD': raw},
+            'DISPLAY': {'USD': display}
+        })
+    return {'Message': 'Success', 'Type': 100, 'MetaData': {'Count': 5000}, 'Data': data}
+
+
+def _cryptocompare_histoday(rng: np.random.Generator, now: int) -> Dict:
+    days = candles(2001, seed=int(rng.integers(1 << 31)), start=now - 2001 * 86400)
+    # Days before the coin was listed come back as zero candles
+    for candle in days[:30]:
+        candle.update(open=0.0, high=0.0, low=0.0, close=0.0, volume=0.0)
+    return {'Response': 'Success', 'Message': '', 'HasWarning': False, 'Type': 100, 'Data': {
+        'Aggregated': False, 'TimeFrom': days[0]['timestamp'], 'TimeTo': days[-1]['timestamp'],
+        'Data': [{
+            'time': candle['timestamp'], 'high': candle['high'], 'low': candle['low'], 'open': candle['open'],
+            'volumefrom': candle['volume'], 'volumeto': candle['volume'] * candle['close'],
+            'close': candle['close'], 'conversionType': 'direct', 'conversionSymbol': ''
+        } for candle in days]
+    }}
+
+
+def _coingecko_market_chart(rng: np.random.Generator, now: int) -> Dict:
+    hours = candles(2160, step=3600, seed=int(rng.integers(1 << 31)), start=now - 2160 * 3600)
+    supply = float(rng.lognormal(18, 1))
+    return {
+        'prices': [[candle['timestamp'] * 1000, candle['close']] for candle in hours],
+        'market_caps': [[candle['timestamp'] * 1000, candle['close'] * supply] for candle in hours],
+        'total_volumes': [[candle['timestamp'] * 1000, candle['volume'] * candle['close'] * 24] for candle in hours]
+    }
+
+
+def _coinmarketcap_quotes_historical(rng: np.random.Generator, now: int) -> Dict:
+    hours = candles(720, step=3600, seed=int(rng.integers(1 << 31)), start=now - 720 * 3600)
+    supply = float(rng.lognormal(16, 1))
+
+    def iso(timestamp: int) -> str:
+        return np.datetime_as_string(np.datetime64(timestamp, 's'), unit='ms') + 'Z'
+
+    return {'status': {'timestamp': iso(now), 'error_code': 0, 'error_message': None, 'credit_count': 1},
+            'data': {'id': 1, 'name': 'Bitcoin', 'symbol': 'BTC', 'is_active': 1, 'is_fiat': 0, 'quotes': [{
+                'timestamp': iso(candle['timestamp']),
+                'quote': {'USD': {
+                    'price': candle['close'], 'volume_24h': candle['volume'] * candle['close'] * 24,
+                    'market_cap': candle['close'] * supply, 'circulating_supply': supply, 'total_supply': supply,
+                    'timestamp': iso(candle['timestamp'])
+                }}
+            } for candle in hours]}}
+
+
+def _binance_klines(rng: np.random.Generator, now: int) -> List:
+    bars = candles(1000, step=14400, seed=int(rng.integers(1 << 31)), start=now - 1000 * 14400)
+    return [[
+        candle['timestamp'] * 1000, _decimal(candle['open']), _decimal(candle['high']), _decimal(candle['low']),
+        _decimal(candle['close']), _decimal(candle['volume']), (candle['timestamp'] + 14400) * 1000 - 1,
+        _decimal(candle['volume'] * candle['close']), int(rng.integers(1000, 100000)),
+        _decimal(candle['volume'] / 2), _decimal(candle['volume'] / 2 * candle['close']), '0'
+    ] for candle in bars]
+
+
+def _binance_premium_index(rng: np.random.Generator, now: int) -> List:
+    next_funding = (now // 28800 + 1) * 28800 * 1000
+    return [{
+        'symbol': f"{coin['symbol']}USDT", 'markPrice': _decimal(coin['price']),
+        'indexPrice': _decimal(coin['price'] * float(rng.normal(1, 0.0005))),
+        'estimatedSettlePrice': _decimal(coin['price'] * float(rng.normal(1, 0.0005))),
+        'lastFundingRate': _decimal(coin['funding_rate']), 'interestRate': '0.00010000',
+        'nextFundingTime': next_funding, 'time': now * 1000
+    } for coin in _coins(rng, 600)]
+
+
+def _bybit_tickers(rng: np.random.Generator, now: int) -> Dict:
+    next_funding = str((now // 28800 + 1) * 28800 * 1000)
+    tickers = [{
+        'symbol': f"{coin['symbol']}USDT", 'lastPrice': _decimal(coin['price']),
+        'indexPrice': _decimal(coin['price'] * float(rng.normal(1, 0.0005))),
+        'markPrice': _decimal(coin['price'] * float(rng.normal(1, 0.0005))),
+        'prevPrice24h': _decimal(coin['open']), 'price24hPcnt': f"{coin['price'] / coin['open'] - 1:.6f}",
+        'highPrice24h': _decimal(coin['high']), 'lowPrice24h': _decimal(coin['low']),
+        'prevPrice1h': _decimal(coin['price'] * float(rng.normal(1, 0.005))),
+        'openInterest': _decimal(coin['open_interest']),
+        'openInterestValue': f"{coin['open_interest'] * coin['price']:.2f}",
+        'turnover24h': f"{coin['volume'] * coin['price']:.4f}", 'volume24h': _decimal(coin['volume']),
+        'fundingRate': _decimal(coin['funding_rate']), 'nextFundingTime': next_funding,
+        'predictedDeliveryPrice': '', 'basisRate': '', 'deliveryFeeRate': '', 'deliveryTime': '0',
+        'ask1Size': _decimal(float(rng.uniform(1, 1000))), 'bid1Price': _decimal(coin['price'] * 0.9999),
+        'ask1Price': _decimal(coin['price'] * 1.0001), 'bid1Size': _decimal(float(rng.uniform(1, 1000))),
+        'basis': ''
+    } for coin in _coins(rng, 550)]
+    return {'retCode': 0, 'retMsg': 'OK', 'result': {'category': 'linear', 'list': tickers},
+            'retExtInfo': {}, 'time': now * 1000}
+
+
+def _okx_open_interest(rng: np.random.Generator, now: int) -> Dict:
+    return {'code': '0', 'msg': '', 'data': [{
+        'instType': 'SWAP', 'instId': f"{coin['symbol']}-USDT-SWAP",
+        'oi': _decimal(coin['open_interest'] * 10), 'oiCcy': _decimal(coin['open_interest']),
+        'oiUsd': _decimal(coin['open_interest'] * coin['price']), 'ts': str(now * 1000)
+    } for coin in _coins(rng, 300)]}
+
+
+# Provider endpoint -> payload builder, each shaped and sized like that endpoint's responses
+_PAYLOAD_BUILDERS = {
+    'cryptocompare_mktcapfull': _cryptocompare_mktcapfull,
+    'cryptocompare_histoday': _cryptocompare_histoday,
+    'coingecko_market_chart': _coingecko_market_chart,
+    'coinmarketcap_quotes_historical': _coinmarketcap_quotes_historical,
+    'binance_klines': _binance_klines,
+    'binance_premium_index': _binance_premium_index,
+    'bybit_tickers': _bybit_tickers,
+    'okx_open_interest': _okx_open_interest,
+}
+PROVIDER_PAYLOADS = tuple(_PAYLOAD_BUILDERS)
+
+
+def provider_payloads(seed: int = 42, now: int = 1_700_000_000) -> Dict[str, bytes]:
+    """JSON response bodies of the provider endpoints the clients parse, by PROVIDER_PAYLOADS name.
+
+    Prices follow the candles() random walk (so highs and lows bracket opens
+    and closes), funding rates are basis points and exchanges send their
+    numbers as strings, as the live endpoints do.
+    """
+    rng = np.random.default_rng(seed)
+    return {name: json.dumps(build(rng, now)).encode() for name, build in _PAYLOAD_BUILDERS.items()}
@@ -0,0 +1,240 @@
+"""
+Vectorized bot execution across every coin in a scan.
+
+Instead of calling ``bot.analyze(features)`` once per bot and coin, the scan
+builds one FeatureTable (one NumPy column per feature, one row per coin) and
+asks each bot for ``analyze_batch(table)``. Bots that implement it return
+arrays of direction, confidence, entry, take profit and stop loss for every
+coin at once; bots that don't (or rows a bot can't vectorize, e.g. NaN inputs)
+are routed through the scalar ``analyze`` so results stay identical to the
+per-coin path.
+
+Coverage is partial: 12 of the 58 bots have a NumPy implementation, the rest
+run through the scalar adapter. No bot dominates the scalar cost (4 us per
+coin on average, 7 us for the heaviest), so the gain is in signal computation
+(about x3.5 for the vectorized bots on 5,000 coins) while running all bots
+ends up at x0.8-1.0 of the per-coin path: building the result dicts costs as
+much as the bots themselves. benchmarks/bench_batch_bots.py measures both;
+VECTORIZED_BOTS stays opt-in.
+"""
+
+import logging
+import math
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Numeric keys every batch signal dict carries (besides 'valid' and 'fallback')
+SIGNAL_FIELDS = ['confidence', 'entry', 'take_profit', 'stop_loss',
+                 'predicted_24h', 'predicted_48h', 'predicted_7d']
+
+
+def _as_float(value) -> float:
+    """Coerce a feature value to float, NaN for missing or non-numeric values."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+class FeatureTable:
+    """Column-oriented view over the per-coin feature dicts of a scan."""
+
+    def __init__(self, rows: List[Dict], labels: Optional[List[str]] = None,
+                 columns: Optional[Dict[str, np.ndarray]] = None):
+        """
+        Args:
+            rows: One features dict per coin
+            labels: Optional row labels used in log messages
+            columns: Optional float64 columns already built from the rows (the
+                backtester keeps its features as arrays), used instead of re-reading rows
+        """
+        self.rows = rows
+        self.labels = labels or [str(i) for i in range(len(rows))]
+        self.size = len(rows)
+        self._columns: Dict[str, np.ndarray] = dict(columns or {})
+        self._presence: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return self.size
+
+    def column(self, key: str) -> np.ndarray:
+        """Float64 column for a feature (NaN where missing or non-numeric)."""
+        col = self._columns.get(key)
+        if col is None:
+            values = [row.get(key) for row in self.rows]
+            try:
+                col = np.array(values, dtype=np.float64)  # None becomes NaN
+            except (TypeError, ValueError):
+                col = np.array([_as_float(value) for value in values], dtype=np.float64)
+            self._columns[key] = col
+        return col
+
+    def has(self, *keys: str) -> np.ndarray:
+        """Mask of rows whose feature dict contains all the given keys."""
+        mask = np.ones(self.size, dtype=bool)
+        for key in keys:
+            present = self._presence.get(key)
+            if present is None:
+                present = np.fromiter((key in row for row in self.rows), dtype=bool, count=self.size)
+                self._presence[key] = present
+            mask &= present
+        return mask
+
+    def finite(self, *keys: str) -> np.ndarray:
+        """Mask of rows where all the given features are finite numbers."""
+        mask = np.ones(self.size, dtype=bool)
+        for key in keys:
+            mask &= np.isfinite(self.column(key))
+        return mask
+
+
+def _safe_analyze(bot, features: Dict, label: str) -> Optional[Dict]:
+    """Scalar analyze with the same error handling as the per-coin scan loop."""
+    try:
+        return bot.analyze(features)
+    except Exception as e:
+        logger.error(f"Bot {bot.name} failed for {label}: {e}")
+        return None
+
+
+def _clean_number(value: float):
+    """Return integral confidences as int, like the scalar bots do."""
+    return int(value) if value.is_integer() else value
+
+
+def results_from_signals(bot, table: FeatureTable, signals: Dict[str, np.ndarray]) -> List[Optional[Dict]]:
+    """Expand batch signal arrays into one scalar-style result dict per row.
+
+    Rows flagged in ``signals['fallback']`` are evaluated with ``bot.analyze``.
+    """
+    results: List[Optional[Dict]] = [None] * table.size
+    valid = signals['valid'] & ~signals['fallback']
+    rows = np.flatnonzero(valid).tolist()
+
+    # tolist() hands back plain Python floats in one pass instead of per-element boxing
+    columns = {field: signals[field][valid].tolist() for field in SIGNAL_FIELDS}
+    columns['direction'] = signals['direction'][valid].tolist()
+    columns['rationale'] = signals['rationale'][valid].tolist()
+    leverage = signals.get('recommended_leverage')
+    if leverage is not None:
+        columns['recommended_leverage'] = leverage[valid].tolist()
+    keys = list(columns)
+
+    for i, values in zip(rows, zip(*columns.values())):
+        result = dict(zip(keys, values))
+        result['confidence'] = _clean_number(result['confidence'])
+        result['direction'] = str(result['direction'])
+        result['rationale'] = str(result['rationale'])
+        results[i] = result
+
+    for i in np.flatnonzero(signals['fallback']).tolist():
+        results[i] = _safe_analyze(bot, table.rows[i], table.labels[i])
+
+    return results
+
+
+def analyze_bot_batch(bot, table: FeatureTable) -> List[Optional[Dict]]:
+    """Run one bot over every row, vectorized when the bot supports it.
+
+    This is the adapter for bots without a NumPy implementation: when
+    ``analyze_batch`` is missing or returns None, every row goes through
+    the scalar ``analyze``.
+    """
+    signals = None
+    analyze_batch = getattr(bot, 'analyze_batch', None)
+    if analyze_batch is not None:
+        try:
+            with np.errstate(all='ignore'):
+                signals = analyze_batch(table)
+        except Exception as e:
+            logger.error(f"Batch analysis failed for {bot.name}, falling back to scalar: {e}", exc_info=True)
+
+    if signals is None:
+        return [_safe_analyze(bot, row, label) for row, label in zip(table.rows, table.labels)]
+    return results_from_signals(bot, table, signals)
+
+
+def run_bots_batch(bots: Sequence, rows: List[Dict],
+                   labels: Optional[List[str]] = None) -> List[List[Tuple[object, Optional[Dict]]]]:
+    """Run every bot over every coin's features.
+
+    Args:
+        bots: Bot instances (BotStrategy or any object with ``analyze``)
+        rows: One features dict per coin
+        labels: Optional coin symbols used in log messages
+
+    Returns:
+        Per coin, a list of (bot, result) pairs in bot order. ``result`` is None
+        when the bot produced no signal, exactly like ``bot.analyze``.
+    """
+    table = FeatureTable(rows, labels)
+    per_coin: List[List[Tuple[object, Optional[Dict]]]] = [[] for _ in range(table.size)]
+
+    for bot in bots:
+        for i, result in enumerate(analyze_bot_batch(bot, table)):
+            per_coin[i].append((bot, result))
+
+    return per_coin
+
+
+def _results_match(expected: Optional[Dict], actual: Optional[Dict], rtol: float) -> bool:
+    if expected is None or actual is None:
+        return expected is None and actual is None
+    for key, value in expected.items():
+        other = actual.get(key)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            if not isinstance(other, (int, float)):
+                return False
+            if math.isnan(value) and math.isnan(other):
+                continue
+            if not math.isclose(value, other, rel_tol=rtol, abs_tol=1e-12):
+                return False
+        elif value != other:
+            return False
+    return True
+
+
+def verify_batch_equivalence(bots: Sequence, rows: List[Dict], rtol: float = 1e-9) -> Dict:
+    """Equivalence harness: compare batch output against scalar ``analyze`` row by row.
+
+    Bots that draw random numbers (see specialized_bots) will not compare equal.
+
+    Returns:
+        Dict with per-bot mismatch counts, timings and a sample of mismatches
+    """
+    table = FeatureTable(rows)
+    report = {'rows': table.size, 'bots': {}, 'mismatches': []}
+
+    for bot in bots:
+        analyze_batch = getattr(bot, 'analyze_batch', None)
+        with np.errstate(all='ignore'):
+            vectorized = analyze_batch is not None and analyze_batch(table) is not None
+
+        start = time.perf_counter()
+        batch_results = analyze_bot_batch(bot, table)
+        batch_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        scalar_results = [_safe_analyze(bot, row, table.labels[i]) for i, row in enumerate(rows)]
+        scalar_seconds = time.perf_counter() - start
+
+        mismatched = 0
+        for i, (expected, actual) in enumerate(zip(scalar_results, batch_results)):
+            if not _results_match(expected, actual, rtol):
+                mismatched += 1
+                if len(report['mismatches']) < 20:
+                    report['mismatches'].append({'bot': bot.name, 'row': i, 'scalar': expected, 'batch': actual})
+
+        report['bots'][bot.name] = {
+            'vectorized': vectorized,
+            'mismatched_rows': mismatched,
+            'batch_seconds': round(batch_seconds, 6),
+            'scalar_seconds': round(scalar_seconds, 6),
+        }
+
+    report['equivalent'] = not report['mismatches']
+    return report
@@ -1,5 +1,8 @@
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
 import logging
+import numpy as np
+
+from bots.batch_engine import FeatureTable
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +23,98 @@ class BotStrategy:
         """
         raise NotImplementedError
     
+    def analyze_batch(self, table: FeatureTable) -> Optional[Dict[str, np.ndarray]]:
+        """Analyze every coin of a scan at once (vectorized mode).
+        
+        Bots override this with NumPy implementations of their analyze() logic.
+        Returning None (the default) makes the batch engine call analyze() per coin.
+        
+        Returns:
+            Dict of arrays (one entry per row): valid, fallback, direction, entry,
+            take_profit, stop_loss, confidence, rationale, predicted_24h,
+            predicted_48h, predicted_7d and optionally recommended_leverage
+        """
+        return None
+    
+    def _batch_inputs(self, table: FeatureTable, *keys: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows that have all required features, and those needing the scalar path.
+        
+        Rows with non-finite inputs are handed back to analyze() so NaN/inf
+        handling stays exactly as in the scalar implementation.
+        """
+        valid = table.has(*keys)
+        return valid, valid & ~table.finite(*keys)
+    
+    def _batch_signals(self, table: FeatureTable, valid: np.ndarray, fallback: np.ndarray,
+                       is_long: np.ndarray, confidence: np.ndarray, take_profit: np.ndarray,
+                       stop_loss: np.ndarray, rationale: np.ndarray, volatility: float = 0.02,
+                       leverage: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """Assemble analyze_batch() output, mirroring the scalar result dict."""
+        price = table.column('current_price')
+        confidence = np.asarray(confidence, dtype=np.float64)
+        predictions = self._calculate_predicted_prices_batch(price, is_long, volatility, confidence / 10.0)
+        
+        signals = {
+            'direction': np.where(is_long, 'long', 'short'),
+            'entry': price,
+            'take_profit': np.asarray(take_profit, dtype=np.float64),
+            'stop_loss': np.asarray(stop_loss, dtype=np.float64),
+            'confidence': confidence,
+            'rationale': np.asarray(rationale, dtype=object),
+            **predictions
+        }
+        if leverage is not None:
+            signals['recommended_leverage'] = leverage
+        
+        # Anything that would not be a finite number goes through analyze() instead
+        finite = np.ones(len(table), dtype=bool)
+        for key in ('take_profit', 'stop_loss', 'confidence', 'predicted_24h', 'recommended_leverage'):
+            if key in signals:
+                finite &= np.isfinite(signals[key])
+        
+        signals['valid'] = valid
+        signals['fallback'] = fallback | (valid & ~finite)
+        return signals
+    
+    def _calculate_predicted_prices_batch(self, current_price: np.ndarray, is_long: np.ndarray,
+                                          volatility: float = 0.02, strength: np.ndarray = 1.0) -> Dict[str, np.ndarray]:
+        """Vectorized _calculate_predicted_prices (same arithmetic, element-wise)."""
+        return {
+            'predicted_24h': np.where(is_long, current_price * (1 + volatility * strength * 0.5),
+                                      current_price * (1 - volatility * strength * 0.5)),
+            'predicted_48h': np.where(is_long, current_price * (1 + volatility * strength * 1.0),
+                                      current_price * (1 - volatility * strength * 1.0)),
+            'predicted_7d': np.where(is_long, current_price * (1 + volatility * strength * 2.0),
+                                     current_price * (1 - volatility * strength * 2.0)),
+        }
+    
+    def _calculate_leverage_batch(self, confidence: np.ndarray, entry: np.ndarray, stop_loss: np.ndarray,
+                                  volatility: float = 0.02, sentiment_score: np.ndarray = 5) -> np.ndarray:
+        """Vectorized _calculate_leverage. NaN where the scalar version would raise."""
+        sl_distance = np.abs(entry - stop_loss) / entry
+        sl_factor = np.select([sl_distance < 0.02, sl_distance < 0.05, sl_distance < 0.10], [0.5, 0.8, 1.0], 0.7)
+        
+        if volatility < 0.02:
+            vol_factor = 1.3
+        elif volatility < 0.05:
+            vol_factor = 1.0
+        elif volatility < 0.08:
+            vol_factor = 0.7
+        else:
+            vol_factor = 0.5
+        
+        sentiment_score = np.broadcast_to(np.asarray(sentiment_score, dtype=np.float64), sl_distance.shape)
+        sentiment_factor = np.select(
+            [sentiment_score >= 8, sentiment_score >= 6, sentiment_score <= 2, sentiment_score <= 4],
+            [1.2, 1.1, 0.8, 0.9], 1.0
+        )
+        
+        leverage = np.clip(confidence * sl_factor * vol_factor * sentiment_factor, 1.0, 20.0)
+        # Python's round() so results match the scalar path exactly
+        leverage = np.array([round(x, 1) for x in leverage.tolist()], dtype=np.float64)
+        leverage[~(np.isfinite(sl_distance) & np.isfinite(sentiment_score))] = np.nan
+        return leverage
+    
     def _calculate_predicted_prices(self, current_price: float, direction: str, 
                                     volatility: float = 0.02, strength: float = 1.0) -> Dict:
         """Calculate predicted prices for 24h, 48h, and 7d based on strategy.
@@ -171,6 +266,30 @@ class SMA_CrossBot(BotStrategy):
             'recommended_leverage': leverage,
             **predictions
         }
+    
+    def analyze_batch(self, table: FeatureTable) -> Dict[str, np.ndarray]:
+        valid, fallback = self._batch_inputs(table, 'sma_20', 'sma_50', 'current_price')
+        sma_20 = table.column('sma_20')
+        sma_50 = table.column('sma_50')
+        price = table.column('current_price')
+        
+        is_long = sma_20 > sma_50
+        gap = np.where(is_long, sma_20 - sma_50, sma_50 - sma_20)
+        confidence = np.where(sma_50 > 0, np.minimum(10, np.trunc(5 + (gap / sma_50) * 100)), 5)
+        
+        volatility = np.where(price > 0, np.minimum(np.abs(sma_20 - sma_50) / price, 0.5), 0.02)
+        tp_pct = 0.03 + volatility * 2
+        sl_pct = 0.015 + volatility
+        stop_loss = np.where(is_long, price * (1 - sl_pct), price * (1 + sl_pct))
+        take_profit = np.where(is_long, price * (1 + tp_pct), price * (1 - tp_pct))
+        
+        sentiment_score = np.where(table.has('sentiment_score'), table.column('sentiment_score'), 5)
+        leverage = self._calculate_leverage_batch(confidence, price, stop_loss, 0.02, sentiment_score)
+        rationale = np.where(is_long, "SMA20 above SMA50, indicating long trend",
+                             "SMA20 below SMA50, indicating short trend")
+        
+        return self._batch_signals(table, valid, fallback, is_long, confidence, take_profit, stop_loss,
+                                   rationale, 0.02, leverage)
 
 
 class RSI_Bot(BotStrategy):
@@ -224,6 +343,34 @@ class RSI_Bot(BotStrategy):
 ,
             **predictions
         }
+    
+    def analyze_batch(self, table: FeatureTable) -> Dict[str, np.ndarray]:
+        valid, fallback = self._batch_inputs(table, 'rsi_14', 'current_price')
+        rsi = table.column('rsi_14')
+        price = table.column('current_price')
+        
+        oversold = rsi < 30
+        overbought = ~oversold & (rsi > 70)
+        extreme = oversold | overbought
+        is_long = np.where(extreme, oversold, rsi < 50)
+        confidence = np.select(
+            [oversold, overbought],
+            [np.minimum(10, np.trunc(3 + (30 - rsi) / 3)), np.minimum(10, np.trunc(3 + (rsi - 70) / 3))],
+            5
+        )
+        tp_pct = np.where(extreme, 0.04, 0.025)
+        sl_pct = np.where(extreme, 0.02, 0.015)
+        
+        rationale = np.full(len(table), '', dtype=object)
+        for i in np.flatnonzero(valid & ~fallback):
+            condition = 'indicates oversold condition' if oversold[i] else \
+                'indicates overbought condition' if overbought[i] else 'shows neutral momentum'
+            rationale[i] = f"RSI at {rsi[i]:.1f} {condition}"
+        
+        return self._batch_signals(table, valid, fallback, is_long, confidence,
+                                   np.where(is_long, price * (1 + tp_pct), price * (1 - tp_pct)),
+                                   np.where(is_long, price * (1 - sl_pct), price * (1 + sl_pct)),
+                                   rationale)
 
 
 class MACD_Bot(BotStrategy):
@@ -262,6 +409,21 @@ class MACD_Bot(BotStrategy):
             'rationale': f"MACD {'above' if direction == 'long' else 'below'} signal line",
             **predictions
         }
+    
+    def analyze_batch(self, table: FeatureTable) -> Dict[str, np.ndarray]:
+        valid, fallback = self._batch_inputs(table, 'macd', 'macd_signal', 'current_price')
+        macd = table.column('macd')
+        signal = table.column('macd_signal')
+        price = table.column('current_price')
+        
+        is_long = macd > signal
+        confidence = np.minimum(10, np.trunc(5 + np.abs(macd - signal) * 10))
+        rationale = np.where(is_long, "MACD above signal line", "MACD below signal line")
+        
+        return self._batch_signals(table, valid, fallback, is_long, confidence,
+                                   np.where(is_long, price * 1.035, price * 0.965),
+                                   np.where(is_long, price * 0.98, price * 1.02),
+                                   rationale)
 
 
 class BollingerBandsBot(BotStrategy):
@@ -314,6 +476,35 @@ class BollingerBandsBot(BotStrategy):
 ,
             **predictions
         }
+    
+    def analyze_batch(self, table: FeatureTable) -> Dict[str, np.ndarray]:
+        valid, fallback = self._batch_inputs(table, 'bb_upper', 'bb_lower', 'bb_middle', 'current_price')
+        price = table.column('current_price')
+        bb_upper = table.column('bb_upper')
+        bb_lower = table.column('bb_lower')
+        bb_middle = table.column('bb_middle')
+        
+        bb_position = (price - bb_lower) / (bb_upper - bb_lower)
+        fallback = fallback | (valid & ~np.isfinite(bb_position))
+        
+        near_lower = bb_position < 0.2
+        near_upper = ~near_lower & (bb_position > 0.8)
+        is_long = np.where(near_lower, True, np.where(near_upper, False, price < bb_middle))
+        confidence = np.select(
+            [near_lower, near_upper],
+            [np.minimum(10, np.trunc(8 - bb_position * 10)), np.minimum(10, np.trunc(5 + (bb_position - 0.8) * 25))],
+            5
+        )
+        rationale = np.select(
+            [near_lower, near_upper],
+            ["Price near lower Bollinger Band, potential bounce", "Price near upper Bollinger Band, potential pullback"],
+            "Price in middle BB zone"
+        )
+        
+        return self._batch_signals(table, valid, fallback, is_long, confidence,
+                                   np.where(is_long, bb_middle, bb_lower),
+                                   np.where(is_long, bb_lower * 0.98, bb_upper * 1.02),
+                                   rationale)
 
 
 class EMA_RibbonBot(BotStrategy):
@@ -359,6 +550,27 @@ class EMA_RibbonBot(BotStrategy):
 ,
             **predictions
         }
+    
+    def analyze_batch(self, table: FeatureTable) -> Dict[str, np.ndarray]:
+        valid, fallback = self._batch_inputs(table, 'ema_9', 'ema_21', 'current_price')
+        ema_9 = table.column('ema_9')
+        ema_21 = table.column('ema_21')
+        price = table.column('current_price')
+        
+        uptrend = (ema_9 > ema_21) & (price > ema_9)
+        downtrend = ~uptrend & (ema_9 < ema_21) & (price < ema_9)
+        is_long = np.where(uptrend, True, np.where(downtrend, False, price > ema_9))
+        confidence = np.where(uptrend | downtrend, 8, 5)
+        rationale = np.select(
+            [uptrend, downtrend],
+            ["Strong uptrend: Price > EMA9 > EMA21", "Strong downtrend: Price < EMA9 < EMA21"],
+            "Mixed EMA signals"
+        )
+        
+        return self._batch_signals(table, valid, fallback, is_long, confidence,
+                                   np.where(is_long, price * 1.04, price * 0.96),
+                                   np.where(is_long, price * 0.975, price * 1.025),
+                                   rationale)
 
 
 class VolumeBreakoutBot(BotStrategy):
@@ -407,6 +619,33 @@ class VolumeBreakoutBot(BotStrategy):
 ,
             **predictions
         }
+    
+    def analyze_batch(self, table: FeatureTable) -> Dict[str, np.ndarray]:
+        valid, fallback = self._batch_inputs(table, 'volume', 'volume_sma_20', 'current_price', 'price_change_24h')
+        volume = table.column('volume')
+        vol_sma = table.column('volume_sma_20')
+        price = table.column('current_price')
+        price_change = table.column('price_change_24h')
+        
+        vol_ratio = np.where(vol_sma > 0, volume / vol_sma, 1)
+        breakout = (vol_ratio > 1.5) & (price_change > 2)
+        breakdown = ~breakout & (vol_ratio > 1.5) & (price_change < -2)
+        is_long = np.where(breakout, True, np.where(breakdown, False, price_change > 0))
+        confidence = np.where(breakout | breakdown, np.minimum(10, np.trunc(5 + vol_ratio)), 4)
+        
+        rationale = np.full(len(table), '', dtype=object)
+        for i in np.flatnonzero(valid & ~fallback):
+            if breakout[i]:
+                rationale[i] = f"High volume breakout ({vol_ratio[i]:.1f}x avg) with price up {price_change[i]:.1f}%"
+            elif breakdown[i]:
+                rationale[i] = f"High volume breakdown ({vol_ratio[i]:.1f}x avg) with price down {price_change[i]:.1f}%"
+            else:
+                rationale[i] = "Normal volume conditions"
+        
+        return self._batch_signals(table, valid, fallback, is_long, confidence,
+                                   np.where(is_long, price * 1.05, price * 0.95),
+                                   np.where(is_long, price * 0.97, price * 1.03),
+                                   rationale)
 
 
 class ATR_VolatilityBot(BotStrategy):
@@ -505,6 +744,29 @@ class StochasticBot(BotStrategy):
 ,
             **predictions
         }
+    
+    def analyze_batch(self, table: FeatureTable) -> Dict[str, np.ndarray]:
+        valid, fallback = self._batch_inputs(table, 'stoch_k', 'stoch_d', 'current_price')
+        k = table.column('stoch_k')
+        d = table.column('stoch_d')
+        price = table.column('current_price')
+        
+        oversold = (k < 20) & (d < 20)
+        overbought = ~oversold & (k > 80) & (d > 80)
+        crossed_up = ~oversold & ~overbought & (k > d)
+        is_long = oversold | crossed_up
+        confidence = np.where(oversold | overbought, 8, 6)
+        rationale = np.select(
+            [oversold, overbought, crossed_up],
+            ["Stochastic in oversold zone (< 20)", "Stochastic in overbought zone (> 80)",
+             "Stochastic %K crossed above %D"],
+            "Stochastic %K crossed below %D"
+        )
+        
+        return self._batch_signals(table, valid, fallback, is_long, confidence,
+                                   np.where(is_long, price * 1.035, price * 0.965),
+                                   np.where(is_long, price * 0.98, price * 1.02),
+                                   rationale)
 
 
 class TrendStrengthBot(BotStrategy):
@@ -551,6 +813,31 @@ class TrendStrengthBot(BotStrategy):
 ,
             **predictions
         }
+    
+    def analyze_batch(self, table: FeatureTable) -> Dict[str, np.ndarray]:
+        valid, fallback = self._batch_inputs(table, 'price_change_24h', 'price_change_7d', 'current_price')
+        change_24h = table.column('price_change_24h')
+        change_7d = table.column('price_change_7d')
+        price = table.column('current_price')
+        
+        uptrend = (change_24h > 1) & (change_7d > 3)
+        downtrend = ~uptrend & (change_24h < -1) & (change_7d < -3)
+        is_long = np.where(uptrend, True, np.where(downtrend, False, change_24h > 0))
+        confidence = np.where(uptrend | downtrend, 9, 5)
+        
+        rationale = np.full(len(table), '', dtype=object)
+        for i in np.flatnonzero(valid & ~fallback):
+            if uptrend[i]:
+                rationale[i] = f"Strong uptrend: +{change_24h[i]:.1f}% (24h), +{change_7d[i]:.1f}% (7d)"
+            elif downtrend[i]:
+                rationale[i] = f"Strong downtrend: {change_24h[i]:.1f}% (24h), {change_7d[i]:.1f}% (7d)"
+            else:
+                rationale[i] = "Mixed timeframe signals"
+        
+        return self._batch_signals(table, valid, fallback, is_long, confidence,
+                                   np.where(is_long, price * 1.04, price * 0.96),
+                                   np.where(is_long, price * 0.975, price * 1.025),
+                                   rationale)
 
 
 class SupportResistanceBot(BotStrategy):
@@ -1176,6 +1463,23 @@ class EMA_CrossBot(BotStrategy):
             'rationale': f"EMA12/26 crossover indicating {direction} momentum",
             **predictions
         }
+    
+    def analyze_batch(self, table: FeatureTable) -> Dict[str, np.ndarray]:
+        valid, fallback = self._batch_inputs(table, 'ema_12', 'ema_26', 'current_price')
+        ema_12 = table.column('ema_12')
+        ema_26 = table.column('ema_26')
+        price = table.column('current_price')
+        
+        is_long = ema_12 > ema_26
+        gap = np.where(is_long, ema_12 - ema_26, ema_26 - ema_12)
+        confidence = np.where(ema_26 > 0, np.minimum(10, np.trunc(6 + (gap / ema_26) * 150)), 6)
+        rationale = np.where(is_long, "EMA12/26 crossover indicating long momentum",
+                             "EMA12/26 crossover indicating short momentum")
+        
+        return self._batch_signals(table, valid, fallback, is_long, confidence,
+                                   np.where(is_long, price * 1.04, price * 0.96),
+                                   np.where(is_long, price * 0.98, price * 1.02),
+                                   rationale, 0.025)
 
 
 class ADX_TrendBot(BotStrategy):
@@ -1217,6 +1521,22 @@ class ADX_TrendBot(BotStrategy):
             'rationale': rationale,
             **predictions
         }
+    
+    def analyze_batch(self, table: FeatureTable) -> Dict[str, np.ndarray]:
+        valid, fallback = self._batch_inputs(table, 'adx', 'current_price')
+        adx = table.column('adx')
+        price = table.column('current_price')
+        
+        is_long = np.ones(len(table), dtype=bool)  # Trend follower
+        confidence = np.select([adx > 40, adx > 25], [9, 7], 4)
+        rationale = np.select(
+            [adx > 40, adx > 25],
+            ["Very strong trend detected (ADX > 40)", "Strong trend detected (ADX > 25)"],
+            "Weak trend, low confidence"
+        )
+        
+        return self._batch_signals(table, valid, fallback, is_long, confidence,
+                                   price * 1.05, price * 0.97, rationale, 0.03)
 
 
 class WilliamsRBot(BotStrategy):
@@ -1259,6 +1579,26 @@ class WilliamsRBot(BotStrategy):
             'rationale': rationale,
             **predictions
         }
+    
+    def analyze_batch(self, table: FeatureTable) -> Dict[str, np.ndarray]:
+        valid, fallback = self._batch_inputs(table, 'stoch_k', 'current_price')
+        williams_r = -100 + table.column('stoch_k')
+        price = table.column('current_price')
+        
+        oversold = williams_r < -80
+        overbought = ~oversold & (williams_r > -20)
+        is_long = ~overbought
+        confidence = np.where(oversold | overbought, 8, 5)
+        rationale = np.select(
+            [oversold, overbought],
+            ["Williams %R oversold, expecting bounce", "Williams %R overbought, expecting pullback"],
+            "Williams %R neutral zone"
+        )
+        
+        return self._batch_signals(table, valid, fallback, is_long, confidence,
+                                   np.where(is_long, price * 1.03, price * 0.97),
+                                   np.where(is_long, price * 0.985, price * 1.015),
+                                   rationale)
 
 
 class CCI_Bot(BotStrategy):
@@ -1301,6 +1641,26 @@ class CCI_Bot(BotStrategy):
             'rationale': rationale,
             **predictions
         }
+    
+    def analyze_batch(self, table: FeatureTable) -> Dict[str, np.ndarray]:
+        valid, fallback = self._batch_inputs(table, 'rsi_14', 'current_price')
+        cci_proxy = (table.column('rsi_14') - 50) * 4
+        price = table.column('current_price')
+        
+        oversold = cci_proxy < -100
+        overbought = ~oversold & (cci_proxy > 100)
+        is_long = ~overbought
+        confidence = np.where(oversold | overbought, 8, 5)
+        rationale = np.select(
+            [oversold, overbought],
+            ["CCI oversold (<-100), mean reversion expected", "CCI overbought (>100), mean reversion expected"],
+            "CCI in normal range"
+        )
+        
+        return self._batch_signals(table, valid, fallback, is_long, confidence,
+                                   np.where(is_long, price * 1.035, price * 0.965),
+                                   np.where(is_long, price * 0.98, price * 1.02),
+                                   rationale, 0.025)
 
 
 class ParabolicSARBot(BotStrategy):
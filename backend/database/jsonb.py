@@ -0,0 +1,28 @@
+"""
+Values for jsonb columns.
+
+Coin results carry numpy scalars, NaN from indicators and datetimes, none of
+which the Supabase client can serialize. to_jsonable() converts them before
+results are stored (scan shards, scan checkpoints).
+"""
+
+import math
+from datetime import datetime
+from typing import Any
+
+import numpy as np
+
+
+def to_jsonable(value: Any) -> Any:
+    """Make coin results storable in a jsonb column (numpy scalars, NaN, datetimes)."""
+    if isinstance(value, dict):
+        return {str(k): to_jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(v) for v in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
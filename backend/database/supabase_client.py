@@ -14,6 +14,9 @@ from postgrest.base_request_builder import APIResponse
 
 logger = logging.getLogger(__name__)
 
+# Rows per request of SupabaseCursor.to_list; keep at or below PostgREST's max-rows (default 1000)
+PAGE_SIZE = int(os.getenv('SUPABASE_PAGE_SIZE', '1000'))
+
 
 class SupabaseClient:
     """Async wrapper for Supabase client with MongoDB-like interface."""
@@ -87,10 +90,13 @@ class SupabaseCollection:
             logger.error(f"Error in find_one for {self.table_name}: {e}")
             return None
 
-    async def find(self, query: Dict[str, Any] = None) -> 'SupabaseCursor':
+    def find(self, query: Dict[str, Any] = None) -> 'SupabaseCursor':
         """
         Find multiple documents matching the query.
 
+        Not a coroutine (like Motor's find): callers chain
+        ``find(query).sort(...).to_list(n)`` and await only ``to_list``.
+
         Args:
             query: Dictionary of field-value pairs to match
 
@@ -172,6 +178,38 @@ class SupabaseCollection:
             logger.error(f"Error in update_one for {self.table_name}: {e}")
             raise
 
+    async def update_many(self, query: Dict[str, Any], update: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Update all documents matching the query with one request.
+
+        Args:
+            query: Dictionary of field-value pairs to match; {'$in': [...]} matches any listed value
+            update: Dictionary with $set operator or direct fields
+
+        Returns:
+            Result dictionary
+        """
+        try:
+            update_data = update['$set'] if '$set' in update else update
+            request = self._table.update(self._serialize_dates(update_data))
+
+            for key, value in query.items():
+                if isinstance(value, dict) and '$in' in value:
+                    request = request.in_(key, list(value['$in']))
+                else:
+                    request = request.eq(key, value)
+
+            response = request.execute()
+
+            return {
+                'matched_count': len(response.data) if response.data else 0,
+                'modified_count': len(response.data) if response.data else 0
+            }
+
+        except Exception as e:
+            logger.error(f"Error in update_many for {self.table_name}: {e}")
+            raise
+
     async def delete_one(self, query: Dict[str, Any]) -> Dict[str, Any]:
         """Delete a single document."""
         try:
@@ -190,6 +228,35 @@ class SupabaseCollection:
             logger.error(f"Error in delete_one for {self.table_name}: {e}")
             raise
 
+    async def delete_many(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Delete all documents matching the query with one request.
+
+        Args:
+            query: Dictionary of field-value pairs to match; {'$in': [...]} matches any listed value
+
+        Returns:
+            Result dictionary
+        """
+        try:
+            request = self._table.delete()
+
+            for key, value in query.items():
+                if isinstance(value, dict) and '$in' in value:
+                    request = request.in_(key, list(value['$in']))
+                else:
+                    request = request.eq(key, value)
+
+            response = request.execute()
+
+            return {
+                'deleted_count': len(response.data) if response.data else 0
+            }
+
+        except Exception as e:
+            logger.error(f"Error in delete_many for {self.table_name}: {e}")
+            raise
+
     async def count_documents(self, query: Dict[str, Any] = None) -> int:
         """Count documents matching the query."""
         try:
@@ -249,33 +316,57 @@ class SupabaseCursor:
         self._limit_count = count
         return self
 
-    async def to_list(self, length: int = None):
-        """Execute query and return list of results."""
-        try:
-            request = self._table.select("*")
+    def _build_request(self):
+        request = self._table.select("*")
 
-            # Apply filters
-            for key, value in self._query.items():
-                request = request.eq(key, value)
+        # Apply filters
+        for key, value in self._query.items():
+            request = request.eq(key, value)
 
-            # Apply sorting
-            for field, direction in self._sort_fields:
-                ascending = direction == 1
-                request = request.order(field, desc=not ascending)
+        # Apply sorting
+        for field, direction in self._sort_fields:
+            ascending = direction == 1
+            request = request.order(field, desc=not ascending)
 
-            # Apply limit
-            limit = length if length is not None else self._limit_count
-            if limit is not None:
-                request = request.limit(limit)
+        return request
 
-            response = request.execute()
-            return response.data if response.data else []
+    async def to_list(self, length: int = None):
+        """Execute query and return list of results.
+
+        PostgREST truncates a response at its max-rows setting, so rows are
+        fetched in pages of SUPABASE_PAGE_SIZE (.range() offsets) until a page
+        comes back short or the limit is reached. Pages follow the cursor's sort:
+        sort on a unique column when the result may span several pages.
+        """
+        try:
+            limit = length if length is not None else self._limit_count
+            rows = []
+            while limit is None or len(rows) < limit:
+                page_size = PAGE_SIZE if limit is None else min(PAGE_SIZE, limit - len(rows))
+                # Builders are mutable, so each page gets a fresh request
+                response = self._build_request().range(len(rows), len(rows) + page_size - 1).execute()
+                page = response.data or []
+                rows.extend(page)
+                if len(page) < page_size:
+                    break
+                logger.debug(f"📄 Page of {page_size} rows came back full, fetching from offset {len(rows)}")
+            return rows
 
         except Exception as e:
             logger.error(f"Error executing cursor query: {e}")
             return []
 
 
+class DBInterface:
+    """Attribute access to collections: ``db.scan_runs`` is ``client.collection('scan_runs')``."""
+
+    def __init__(self, client):
+        self._client = client
+
+    def __getattr__(self, name):
+        return self._client.collection(name)
+
+
 def get_supabase_client() -> SupabaseClient:
     """
     Get initialized Supabase client from environment variables.
@@ -50,6 +50,7 @@ class ScanRun(BaseModel):
     total_available_coins: int = 0  # Total coins available from source
     total_bots: int = 49
     error_message: Optional[str] = None
+    scan_config: Optional[Dict] = None  # Selected coins and scan settings, used to resume the run
 
 class BotResult(BaseModel):
     id: str = Field(default_factory=uuid_str)
@@ -199,6 +200,8 @@ class BotPrediction(BaseModel):
     outcome_price: Optional[float] = None  # Price when outcome was checked
     outcome_status: Optional[str] = None  # 'pending', 'win', 'loss', 'neutral'
     profit_loss_percent: Optional[float] = None  # Actual % gain/loss
+    time_to_outcome_hours: Optional[float] = None  # Prediction time -> first target/stop touch
+    max_adverse_excursion_percent: Optional[float] = None  # Worst move against the position (<= 0)
     
     class Config:
         json_schema_extra = {
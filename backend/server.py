@@ -21,10 +21,12 @@ from models.models import (
 from services.scan_orchestrator import ScanOrchestrator
 from services.auth_service import hash_password, verify_password, create_access_token, decode_access_token
 from services.outcome_tracker import OutcomeTracker
-from services.cryptocompare_client import CryptoCompareClient
+from services.http_transport import get_transport
 from services.scan_monitor import scan_monitor
 from services.portfolio_service import PortfolioService
 from services.alert_service import AlertService
+from services.backtester import BacktestService
+from services.weight_optimizer import WeightOptimizer
 
 # Utility function to sanitize JSON output (prevent NaN/Infinity errors)
 def sanitize_for_json(obj):
@@ -45,17 +47,10 @@ ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # Supabase connection
-from database.supabase_client import get_supabase_client
+from database.supabase_client import DBInterface, get_supabase_client
 supabase_client = get_supabase_client()
 
 # Database interface (MongoDB-like API)
-class DBInterface:
-    def __init__(self, client):
-        self._client = client
-
-    def __getattr__(self, name):
-        return self._client.collection(name)
-
 db = DBInterface(supabase_client)
 
 # Configure logging
@@ -80,10 +75,12 @@ app.add_middleware(
 
 # Global state
 scan_orchestrator = ScanOrchestrator(db)
-crypto_client = CryptoCompareClient()
+crypto_client = scan_orchestrator.crypto_client.cryptocompare  # Share the orchestrator's client (one session per provider)
 outcome_tracker = OutcomeTracker(db, crypto_client)
-portfolio_service = PortfolioService(db, crypto_client)
-alert_service = AlertService(db, crypto_client)
+portfolio_service = PortfolioService(db, crypto_client, market_snapshot=scan_orchestrator.market_snapshot)
+alert_service = AlertService(db, crypto_client, market_snapshot=scan_orchestrator.market_snapshot)
+backtest_service = BacktestService(db, scan_orchestrator.crypto_client)
+weight_optimizer = WeightOptimizer(db, backtest_service, scan_orchestrator.aggregation_engine.weight_sets)
 scheduler = AsyncIOScheduler()
 current_scan_task: Optional[asyncio.Task] = None
 bot_statuses = {}
@@ -335,53 +332,25 @@ async def get_user_run_recommendations(run_id: str, current_user: dict = Depends
 
 # ==================== Scan Endpoints ====================
 
-@api_router.post("/scan/run")
-async def run_scan(request: ScanRunRequest, background_tasks: BackgroundTasks, current_user: Optional[dict] = Depends(get_current_user)):
-    """Trigger a crypto scan (user-specific if authenticated) with timeout protection."""
-    global current_scan_task
-    
-    # Check if previous scan is stuck
-    if scan_monitor.is_scan_stuck(request.scan_type):
-        logger.warning("⚠️ Previous scan stuck, auto-cancelling...")
-        await scan_monitor.cancel_scan()
-        current_scan_task = None
-    
-    if current_scan_task and not current_scan_task.done():
-        raise HTTPException(status_code=409, detail="A scan is already running")
-    
-    user_id = current_user['id'] if current_user else None
+def _start_monitored_scan(scan_id: str, scan_type: str, scan_coro) -> asyncio.Task:
+    """Run a scan coroutine in the background with ScanMonitor timeout protection."""
     
-    # Generate scan ID for monitoring
-    import uuid
-    scan_id = str(uuid.uuid4())
-    
-    # Create a background task for the scan with timeout protection
     async def scan_task_with_timeout():
         global current_scan_task
         try:
             # Start monitoring
-            scan_monitor.start_monitoring(scan_id, request.scan_type)
+            scan_monitor.start_monitoring(scan_id, scan_type)
             
             # Get timeout for this scan type
             timeout_minutes = scan_monitor.max_scan_time_minutes.get(
-                request.scan_type, 
+                scan_type, 
                 scan_monitor.default_timeout_minutes
             )
             timeout_seconds = timeout_minutes * 60
             
             # Run scan with timeout
             logger.info(f"🚀 Starting scan {scan_id} with {timeout_seconds}s timeout")
-            await asyncio.wait_for(
-                scan_orchestrator.run_scan(
-                    filter_scope=request.scope,
-                    min_price=request.min_price,
-                    max_price=request.max_price,
-                    custom_symbols=request.custom_symbols,
-                    user_id=user_id,
-                    scan_type=request.scan_type
-                ),
-                timeout=timeout_seconds
-            )
+            await asyncio.wait_for(scan_coro, timeout=timeout_seconds)
             logger.info(f"✅ Scan {scan_id} completed successfully")
             
         except asyncio.TimeoutError:
@@ -392,7 +361,7 @@ async def run_scan(request: ScanRunRequest, background_tasks: BackgroundTasks, c
                     {'id': scan_id},
                     {'$set': {
                         'status': 'timeout',
-                        'error_message': f'Scan timed out after {timeout_minutes} minutes',
+                        'error_message': f'Scan timed out after {timeout_minutes} minutes (resumable via /api/scan/resume/{scan_id})',
                         'completed_at': datetime.now(timezone.utc).isoformat()
                     }}
                 )
@@ -405,8 +374,45 @@ async def run_scan(request: ScanRunRequest, background_tasks: BackgroundTasks, c
             scan_monitor.stop_monitoring()
             current_scan_task = None
     
-    current_scan_task = asyncio.create_task(scan_task_with_timeout())
-    scan_monitor.scan_task = current_scan_task
+    task = asyncio.create_task(scan_task_with_timeout())
+    scan_monitor.scan_task = task
+    return task
+
+
+@api_router.post("/scan/run")
+async def run_scan(request: ScanRunRequest, background_tasks: BackgroundTasks, current_user: Optional[dict] = Depends(get_current_user)):
+    """Trigger a crypto scan (user-specific if authenticated) with timeout protection."""
+    global current_scan_task
+    
+    # Check if previous scan is stuck
+    if scan_monitor.is_scan_stuck(request.scan_type):
+        logger.warning("⚠️ Previous scan stuck, auto-cancelling...")
+        await scan_monitor.cancel_scan()
+        current_scan_task = None
+    
+    if current_scan_task and not current_scan_task.done():
+        raise HTTPException(status_code=409, detail="A scan is already running")
+    
+    user_id = current_user['id'] if current_user else None
+    
+    # Generate scan ID for monitoring (also used as the scan run ID, so it can be resumed)
+    import uuid
+    scan_id = str(uuid.uuid4())
+    
+    # Create a background task for the scan with timeout protection
+    current_scan_task = _start_monitored_scan(
+        scan_id,
+        request.scan_type,
+        scan_orchestrator.run_scan(
+            filter_scope=request.scope,
+            min_price=request.min_price,
+            max_price=request.max_price,
+            custom_symbols=request.custom_symbols,
+            run_id=scan_id,
+            user_id=user_id,
+            scan_type=request.scan_type
+        )
+    )
     
     return {
         "status": "started", 
@@ -415,6 +421,37 @@ async def run_scan(request: ScanRunRequest, background_tasks: BackgroundTasks, c
     }
 
 
+@api_router.post("/scan/resume/{run_id}")
+async def resume_scan(run_id: str, current_user: Optional[dict] = Depends(get_current_user)):
+    """Resume a timed-out, failed or interrupted scan: only coins without a checkpoint are re-analyzed."""
+    global current_scan_task
+    
+    if current_scan_task and not current_scan_task.done():
+        raise HTTPException(status_code=409, detail="A scan is already running")
+    
+    scan_run = await db.scan_runs.find_one({'id': run_id})
+    if not scan_run:
+        raise HTTPException(status_code=404, detail="Scan run not found")
+    if scan_run.get('user_id') and (not current_user or current_user['id'] != scan_run['user_id']):
+        raise HTTPException(status_code=403, detail="Not allowed to resume this scan")
+    if scan_run.get('status') == 'completed':
+        raise HTTPException(status_code=400, detail="Scan run already completed")
+    if not (scan_run.get('scan_config') or {}).get('tokens'):
+        raise HTTPException(status_code=400, detail="Scan run has no checkpoint data to resume from")
+    
+    current_scan_task = _start_monitored_scan(
+        run_id,
+        scan_run.get('scan_type', 'full_scan'),
+        scan_orchestrator.resume_scan(run_id)
+    )
+    
+    return {
+        "status": "resumed",
+        "message": "Scan resumed from checkpoints",
+        "scan_id": run_id
+    }
+
+
 @api_router.get("/scan/runs")
 async def get_scan_runs(limit: int = 10):
     """Get recent scan runs."""
@@ -853,6 +890,132 @@ async def get_data_readiness():
     }
 
 
+# ==================== Backtest Endpoints ====================
+
+@api_router.post("/backtest/run")
+async def start_backtest(
+    max_coins: Optional[int] = None,
+    days: Optional[int] = None,
+    horizon_days: Optional[int] = None,
+    symbols: Optional[str] = None
+):
+    """Start a historical backtest of the bots in the background.
+
+    Query params:
+    - max_coins: Number of top coins to replay (default BACKTEST_MAX_COINS)
+    - days: Days of daily candles per coin (default BACKTEST_DAYS)
+    - horizon_days: Days before a simulated position is force-closed (default BACKTEST_HORIZON_DAYS)
+    - symbols: Comma-separated coins to replay instead of the top coins
+    """
+    symbol_list = [symbol.strip() for symbol in symbols.split(',') if symbol.strip()] if symbols else None
+    try:
+        run_id = backtest_service.start(symbol_list, max_coins, days, horizon_days)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    return {"message": "Backtest started", "run_id": run_id}
+
+
+@api_router.get("/backtest/status")
+async def get_backtest_status():
+    """Progress of the current (or last) backtest run."""
+    return backtest_service.get_status()
+
+
+@api_router.get("/backtest/runs")
+async def get_backtest_runs(limit: int = 20):
+    """Latest backtest runs, without their stats."""
+    runs = await backtest_service.list_runs(limit)
+    return {"runs": runs, "total": len(runs)}
+
+
+@api_router.get("/backtest/runs/{run_id}")
+async def get_backtest_run(run_id: str):
+    """A backtest run with its per-bot and per-regime stats."""
+    run = await backtest_service.get_run(run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="Backtest run not found")
+    return run
+
+
+# ==================== Weight Set Endpoints ====================
+
+@api_router.post("/weights/optimize")
+async def start_weight_optimization(
+    max_coins: Optional[int] = None,
+    days: Optional[int] = None,
+    horizon_days: Optional[int] = None,
+    train_days: Optional[int] = None,
+    test_days: Optional[int] = None,
+    symbols: Optional[str] = None,
+    activate: bool = False
+):
+    """Fit bot weights and regime multipliers walk-forward on historical replays.
+
+    The result is published as a new weight set version.
+
+    Query params:
+    - max_coins, days, horizon_days, symbols: Replay settings (as for /backtest/run)
+    - train_days: History each fit sees (default WEIGHT_OPTIMIZER_TRAIN_DAYS)
+    - test_days: Out-of-sample period after each fit (default WEIGHT_OPTIMIZER_TEST_DAYS)
+    - activate: Activate the new set if it beats the current weights out of sample
+    """
+    symbol_list = [symbol.strip() for symbol in symbols.split(',') if symbol.strip()] if symbols else None
+    try:
+        run_id = weight_optimizer.start(
+            symbols=symbol_list, max_coins=max_coins, days=days, horizon_days=horizon_days,
+            train_days=train_days, test_days=test_days, activate=activate
+        )
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    return {"message": "Weight optimization started", "run_id": run_id}
+
+
+@api_router.get("/weights/optimize/status")
+async def get_weight_optimization_status():
+    """Progress (and last result) of the weight optimizer."""
+    return weight_optimizer.get_status()
+
+
+@api_router.get("/weights/sets")
+async def get_weight_sets(limit: int = 20):
+    """Latest weight set versions with their metrics, without the weights."""
+    sets = await scan_orchestrator.aggregation_engine.weight_sets.list_sets(limit)
+    return {"weight_sets": sets, "total": len(sets)}
+
+
+@api_router.get("/weights/sets/active")
+async def get_active_weight_set():
+    """The active weight set (null while the built-in weights apply)."""
+    return {"weight_set": await scan_orchestrator.aggregation_engine.weight_sets.get_active(refresh=True)}
+
+
+@api_router.post("/weights/sets/deactivate")
+async def deactivate_weight_set():
+    """Retire the active weight set and fall back to the built-in weights."""
+    await scan_orchestrator.aggregation_engine.weight_sets.deactivate()
+    return {"message": "Using built-in weights"}
+
+
+@api_router.get("/weights/sets/{version}")
+async def get_weight_set(version: int):
+    """A weight set version with its weights."""
+    weight_set = await scan_orchestrator.aggregation_engine.weight_sets.get(version)
+    if not weight_set:
+        raise HTTPException(status_code=404, detail="Weight set not found")
+    return weight_set
+
+
+@api_router.post("/weights/sets/{version}/activate")
+async def activate_weight_set(version: int):
+    """Make a weight set version active; scans pick it up without a restart."""
+    weight_set = await scan_orchestrator.aggregation_engine.weight_sets.activate(version)
+    if not weight_set:
+        raise HTTPException(status_code=404, detail="Weight set not found")
+    return {"message": f"Weight set v{version} activated", "version": version}
+
+
 @api_router.get("/api-providers/status")
 async def get_provider_status():
     """Get status and statistics for crypto data API providers.
@@ -862,6 +1025,7 @@ async def get_provider_status():
     - Primary and backup providers
     - Usage statistics for each provider
     - Error and rate limit counts
+    - Circuit breaker state and health score per provider and operation
     """
     stats = scan_orchestrator.crypto_client.get_stats()
     
@@ -897,7 +1061,10 @@ async def get_provider_status():
         },
         "total_calls": sum(p['calls'] for p in stats['stats'].values()),
         "total_errors": sum(p['errors'] for p in stats['stats'].values()),
-        "total_rate_limits": sum(p['rate_limits'] for p in stats['stats'].values())
+        "total_rate_limits": sum(p['rate_limits'] for p in stats['stats'].values()),
+        "routing": stats['routing'],
+        "market_snapshot": scan_orchestrator.market_snapshot.get_stats(),
+        "http_transport": get_transport().get_stats()
     }
 
 
@@ -909,6 +1076,9 @@ async def get_futures_provider_status():
     - Usage statistics for each futures provider (OKX, Coinalyze, Bybit, Binance)
     - Success/failure rates
     - Which provider is used for which symbols
+    - Negative cache of symbols without derivatives markets per provider
+    - Exchange-wide derivatives snapshot (symbols per exchange, age, hits)
+    - Per-metric cache hit rates (open interest, funding, long/short)
     """
     stats = scan_orchestrator.futures_client.get_stats()
     
@@ -950,7 +1120,33 @@ async def get_futures_provider_status():
         "symbol_providers": stats['symbol_providers'],
         "total_calls": stats['total_calls'],
         "total_success": stats['total_success'],
-        "overall_success_rate": (stats['total_success'] / stats['total_calls'] * 100) if stats['total_calls'] > 0 else 0
+        "overall_success_rate": (stats['total_success'] / stats['total_calls'] * 100) if stats['total_calls'] > 0 else 0,
+        "skipped_calls": stats['skipped_calls'],
+        "negative_cache": stats['negative_cache'],
+        "snapshot": stats['snapshot'],
+        "metrics_cache": stats['metrics_cache']
+    }
+
+@api_router.get("/market-stream/status")
+async def get_market_stream_status():
+    """Get status of the exchange WebSocket market data streams.
+    
+    Shows:
+    - Connection state, connects/reconnects and subscribed symbols per endpoint
+    - Per-stream message counts and lag (receive time - exchange event time)
+    """
+    return scan_orchestrator.market_stream.get_stats()
+
+@api_router.get("/market-stream/symbols/{symbol}")
+async def get_market_stream_symbol(symbol: str):
+    """Get the latest streamed state of a symbol per exchange."""
+    state = scan_orchestrator.market_stream.get_state(symbol)
+    if not state:
+        raise HTTPException(status_code=404, detail=f"No streamed data for {symbol.upper()}")
+    return {
+        "symbol": symbol.upper(),
+        "exchanges": state,
+        "klines": len(scan_orchestrator.market_stream.get_klines(symbol))
     }
 
 @api_router.post("/bots/evaluate")
@@ -1270,6 +1466,23 @@ async def evaluate_bot_predictions_job():
         logger.error(f"Bot evaluation error: {e}")
 
 
+async def sync_market_stream_job():
+    """Job function to point the market stream at the current top coins listed on each exchange."""
+    try:
+        await scan_orchestrator.market_snapshot.ensure_fresh()
+        futures_client = scan_orchestrator.futures_client
+        if futures_client.snapshot_is_stale:
+            await futures_client.refresh_snapshot()
+        
+        await scan_orchestrator.market_stream.sync_symbols(
+            list(scan_orchestrator.market_snapshot.index),
+            futures_client.snapshot
+        )
+    
+    except Exception as e:
+        logger.error(f"Market stream symbol sync error: {e}")
+
+
 async def track_outcomes_job():
     """Job function to track outcomes for pending recommendations."""
     logger.info("Starting scheduled outcome tracking")
@@ -1385,6 +1598,64 @@ async def startup_event():
     )
     logger.info("Bot prediction evaluation scheduled to run daily at 2 AM UTC")
     
+    # Load / warm the persistent symbol -> provider ID maps without blocking startup,
+    # then re-warm them and persist per-symbol lookups periodically
+    asyncio.create_task(scan_orchestrator.crypto_client.warm_id_maps())
+    scheduler.add_job(
+        scan_orchestrator.crypto_client.warm_id_maps,
+        'interval',
+        hours=6,
+        id='provider_id_map_warmup',
+        replace_existing=True
+    )
+    scheduler.add_job(
+        scan_orchestrator.crypto_client.id_map.flush,
+        'interval',
+        minutes=10,
+        id='provider_id_map_flush',
+        replace_existing=True
+    )
+    
+    # Derivatives negative cache: load persisted misses, flush new ones periodically
+    asyncio.create_task(scan_orchestrator.futures_client.negative_cache.load())
+    scheduler.add_job(
+        scan_orchestrator.futures_client.negative_cache.flush,
+        'interval',
+        minutes=10,
+        id='negative_cache_flush',
+        replace_existing=True
+    )
+    
+    # Alerts are evaluated on each market snapshot refresh; last_checked is written in batches
+    scheduler.add_job(
+        alert_service.flush_last_checked,
+        'interval',
+        seconds=alert_service.flush_seconds,
+        id='alert_last_checked_flush',
+        replace_existing=True
+    )
+    
+    # Keep the shared market snapshot (price / volume / market cap index) fresh
+    scheduler.add_job(
+        scan_orchestrator.market_snapshot.refresh,
+        'interval',
+        seconds=scan_orchestrator.market_snapshot.refresh_seconds,
+        id='market_snapshot_refresh',
+        replace_existing=True
+    )
+    
+    # Exchange WebSocket streams (MARKET_STREAM_ENABLED): subscribe now, follow the top coins
+    if scan_orchestrator.market_stream.enabled:
+        await scan_orchestrator.market_stream.start()
+        asyncio.create_task(sync_market_stream_job())
+        scheduler.add_job(
+            sync_market_stream_job,
+            'interval',
+            minutes=10,
+            id='market_stream_sync',
+            replace_existing=True
+        )
+    
     logger.info("Application startup complete")
 
 
@@ -1397,8 +1668,21 @@ async def shutdown_event():
     if scheduler.running:
         scheduler.shutdown()
 
-    # Close crypto client
+    # Persist ID map entries, negative cache misses and alert last_checked times since the last flush
+    await scan_orchestrator.crypto_client.id_map.flush()
+    await scan_orchestrator.futures_client.negative_cache.flush()
+    await alert_service.flush_last_checked()
+
+    # Close exchange streams, provider clients, then the shared connection pool
+    await scan_orchestrator.market_stream.stop()
     await scan_orchestrator.crypto_client.close()
+    await scan_orchestrator.futures_client.close()
+    await get_transport().close()
+
+    # Stop analysis and backtest worker processes
+    scan_orchestrator.analysis_pool.shutdown()
+    weight_optimizer.shutdown()
+    backtest_service.shutdown()
 
     logger.info("Application shutdown complete")
 
@@ -1531,6 +1815,12 @@ async def delete_alert(
     return result
 
 
+@api_router.get("/alerts/engine/status")
+async def get_alert_engine_status():
+    """Alert engine status: indexed alerts, check timings and batched last_checked writes."""
+    return alert_service.get_stats()
+
+
 @api_router.post("/alerts/check")
 async def check_alerts_now(background_tasks: BackgroundTasks):
     """Manually trigger alert checking (admin only)."""
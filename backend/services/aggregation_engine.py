@@ -1,9 +1,39 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
 import statistics
 import logging
 
+from services.weight_sets import WeightSetStore
+
 logger = logging.getLogger(__name__)
 
+# Bots below this confidence are left out of the consensus (Phase 2 confidence gate)
+CONFIDENCE_THRESHOLD = 6
+
+# Built-in regime boosts of _apply_regime_weighting: regime -> (boost, bots)
+DEFAULT_REGIME_BOOSTS = {
+    'BULL': (1.3, {
+        'TrendFollowerBot', 'MomentumBot', 'BreakoutBot', 'GoldenCrossBot',
+        'MovingAverageCrossoverBot', 'ParabolicSARBot', 'Elliott Wave Bot',
+        'Order Flow Bot', 'Whale Tracker Bot', 'Social Sentiment Bot'
+    }),
+    'BEAR': (1.3, {
+        'MeanReversionBot', 'RSIBot', 'OverboughtOversoldBot', 'BollingerBandBot',
+        'StochasticBot', 'CCI_Bot', 'WilliamsRBot', 'VolumeBot',
+        'Options Flow Bot'
+    }),
+    'SIDEWAYS': (1.2, {
+        'RangeTradingBot', 'SupportResistanceBot', 'MeanReversionBot',
+        'BollingerBandBot', 'RSIBot', 'StochasticBot', 'Order Flow Bot'
+    })
+}
+
+
+def default_regime_boost(bot_name: str, market_regime: str) -> float:
+    """Built-in boost of a bot in a regime (1.0 if the bot is not favoured there)."""
+    boost, bots = DEFAULT_REGIME_BOOSTS.get(market_regime, (1.0, set()))
+    return boost if bot_name in bots else 1.0
+
+
 class AggregationEngine:
     """Aggregate bot results with Phase 2 enhancements:
     - Regime-aware bot weighting
@@ -16,20 +46,30 @@ class AggregationEngine:
         """Initialize with optional database for performance weight lookup."""
         self.db = db
         self._bot_weights = {}  # Cache for bot weights
-        self.confidence_threshold = 6  # Phase 2: Only consider bots with confidence ≥6
+        self.confidence_threshold = CONFIDENCE_THRESHOLD  # Phase 2: Only consider bots with confidence ≥6
         self.strong_consensus_threshold = 0.8  # Phase 2: 80% agreement threshold
+        # Versioned weight set (weight optimizer), hot-loaded over the built-in weights
+        self.weight_sets = WeightSetStore(db)
+        self._weight_set_version: Optional[int] = None
+        self._regime_boosts: Dict[str, Dict[str, float]] = {}
     
     async def get_bot_weights(self) -> Dict[str, float]:
         """Fetch bot performance weights from database.
         
+        Weights of the active weight set override the bot_performance table; the
+        cache is rebuilt whenever another set becomes active.
+        
         Returns:
             Dict mapping bot_name to performance_weight
         """
         if self.db is None:
             return {}
         
+        weight_set = await self.weight_sets.get_active()
+        version = weight_set.get('version') if weight_set else None
+        
         # Check cache first
-        if self._bot_weights:
+        if self._bot_weights and version == self._weight_set_version:
             return self._bot_weights
         
         try:
@@ -41,8 +81,14 @@ class AggregationEngine:
                 weight = perf.get('performance_weight', 1.0)
                 weights[bot_name] = weight
             
+            if weight_set:
+                weights.update(weight_set.get('bot_weights') or {})
+            self._regime_boosts = (weight_set.get('aggregation_boosts') or {}) if weight_set else {}
+            self._weight_set_version = version
+            
             self._bot_weights = weights
-            logger.info(f"📊 Loaded performance weights for {len(weights)} bots")
+            logger.info(f"📊 Loaded performance weights for {len(weights)} bots"
+                        + (f" (weight set v{version})" if version else ""))
             return weights
             
         except Exception as e:
@@ -286,6 +332,9 @@ class AggregationEngine:
         - BEAR market: Mean reversion, volatility bots get boost
         - SIDEWAYS: Range trading, oscillator bots get boost
 
+        The active weight set's aggregation_boosts take precedence over these
+        built-in boosts (DEFAULT_REGIME_BOOSTS) for the bots it covers.
+
         Args:
             bot_name: Name of the bot
             market_regime: 'BULL', 'BEAR', or 'SIDEWAYS'
@@ -294,35 +343,13 @@ class AggregationEngine:
         Returns:
             Adjusted weight for current market regime
         """
-        bull_bots = {
-            'TrendFollowerBot', 'MomentumBot', 'BreakoutBot', 'GoldenCrossBot',
-            'MovingAverageCrossoverBot', 'ParabolicSARBot', 'Elliott Wave Bot',
-            'Order Flow Bot', 'Whale Tracker Bot', 'Social Sentiment Bot'
-        }
-
-        bear_bots = {
-            'MeanReversionBot', 'RSIBot', 'OverboughtOversoldBot', 'BollingerBandBot',
-            'StochasticBot', 'CCI_Bot', 'WilliamsRBot', 'VolumeBot',
-            'Options Flow Bot'
-        }
-
-        sideways_bots = {
-            'RangeTradingBot', 'SupportResistanceBot', 'MeanReversionBot',
-            'BollingerBandBot', 'RSIBot', 'StochasticBot', 'Order Flow Bot'
-        }
-
-        regime_boost = 1.0
-
-        if market_regime == 'BULL' and bot_name in bull_bots:
-            regime_boost = 1.3
-        elif market_regime == 'BEAR' and bot_name in bear_bots:
-            regime_boost = 1.3
-        elif market_regime == 'SIDEWAYS' and bot_name in sideways_bots:
-            regime_boost = 1.2
+        regime_boost = self._regime_boosts.get(market_regime, {}).get(bot_name)
+        if regime_boost is None:
+            regime_boost = default_regime_boost(bot_name, market_regime)
 
         adjusted_weight = base_weight * regime_boost
 
-        if regime_boost > 1.0:
+        if regime_boost != 1.0:
             logger.debug(f"Regime boost for {bot_name} in {market_regime}: {base_weight:.2f} → {adjusted_weight:.2f}")
 
         return adjusted_weight
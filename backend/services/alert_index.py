@@ -0,0 +1,169 @@
+"""
+Per-symbol threshold index for price alerts.
+
+check_alerts used to load up to 1000 active alerts and, for each one, fetch a
+price and write last_checked. price_above / price_below alerts are now kept in
+sorted threshold lists per symbol, built once from the active alerts:
+
+- price_above thresholds ascending: a price p crosses every threshold below p,
+  a prefix found with bisect_left
+- price_below thresholds ascending: p crosses every threshold above p, a suffix
+  found with bisect_right
+
+A price tick costs O(log n) per symbol plus the crossed alerts, which are
+removed from the index (a triggered alert is no longer active).
+"""
+
+import bisect
+from typing import Dict, List, Optional, Set, Tuple
+
+THRESHOLD_TYPES = ('price_above', 'price_below')
+
+
+def alert_threshold(alert: Dict) -> Optional[float]:
+    """Threshold price of a price_above / price_below alert, None for other alerts."""
+    if alert.get('alert_type') not in THRESHOLD_TYPES:
+        return None
+    try:
+        return float((alert.get('condition') or {}).get('price', 0))
+    except (TypeError, ValueError):
+        return None
+
+
+class SymbolThresholds:
+    """Sorted price_above / price_below thresholds of one symbol (parallel id lists)."""
+
+    __slots__ = ('above', 'above_ids', 'below', 'below_ids')
+
+    def __init__(self):
+        self.above: List[float] = []
+        self.above_ids: List[str] = []
+        self.below: List[float] = []
+        self.below_ids: List[str] = []
+
+    def _side(self, alert_type: str) -> Tuple[List[float], List[str]]:
+        if alert_type == 'price_above':
+            return self.above, self.above_ids
+        return self.below, self.below_ids
+
+    def add(self, alert_type: str, threshold: float, alert_id: str):
+        prices, ids = self._side(alert_type)
+        position = bisect.bisect_right(prices, threshold)
+        prices.insert(position, threshold)
+        ids.insert(position, alert_id)
+
+    def remove(self, alert_type: str, threshold: float, alert_id: str) -> bool:
+        prices, ids = self._side(alert_type)
+        position = bisect.bisect_left(prices, threshold)
+        while position < len(prices) and prices[position] == threshold:
+            if ids[position] == alert_id:
+                del prices[position]
+                del ids[position]
+                return True
+            position += 1
+        return False
+
+    def pop_crossed(self, price: float) -> List[str]:
+        """Remove and return the ids of alerts the price crossed."""
+        crossed = []
+        # price_above: thresholds < price
+        end = bisect.bisect_left(self.above, price)
+        if end:
+            crossed.extend(self.above_ids[:end])
+            del self.above[:end]
+            del self.above_ids[:end]
+        # price_below: thresholds > price
+        start = bisect.bisect_right(self.below, price)
+        if start < len(self.below):
+            crossed.extend(self.below_ids[start:])
+            del self.below[start:]
+            del self.below_ids[start:]
+        return crossed
+
+    def __len__(self) -> int:
+        return len(self.above) + len(self.below)
+
+
+class AlertThresholdIndex:
+    """Symbol -> SymbolThresholds for all active price_above / price_below alerts."""
+
+    def __init__(self):
+        self.by_symbol: Dict[str, SymbolThresholds] = {}
+        self.alerts: Dict[str, Dict] = {}  # alert id -> alert
+
+    def build(self, alerts: List[Dict]) -> int:
+        """Replace the index with the given alerts (non-threshold alerts are ignored).
+
+        Returns the number of indexed alerts
+        """
+        rows: Dict[str, Dict[str, List[Tuple[float, str]]]] = {}
+        self.alerts = {}
+        for alert in alerts:
+            threshold = alert_threshold(alert)
+            if threshold is None:
+                continue
+            self.alerts[alert['id']] = alert
+            sides = rows.setdefault(alert['symbol'].upper(), {'price_above': [], 'price_below': []})
+            sides[alert['alert_type']].append((threshold, alert['id']))
+
+        # Sort each side once instead of inserting one by one
+        self.by_symbol = {}
+        for symbol, sides in rows.items():
+            thresholds = SymbolThresholds()
+            for alert_type, side in sides.items():
+                side.sort()
+                prices, ids = thresholds._side(alert_type)
+                prices.extend(threshold for threshold, _ in side)
+                ids.extend(alert_id for _, alert_id in side)
+            self.by_symbol[symbol] = thresholds
+        return len(self.alerts)
+
+    def add(self, alert: Dict) -> bool:
+        """Index one alert; False if it is not a price threshold alert."""
+        threshold = alert_threshold(alert)
+        if threshold is None:
+            return False
+        self.remove(alert['id'])
+        self.alerts[alert['id']] = alert
+        symbol = alert['symbol'].upper()
+        self.by_symbol.setdefault(symbol, SymbolThresholds()).add(alert['alert_type'], threshold, alert['id'])
+        return True
+
+    def remove(self, alert_id: str) -> Optional[Dict]:
+        alert = self.alerts.pop(alert_id, None)
+        if alert is None:
+            return None
+        symbol = alert['symbol'].upper()
+        thresholds = self.by_symbol.get(symbol)
+        if thresholds is not None:
+            thresholds.remove(alert['alert_type'], alert_threshold(alert), alert_id)
+            if not thresholds:
+                del self.by_symbol[symbol]
+        return alert
+
+    def pop_crossed(self, prices: Dict[str, float]) -> List[Tuple[Dict, float]]:
+        """Remove and return (alert, price) for every alert crossed by the prices.
+
+        Args:
+            prices: Symbol -> current price (upper-case symbols)
+        """
+        crossed = []
+        for symbol, price in prices.items():
+            thresholds = self.by_symbol.get(symbol)
+            if thresholds is None:
+                continue
+            for alert_id in thresholds.pop_crossed(price):
+                crossed.append((self.alerts.pop(alert_id), price))
+            if not thresholds:
+                del self.by_symbol[symbol]
+        return crossed
+
+    def count(self, symbol: str) -> int:
+        thresholds = self.by_symbol.get(symbol)
+        return len(thresholds) if thresholds is not None else 0
+
+    def symbols(self) -> Set[str]:
+        return set(self.by_symbol)
+
+    def __len__(self) -> int:
+        return len(self.alerts)
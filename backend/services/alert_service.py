@@ -7,25 +7,72 @@ Features:
 - Risk warning alerts
 - Custom alert conditions
 - Multi-channel notifications (email, in-app)
+
+Evaluation is event-driven: active price_above / price_below alerts live in a
+per-symbol sorted threshold index (services.alert_index), built once and kept
+up to date by create/delete. Each new market snapshot (or a manual check)
+evaluates the index against the current prices; only crossed alerts are
+touched. percent_change alerts compare the current price with the rolling
+price history recorded by the market snapshot (services.price_history), one
+vectorized lookup per timeframe. ai_pattern alerts are grouped by symbol: one
+history fetch and one LLM prompt per symbol cover all of its watched patterns,
+and the answers are cached until the next candle (AI_PATTERN_CANDLE_SECONDS).
+last_checked is written in batches (one update per symbol chunk)
+every ALERT_LAST_CHECKED_FLUSH_SECONDS instead of once per alert and check.
 """
 
+import asyncio
 import logging
+import re
+import time
 from datetime import datetime, timezone
 from typing import List, Dict, Optional
 from emergentintegrations.llm.chat import LlmChat, UserMessage
 import os
 
+from services.alert_index import AlertThresholdIndex
+from services.price_history import parse_timeframe
+
+# Symbols per batched last_checked update (keeps the filter URL short)
+LAST_CHECKED_CHUNK = 200
+
 logger = logging.getLogger(__name__)
 
 
 class AlertService:
     """Service for managing alerts and notifications with AI assistance."""
 
-    def __init__(self, db, crypto_client, email_service=None):
+    def __init__(self, db, crypto_client, email_service=None, market_snapshot=None):
         self.db = db
         self.crypto_client = crypto_client
+        self.market_snapshot = market_snapshot
         self.email_service = email_service
         self.api_key = os.environ.get('EMERGENT_LLM_KEY')
+        self.load_limit = int(os.getenv('ALERT_LOAD_LIMIT', '100000'))
+        self.reload_seconds = float(os.getenv('ALERT_INDEX_RELOAD_SECONDS', '900'))
+        self.flush_seconds = float(os.getenv('ALERT_LAST_CHECKED_FLUSH_SECONDS', '300'))
+        # Active price_above / price_below alerts
+        self.index = AlertThresholdIndex()
+        # Other active alerts (percent_change, ai_pattern), evaluated one by one
+        self.other_alerts: Dict[str, Dict] = {}
+        self._loaded_monotonic: Optional[float] = None
+        self._load_lock: Optional[asyncio.Lock] = None
+        self._check_lock: Optional[asyncio.Lock] = None
+        # Symbols evaluated since the last last_checked flush, and when
+        self.pending_checked: set = set()
+        self.last_checked_at: Optional[datetime] = None
+        # AI pattern answers: (symbol, pattern) -> (detected, expires_at), valid until the next candle
+        self.pattern_cache: Dict[tuple, tuple] = {}
+        self.pattern_candle_seconds = float(os.getenv('AI_PATTERN_CANDLE_SECONDS', '86400'))
+        self.pattern_concurrency = int(os.getenv('AI_PATTERN_CONCURRENCY', '4'))
+        self._pattern_semaphore: Optional[asyncio.Semaphore] = None
+        self.stats = {
+            'checks': 0, 'skipped_checks': 0, 'evaluated': 0, 'triggered': 0,
+            'last_check_ms': 0.0, 'last_checked_writes': 0,
+            'ai_pattern_calls': 0, 'ai_pattern_history_fetches': 0, 'ai_pattern_cache_hits': 0
+        }
+        if market_snapshot is not None:
+            market_snapshot.add_listener(self.on_market_snapshot)
         logger.info("🔔 Alert Service initialized")
 
     async def create_alert(
@@ -49,7 +96,7 @@ class AlertService:
             alert = {
                 'id': f"alert_{datetime.now(timezone.utc).timestamp()}",
                 'user_id': user_id,
-                'symbol': symbol,
+                'symbol': symbol.upper(),
                 'alert_type': alert_type,
                 'condition': condition,
                 'notification_channels': notification_channels or ['in_app'],
@@ -61,6 +108,8 @@ class AlertService:
             }
 
             await self.db.alerts.insert_one(alert)
+            if self._loaded_monotonic is not None:
+                self._index_alert(alert)
 
             logger.info(f"Created alert for user {user_id}: {alert_type} on {symbol}")
             return {'success': True, 'alert_id': alert['id'], 'alert': alert}
@@ -92,6 +141,8 @@ class AlertService:
             })
 
             if result.get('deleted_count', 0) > 0:
+                self.index.remove(alert_id)
+                self.other_alerts.pop(alert_id, None)
                 logger.info(f"Deleted alert {alert_id} for user {user_id}")
                 return {'success': True, 'message': 'Alert deleted'}
             else:
@@ -101,54 +152,188 @@ class AlertService:
             logger.error(f"Error deleting alert: {e}")
             return {'success': False, 'error': str(e)}
 
+    def _index_alert(self, alert: Dict):
+        if not self.index.add(alert):
+            self.other_alerts[alert['id']] = alert
+
+    async def load_alerts(self) -> int:
+        """(Re)build the threshold index from all active alerts. Returns the number of active alerts."""
+        alerts = await self.db.alerts.find({'status': 'active'}).sort('id', 1).to_list(self.load_limit)
+        if len(alerts) >= self.load_limit:
+            logger.warning(f"⚠️ Loaded ALERT_LOAD_LIMIT={self.load_limit} active alerts, the rest are not indexed")
+        indexed = self.index.build(alerts)
+        self.other_alerts = {
+            alert['id']: alert for alert in alerts if alert['id'] not in self.index.alerts
+        }
+        self._loaded_monotonic = time.monotonic()
+        logger.info(f"🔔 Alert index built: {indexed} price alerts on {len(self.index.by_symbol)} symbols, "
+                    f"{len(self.other_alerts)} other alerts")
+        return len(alerts)
+
+    async def _ensure_loaded(self):
+        """Load the index on first use and every ALERT_INDEX_RELOAD_SECONDS (alerts changed elsewhere)."""
+        if self._loaded_monotonic is not None and time.monotonic() - self._loaded_monotonic < self.reload_seconds:
+            return
+        if self._load_lock is None:
+            self._load_lock = asyncio.Lock()
+        async with self._load_lock:
+            if self._loaded_monotonic is None or time.monotonic() - self._loaded_monotonic >= self.reload_seconds:
+                await self.load_alerts()
+
+    async def on_market_snapshot(self):
+        """Market snapshot listener: evaluate alerts against the new prices."""
+        if self._check_lock is not None and self._check_lock.locked():
+            self.stats['skipped_checks'] += 1
+            return
+        await self.check_alerts()
+
+    async def _get_prices(self, symbols: set) -> Dict[str, float]:
+        if not symbols:
+            return {}
+        if self.market_snapshot:
+            return await self.market_snapshot.get_prices(symbols)
+        all_coins = await self.crypto_client.get_all_coins(max_coins=500)
+        return {coin[0]: coin[2] for coin in all_coins if coin[0] in symbols}
+
     async def check_alerts(self) -> Dict:
-        """Check all active alerts and trigger notifications."""
+        """Check all active alerts against current prices and trigger notifications."""
+        if self._check_lock is None:
+            self._check_lock = asyncio.Lock()
         try:
-            # Get all active alerts
-            alerts = await self.db.alerts.find({'status': 'active'}).to_list(1000)
-
-            triggered_count = 0
-            checked_count = 0
-
-            for alert in alerts:
-                checked_count += 1
-                triggered = await self._check_single_alert(alert)
-                if triggered:
-                    triggered_count += 1
-
-            logger.info(f"Alert check complete: {checked_count} checked, {triggered_count} triggered")
-            return {
-                'checked': checked_count,
-                'triggered': triggered_count
-            }
+            async with self._check_lock:
+                await self._ensure_loaded()
+                symbols = self.index.symbols()
+                symbols.update(alert['symbol'].upper() for alert in self.other_alerts.values())
+                prices = await self._get_prices(symbols)
+                return await self.evaluate_prices(prices)
 
         except Exception as e:
             logger.error(f"Error checking alerts: {e}")
             return {'checked': 0, 'triggered': 0}
 
-    async def _check_single_alert(self, alert: Dict) -> bool:
-        """Check a single alert and trigger if condition met."""
-        try:
-            symbol = alert['symbol']
-            alert_type = alert['alert_type']
-            condition = alert['condition']
+    async def evaluate_prices(self, prices: Dict[str, float]) -> Dict:
+        """Evaluate active alerts against a price snapshot.
 
-            # Get current price
-            all_coins = await self.crypto_client.get_all_coins(max_coins=500)
-            current_price = next(
-                (coin[2] for coin in all_coins if coin[0] == symbol),
-                None
-            )
+        Args:
+            prices: Symbol -> current price (upper-case symbols)
 
+        Returns:
+            Dict with checked and triggered counts
+        """
+        started = time.perf_counter()
+        checked_count = sum(self.index.count(symbol) for symbol in prices)
+
+        # Price thresholds: only crossed alerts come out of the index
+        crossed = self.index.pop_crossed(prices)
+        evaluation_ms = (time.perf_counter() - started) * 1000
+        triggered_count = 0
+        for alert, current_price in crossed:
+            if await self._trigger_alert(alert, current_price):
+                triggered_count += 1
+            else:
+                # Still active in the database: keep it indexed for the next check
+                self.index.add(alert)
+
+        percent_changes = self._percent_changes(prices)
+        pattern_results = await self._ai_pattern_results(prices)
+        for alert in list(self.other_alerts.values()):
+            symbol = alert['symbol'].upper()
+            current_price = prices.get(symbol)
             if current_price is None:
-                logger.warning(f"Could not get price for {symbol}")
-                return False
+                continue
+            checked_count += 1
+            percent_change = pattern_detected = None
+            if alert['alert_type'] == 'percent_change':
+                timeframe = (alert.get('condition') or {}).get('timeframe', '24h')
+                percent_change = percent_changes.get(timeframe, {}).get(symbol)
+            elif alert['alert_type'] == 'ai_pattern':
+                pattern_detected = pattern_results.get((symbol, self._pattern_key(alert.get('condition'))))
+            if await self._check_single_alert(alert, current_price, percent_change, pattern_detected):
+                self.other_alerts.pop(alert['id'], None)
+                triggered_count += 1
+
+        self.pending_checked.update(prices)
+        self.last_checked_at = datetime.now(timezone.utc)
+        self.stats['checks'] += 1
+        self.stats['evaluated'] += checked_count
+        self.stats['triggered'] += triggered_count
+        self.stats['last_check_ms'] = round(evaluation_ms, 3)
+
+        logger.info(f"Alert check complete: {checked_count} checked, {triggered_count} triggered "
+                    f"(index evaluated in {evaluation_ms:.2f}ms)")
+        return {
+            'checked': checked_count,
+            'triggered': triggered_count
+        }
+
+    def _percent_changes(self, prices: Dict[str, float]) -> Dict[str, Dict[str, float]]:
+        """Timeframe -> {symbol: percent change} for the symbols of active percent_change alerts.
+
+        Changes come from the snapshot's price history (one lookup per timeframe for all
+        symbols). Until the history covers 24h, the provider's 24h change is used for '24h'.
+        """
+        symbols_by_timeframe: Dict[str, set] = {}
+        for alert in self.other_alerts.values():
+            if alert['alert_type'] == 'percent_change':
+                timeframe = (alert.get('condition') or {}).get('timeframe', '24h')
+                symbols_by_timeframe.setdefault(timeframe, set()).add(alert['symbol'].upper())
+        if not symbols_by_timeframe or not self.market_snapshot:
+            return {}
+
+        history = self.market_snapshot.history
+        changes = {}
+        for timeframe, symbols in symbols_by_timeframe.items():
+            seconds = parse_timeframe(timeframe)
+            if seconds is None:
+                continue
+            window_prices = {symbol: prices[symbol] for symbol in symbols if symbol in prices}
+            changes[timeframe] = history.changes(window_prices, seconds)
+            if seconds == 86400:
+                for symbol in window_prices:
+                    entry = self.market_snapshot.index.get(symbol)
+                    if symbol not in changes[timeframe] and entry and entry.get('change_24h_pct') is not None:
+                        changes[timeframe][symbol] = entry['change_24h_pct']
+        return changes
+
+    async def flush_last_checked(self) -> int:
+        """Write last_checked for the alerts of all symbols evaluated since the last flush.
+
+        One update per LAST_CHECKED_CHUNK symbols; failed chunks are retried on the next flush.
+        Returns the number of update requests sent.
+        """
+        if not self.pending_checked:
+            return 0
+        symbols = sorted(self.pending_checked)
+        self.pending_checked = set()
+        writes = 0
+        for i in range(0, len(symbols), LAST_CHECKED_CHUNK):
+            chunk = symbols[i:i + LAST_CHECKED_CHUNK]
+            try:
+                await self.db.alerts.update_many(
+                    {'status': 'active', 'symbol': {'$in': chunk}},
+                    {'$set': {'last_checked': self.last_checked_at}}
+                )
+                writes += 1
+            except Exception as e:
+                self.pending_checked.update(chunk)
+                logger.error(f"Error updating alert last_checked: {e}")
+        self.stats['last_checked_writes'] += writes
+        return writes
+
+    async def _check_single_alert(self, alert: Dict, current_price: float,
+                                  percent_change: Optional[float] = None,
+                                  pattern_detected: Optional[bool] = None) -> bool:
+        """Check a single alert against the current price and trigger if condition met.
 
-            # Update last checked time
-            await self.db.alerts.update_one(
-                {'id': alert['id']},
-                {'$set': {'last_checked': datetime.now(timezone.utc)}}
-            )
+        Args:
+            alert: Active alert
+            current_price: Current price of the alert's symbol
+            percent_change: Price change (%) over the alert's timeframe (percent_change alerts)
+            pattern_detected: Whether the AI detected the alert's pattern (ai_pattern alerts)
+        """
+        try:
+            alert_type = alert['alert_type']
+            condition = alert['condition']
 
             # Check alert condition
             triggered = False
@@ -164,23 +349,23 @@ class AlertService:
                     triggered = True
 
             elif alert_type == 'percent_change':
-                # Get historical price
-                timeframe = condition.get('timeframe', '24h')
-                threshold_pct = condition.get('percent', 0)
-
-                # Calculate percent change
-                # (Simplified - would need historical data)
-                # For now, skip this type
-                pass
+                # percent > 0: rise of at least percent, < 0: drop of at least |percent|,
+                # direction 'any': move of at least |percent| either way
+                threshold_pct = float(condition.get('percent', 0))
+                if percent_change is not None and threshold_pct:
+                    if condition.get('direction') == 'any':
+                        triggered = abs(percent_change) >= abs(threshold_pct)
+                    elif threshold_pct > 0:
+                        triggered = percent_change >= threshold_pct
+                    else:
+                        triggered = percent_change <= threshold_pct
 
             elif alert_type == 'ai_pattern':
-                # AI-powered pattern detection
-                if self.api_key:
-                    triggered = await self._check_ai_pattern(symbol, current_price, condition)
+                # AI-powered pattern detection (evaluated per symbol in _ai_pattern_results)
+                triggered = bool(pattern_detected)
 
             if triggered:
-                await self._trigger_alert(alert, current_price)
-                return True
+                return await self._trigger_alert(alert, current_price, percent_change)
 
             return False
 
@@ -188,14 +373,87 @@ class AlertService:
             logger.error(f"Error checking alert {alert.get('id')}: {e}")
             return False
 
-    async def _check_ai_pattern(self, symbol: str, current_price: float, condition: Dict) -> bool:
-        """Use AI to detect trading patterns."""
+    def get_stats(self) -> Dict:
+        return {
+            'price_alerts': len(self.index),
+            'symbols': len(self.index.by_symbol),
+            'other_alerts': len(self.other_alerts),
+            'pending_last_checked_symbols': len(self.pending_checked),
+            'cached_patterns': len(self.pattern_cache),
+            'last_checked_at': self.last_checked_at.isoformat() if self.last_checked_at else None,
+            **self.stats
+        }
+
+    @staticmethod
+    def _pattern_key(condition: Dict) -> str:
+        return str((condition or {}).get('pattern', 'any')).strip().lower()
+
+    def _candle_expiry(self, now: float) -> float:
+        """End of the current pattern candle (AI_PATTERN_CANDLE_SECONDS, UTC-aligned)."""
+        return (now // self.pattern_candle_seconds + 1) * self.pattern_candle_seconds
+
+    async def _ai_pattern_results(self, prices: Dict[str, float]) -> Dict[tuple, bool]:
+        """(symbol, pattern) -> detected, for the active ai_pattern alerts with a current price.
+
+        Alerts are grouped by symbol: each symbol's uncached patterns are evaluated with one
+        history fetch and one LLM prompt, and the answers are cached until the next candle.
+        """
+        patterns_by_symbol: Dict[str, set] = {}
+        for alert in self.other_alerts.values():
+            symbol = alert['symbol'].upper()
+            if alert['alert_type'] == 'ai_pattern' and symbol in prices:
+                patterns_by_symbol.setdefault(symbol, set()).add(self._pattern_key(alert.get('condition')))
+        if not patterns_by_symbol or not self.api_key:
+            return {}
+
+        now = time.time()
+        self.pattern_cache = {key: cached for key, cached in self.pattern_cache.items() if cached[1] > now}
+        results = {}
+        pending: Dict[str, List[str]] = {}
+        for symbol, patterns in patterns_by_symbol.items():
+            for pattern in sorted(patterns):
+                cached = self.pattern_cache.get((symbol, pattern))
+                if cached is not None:
+                    results[(symbol, pattern)] = cached[0]
+                    self.stats['ai_pattern_cache_hits'] += 1
+                else:
+                    pending.setdefault(symbol, []).append(pattern)
+
+        if self._pattern_semaphore is None:
+            self._pattern_semaphore = asyncio.Semaphore(self.pattern_concurrency)
+
+        async def detect(symbol: str, patterns: List[str]):
+            async with self._pattern_semaphore:
+                detected = await self._detect_patterns(symbol, prices[symbol], patterns)
+            if detected is None:
+                return  # Failed: retried on the next check
+            expires_at = self._candle_expiry(time.time())
+            for pattern in patterns:
+                self.pattern_cache[(symbol, pattern)] = (detected[pattern], expires_at)
+                results[(symbol, pattern)] = detected[pattern]
+
+        await asyncio.gather(*(detect(symbol, patterns) for symbol, patterns in pending.items()))
+        return results
+
+    async def _detect_patterns(self, symbol: str, current_price: float, patterns: List[str]) -> Optional[Dict[str, bool]]:
+        """Use AI to detect several trading patterns on one symbol with a single prompt.
+
+        Args:
+            symbol: Coin symbol
+            current_price: Current price
+            patterns: Pattern conditions to evaluate
+
+        Returns:
+            Dict mapping pattern -> detected, or None if the data or LLM call failed
+        """
         try:
             # Get recent data
             historical_data = await self.crypto_client.get_historical_data(symbol, days=7)
+            self.stats['ai_pattern_history_fetches'] += 1
 
             if not historical_data or len(historical_data) < 5:
-                return False
+                # Not enough data for any pattern until the next candle
+                return {pattern: False for pattern in patterns}
 
             # Initialize AI chat
             chat = LlmChat(
@@ -208,27 +466,45 @@ class AlertService:
             # Extract price data
             prices = [candle.get('close', 0) for candle in historical_data[-20:]]
 
-            pattern_type = condition.get('pattern', 'any')
+            pattern_lines = '\n'.join(f"{i}. {pattern}" for i, pattern in enumerate(patterns, start=1))
 
             prompt = f"""Analyze recent price action for {symbol}:
 Current Price: ${current_price:.6f}
 Recent Prices: {prices[-10:]}
 
-Looking for: {pattern_type}
+Looking for these patterns:
+{pattern_lines}
 
-Does this show a {pattern_type} pattern? Reply with only YES or NO."""
+For each pattern, does the price action show it? Reply with one line per pattern,
+in the form "<number>. YES" or "<number>. NO", and nothing else."""
 
             message = UserMessage(text=prompt)
             response = await chat.send_message(message)
+            self.stats['ai_pattern_calls'] += 1
+
+            # Parse numbered YES/NO lines; unanswered patterns count as not detected
+            answers = {}
+            for line in response.splitlines():
+                match = re.match(r'\s*(\d+)\s*[.):-]?\s*(YES|NO)\b', line.strip(), re.IGNORECASE)
+                if match:
+                    answers[int(match.group(1))] = match.group(2).upper() == 'YES'
+            if len(answers) < len(patterns):
+                logger.warning(f"AI pattern detection for {symbol}: {len(answers)}/{len(patterns)} patterns answered")
 
-            return 'YES' in response.upper()
+            return {pattern: answers.get(i, False) for i, pattern in enumerate(patterns, start=1)}
 
         except Exception as e:
-            logger.error(f"AI pattern detection error: {e}")
-            return False
+            logger.error(f"AI pattern detection error for {symbol}: {e}")
+            return None
+
+    async def _trigger_alert(self, alert: Dict, current_value: float,
+                             percent_change: Optional[float] = None) -> bool:
+        """Trigger an alert and send notifications.
 
-    async def _trigger_alert(self, alert: Dict, current_value: float):
-        """Trigger an alert and send notifications."""
+        Returns:
+            True once the alert is marked triggered, False if that update failed
+            (the alert is still active)
+        """
         try:
             # Update alert
             await self.db.alerts.update_one(
@@ -241,17 +517,22 @@ Does this show a {pattern_type} pattern? Reply with only YES or NO."""
                     '$inc': {'triggered_count': 1}
                 }
             )
+        except Exception as e:
+            logger.error(f"Error triggering alert {alert['id']}: {e}")
+            return False
 
+        try:
             # Create notification
             notification = {
                 'user_id': alert['user_id'],
                 'type': 'alert',
                 'title': f"Alert Triggered: {alert['symbol']}",
-                'message': self._format_alert_message(alert, current_value),
+                'message': self._format_alert_message(alert, current_value, percent_change),
                 'data': {
                     'alert_id': alert['id'],
                     'symbol': alert['symbol'],
-                    'current_value': current_value
+                    'current_value': current_value,
+                    'percent_change': percent_change
                 },
                 'read': False,
                 'created_at': datetime.now(timezone.utc)
@@ -267,9 +548,10 @@ Does this show a {pattern_type} pattern? Reply with only YES or NO."""
             logger.info(f"Alert triggered: {alert['id']} for {alert['symbol']}")
 
         except Exception as e:
-            logger.error(f"Error triggering alert: {e}")
+            logger.error(f"Error sending notification for alert {alert['id']}: {e}")
+        return True
 
-    def _format_alert_message(self, alert: Dict, current_value: float) -> str:
+    def _format_alert_message(self, alert: Dict, current_value: float, percent_change: Optional[float] = None) -> str:
         """Format alert notification message."""
         symbol = alert['symbol']
         alert_type = alert['alert_type']
@@ -279,6 +561,8 @@ Does this show a {pattern_type} pattern? Reply with only YES or NO."""
             return f"{symbol} is now ${current_value:.6f}, above your threshold of ${condition.get('price', 0):.6f}"
         elif alert_type == 'price_below':
             return f"{symbol} is now ${current_value:.6f}, below your threshold of ${condition.get('price', 0):.6f}"
+        elif alert_type == 'percent_change' and percent_change is not None:
+            return f"{symbol} moved {percent_change:+.2f}% over {condition.get('timeframe', '24h')} to ${current_value:.6f}"
         elif alert_type == 'ai_pattern':
             return f"{symbol} detected pattern: {condition.get('pattern', 'unknown')} at ${current_value:.6f}"
         else:
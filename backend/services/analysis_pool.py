@@ -0,0 +1,243 @@
+"""
+Optional process pool for the CPU-bound part of coin analysis.
+
+Indicators, timeframe alignment, regime classification and the 50+ bots are
+pure Python/pandas work that holds the GIL, so on a multi-core box the asyncio
+scan loop uses a single core no matter how many coins are fetched in parallel.
+With ANALYSIS_WORKERS > 0 the orchestrator hands that work to a
+ProcessPoolExecutor: the candle arrays are packed into one shared-memory block
+(no pickling of thousands of candle dicts) and only the resulting features and
+bot signals travel back to the parent.
+
+ANALYSIS_WORKERS=0 (the default) keeps everything in-process.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from services.indicator_engine import IndicatorEngine
+from services.market_regime_classifier import MarketRegimeClassifier
+
+logger = logging.getLogger(__name__)
+
+# Column order of the packed candle arrays
+CANDLE_FIELDS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+
+
+def compute_coin_features(symbol: str, candles: List[Dict], candles_4h: List[Dict],
+                          derivatives_data: Optional[Dict], current_price: float,
+                          indicator_engine: IndicatorEngine,
+                          regime_classifier: MarketRegimeClassifier) -> Optional[Tuple[Dict, Dict]]:
+    """Compute bot features and market regime for one coin from its candles.
+
+    Shared by the in-process scan path and the pool workers.
+
+    Returns:
+        (features, regime_data) or None if indicators could not be computed
+    """
+    # 3. Compute indicators (now includes derivatives data)
+    features = indicator_engine.compute_all_indicators(candles, derivatives_data)
+
+    if not features:
+        logger.warning(f"Failed to compute indicators for {symbol}")
+        return None
+
+    # Ensure current price is accurate
+    features['current_price'] = current_price
+
+    # 3.5. PHASE 4: Compute 4h timeframe indicators
+    features_4h = indicator_engine.compute_4h_indicators(candles_4h)
+
+    # 3.6. PHASE 4: Check timeframe alignment
+    timeframe_alignment = indicator_engine.check_timeframe_alignment(features, features_4h)
+    features['timeframe_alignment'] = timeframe_alignment.get('alignment', 'unknown')
+    features['timeframe_confidence_modifier'] = timeframe_alignment.get('confidence_modifier', 1.0)
+
+    # Merge 4h indicators into features dict
+    features.update(features_4h)
+
+    logger.debug(f"📊 {symbol} Timeframe Alignment: {timeframe_alignment.get('alignment')} (modifier: {timeframe_alignment.get('confidence_modifier')})")
+
+    # 🎯 PHASE 2: Classify market regime (memoized per coin and candle period)
+    regime_data = regime_classifier.classify_regime_cached(symbol, candles, features)
+
+    # Add regime to features for bot access
+    features['market_regime'] = regime_data['regime']
+    features['regime_confidence'] = regime_data['confidence']
+
+    return features, regime_data
+
+
+def _pack_candles(candles: List[Dict], candles_4h: List[Dict]) -> shared_memory.SharedMemory:
+    """Copy daily + 4h candles into one (rows, 6) float64 shared-memory block."""
+    rows = len(candles) + len(candles_4h)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, rows * len(CANDLE_FIELDS) * 8))
+    packed = np.ndarray((rows, len(CANDLE_FIELDS)), dtype=np.float64, buffer=shm.buf)
+    for i, candle in enumerate(candles + candles_4h):
+        packed[i] = [candle.get(field, np.nan) for field in CANDLE_FIELDS]
+    del packed  # release the buffer export so the block can be closed
+    return shm
+
+
+def _unpack_candles(packed: np.ndarray) -> List[Dict]:
+    candles = []
+    for timestamp, open_, high, low, close, volume in packed.tolist():
+        candles.append({
+            'timestamp': int(timestamp),
+            'open': open_,
+            'high': high,
+            'low': low,
+            'close': close,
+            'volume': volume
+        })
+    return candles
+
+
+# Per-worker state, created lazily on the first task a worker process runs
+_worker_state: Dict = {}
+
+
+def _worker_bots(bot_names: List[str]) -> List:
+    bots = _worker_state.get('bots')
+    if bots is None:
+        from bots.bot_strategies import get_all_bots
+        bots = {bot.name: bot for bot in get_all_bots()}
+        _worker_state['bots'] = bots
+    return [bots[name] for name in bot_names if name in bots]
+
+
+def _analyze_in_worker(symbol: str, shm_name: str, daily_rows: int, total_rows: int,
+                       derivatives_data: Optional[Dict], current_price: float,
+                       bot_names: Optional[List[str]]) -> Optional[Dict]:
+    """Worker entry point: features, regime and (optionally) bot signals for one coin."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        packed = np.ndarray((total_rows, len(CANDLE_FIELDS)), dtype=np.float64, buffer=shm.buf)
+        candles = _unpack_candles(packed[:daily_rows])
+        candles_4h = _unpack_candles(packed[daily_rows:])
+        del packed
+    finally:
+        shm.close()
+
+    if 'indicator_engine' not in _worker_state:
+        _worker_state['indicator_engine'] = IndicatorEngine()
+        _worker_state['market_regime'] = MarketRegimeClassifier()
+
+    computed = compute_coin_features(
+        symbol, candles, candles_4h, derivatives_data, current_price,
+        _worker_state['indicator_engine'], _worker_state['market_regime']
+    )
+    if computed is None:
+        return None
+    features, regime_data = computed
+
+    bot_results = None
+    if bot_names is not None:
+        bot_results = []
+        for bot in _worker_bots(bot_names):
+            try:
+                bot_results.append((bot.name, bot.analyze(features)))
+            except Exception as e:
+                logger.error(f"Bot {bot.name} failed for {symbol}: {e}", exc_info=True)
+
+    return {
+        'features': features,
+        'regime_data': regime_data,
+        'bot_results': bot_results
+    }
+
+
+class AnalysisPool:
+    """Runs coin feature computation (and optionally the bots) in worker processes."""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        if max_workers is None:
+            max_workers = int(os.getenv('ANALYSIS_WORKERS', '0'))
+        self.max_workers = max(0, max_workers)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.stats = {
+            'tasks': 0,
+            'failures': 0,
+            'restarts': 0,
+            'total_time': 0.0
+        }
+
+        if self.enabled:
+            logger.info(f"⚙️ Analysis pool enabled with {self.max_workers} worker processes")
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_workers > 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    async def analyze(self, symbol: str, candles: List[Dict], candles_4h: List[Dict],
+                      derivatives_data: Optional[Dict], current_price: float,
+                      bot_names: Optional[List[str]] = None) -> Optional[Dict]:
+        """Compute one coin's features in a worker process.
+
+        Args:
+            symbol: Coin symbol (for logging)
+            candles: Daily candles
+            candles_4h: 4h candles
+            derivatives_data: Futures metrics passed to the indicator engine
+            current_price: Real-time current price
+            bot_names: If given, these bots also run in the worker on the computed features
+
+        Returns:
+            Dict with 'features', 'regime_data' and 'bot_results' ((bot name, result)
+            pairs, None when bot_names was not given), or None if indicators failed
+        """
+        shm = _pack_candles(candles, candles_4h)
+        start = time.monotonic()
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(
+                self._get_executor(), _analyze_in_worker,
+                symbol, shm.name, len(candles), len(candles) + len(candles_4h),
+                derivatives_data, current_price, bot_names
+            )
+            self.stats['tasks'] += 1
+            self.stats['total_time'] += time.monotonic() - start
+            return result
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM kill); start a fresh pool for the next coin
+            self.stats['failures'] += 1
+            self.stats['restarts'] += 1
+            broken, self._executor = self._executor, None
+            if broken is not None:
+                broken.shutdown(wait=False)
+            raise
+        except Exception:
+            self.stats['failures'] += 1
+            raise
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def get_stats(self) -> Dict:
+        tasks = self.stats['tasks']
+        return {
+            'workers': self.max_workers,
+            'tasks': tasks,
+            'failures': self.stats['failures'],
+            'restarts': self.stats['restarts'],
+            'avg_task_time': round(self.stats['total_time'] / tasks, 4) if tasks else 0.0
+        }
+
+    def shutdown(self):
+        """Stop the worker processes (called on application shutdown)."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,519 @@
+"""
+Vectorized historical backtest of the scan bots.
+
+The only way to score a bot was to wait for evaluate_predictions. The
+backtester replays daily candles instead, one coin at a time:
+
+1. rolling_features(): every feature compute_all_indicators() produces, for
+   every bar at once. The indicator series are causal, so row i equals
+   compute_all_indicators(candles[:i + 1]) (the live scan sees the same values
+   on a 365-day window; only the 4h and derivatives inputs are missing, as if
+   those providers returned nothing).
+2. classify_regimes() / market_regimes(): MarketRegimeClassifier.classify_regime
+   per coin and BotPerformanceService.classify_market_regime on BTC, vectorized
+   over all bars.
+3. run_bot_signals(): all bots over all bars of the coin through the batch
+   engine (analyze_batch where available, analyze per row otherwise), as a
+   (bars x bots) signal matrix.
+4. simulate_signals(): each long / short signal is opened at its bar's close and
+   resolved over the next `horizon` candles with first_touch_window, scored
+   like evaluate_predictions: win / loss at the first TP / SL touch, otherwise
+   force-closed at the horizon (partial_win if in profit, else loss); signals
+   whose horizon runs past the data stay pending.
+5. accumulate() / summarize(): counts per (bot, coin regime, market regime,
+   status) and P/L sums, turned into bot_performance and
+   performance-by-regime shaped stats.
+"""
+
+import logging
+import random
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from bots.batch_engine import FeatureTable, analyze_bot_batch
+from services.bot_performance_service import DEFAULT_STOP_LOSS_PERCENT, performance_weight
+from services.indicator_engine import IndicatorEngine
+from services.market_regime_classifier import MarketRegimeClassifier
+from services.outcome_engine import STOP_LOSS, TAKE_PROFIT, first_touch_window
+
+logger = logging.getLogger(__name__)
+
+# compute_all_indicators needs at least this many candles
+FEATURE_WARMUP = 50
+
+# Coin regimes (MarketRegimeClassifier) and BTC market regimes (bot_predictions.market_regime)
+COIN_REGIMES = MarketRegimeClassifier.REGIMES
+MARKET_REGIMES = ('bull_market', 'bear_market', 'high_volatility', 'sideways')
+
+# Simulated outcome codes, in bot_predictions.outcome_status terms
+PENDING, WIN, PARTIAL_WIN, LOSS = 0, 1, 2, 3
+STATUSES = ('pending', 'win', 'partial_win', 'loss')
+
+# Numeric features of compute_all_indicators (without derivatives data)
+FEATURE_KEYS = (
+    'current_price', 'sma_20', 'sma_50', 'sma_200', 'ema_9', 'ema_12', 'ema_13', 'ema_20', 'ema_21',
+    'ema_26', 'rsi_14', 'volume', 'volume_sma_20', 'obv', 'vwap', 'atr', 'atr_14', 'adx', 'macd',
+    'macd_signal', 'macd_histogram', 'bb_upper', 'bb_middle', 'bb_lower', 'bb_width', 'stoch_k',
+    'stoch_d', 'price_change_24h', 'price_change_7d', 'recent_high', 'recent_low'
+)
+
+
+def rolling_features(candles: List[Dict]) -> Dict[str, np.ndarray]:
+    """compute_all_indicators() for every bar of a candle list.
+
+    Returns:
+        Dict of float arrays (one value per candle, sorted by time): FEATURE_KEYS
+        plus timestamp (seconds), high, low and close
+    """
+    engine = IndicatorEngine
+    df = engine.prepare_dataframe(candles)
+    if df.empty:
+        return {}
+
+    bars = np.arange(1, len(df) + 1)
+    close = df['close']
+    sma_50 = engine.sma(df, 50)
+    atr = engine.atr(df, 14)
+    macd_line, signal_line, histogram = engine.macd(df)
+    bb_upper, bb_middle, bb_lower = engine.bollinger_bands(df)
+    stoch_k, stoch_d = engine.stochastic(df)
+
+    columns = {
+        'current_price': close,
+        'sma_20': engine.sma(df, 20),
+        'sma_50': sma_50,
+        'sma_200': engine.sma(df, 200).where(bars >= 200, sma_50),
+        'ema_9': engine.ema(df, 9),
+        'ema_12': engine.ema(df, 12),
+        'ema_13': engine.ema(df, 13),
+        'ema_20': engine.ema(df, 20),
+        'ema_21': engine.ema(df, 21),
+        'ema_26': engine.ema(df, 26),
+        'rsi_14': engine.rsi(df, 14),
+        'volume': df['volume'],
+        'volume_sma_20': df['volume'].rolling(20).mean(),
+        'obv': engine.obv(df),
+        'vwap': engine.vwap(df),
+        'atr': atr,
+        'atr_14': atr,
+        'adx': pd.Series(50.0, index=df.index),  # same placeholder as compute_all_indicators
+        'macd': macd_line,
+        'macd_signal': signal_line,
+        'macd_histogram': histogram,
+        'bb_upper': bb_upper,
+        'bb_middle': bb_middle,
+        'bb_lower': bb_lower,
+        'bb_width': (bb_upper - bb_lower) / bb_middle,
+        'stoch_k': stoch_k,
+        'stoch_d': stoch_d,
+        'price_change_24h': ((close - close.shift(5)) / close.shift(5) * 100).where(bars > 6, 0.0),
+        'price_change_7d': ((close - close.shift(41)) / close.shift(41) * 100).where(bars > 42, 0.0),
+        'recent_high': df['high'].rolling(100, min_periods=1).max(),
+        'recent_low': df['low'].rolling(100, min_periods=1).min()
+    }
+
+    features = {key: columns[key].to_numpy(dtype=np.float64) for key in FEATURE_KEYS}
+    features['timestamp'] = ((df['timestamp'] - pd.Timestamp(0)) // pd.Timedelta(seconds=1)).to_numpy(dtype=np.int64)
+    features['high'] = df['high'].to_numpy(dtype=np.float64)
+    features['low'] = df['low'].to_numpy(dtype=np.float64)
+    features['close'] = close.to_numpy(dtype=np.float64)
+    return features
+
+
+def _window_extreme(values: np.ndarray, window: int, how: str) -> np.ndarray:
+    series = pd.Series(values).rolling(window)
+    return (series.max() if how == 'max' else series.min()).to_numpy()
+
+
+def classify_regimes(features: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """MarketRegimeClassifier.classify_regime for every bar of one coin.
+
+    Returns:
+        (regime index into COIN_REGIMES, confidence) per bar; bars with fewer than
+        50 candles get the classifier's default (SIDEWAYS, 0.5)
+    """
+    close = features['close']
+    count = len(close)
+    bars = np.arange(count)
+
+    # Signal 1: SMA alignment (price vs features' SMAs; 0.33 / 0.33 / 0.34)
+    sma_trend = (
+        np.where(close > features['sma_20'], 0.33, -0.33)
+        + np.where(close > features['sma_50'], 0.33, -0.33)
+        + np.where(close > features['sma_200'], 0.34, -0.34)
+    )
+
+    # Signal 2: momentum over the last 20 closes
+    first = np.concatenate([np.full(19, np.nan), close[:-19]]) if count > 19 else np.full(count, np.nan)
+    momentum = np.where(np.isfinite(first) & (first != 0), (close - first) / np.where(first == 0, 1, first), 0.0)
+
+    # Signal 3: ADX trend strength
+    adx = features['adx']
+    trend_strength = np.select([adx < 20, adx < 25, adx < 40], [0.2, 0.4, 0.7], 1.0)
+
+    # Signal 5: structure of the last 30 candles split in three segments of 10
+    high_max = _window_extreme(features['high'], 10, 'max')
+    low_min = _window_extreme(features['low'], 10, 'min')
+
+    def segment(values: np.ndarray, end_offset: int) -> np.ndarray:
+        shifted = np.full(count, np.nan)
+        if count > end_offset:
+            shifted[end_offset:] = values[:count - end_offset]
+        return shifted
+
+    high1, high2, high3 = segment(high_max, 20), segment(high_max, 10), high_max
+    low1, low2, low3 = segment(low_min, 20), segment(low_min, 10), low_min
+    higher_highs = (high2 > high1) & (high3 > high2)
+    lower_lows = (low2 < low1) & (low3 < low2)
+    with np.errstate(all='ignore'):
+        high_trend = np.where(high1 > 0, (high3 - high1) / high1, 0.0)
+        low_trend = np.where(low1 > 0, (low3 - low1) / low1, 0.0)
+    average_trend = np.clip((high_trend + low_trend) / 2 * 10, -1.0, 1.0)
+    structure = np.select(
+        [higher_highs & ~lower_lows, lower_lows & ~higher_highs, higher_highs & lower_lows],
+        [1.0, -1.0, 0.0], average_trend
+    )
+
+    # Combine signals with classify_regime's weights
+    bull = np.where(sma_trend > 0.3, sma_trend * 0.4, 0.0)
+    bear = np.where(sma_trend < -0.3, np.abs(sma_trend) * 0.4, 0.0)
+    sideways = np.where(np.abs(sma_trend) <= 0.3, 0.4, 0.0)
+
+    bull += np.where(momentum > 0.02, np.minimum(momentum * 10, 1.0) * 0.3, 0.0)
+    bear += np.where(momentum < -0.02, np.minimum(np.abs(momentum) * 10, 1.0) * 0.3, 0.0)
+    sideways += np.where(np.abs(momentum) <= 0.02, 0.3, 0.0)
+
+    strong = trend_strength > 0.6
+    bull_leads = bull > bear
+    bull += np.where(strong & bull_leads, 0.15, 0.0)
+    bear += np.where(strong & ~bull_leads, 0.15, 0.0)
+    sideways += np.where(strong, 0.0, 0.15)
+
+    bull += np.where(structure > 0.5, 0.15, 0.0)
+    bear += np.where(structure < -0.5, 0.15, 0.0)
+    sideways += np.where(np.abs(structure) <= 0.5, 0.15, 0.0)
+
+    best = np.maximum(np.maximum(bull, bear), sideways)
+    is_bull = (best == bull) & (bull > 0.6)
+    is_bear = ~is_bull & (best == bear) & (bear > 0.6)
+    regimes = np.where(is_bull, COIN_REGIMES.index('BULL'),
+                       np.where(is_bear, COIN_REGIMES.index('BEAR'), COIN_REGIMES.index('SIDEWAYS')))
+    confidence = np.where(is_bull, bull, np.where(is_bear, bear, sideways))
+
+    warming_up = bars < FEATURE_WARMUP - 1
+    regimes[warming_up] = COIN_REGIMES.index('SIDEWAYS')
+    confidence[warming_up] = 0.5
+    return regimes.astype(np.int8), confidence
+
+
+def market_regimes(closes: np.ndarray, window: int = 7) -> np.ndarray:
+    """BotPerformanceService.classify_market_regime on BTC closes, for every bar.
+
+    Each bar uses the last `window` daily closes: 7-day change and stdev / mean
+    volatility with the same thresholds.
+
+    Returns:
+        Index into MARKET_REGIMES per bar (sideways until `window` closes exist)
+    """
+    count = len(closes)
+    codes = np.full(count, MARKET_REGIMES.index('sideways'), dtype=np.int8)
+    if count < window:
+        return codes
+
+    windows = np.lib.stride_tricks.sliding_window_view(closes, window)
+    with np.errstate(all='ignore'):
+        change = (windows[:, -1] - windows[:, 0]) / windows[:, 0] * 100
+        mean = windows.mean(axis=1)
+        volatility = np.where(mean > 0, windows.std(axis=1, ddof=1) / mean, 0.0)
+
+    labels = np.select(
+        [volatility > 0.10, (change > 5) & (volatility < 0.08), (change < -5) & (volatility < 0.08)],
+        [MARKET_REGIMES.index('high_volatility'), MARKET_REGIMES.index('bull_market'),
+         MARKET_REGIMES.index('bear_market')],
+        MARKET_REGIMES.index('sideways')
+    )
+    codes[window - 1:] = labels
+    return codes
+
+
+def align_market_regimes(timestamps: np.ndarray, btc_timestamps: np.ndarray, btc_codes: np.ndarray) -> np.ndarray:
+    """Market regime of the latest BTC bar at or before each timestamp (sideways before BTC data)."""
+    if len(btc_timestamps) == 0:
+        return np.full(len(timestamps), MARKET_REGIMES.index('sideways'), dtype=np.int8)
+    positions = np.searchsorted(btc_timestamps, timestamps, side='right') - 1
+    codes = btc_codes[np.maximum(positions, 0)]
+    return np.where(positions >= 0, codes, MARKET_REGIMES.index('sideways')).astype(np.int8)
+
+
+def feature_rows(features: Dict[str, np.ndarray], bars: np.ndarray, regimes: np.ndarray,
+                 confidence: np.ndarray) -> Tuple[List[Dict], Dict[str, np.ndarray]]:
+    """Bot feature dicts for the given bars, shaped like the scan's features.
+
+    Returns:
+        (rows, columns): the dicts and their numeric columns for FeatureTable
+    """
+    columns = {key: features[key][bars] for key in FEATURE_KEYS}
+    values = [columns[key].tolist() for key in FEATURE_KEYS]
+    regime_names = [COIN_REGIMES[code] for code in regimes[bars].tolist()]
+    rows = []
+    for row_values, regime, regime_confidence in zip(zip(*values), regime_names, confidence[bars].tolist()):
+        row = dict(zip(FEATURE_KEYS, row_values))
+        # No 4h candles or derivatives history: as in a scan where those providers returned nothing
+        row['has_derivatives'] = False
+        row['timeframe_alignment'] = 'unknown'
+        row['timeframe_confidence_modifier'] = 1.0
+        row['market_regime'] = regime
+        row['regime_confidence'] = regime_confidence
+        rows.append(row)
+    columns['timeframe_confidence_modifier'] = np.ones(len(bars))
+    columns['regime_confidence'] = confidence[bars].astype(np.float64)
+    return rows, columns
+
+
+def run_bot_signals(bots: Sequence, rows: List[Dict], columns: Dict[str, np.ndarray],
+                    label: str = '') -> Dict[str, np.ndarray]:
+    """Run every bot over every row (bar) in batch mode.
+
+    Returns:
+        (rows x bots) arrays: direction (+1 long, -1 short, 0 no signal), confidence,
+        entry, take_profit and stop_loss (NaN without a stop)
+    """
+    shape = (len(rows), len(bots))
+    signals = {
+        'direction': np.zeros(shape, dtype=np.int8),
+        'confidence': np.zeros(shape, dtype=np.float32),
+        'entry': np.full(shape, np.nan),
+        'take_profit': np.full(shape, np.nan),
+        'stop_loss': np.full(shape, np.nan)
+    }
+    table = FeatureTable(rows, [f"{label}#{i}" for i in range(len(rows))], columns)
+
+    for b, bot in enumerate(bots):
+        for i, result in enumerate(analyze_bot_batch(bot, table)):
+            if not result:
+                continue
+            direction = result.get('direction')
+            if direction not in ('long', 'short'):
+                continue
+            try:
+                entry = float(result.get('entry') or 0)
+                take_profit = float(result.get('take_profit') or 0)
+                stop_loss = result.get('stop_loss')
+                stop_loss = float(stop_loss) if stop_loss else np.nan
+                confidence = float(result.get('confidence', 0))
+            except (TypeError, ValueError):
+                continue
+            if not (entry > 0 and np.isfinite(take_profit)):
+                continue
+            signals['direction'][i, b] = 1 if direction == 'long' else -1
+            signals['confidence'][i, b] = confidence
+            signals['entry'][i, b] = entry
+            signals['take_profit'][i, b] = take_profit
+            signals['stop_loss'][i, b] = stop_loss
+    return signals
+
+
+def effective_stop_losses(entries: np.ndarray, stop_losses: np.ndarray, is_long: np.ndarray) -> np.ndarray:
+    """Vectorized BotPerformanceService._stop_level: own stop or the default stop, whichever is hit first."""
+    default_long = entries * (1 - DEFAULT_STOP_LOSS_PERCENT / 100)
+    default_short = entries * (1 + DEFAULT_STOP_LOSS_PERCENT / 100)
+    has_stop = np.isfinite(stop_losses) & (stop_losses != 0)
+    return np.where(
+        is_long,
+        np.where(has_stop, np.maximum(stop_losses, default_long), default_long),
+        np.where(has_stop, np.minimum(stop_losses, default_short), default_short)
+    )
+
+
+def simulate_signals(signals: Dict[str, np.ndarray], bars: np.ndarray, features: Dict[str, np.ndarray],
+                     horizon: int) -> Dict[str, np.ndarray]:
+    """Resolve every signal on the candles after its bar.
+
+    Args:
+        signals: run_bot_signals output (rows x bots)
+        bars: Candle index of each row
+        features: rolling_features of the coin (high / low / close)
+        horizon: Candles a position stays open before it is force-closed
+
+    Returns:
+        (rows x bots) arrays: status (PENDING / WIN / PARTIAL_WIN / LOSS, PENDING
+        where there was no signal) and profit_loss (percent, NaN unless closed)
+    """
+    direction = signals['direction']
+    status = np.full(direction.shape, PENDING, dtype=np.int8)
+    profit_loss = np.full(direction.shape, np.nan, dtype=np.float32)
+    rows, columns = np.nonzero(direction)
+    if len(rows) == 0:
+        return {'status': status, 'profit_loss': profit_loss}
+
+    is_long = direction[rows, columns] > 0
+    entries = signals['entry'][rows, columns]
+    targets = signals['take_profit'][rows, columns]
+    stops = effective_stop_losses(entries, signals['stop_loss'][rows, columns], is_long)
+    opened_at = bars[rows]
+
+    touch = first_touch_window(features['high'], features['low'], opened_at + 1, horizon, is_long, targets, stops)
+    side = np.where(is_long, 1.0, -1.0)
+
+    # Still open after the horizon: force-closed at the last close, as evaluate_predictions does
+    closes = features['close']
+    exit_index = np.minimum(opened_at + horizon, len(closes) - 1)
+    exits = closes[exit_index]
+    forced_pl = (exits - entries) / entries * 100 * side
+    halfway = entries + (targets - entries) * 0.5
+    forced_win = np.where(is_long, exits >= targets, exits <= targets)
+    forced_partial = np.where(is_long, exits >= halfway, exits <= halfway) | (forced_pl > 0)
+    forced_status = np.where(forced_win, WIN, np.where(forced_partial, PARTIAL_WIN, LOSS))
+
+    touched_tp = touch['outcome'] == TAKE_PROFIT
+    touched_sl = touch['outcome'] == STOP_LOSS
+    closed = touched_tp | touched_sl | touch['complete']
+    level = np.where(touched_tp, targets, stops)
+
+    outcome_status = np.where(touched_tp, WIN, np.where(touched_sl, LOSS, forced_status))
+    outcome_pl = np.where(touched_tp | touched_sl, (level - entries) / entries * 100 * side, forced_pl)
+
+    status[rows[closed], columns[closed]] = outcome_status[closed]
+    profit_loss[rows[closed], columns[closed]] = outcome_pl[closed]
+    return {'status': status, 'profit_loss': profit_loss}
+
+
+def backtest_coin(symbol: str, candles: List[Dict], bots: Sequence, btc_timestamps: np.ndarray,
+                  btc_codes: np.ndarray, horizon: int, seed: Optional[int] = None) -> Optional[Dict]:
+    """Features, regimes, bot signals and simulated outcomes of one coin.
+
+    Args:
+        symbol: Coin symbol (seeds the random generator of bots that draw random inputs)
+        candles: Daily candles of the coin
+        bots: Bots to replay
+        btc_timestamps, btc_codes: BTC bar timestamps and market_regimes() codes
+        horizon: Candles before a position is force-closed
+        seed: Optional base seed for reproducible runs
+
+    Returns:
+        Dict with timestamps, coin_regime, market_regime and forward_return (close
+        to close move over the horizon in percent, NaN where it runs past the data)
+        per row, the run_bot_signals arrays and the simulate_signals arrays, or None
+        if the coin has too little history
+    """
+    features = rolling_features(candles)
+    if not features or len(features['close']) < FEATURE_WARMUP:
+        return None
+
+    regimes, confidence = classify_regimes(features)
+    bars = np.flatnonzero((np.arange(len(features['close'])) >= FEATURE_WARMUP - 1) & (features['close'] > 0))
+    if len(bars) == 0:
+        return None
+
+    if seed is not None:
+        random.seed(f"{seed}:{symbol}")
+    rows, columns = feature_rows(features, bars, regimes, confidence)
+    signals = run_bot_signals(bots, rows, columns, symbol)
+    outcomes = simulate_signals(signals, bars, features, horizon)
+
+    closes = features['close']
+    exits = bars + horizon
+    inside = exits < len(closes)
+    forward_return = np.full(len(bars), np.nan)
+    forward_return[inside] = (closes[exits[inside]] - closes[bars[inside]]) / closes[bars[inside]] * 100
+
+    timestamps = features['timestamp'][bars]
+    return {
+        'symbol': symbol,
+        'timestamps': timestamps,
+        'coin_regime': regimes[bars],
+        'market_regime': align_market_regimes(timestamps, btc_timestamps, btc_codes),
+        'forward_return': forward_return,
+        **signals,
+        **outcomes
+    }
+
+
+def empty_totals(bot_count: int) -> Dict[str, np.ndarray]:
+    """Accumulators: counts[bot, coin regime, market regime, status] and closed P/L sums."""
+    shape = (bot_count, len(COIN_REGIMES), len(MARKET_REGIMES))
+    return {
+        'counts': np.zeros(shape + (len(STATUSES),), dtype=np.int64),
+        'profit_loss': np.zeros(shape, dtype=np.float64)
+    }
+
+
+def accumulate(totals: Dict[str, np.ndarray], coin: Dict):
+    """Add one backtest_coin result to the accumulators."""
+    rows, bots = np.nonzero(coin['direction'])
+    if len(rows) == 0:
+        return
+    coin_regime = coin['coin_regime'][rows]
+    market_regime = coin['market_regime'][rows]
+    status = coin['status'][rows, bots]
+    np.add.at(totals['counts'], (bots, coin_regime, market_regime, status), 1)
+    closed = status != PENDING
+    np.add.at(totals['profit_loss'], (bots[closed], coin_regime[closed], market_regime[closed]),
+              coin['profit_loss'][rows[closed], bots[closed]].astype(np.float64))
+
+
+def merge_totals(totals: Dict[str, np.ndarray], other: Dict[str, np.ndarray]):
+    totals['counts'] += other['counts']
+    totals['profit_loss'] += other['profit_loss']
+
+
+def _rates(counts: np.ndarray, profit_loss: float) -> Dict:
+    """bot_performance style metrics from a [status] count vector."""
+    wins, partial_wins, losses = int(counts[WIN]), int(counts[PARTIAL_WIN]), int(counts[LOSS])
+    closed = wins + partial_wins + losses
+    return {
+        'total_predictions': int(counts.sum()),
+        'successful_predictions': wins,
+        'partial_wins': partial_wins,
+        'failed_predictions': losses,
+        'pending_predictions': int(counts[PENDING]),
+        'accuracy_rate': (wins + partial_wins * 0.5) / closed * 100 if closed else 0.0,
+        'avg_profit_loss': profit_loss / closed if closed else 0.0
+    }
+
+
+def summarize(totals: Dict[str, np.ndarray], bots: Sequence) -> Dict[str, List[Dict]]:
+    """Per-bot and per-regime stats in the shapes the performance endpoints use.
+
+    Returns:
+        Dict with
+        - bots: bot_performance records (_update_bot_metrics fields + performance_weight)
+        - regimes: get_performance_by_regime records (BTC market regimes, win / loss only)
+        - coin_regimes: per bot, bot_performance metrics per coin regime (BULL / BEAR / SIDEWAYS)
+    """
+    counts = totals['counts']
+    profit_loss = totals['profit_loss']
+    bot_stats, regime_stats, coin_regime_stats = [], [], []
+
+    for b, bot in enumerate(bots):
+        stats = _rates(counts[b].sum(axis=(0, 1)), float(profit_loss[b].sum()))
+        stats['performance_weight'] = performance_weight(
+            stats['accuracy_rate'], stats['avg_profit_loss'], stats['total_predictions']
+        )
+        bot_stats.append({'bot_name': bot.name, 'bot_type': getattr(bot, 'bot_type', 'default'), **stats})
+
+        by_regime = {'bot_name': bot.name, 'best_regime': None}
+        best_accuracy = 0.0
+        for m, regime in enumerate(MARKET_REGIMES):
+            regime_counts = counts[b, :, m].sum(axis=0)
+            decided = int(regime_counts[WIN] + regime_counts[LOSS])
+            accuracy = round(float(regime_counts[WIN]) / decided * 100, 1) if decided else None
+            by_regime[f'{regime}_accuracy'] = accuracy
+            by_regime[f'{regime}_predictions'] = decided
+            if accuracy is not None and accuracy > best_accuracy:
+                best_accuracy = accuracy
+                by_regime['best_regime'] = regime.replace('_', ' ').title()
+        regime_stats.append(by_regime)
+
+        coin_regime_stats.append({
+            'bot_name': bot.name,
+            'bot_type': getattr(bot, 'bot_type', 'default'),
+            **{
+                regime: _rates(counts[b, r].sum(axis=0), float(profit_loss[b, r].sum()))
+                for r, regime in enumerate(COIN_REGIMES)
+            }
+        })
+
+    return {'bots': bot_stats, 'regimes': regime_stats, 'coin_regimes': coin_regime_stats}
@@ -0,0 +1,261 @@
+"""
+Historical backtest runs of the scan bots.
+
+BacktestService fetches daily candles for the top coins from the providers
+(bypassing the shared candle store, which they would otherwise fill with
+multi-year series), replays them with backtest_engine in worker processes
+(BACKTEST_WORKERS, default: one per CPU; 0 runs in a thread of this process)
+and stores per-bot and per-regime stats in the backtest_runs table, in the
+same shape as bot_performance and /analytics/performance-by-regime.
+
+Coins are fetched and submitted in chunks of BACKTEST_CHUNK_COINS, so candle
+fetching overlaps with the replay of earlier chunks; workers return only the
+stats accumulators of their chunk.
+"""
+
+import asyncio
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from services.backtest_engine import accumulate, backtest_coin, empty_totals, market_regimes, merge_totals, summarize
+
+logger = logging.getLogger(__name__)
+
+# Per-worker bots, created lazily on the first chunk a worker process runs
+_worker_state: Dict = {}
+
+
+def backtest_bots(bot_names: Optional[List[str]] = None) -> List:
+    """Bots to replay: every scan bot except AIAnalystBot (LLM calls), or the named ones."""
+    bots = _worker_state.get('bots')
+    if bots is None:
+        from bots.bot_strategies import get_all_bots
+        bots = [bot for bot in get_all_bots() if bot.__class__.__name__ != 'AIAnalystBot']
+        _worker_state['bots'] = bots
+    if bot_names is None:
+        return bots
+    by_name = {bot.name: bot for bot in bots}
+    return [by_name[name] for name in bot_names if name in by_name]
+
+
+def _backtest_chunk(coins: List[Tuple[str, List[Dict]]], bot_names: List[str], btc_timestamps: np.ndarray,
+                    btc_codes: np.ndarray, horizon: int, seed: Optional[int]) -> Dict:
+    """Worker entry point: replay a chunk of coins and return its stats accumulators."""
+    bots = backtest_bots(bot_names)
+    totals = empty_totals(len(bots))
+    replayed, skipped, signals = [], [], 0
+    for symbol, candles in coins:
+        try:
+            coin = backtest_coin(symbol, candles, bots, btc_timestamps, btc_codes, horizon, seed)
+        except Exception as e:
+            logger.error(f"Backtest failed for {symbol}: {e}", exc_info=True)
+            coin = None
+        if coin is None:
+            skipped.append(symbol)
+            continue
+        accumulate(totals, coin)
+        replayed.append(symbol)
+        signals += int(np.count_nonzero(coin['direction']))
+    return {'totals': totals, 'replayed': replayed, 'skipped': skipped, 'signals': signals}
+
+
+class BacktestService:
+    """Runs bot backtests over historical candles and stores their stats."""
+
+    def __init__(self, db, crypto_client, max_workers: Optional[int] = None):
+        self.db = db
+        self.crypto_client = crypto_client
+        if max_workers is None:
+            max_workers = int(os.getenv('BACKTEST_WORKERS', str(os.cpu_count() or 1)))
+        self.max_workers = max(0, max_workers)
+        self.default_coins = int(os.getenv('BACKTEST_MAX_COINS', '500'))
+        self.default_days = int(os.getenv('BACKTEST_DAYS', '730'))
+        # Candles a simulated position stays open (1 = force-closed after a day, like the daily evaluation job)
+        self.default_horizon = int(os.getenv('BACKTEST_HORIZON_DAYS', '1'))
+        self.chunk_coins = int(os.getenv('BACKTEST_CHUNK_COINS', '10'))
+        self.fetch_concurrency = int(os.getenv('BACKTEST_FETCH_CONCURRENCY', '8'))
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._task: Optional[asyncio.Task] = None
+        self.progress: Dict = {}
+
+    def get_executor(self) -> Optional[ProcessPoolExecutor]:
+        """Worker pool shared by backtests and the weight optimizer (None: default thread executor)."""
+        if self.max_workers == 0:
+            return None
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, symbols: Optional[List[str]] = None, max_coins: Optional[int] = None,
+              days: Optional[int] = None, horizon_days: Optional[int] = None, seed: Optional[int] = 0) -> str:
+        """Start a backtest in the background.
+
+        Returns:
+            Run ID (see get_run)
+
+        Raises:
+            RuntimeError: if a backtest is already running
+        """
+        if self.running:
+            raise RuntimeError("A backtest is already running")
+        run_id = str(uuid.uuid4())
+        self._task = asyncio.create_task(self.run(symbols, max_coins, days, horizon_days, seed, run_id=run_id))
+        return run_id
+
+    async def select_symbols(self, symbols: Optional[List[str]], max_coins: int) -> List[str]:
+        """The given symbols, or the top max_coins of the coin listing."""
+        if symbols:
+            selected = [symbol.upper() for symbol in symbols]
+        else:
+            selected = [symbol for symbol, _, _ in await self.crypto_client.get_all_coins(max_coins=max_coins)]
+        # De-duplicate, keep order
+        return list(dict.fromkeys(selected))[:max_coins]
+
+    async def fetch_candles(self, symbols: List[str], days: int) -> List[Tuple[str, List[Dict]]]:
+        """(symbol, daily candles) pairs; empty candles for coins that could not be fetched."""
+        semaphore = asyncio.Semaphore(self.fetch_concurrency)
+
+        async def fetch(symbol: str):
+            async with semaphore:
+                try:
+                    return symbol, await self.crypto_client.get_historical_data(symbol, days=days, use_store=False)
+                except Exception as e:
+                    logger.warning(f"⚠️ Backtest: could not fetch candles for {symbol}: {e}")
+                    return symbol, []
+
+        return await asyncio.gather(*(fetch(symbol) for symbol in symbols))
+
+    async def btc_regimes(self, days: int) -> Tuple[np.ndarray, np.ndarray]:
+        """BTC bar timestamps and market regime per day (the regime bot predictions are labelled with)."""
+        btc = await self.crypto_client.get_historical_data('BTC', days=days, use_store=False)
+        btc = sorted(btc, key=lambda c: c['timestamp'])
+        btc_timestamps = np.array([candle['timestamp'] for candle in btc], dtype=np.int64)
+        btc_codes = market_regimes(np.array([candle['close'] for candle in btc], dtype=np.float64))
+        return btc_timestamps, btc_codes
+
+    async def run(self, symbols: Optional[List[str]] = None, max_coins: Optional[int] = None,
+                  days: Optional[int] = None, horizon_days: Optional[int] = None, seed: Optional[int] = 0,
+                  run_id: Optional[str] = None) -> Dict:
+        """Backtest the bots over the daily candles of many coins.
+
+        Args:
+            symbols: Coins to replay (default: the top max_coins of the coin listing)
+            max_coins: Number of coins (default BACKTEST_MAX_COINS)
+            days: Days of history per coin (default BACKTEST_DAYS)
+            horizon_days: Days before a position is force-closed (default BACKTEST_HORIZON_DAYS)
+            seed: Seed for bots that draw random inputs (None: unseeded)
+            run_id: Run ID to use (start() passes its own)
+
+        Returns:
+            The stored backtest_runs record
+        """
+        max_coins = max_coins or self.default_coins
+        days = days or self.default_days
+        horizon = horizon_days or self.default_horizon
+        run_id = run_id or str(uuid.uuid4())
+        started = time.perf_counter()
+        bot_names = [bot.name for bot in backtest_bots()]
+
+        record = {
+            'id': run_id,
+            'status': 'running',
+            'config': {'max_coins': max_coins, 'days': days, 'horizon_days': horizon, 'seed': seed,
+                       'symbols': symbols, 'bots': len(bot_names), 'workers': self.max_workers},
+            'started_at': datetime.now(timezone.utc)
+        }
+        self.progress = {'run_id': run_id, 'status': 'running', 'coins_total': 0, 'coins_done': 0}
+        await self._save(record, insert=True)
+
+        try:
+            selected = await self.select_symbols(symbols, max_coins)
+            self.progress['coins_total'] = len(selected)
+            logger.info(f"🧪 Backtest {run_id}: {len(selected)} coins x {days} days, {len(bot_names)} bots, "
+                        f"horizon {horizon}d, {self.max_workers} workers")
+
+            btc_timestamps, btc_codes = await self.btc_regimes(days)
+
+            loop = asyncio.get_running_loop()
+            executor = self.get_executor()
+            futures = []
+            for i in range(0, len(selected), self.chunk_coins):
+                coins = [(symbol, candles) for symbol, candles in
+                         await self.fetch_candles(selected[i:i + self.chunk_coins], days) if candles]
+                if coins:
+                    futures.append(loop.run_in_executor(
+                        executor, _backtest_chunk, coins, bot_names, btc_timestamps, btc_codes, horizon, seed
+                    ))
+
+            totals = empty_totals(len(bot_names))
+            replayed, skipped, signals = [], [], 0
+            for future in asyncio.as_completed(futures):
+                chunk = await future
+                merge_totals(totals, chunk['totals'])
+                replayed.extend(chunk['replayed'])
+                skipped.extend(chunk['skipped'])
+                signals += chunk['signals']
+                self.progress['coins_done'] = len(replayed) + len(skipped)
+
+            stats = summarize(totals, backtest_bots(bot_names))
+            duration = time.perf_counter() - started
+            record.update({
+                'status': 'completed',
+                'completed_at': datetime.now(timezone.utc),
+                'coins': len(replayed),
+                'coins_skipped': len(skipped) + len(selected) - self.progress['coins_done'],
+                'signals': signals,
+                'duration_seconds': round(duration, 1),
+                'bot_stats': stats['bots'],
+                'regime_stats': stats['regimes'],
+                'coin_regime_stats': stats['coin_regimes']
+            })
+            logger.info(f"✅ Backtest {run_id} complete: {len(replayed)} coins, {signals} signals in {duration:.1f}s")
+
+        except Exception as e:
+            logger.error(f"❌ Backtest {run_id} failed: {e}", exc_info=True)
+            record.update({'status': 'failed', 'completed_at': datetime.now(timezone.utc), 'error': str(e)})
+
+        self.progress['status'] = record['status']
+        await self._save(record)
+        return record
+
+    async def _save(self, record: Dict, insert: bool = False):
+        try:
+            if insert:
+                await self.db.backtest_runs.insert_one(dict(record))
+            else:
+                await self.db.backtest_runs.update_one({'id': record['id']}, {'$set': record})
+        except Exception as e:
+            logger.error(f"Error saving backtest run {record['id']}: {e}")
+
+    async def get_run(self, run_id: str) -> Optional[Dict]:
+        return await self.db.backtest_runs.find_one({'id': run_id})
+
+    async def list_runs(self, limit: int = 20) -> List[Dict]:
+        """Latest runs without their stats."""
+        runs = await self.db.backtest_runs.find({}).sort('started_at', -1).limit(limit).to_list(limit)
+        return [
+            {key: value for key, value in run.items() if key not in ('bot_stats', 'regime_stats', 'coin_regime_stats')}
+            for run in runs
+        ]
+
+    def get_status(self) -> Dict:
+        return {'running': self.running, 'workers': self.max_workers, **self.progress}
+
+    def shutdown(self):
+        """Stop the worker processes (called on application shutdown)."""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
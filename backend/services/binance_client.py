@@ -3,6 +3,8 @@ import asyncio
 from typing import List, Dict, Optional
 from datetime import datetime, timedelta, timezone
 import logging
+from services.http_transport import get_transport
+from services.json_codec import candles_from_arrays, read_json
 
 logger = logging.getLogger(__name__)
 
@@ -15,7 +17,7 @@ class BinanceClient:
     
     async def _get_session(self):
         if self.session is None or self.session.closed:
-            self.session = aiohttp.ClientSession()
+            self.session = get_transport().session('binance')
         return self.session
     
     async def close(self):
@@ -32,9 +34,9 @@ class BinanceClient:
             
             url = f'{self.base_url}/exchangeInfo'
             
-            async with session.get(url, timeout=30) as response:
+            async with session.get(url) as response:
                 if response.status == 200:
-                    data = await response.json()
+                    data = await read_json(response)
                     symbols = []
                     
                     for symbol_info in data.get('symbols', []):
@@ -93,9 +95,9 @@ class BinanceClient:
             # For 365 days of 4h candles: 365*24/4 = 2190 candles
             # Need 3 requests
             for _ in range(3):
-                async with session.get(url, params=params, timeout=30) as response:
+                async with session.get(url, params=params) as response:
                     if response.status == 200:
-                        klines = await response.json()
+                        klines = await read_json(response)
                         
                         if not klines:
                             break
@@ -132,9 +134,9 @@ class BinanceClient:
             
             url = f'{self.base_url}/ticker/price'
             
-            async with session.get(url, timeout=30) as response:
+            async with session.get(url) as response:
                 if response.status == 200:
-                    tickers = await response.json()
+                    tickers = await read_json(response)
                     prices = {}
                     
                     for ticker in tickers:
@@ -175,17 +177,4 @@ class BinanceClient:
           ignore          // 11: Ignore
         ]
         """
-        candles = []
-        
-        for kline in klines:
-            if len(kline) >= 6:
-                candles.append({
-                    'timestamp': int(kline[0] / 1000),  # Convert ms to seconds
-                    'open': float(kline[1]),
-                    'high': float(kline[2]),
-                    'low': float(kline[3]),
-                    'close': float(kline[4]),
-                    'volume': float(kline[5])
-                })
-        
-        return candles
+        return candles_from_arrays(klines)
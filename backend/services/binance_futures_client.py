@@ -3,6 +3,8 @@ import asyncio
 from typing import List, Dict, Optional
 from datetime import datetime, timezone
 import logging
+from services.http_transport import get_transport
+from services.json_codec import read_json
 
 logger = logging.getLogger(__name__)
 
@@ -20,7 +22,7 @@ class BinanceFuturesClient:
     
     async def _get_session(self):
         if self.session is None or self.session.closed:
-            self.session = aiohttp.ClientSession()
+            self.session = get_transport().session('binance_futures')
         return self.session
     
     async def close(self):
@@ -45,9 +47,9 @@ class BinanceFuturesClient:
             url = f'{self.base_url}/fapi/v1/openInterest'
             params = {'symbol': binance_symbol}
             
-            async with session.get(url, params=params, timeout=10) as response:
+            async with session.get(url, params=params) as response:
                 if response.status == 200:
-                    data = await response.json()
+                    data = await read_json(response)
                     return {
                         'symbol': symbol,
                         'open_interest': float(data.get('openInterest', 0)),
@@ -80,9 +82,9 @@ class BinanceFuturesClient:
             url = f'{self.base_url}/fapi/v1/premiumIndex'
             params = {'symbol': binance_symbol}
             
-            async with session.get(url, params=params, timeout=10) as response:
+            async with session.get(url, params=params) as response:
                 if response.status == 200:
-                    data = await response.json()
+                    data = await read_json(response)
                     return {
                         'symbol': symbol,
                         'funding_rate': float(data.get('lastFundingRate', 0)) * 100,  # Convert to percentage
@@ -121,9 +123,9 @@ class BinanceFuturesClient:
                 'limit': min(limit, 1000)
             }
             
-            async with session.get(url, params=params, timeout=10) as response:
+            async with session.get(url, params=params) as response:
                 if response.status == 200:
-                    data = await response.json()
+                    data = await read_json(response)
                     history = []
                     for item in data:
                         history.append({
@@ -163,9 +165,9 @@ class BinanceFuturesClient:
                 'limit': 1
             }
             
-            async with session.get(url, params=params, timeout=10) as response:
+            async with session.get(url, params=params) as response:
                 if response.status == 200:
-                    data = await response.json()
+                    data = await read_json(response)
                     if data and len(data) > 0:
                         latest = data[0]
                         long_account = float(latest.get('longAccount', 0))
@@ -234,6 +236,41 @@ class BinanceFuturesClient:
             logger.debug(f"Error calculating liquidation metrics for {symbol}: {e}")
             return None
     
+    async def get_market_snapshot(self) -> Dict[str, Dict]:
+        """Get funding rates of all USDT perpetuals (one premiumIndex request).
+        
+        Binance has no exchange-wide open interest endpoint.
+        
+        Returns:
+            Dict mapping base symbol (e.g. 'BTC') -> funding_rate, mark_price, next_funding_time
+        """
+        try:
+            session = await self._get_session()
+            
+            url = f'{self.base_url}/fapi/v1/premiumIndex'
+            
+            async with session.get(url) as response:
+                if response.status == 200:
+                    data = await read_json(response)
+                    snapshot = {}
+                    for item in data:
+                        binance_symbol = item.get('symbol', '')
+                        if not binance_symbol.endswith('USDT'):
+                            continue
+                        snapshot[binance_symbol[:-len('USDT')]] = {
+                            'funding_rate': float(item.get('lastFundingRate') or 0) * 100,  # Convert to percentage
+                            'mark_price': float(item.get('markPrice') or 0),
+                            'next_funding_time': int(item.get('nextFundingTime') or 0) / 1000
+                        }
+                    return snapshot
+                else:
+                    logger.debug(f"Binance market snapshot error {response.status}")
+                    return {}
+        
+        except Exception as e:
+            logger.debug(f"Error fetching Binance market snapshot: {e}")
+            return {}
+    
     async def get_all_derivatives_metrics(self, symbol: str) -> Dict:
         """Get all available derivatives metrics for a symbol.
         
@@ -3,27 +3,69 @@ Bot Performance Tracking Service
 
 Handles:
 - Storing bot predictions during scans
-- Evaluating prediction outcomes
+- Evaluating prediction outcomes (first TP/SL touch on the 4h price path)
 - Updating bot performance metrics
 - Adjusting bot weights based on historical accuracy
 """
 
 import asyncio
+import math
+import os
 from datetime import datetime, timezone, timedelta
 from typing import List, Dict, Optional
 import logging
 
+import numpy as np
+
 from models.models import BotPrediction, BotPerformance
+from services.outcome_engine import OPEN, TAKE_PROFIT, adverse_excursion, candle_arrays, first_touch, start_indices
 
 logger = logging.getLogger(__name__)
 
+# Default stop distance when a prediction's own stop is wider or missing (same as _determine_outcome)
+DEFAULT_STOP_LOSS_PERCENT = 5.0
+
+# 4h candles the scans fetch per coin; path requests ask for at least as many so both share one store entry
+SCAN_4H_CANDLES = 168
+CANDLE_4H_SECONDS = 14400
+
+
+def performance_weight(accuracy: float, avg_profit_loss: float, total_predictions: int) -> float:
+    """Aggregation weight of a bot from its accuracy and average P/L (see _recalculate_weights).
+    
+    Shared with the backtester so replayed stats map to the same weights.
+    """
+    # Need at least 10 predictions to calculate meaningful weight
+    if total_predictions < 10:
+        return 1.0
+    
+    # Base weight from accuracy
+    if accuracy >= 60:
+        weight = 1.0 + (accuracy - 60) / 100
+    elif accuracy < 40:
+        weight = 0.5 + (accuracy / 80)
+    else:
+        weight = 1.0
+    
+    # Adjust for profit/loss performance
+    if avg_profit_loss > 5:
+        weight += 0.1
+    elif avg_profit_loss < -5:
+        weight -= 0.1
+    
+    # Clamp weight between 0.5 and 1.5
+    return max(0.5, min(1.5, weight))
 
 class BotPerformanceService:
     """Service for tracking and evaluating bot performance."""
 
-    def __init__(self, db, crypto_client):
+    def __init__(self, db, crypto_client, market_snapshot=None):
         self.db = db
         self.crypto_client = crypto_client
+        self.market_snapshot = market_snapshot
+        self.path_concurrency = int(os.getenv('BOT_OUTCOME_CONCURRENCY', '8'))
+        # Oldest prediction resolvable on the price path (500 x 4h = ~83 days)
+        self.path_max_candles = int(os.getenv('BOT_OUTCOME_MAX_4H_CANDLES', '500'))
         logger.info("🤖 Bot Performance Service initialized")
     
     async def classify_market_regime(self, btc_price_change_7d: float = None, volatility: float = None) -> str:
@@ -240,15 +282,21 @@ class BotPerformanceService:
         - Added partial_win tracking
         - Improved logging with detailed breakdown
         
+        Predictions are first resolved on the 4h candles between prediction and
+        evaluation time: whichever of target or stop the price touched first decides
+        win / loss, even if the price has reversed since. Predictions whose path
+        touched neither fall back to _determine_outcome at the current price.
+        
         Args:
             hours_old: Minimum age of predictions to evaluate (default 24h)
             force_close: If True, forces evaluation (no neutral outcomes)
-            
+        
         Returns:
             Dictionary with evaluation statistics
         """
         try:
-            cutoff_time = datetime.now(timezone.utc) - timedelta(hours=hours_old)
+            now = datetime.now(timezone.utc)
+            cutoff_time = now - timedelta(hours=hours_old)
             
             # Find pending predictions older than cutoff
             pending = await self.db.bot_predictions.find({
@@ -262,6 +310,9 @@ class BotPerformanceService:
             
             logger.info(f"📊 Evaluating {len(pending)} predictions older than {hours_old}h (force_close={force_close})...")
             
+            # Price paths (first touch, time to outcome, adverse excursion) per prediction
+            paths = await self._resolve_price_paths(pending, now)
+            
             # Get current prices for all unique coins
             unique_symbols = list(set(p['coin_symbol'] for p in pending))
             current_prices = await self._get_current_prices(unique_symbols)
@@ -270,6 +321,7 @@ class BotPerformanceService:
             partial_wins = 0
             losses = 0
             neutral = 0
+            touched = 0
             
             # Determine if we should force close based on age
             # Force close at 24h, 48h, and 7d (168h)
@@ -278,27 +330,36 @@ class BotPerformanceService:
             # Evaluate each prediction
             for prediction in pending:
                 symbol = prediction['coin_symbol']
-                current_price = current_prices.get(symbol)
+                path = paths.get(prediction['id'])
                 
-                if current_price is None:
-                    logger.warning(f"Could not get price for {symbol}, skipping")
-                    continue
+                if path is not None and path['status'] is not None:
+                    # Target or stop touched on the way: scored at that level
+                    outcome = path
+                    outcome_price = path['outcome_price']
+                    touched += 1
+                else:
+                    current_price = current_prices.get(symbol)
+                    
+                    if current_price is None:
+                        logger.warning(f"Could not get price for {symbol}, skipping")
+                        continue
+                    
+                    # Use improved outcome determination with force_close
+                    outcome = self._determine_outcome(prediction, current_price, force_close=should_force_close)
+                    outcome_price = current_price
                 
-                # Use improved outcome determination with force_close
-                outcome = self._determine_outcome(prediction, current_price, force_close=should_force_close)
+                fields = {
+                    'outcome_checked_at': now,
+                    'outcome_price': outcome_price,
+                    'outcome_status': outcome['status'],
+                    'profit_loss_percent': outcome['profit_loss_percent']
+                }
+                if path is not None:
+                    fields['time_to_outcome_hours'] = path['time_to_outcome_hours']
+                    fields['max_adverse_excursion_percent'] = path['max_adverse_excursion_percent']
                 
                 # Update prediction with outcome
-                await self.db.bot_predictions.update_one(
-                    {'id': prediction['id']},
-                    {
-                        '$set': {
-                            'outcome_checked_at': datetime.now(timezone.utc),
-                            'outcome_price': current_price,
-                            'outcome_status': outcome['status'],
-                            'profit_loss_percent': outcome['profit_loss_percent']
-                        }
-                    }
-                )
+                await self.db.bot_predictions.update_one({'id': prediction['id']}, {'$set': fields})
                 
                 # Count results (including partial wins)
                 if outcome['status'] == 'win':
@@ -316,22 +377,144 @@ class BotPerformanceService:
             # Recalculate performance weights
             await self._recalculate_weights()
             
-            logger.info(f"✅ Evaluation complete: {wins} wins, {partial_wins} partial wins, {losses} losses, {neutral} neutral")
+            logger.info(f"✅ Evaluation complete: {wins} wins, {partial_wins} partial wins, {losses} losses, {neutral} neutral "
+                        f"({touched} resolved by first touch on the price path)")
             
             return {
                 'evaluated': len(pending),
                 'wins': wins,
                 'partial_wins': partial_wins,
                 'losses': losses,
-                'neutral': neutral
+                'neutral': neutral,
+                'resolved_on_path': touched
             }
-            
+        
         except Exception as e:
             logger.error(f"Error evaluating predictions: {e}")
             return {'evaluated': 0, 'wins': 0, 'partial_wins': 0, 'losses': 0, 'neutral': 0, 'error': str(e)}
     
+    @staticmethod
+    def _prediction_time(prediction: Dict) -> datetime:
+        timestamp = prediction.get('timestamp')
+        if isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        return timestamp
+    
+    @staticmethod
+    def _stop_level(prediction: Dict) -> float:
+        """Effective stop: the prediction's stop or the default 5% stop, whichever is hit first."""
+        entry_price = prediction['entry_price']
+        stop_loss = prediction.get('stop_loss')
+        if prediction['position_direction'] == 'long':
+            default_stop = entry_price * (1 - DEFAULT_STOP_LOSS_PERCENT / 100)
+            return max(stop_loss, default_stop) if stop_loss else default_stop
+        default_stop = entry_price * (1 + DEFAULT_STOP_LOSS_PERCENT / 100)
+        return min(stop_loss, default_stop) if stop_loss else default_stop
+    
+    async def _resolve_price_paths(self, predictions: List[Dict], now: datetime) -> Dict[str, Dict]:
+        """Resolve predictions on the 4h candles between prediction time and now.
+        
+        Predictions are grouped by coin; each coin's candles are read once through the
+        candle store shared with the scans (BOT_OUTCOME_CONCURRENCY coins at a time) and
+        all of its predictions are resolved with one vectorized first-touch search.
+        
+        Args:
+            predictions: Pending predictions (long / short with entry and target)
+            now: Evaluation time
+        
+        Returns:
+            Prediction id -> dict with status ('win' / 'loss' when target / stop was touched
+            first, None if neither), profit_loss_percent and outcome_price at that level,
+            time_to_outcome_hours (end of the touching candle, None if open) and
+            max_adverse_excursion_percent. Predictions the candles don't cover are omitted.
+        """
+        by_symbol: Dict[str, List[Dict]] = {}
+        for prediction in predictions:
+            if prediction.get('position_direction') not in ('long', 'short'):
+                continue
+            if not prediction.get('entry_price') or not prediction.get('target_price'):
+                continue
+            try:
+                prediction['_created_ts'] = self._prediction_time(prediction).timestamp()
+            except Exception as e:
+                logger.warning(f"Prediction {prediction.get('id')} has invalid timestamp: {e}")
+                continue
+            by_symbol.setdefault(prediction['coin_symbol'], []).append(prediction)
+        
+        if not by_symbol:
+            return {}
+        
+        now_ts = now.timestamp()
+        semaphore = asyncio.Semaphore(self.path_concurrency)
+        
+        async def fetch(symbol: str, oldest_ts: float):
+            needed = math.ceil((now_ts - oldest_ts) / CANDLE_4H_SECONDS) + 1
+            limit = min(max(needed, SCAN_4H_CANDLES), self.path_max_candles)
+            async with semaphore:
+                try:
+                    return symbol, await self.crypto_client.get_4h_candles(symbol, limit=limit)
+                except Exception as e:
+                    logger.error(f"Error fetching 4h candles for {symbol}: {e}")
+                    return symbol, None
+        
+        candles_by_symbol = dict(await asyncio.gather(*(
+            fetch(symbol, min(p['_created_ts'] for p in group)) for symbol, group in by_symbol.items()
+        )))
+        
+        resolved = {}
+        for symbol, group in by_symbol.items():
+            candles = candles_by_symbol.get(symbol)
+            if not candles:
+                continue
+            arrays = candle_arrays(candles)
+            # Only predictions made after the first candle opened have their whole path
+            group = [p for p in group if p['_created_ts'] >= arrays['timestamp'][0]]
+            if not group:
+                continue
+            
+            # From the first candle opening after the prediction (the one it was made in may hold earlier prices)
+            starts = start_indices(arrays['timestamp'], [p['_created_ts'] for p in group])
+            is_long = np.array([p['position_direction'] == 'long' for p in group])
+            entries = np.array([p['entry_price'] for p in group], dtype=float)
+            targets = np.array([p['target_price'] for p in group], dtype=float)
+            stops = np.array([self._stop_level(p) for p in group], dtype=float)
+            
+            touch = first_touch(arrays['high'], arrays['low'], starts, is_long, targets, stops)
+            last = len(candles) - 1
+            window_ends = np.where(touch['outcome'] == OPEN, last, touch['index'])
+            excursions = adverse_excursion(arrays['high'], arrays['low'], starts, window_ends, is_long, entries)
+            
+            for i, prediction in enumerate(group):
+                outcome = int(touch['outcome'][i])
+                result = {
+                    'status': None,
+                    'profit_loss_percent': None,
+                    'outcome_price': None,
+                    'time_to_outcome_hours': None,
+                    'max_adverse_excursion_percent': round(float(excursions[i]), 4)
+                }
+                if outcome != OPEN:
+                    level = float(targets[i] if outcome == TAKE_PROFIT else stops[i])
+                    price_change = (level - entries[i]) / entries[i] * 100
+                    touched_at = min(arrays['timestamp'][touch['index'][i]] + CANDLE_4H_SECONDS, now_ts)
+                    result.update({
+                        'status': 'win' if outcome == TAKE_PROFIT else 'loss',
+                        'profit_loss_percent': float(price_change if is_long[i] else -price_change),
+                        'outcome_price': level,
+                        'time_to_outcome_hours': round(max(touched_at - prediction['_created_ts'], 0) / 3600, 2)
+                    })
+                resolved[prediction['id']] = result
+        
+        return resolved
+    
     async def _get_current_prices(self, symbols: List[str]) -> Dict[str, float]:
         """Fetch current prices for a list of symbols."""
+        if self.market_snapshot:
+            # Snapshot index + multi-symbol quotes: also covers coins outside the top 200
+            return await self.market_snapshot.get_prices(symbols)
+        
         prices = {}
         
         # Use CryptoCompare to get current prices
@@ -498,26 +681,7 @@ class BotPerformanceService:
             avg_pl = bot.get('avg_profit_loss', 0.0)
             total_preds = bot.get('total_predictions', 0)
             
-            # Need at least 10 predictions to calculate meaningful weight
-            if total_preds < 10:
-                weight = 1.0
-            else:
-                # Base weight from accuracy
-                if accuracy >= 60:
-                    weight = 1.0 + (accuracy - 60) / 100
-                elif accuracy < 40:
-                    weight = 0.5 + (accuracy / 80)
-                else:
-                    weight = 1.0
-                
-                # Adjust for profit/loss performance
-                if avg_pl > 5:
-                    weight += 0.1
-                elif avg_pl < -5:
-                    weight -= 0.1
-                
-                # Clamp weight between 0.5 and 1.5
-                weight = max(0.5, min(1.5, weight))
+            weight = performance_weight(accuracy, avg_pl, total_preds)
             
             # Update weight
             await self.db.bot_performance.update_one(
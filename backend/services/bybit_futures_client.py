@@ -3,6 +3,8 @@ import asyncio
 from typing import List, Dict, Optional
 from datetime import datetime, timezone
 import logging
+from services.http_transport import get_transport
+from services.json_codec import read_json
 
 logger = logging.getLogger(__name__)
 
@@ -19,7 +21,7 @@ class BybitFuturesClient:
     
     async def _get_session(self):
         if self.session is None or self.session.closed:
-            self.session = aiohttp.ClientSession()
+            self.session = get_transport().session('bybit_futures')
         return self.session
     
     async def close(self):
@@ -48,9 +50,9 @@ class BybitFuturesClient:
                 'intervalTime': '5min'
             }
             
-            async with session.get(url, params=params, timeout=10) as response:
+            async with session.get(url, params=params) as response:
                 if response.status == 200:
-                    data = await response.json()
+                    data = await read_json(response)
                     if data.get('retCode') == 0:
                         result = data.get('result', {})
                         if result and 'list' in result and len(result['list']) > 0:
@@ -88,9 +90,9 @@ class BybitFuturesClient:
                 'symbol': bybit_symbol
             }
             
-            async with session.get(url, params=params, timeout=10) as response:
+            async with session.get(url, params=params) as response:
                 if response.status == 200:
-                    data = await response.json()
+                    data = await read_json(response)
                     if data.get('retCode') == 0:
                         result = data.get('result', {})
                         if result and 'list' in result and len(result['list']) > 0:
@@ -132,9 +134,9 @@ class BybitFuturesClient:
                 'limit': min(limit, 200)
             }
             
-            async with session.get(url, params=params, timeout=10) as response:
+            async with session.get(url, params=params) as response:
                 if response.status == 200:
-                    data = await response.json()
+                    data = await read_json(response)
                     if data.get('retCode') == 0:
                         result = data.get('result', {})
                         history = []
@@ -174,9 +176,9 @@ class BybitFuturesClient:
                 'limit': 1
             }
             
-            async with session.get(url, params=params, timeout=10) as response:
+            async with session.get(url, params=params) as response:
                 if response.status == 200:
-                    data = await response.json()
+                    data = await read_json(response)
                     if data.get('retCode') == 0:
                         result = data.get('result', {})
                         if result and 'list' in result and len(result['list']) > 0:
@@ -198,6 +200,41 @@ class BybitFuturesClient:
             logger.debug(f"Error fetching Bybit long/short ratio for {symbol}: {e}")
             return None
     
+    async def get_market_snapshot(self) -> Dict[str, Dict]:
+        """Get open interest and funding rates of all USDT perpetuals (one tickers request).
+        
+        Returns:
+            Dict mapping base symbol (e.g. 'BTC') -> open_interest, funding_rate, mark_price, next_funding_time
+        """
+        try:
+            session = await self._get_session()
+            
+            url = f'{self.base_url}/v5/market/tickers'
+            params = {'category': 'linear'}
+            
+            async with session.get(url, params=params) as response:
+                if response.status == 200:
+                    data = await read_json(response)
+                    if data.get('retCode') == 0:
+                        snapshot = {}
+                        for ticker in data.get('result', {}).get('list', []):
+                            bybit_symbol = ticker.get('symbol', '')
+                            if not bybit_symbol.endswith('USDT'):
+                                continue
+                            snapshot[bybit_symbol[:-len('USDT')]] = {
+                                'open_interest': float(ticker.get('openInterest') or 0),
+                                'funding_rate': float(ticker.get('fundingRate') or 0) * 100,  # Convert to percentage
+                                'mark_price': float(ticker.get('markPrice') or 0),
+                                'next_funding_time': int(ticker.get('nextFundingTime') or 0) / 1000
+                            }
+                        return snapshot
+                logger.debug(f"Bybit market snapshot error {response.status}")
+                return {}
+        
+        except Exception as e:
+            logger.debug(f"Error fetching Bybit market snapshot: {e}")
+            return {}
+    
     async def get_all_derivatives_metrics(self, symbol: str) -> Dict:
         """Get all available derivatives metrics for a symbol.
         
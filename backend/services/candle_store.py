@@ -0,0 +1,117 @@
+"""
+Shared in-memory candle store.
+
+Scans, bot prediction evaluation, outcome tracking and alerts all fetched the
+same daily / 4h candles straight from the providers. MultiProviderClient now
+reads candles through one CandleStore:
+
+- entries keyed by (timeframe, symbol), fresh for CANDLE_STORE_TTL_SECONDS
+  (default 300; the last candle is still forming)
+- a request for up to as many candles as the cached entry is served from its
+  tail, so a 7-day read after a 365-day scan costs nothing
+- concurrent misses for the same key share one fetch
+- at most CANDLE_STORE_MAX_ENTRIES entries per timeframe, least recently used
+  evicted first
+
+Callers get copies of the candle dicts (scans overwrite the last candle with
+the current price).
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Candle length per timeframe, in seconds
+TIMEFRAME_SECONDS = {'1d': 86400, '4h': 14400}
+
+
+class CandleStore:
+    """(timeframe, symbol) -> candles cache with single-flight fetches."""
+
+    def __init__(self):
+        self.ttl = float(os.getenv('CANDLE_STORE_TTL_SECONDS', '300'))
+        self.max_entries = int(os.getenv('CANDLE_STORE_MAX_ENTRIES', '2000'))
+        # timeframe -> symbol -> (fetched_at, count, candles)
+        self.entries: Dict[str, OrderedDict] = {timeframe: OrderedDict() for timeframe in TIMEFRAME_SECONDS}
+        self._inflight: Dict[Tuple[str, str, int], asyncio.Future] = {}
+        self.stats = {'hits': 0, 'misses': 0, 'shared': 0}
+
+    def _cached(self, timeframe: str, symbol: str, count: int) -> Optional[List[Dict]]:
+        entries = self.entries[timeframe]
+        entry = entries.get(symbol)
+        if entry is None:
+            return None
+        fetched_at, cached_count, candles = entry
+        if time.monotonic() - fetched_at > self.ttl or cached_count < count:
+            return None
+        entries.move_to_end(symbol)
+        return candles if cached_count == count else candles[-count:]
+
+    def _store(self, timeframe: str, symbol: str, count: int, candles: List[Dict]):
+        entries = self.entries[timeframe]
+        current = entries.get(symbol)
+        if current is not None and current[1] > count and time.monotonic() - current[0] <= self.ttl:
+            # Keep the longer fresh series
+            return
+        entries[symbol] = (time.monotonic(), count, candles)
+        entries.move_to_end(symbol)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+    async def get(
+        self,
+        timeframe: str,
+        symbol: str,
+        count: int,
+        fetch: Callable[[], Awaitable[List[Dict]]]
+    ) -> List[Dict]:
+        """Candles of a symbol, from the store when fresh, otherwise from fetch().
+
+        Args:
+            timeframe: '1d' or '4h'
+            symbol: Coin symbol (case-insensitive)
+            count: Requested number of candles (days / limit of the provider call)
+            fetch: Coroutine function returning the candles from the providers
+
+        Returns:
+            Copies of the candle dicts (empty results are not stored)
+        """
+        symbol = symbol.upper()
+        if self.ttl <= 0:
+            return await fetch()
+
+        candles = self._cached(timeframe, symbol, count)
+        if candles is not None:
+            self.stats['hits'] += 1
+            return [dict(candle) for candle in candles]
+
+        key = (timeframe, symbol, count)
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats['shared'] += 1
+            candles = await asyncio.shield(task)
+            return [dict(candle) for candle in candles]
+
+        self.stats['misses'] += 1
+        task = asyncio.ensure_future(fetch())
+        self._inflight[key] = task
+        try:
+            candles = await asyncio.shield(task)
+        finally:
+            self._inflight.pop(key, None)
+        if candles:
+            self._store(timeframe, symbol, count, candles)
+        return [dict(candle) for candle in candles]
+
+    def get_stats(self) -> Dict:
+        return {
+            'ttl_seconds': self.ttl,
+            'max_entries': self.max_entries,
+            'entries': {timeframe: len(entries) for timeframe, entries in self.entries.items()},
+            **self.stats
+        }
@@ -4,6 +4,8 @@ import asyncio
 from typing import List, Dict, Optional
 from datetime import datetime, timedelta, timezone
 import logging
+from services.http_transport import get_transport
+from services.json_codec import read_json
 
 logger = logging.getLogger(__name__)
 
@@ -16,7 +18,7 @@ class CoinalyzeClient:
 
     async def _get_session(self):
         if self.session is None or self.session.closed:
-            self.session = aiohttp.ClientSession()
+            self.session = get_transport().session('coinalyze')
         return self.session
 
     async def close(self):
@@ -32,9 +34,9 @@ class CoinalyzeClient:
             # Coinalyze endpoint for exchanges/symbols
             url = f'{self.base_url}/exchanges'
             
-            async with session.get(url, headers=headers, timeout=30) as response:
+            async with session.get(url, headers=headers) as response:
                 if response.status == 200:
-                    data = await response.json()
+                    data = await read_json(response)
                     # Extract unique base symbols from all exchanges
                     symbols = set()
                     for exchange_data in data:
@@ -109,7 +111,7 @@ class CoinalyzeClient:
                 try:
                     async with session.get(url, headers=headers, params=params, timeout=60) as response:
                         if response.status == 200:
-                            data = await response.json()
+                            data = await read_json(response)
                             candles = self._parse_ohlcv(data, symbol_format)
                             if candles and len(candles) > 0:
                                 logger.info(f"Fetched {len(candles)} real candles for {symbol} using {symbol_format}")
@@ -216,9 +218,9 @@ class CoinalyzeClient:
             # Try to get current price from exchanges endpoint
             url = f'{self.base_url}/exchanges'
             
-            async with session.get(url, headers=headers, timeout=30) as response:
+            async with session.get(url, headers=headers) as response:
                 if response.status == 200:
-                    data = await response.json()
+                    data = await read_json(response)
                     # Look for the symbol in exchange data
                     for exchange_data in data:
                         if isinstance(exchange_data, dict) and 'symbols' in exchange_data:
@@ -298,7 +300,7 @@ class CoinalyzeClient:
             
             async with session.get(url, headers=headers, params=params, timeout=10) as response:
                 if response.status == 200:
-                    data = await response.json()
+                    data = await read_json(response)
                     if data and len(data) > 0:
                         # Get latest data point
                         latest = data[-1] if isinstance(data, list) else data
@@ -338,7 +340,7 @@ class CoinalyzeClient:
             
             async with session.get(url, headers=headers, params=params, timeout=10) as response:
                 if response.status == 200:
-                    data = await response.json()
+                    data = await read_json(response)
                     if data and len(data) > 0:
                         # Get most recent funding rate
                         latest = data[-1] if isinstance(data, list) else data
@@ -380,7 +382,7 @@ class CoinalyzeClient:
             
             async with session.get(url, headers=headers, params=params, timeout=10) as response:
                 if response.status == 200:
-                    data = await response.json()
+                    data = await read_json(response)
                     if data and len(data) > 0:
                         # Get latest ratio
                         latest = data[-1] if isinstance(data, list) else data
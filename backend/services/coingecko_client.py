@@ -4,30 +4,59 @@ from typing import List, Dict, Optional
 from datetime import datetime, timedelta, timezone
 import logging
 import os
+from services.http_transport import get_transport
+from services.json_codec import read_json
+from services.provider_id_map import ProviderIdMap
 
 logger = logging.getLogger(__name__)
 
 class CoinGeckoClient:
     """CoinGecko API client for crypto market data."""
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, id_map: Optional[ProviderIdMap] = None):
         self.base_url = 'https://api.coingecko.com/api/v3'
         self.api_key = api_key or os.getenv('COINGECKO_API_KEY')
         self.session: Optional[aiohttp.ClientSession] = None
         self.provider_name = "CoinGecko"
+        
+        # Persistent coin ID mapping (symbol -> CoinGecko ID)
+        self.id_map = id_map or ProviderIdMap()
     
     async def _get_session(self):
         if self.session is None or self.session.closed:
             headers = {}
             if self.api_key:
                 headers['x-cg-demo-api-key'] = self.api_key
-            self.session = aiohttp.ClientSession(headers=headers)
+            self.session = get_transport().session('coingecko', headers=headers)
         return self.session
     
     async def close(self):
         if self.session and not self.session.closed:
             await self.session.close()
     
+    async def _fetch_markets_page(self, session, page: int, per_page: int) -> List[Dict]:
+        """One page of /coins/markets ordered by market cap."""
+        url = f'{self.base_url}/coins/markets'
+        params = {
+            'vs_currency': 'usd',
+            'order': 'market_cap_desc',
+            'per_page': per_page,
+            'page': page,
+            'sparkline': 'false'
+        }
+        
+        async with session.get(url, params=params) as response:
+            if response.status == 200:
+                return await read_json(response)
+            elif response.status == 429:
+                error_text = await response.text()
+                logger.warning(f"CoinGecko rate limit hit: {error_text}")
+                raise Exception("Rate limit exceeded")
+            else:
+                error_text = await response.text()
+                logger.error(f"CoinGecko API error {response.status}: {error_text}")
+                raise Exception(f"API error: {response.status}")
+    
     async def get_all_coins(self, max_coins: int = 100) -> List[tuple]:
         """Fetch top coins by market cap from CoinGecko.
         
@@ -40,53 +69,28 @@ class CoinGeckoClient:
             session = await self._get_session()
             
             # CoinGecko uses pagination with per_page parameter
-            # We'll fetch in batches of 250 (CoinGecko's max per page)
-            all_coins = []
+            # We'll fetch in batches of 250 (CoinGecko's max per page), all pages concurrently
             per_page = min(250, max_coins)
             pages_needed = (max_coins + per_page - 1) // per_page
+            pages = await asyncio.gather(*(
+                self._fetch_markets_page(session, page, per_page) for page in range(1, pages_needed + 1)
+            ))
             
-            for page in range(1, pages_needed + 1):
-                url = f'{self.base_url}/coins/markets'
-                params = {
-                    'vs_currency': 'usd',
-                    'order': 'market_cap_desc',
-                    'per_page': per_page,
-                    'page': page,
-                    'sparkline': 'false'
-                }
-                
-                async with session.get(url, params=params, timeout=30) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        
-                        for coin in data:
-                            symbol = coin.get('symbol', '').upper()
-                            name = coin.get('name', '')
-                            price = coin.get('current_price', 0)
-                            
-                            if symbol and price and price > 0:
-                                all_coins.append((symbol, name, price))
-                                
-                                if len(all_coins) >= max_coins:
-                                    break
-                        
-                        if len(all_coins) >= max_coins:
-                            break
-                        
-                        # Small delay between pages to respect rate limits
-                        if page < pages_needed:
-                            await asyncio.sleep(0.5)
+            all_coins = []
+            seen_symbols = set()
+            # gather keeps page order, so coins stay in market cap order
+            for data in pages:
+                for coin in data:
+                    symbol = coin.get('symbol', '').upper()
+                    name = coin.get('name', '')
+                    price = coin.get('current_price', 0)
                     
-                    elif response.status == 429:
-                        error_text = await response.text()
-                        logger.warning(f"CoinGecko rate limit hit: {error_text}")
-                        raise Exception("Rate limit exceeded")
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"CoinGecko API error {response.status}: {error_text}")
-                        raise Exception(f"API error: {response.status}")
+                    # Keep the highest-ranked coin of a shared symbol
+                    if symbol and price and price > 0 and symbol not in seen_symbols:
+                        seen_symbols.add(symbol)
+                        all_coins.append((symbol, name, price))
             
-            logger.info(f"✅ CoinGecko: Fetched {len(all_coins)} coins")
+            logger.info(f"✅ CoinGecko: Fetched {len(all_coins[:max_coins])} coins")
             return all_coins[:max_coins]
                     
         except Exception as e:
@@ -118,9 +122,9 @@ class CoinGeckoClient:
                 'days': days
             }
             
-            async with session.get(url, params=params, timeout=30) as response:
+            async with session.get(url, params=params) as response:
                 if response.status == 200:
-                    data = await response.json()
+                    data = await read_json(response)
                     
                     # CoinGecko OHLC format: [[timestamp, open, high, low, close], ...]
                     # Convert to dictionary format compatible with CryptoCompare
@@ -188,9 +192,9 @@ class CoinGeckoClient:
                 'interval': 'hourly'
             }
             
-            async with session.get(url, params=params, timeout=30) as response:
+            async with session.get(url, params=params) as response:
                 if response.status == 200:
-                    data = await response.json()
+                    data = await read_json(response)
                     
                     # CoinGecko market_chart returns: prices, market_caps, total_volumes
                     # Each is array of [timestamp_ms, value]
@@ -247,33 +251,79 @@ class CoinGeckoClient:
             logger.error(f"CoinGecko 4h candles exception for {symbol}: {e}")
             return []
     
+    async def get_id_map(self, ranked_coins: int = 1000) -> Dict[str, str]:
+        """Full symbol -> CoinGecko coin ID map.
+        
+        coins/list covers every coin; symbols shared by several coins are resolved
+        to the highest market cap among the top ranked_coins (coins/markets pages).
+        """
+        session = await self._get_session()
+        
+        async def fetch_list():
+            async with session.get(f'{self.base_url}/coins/list') as response:
+                if response.status != 200:
+                    raise Exception(f"API error: {response.status}")
+                return await read_json(response)
+        
+        per_page = 250
+        all_coins, *ranked_pages = await asyncio.gather(
+            fetch_list(),
+            *(self._fetch_markets_page(session, page, per_page)
+              for page in range(1, (ranked_coins + per_page - 1) // per_page + 1))
+        )
+        
+        id_map = {}
+        for coin in all_coins:
+            symbol = coin.get('symbol', '').upper()
+            if symbol and coin.get('id'):
+                id_map.setdefault(symbol, coin['id'])
+        
+        ranked = {}
+        for page in ranked_pages:
+            for coin in page:
+                symbol = coin.get('symbol', '').upper()
+                if symbol and coin.get('id'):
+                    ranked.setdefault(symbol, coin['id'])
+        id_map.update(ranked)
+        return id_map
+    
     async def _get_coin_id(self, symbol: str) -> Optional[str]:
         """Get CoinGecko coin ID from symbol.
         
         CoinGecko uses IDs like 'bitcoin', 'ethereum' instead of symbols.
+        Uses the persistent ID map first; unknown symbols are looked up with
+        the search endpoint (best market cap rank among exact symbol matches).
         """
+        coin_id = self.id_map.get('coingecko', symbol)
+        if coin_id is not None:
+            return coin_id
+        
         try:
             session = await self._get_session()
             
-            # Use the coins/list endpoint to map symbol to ID
-            url = f'{self.base_url}/coins/list'
+            url = f'{self.base_url}/search'
             
-            async with session.get(url, timeout=30) as response:
+            async with session.get(url, params={'query': symbol}) as response:
                 if response.status == 200:
-                    coins = await response.json()
+                    data = await read_json(response)
                     
-                    # Find matching coin by symbol
+                    # Find matching coins by symbol, best ranked first
                     symbol_lower = symbol.lower()
-                    for coin in coins:
-                        if coin.get('symbol', '').lower() == symbol_lower:
-                            return coin.get('id')
+                    matches = [
+                        coin for coin in data.get('coins', [])
+                        if coin.get('symbol', '').lower() == symbol_lower
+                    ]
+                    if matches:
+                        best = min(matches, key=lambda coin: coin.get('market_cap_rank') or float('inf'))
+                        self.id_map.remember('coingecko', symbol, best.get('id'))
+                        return best.get('id')
                     
                     logger.warning(f"CoinGecko: No coin ID found for symbol {symbol}")
                     return None
                 else:
-                    logger.error(f"CoinGecko coins/list error: {response.status}")
+                    logger.error(f"CoinGecko search error: {response.status}")
                     return None
                     
         except Exception as e:
             logger.error(f"Error getting CoinGecko coin ID for {symbol}: {e}")
-            return None
\ No newline at end of file
+            return None
@@ -3,6 +3,9 @@ import asyncio
 from typing import List, Dict, Optional
 from datetime import datetime, timezone, timedelta
 import logging
+from services.http_transport import get_transport
+from services.json_codec import read_json
+from services.provider_id_map import ProviderIdMap
 
 logger = logging.getLogger(__name__)
 
@@ -12,21 +15,21 @@ class CoinMarketCapClient:
     Uses CoinMarketCap Pro API with API key.
     """
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, id_map: Optional[ProviderIdMap] = None):
         self.base_url = 'https://pro-api.coinmarketcap.com/v1'
         self.api_key = api_key
         self.session: Optional[aiohttp.ClientSession] = None
         self.provider_name = "CoinMarketCap"
         
-        # Cache for CMC ID mapping (symbol -> CMC ID)
-        self.symbol_id_cache = {}
+        # Persistent CMC ID mapping (symbol -> CMC ID), shared with the other providers' maps
+        self.id_map = id_map or ProviderIdMap()
     
     async def _get_session(self):
         if self.session is None or self.session.closed:
             headers = {}
             if self.api_key:
                 headers['X-CMC_PRO_API_KEY'] = self.api_key
-            self.session = aiohttp.ClientSession(headers=headers)
+            self.session = get_transport().session('coinmarketcap', headers=headers)
         return self.session
     
     async def close(self):
@@ -53,9 +56,9 @@ class CoinMarketCapClient:
                 'sort_dir': 'desc'
             }
             
-            async with session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=15)) as response:
+            async with session.get(url, params=params) as response:
                 if response.status == 200:
-                    data = await response.json()
+                    data = await read_json(response)
                     
                     coins = []
                     for coin in data.get('data', []):
@@ -68,8 +71,7 @@ class CoinMarketCapClient:
                         if symbol and price and price > 0:
                             coins.append((symbol, name, price))
                             # Cache CMC ID for later use
-                            if cmc_id:
-                                self.symbol_id_cache[symbol] = cmc_id
+                            self.id_map.remember('coinmarketcap', symbol, cmc_id)
                         
                         if len(coins) >= max_coins:
                             break
@@ -127,9 +129,9 @@ class CoinMarketCapClient:
                 'convert': 'USD'
             }
             
-            async with session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=15)) as response:
+            async with session.get(url, params=params) as response:
                 if response.status == 200:
-                    data = await response.json()
+                    data = await read_json(response)
                     
                     historical_data = []
                     quotes = data.get('data', {}).get('quotes', [])
@@ -195,9 +197,9 @@ class CoinMarketCapClient:
             }
             
             session = await self._get_session()
-            async with session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=15)) as response:
+            async with session.get(url, params=params) as response:
                     if response.status == 200:
-                        data = await response.json()
+                        data = await read_json(response)
                         quotes = data.get('data', {}).get('quotes', [])
                         
                         # Aggregate hourly to 4h candles
@@ -208,11 +210,12 @@ class CoinMarketCapClient:
                                 continue
                             
                             # Aggregate OHLCV
-                            opens = [q.get('quote', {}).get('USD', {}).get('open', 0) for q in chunk]
-                            highs = [q.get('quote', {}).get('USD', {}).get('high', 0) for q in chunk]
-                            lows = [q.get('quote', {}).get('USD', {}).get('low', 0) for q in chunk]
-                            closes = [q.get('quote', {}).get('USD', {}).get('close', 0) for q in chunk]
-                            volumes = [q.get('quote', {}).get('USD', {}).get('volume', 0) for q in chunk]
+                            usd_quotes = [q.get('quote', {}).get('USD', {}) for q in chunk]
+                            opens = [usd.get('open', 0) for usd in usd_quotes]
+                            highs = [usd.get('high', 0) for usd in usd_quotes]
+                            lows = [usd.get('low', 0) for usd in usd_quotes]
+                            closes = [usd.get('close', 0) for usd in usd_quotes]
+                            volumes = [usd.get('volume', 0) for usd in usd_quotes]
                             
                             candles_4h.append({
                                 'timestamp': int(datetime.fromisoformat(chunk[0].get('timestamp').replace('Z', '+00:00')).timestamp()),
@@ -232,14 +235,41 @@ class CoinMarketCapClient:
             logger.error(f"CoinMarketCap 4h candles exception for {symbol}: {e}")
             return []
     
+    async def get_id_map(self) -> Dict[str, int]:
+        """Full symbol -> CMC ID map of active coins (one request, ranked).
+        
+        Symbols shared by several coins map to the highest-ranked one.
+        """
+        session = await self._get_session()
+        
+        url = f'{self.base_url}/cryptocurrency/map'
+        params = {
+            'listing_status': 'active',
+            'sort': 'cmc_rank',
+            'limit': 5000
+        }
+        
+        async with session.get(url, params=params) as response:
+            if response.status != 200:
+                raise Exception(f"API error: {response.status}")
+            data = await read_json(response)
+        
+        id_map = {}
+        for coin in data.get('data', []):
+            symbol = coin.get('symbol', '').upper()
+            if symbol and coin.get('id'):
+                id_map.setdefault(symbol, coin['id'])
+        return id_map
+    
     async def _get_cmc_id(self, symbol: str) -> Optional[int]:
         """Get CoinMarketCap ID from symbol.
         
-        Uses cache first, then queries CMC map endpoint.
+        Uses the persistent ID map first, then queries CMC map endpoint for unknown symbols.
         """
-        # Check cache first
-        if symbol in self.symbol_id_cache:
-            return self.symbol_id_cache[symbol]
+        # Check ID map first
+        cmc_id = self.id_map.get('coinmarketcap', symbol)
+        if cmc_id is not None:
+            return cmc_id
         
         try:
             session = await self._get_session()
@@ -250,15 +280,15 @@ class CoinMarketCapClient:
                 'limit': 1
             }
             
-            async with session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=15)) as response:
+            async with session.get(url, params=params) as response:
                 if response.status == 200:
-                    data = await response.json()
+                    data = await read_json(response)
                     coins = data.get('data', [])
                     
                     if coins and len(coins) > 0:
                         cmc_id = coins[0].get('id')
-                        # Cache for future use
-                        self.symbol_id_cache[symbol] = cmc_id
+                        # Remember for future use (persisted with the ID map)
+                        self.id_map.remember('coinmarketcap', symbol, cmc_id)
                         return cmc_id
                     
                     logger.warning(f"CoinMarketCap: No CMC ID found for symbol {symbol}")
@@ -3,6 +3,8 @@ import asyncio
 from typing import List, Dict, Optional
 from datetime import datetime, timedelta, timezone
 import logging
+from services.http_transport import get_transport
+from services.json_codec import candles_from_records, read_json
 
 logger = logging.getLogger(__name__)
 
@@ -20,7 +22,7 @@ class CryptoCompareClient:
             headers = {}
             if self.api_key:
                 headers['authorization'] = f'Apikey {self.api_key}'
-            self.session = aiohttp.ClientSession(headers=headers)
+            self.session = get_transport().session('cryptocompare', headers=headers)
         return self.session
     
     async def close(self):
@@ -49,9 +51,9 @@ class CryptoCompareClient:
                 'tsym': 'USD'
             }
             
-            async with session.get(url, params=params, timeout=30) as response:
+            async with session.get(url, params=params) as response:
                 if response.status == 200:
-                    data = await response.json()
+                    data = await read_json(response)
                     coins = []
                     
                     if data.get('Message') == 'Success':
@@ -79,8 +81,56 @@ class CryptoCompareClient:
             logger.error(f"Exception fetching CryptoCompare coins: {e}")
             return []
     
+    async def _fetch_listing_page(self, session, page: int) -> List[Dict]:
+        """One page (100 coins) of the market-cap listing; [] on error."""
+        url = f'{self.base_url}/top/mktcapfull'
+        params = {
+            'limit': 100,
+            'tsym': 'USD',
+            'page': page
+        }
+        
+        try:
+            async with session.get(url, params=params) as response:
+                if response.status != 200:
+                    logger.warning(f"Page {page + 1} HTTP error: {response.status}")
+                    return []
+                data = await read_json(response)
+        except Exception as e:
+            logger.error(f"Error fetching page {page + 1}: {e}")
+            return []
+        
+        if data.get('Message') != 'Success':
+            logger.warning(f"Page {page + 1} error: {data.get('Message')}")
+            return []
+        return data.get('Data', [])
+    
+    async def _fetch_listing(self, max_coins: int) -> List[Dict]:
+        """Listing items for the top max_coins coins, deduplicated and in market-cap rank order.
+        
+        Pages are requested concurrently; the provider's rate limiter paces them.
+        """
+        session = await self._get_session()
+        num_pages = (max_coins + 99) // 100  # Ceiling division
+        pages = await asyncio.gather(*(self._fetch_listing_page(session, page) for page in range(num_pages)))
+        
+        items = []
+        seen_symbols = set()
+        # gather keeps page order, so items stay in rank order
+        for page_items in pages:
+            for item in page_items:
+                symbol = item.get('CoinInfo', {}).get('Name')
+                price = item.get('RAW', {}).get('USD', {}).get('PRICE', 0)
+                
+                # Avoid duplicates and ensure valid data
+                if symbol and price > 0 and symbol not in seen_symbols:
+                    seen_symbols.add(symbol)
+                    items.append(item)
+        
+        return items[:max_coins]
+    
     async def _get_coins_with_pagination(self, max_coins: int) -> List[tuple]:
-        """Fetch coins using pagination (multiple API calls for > 100 coins).
+        """Fetch coins using pagination (concurrent API calls for > 100 coins).
         
         Args:
             max_coins: Total number of coins to fetch
@@ -88,71 +138,92 @@ class CryptoCompareClient:
         Returns list of tuples: (symbol, name, current_price_usd)
         """
         try:
-            session = await self._get_session()
-            all_coins = []
-            seen_symbols = set()
-            
-            # Calculate number of pages needed (100 coins per page)
-            num_pages = (max_coins + 99) // 100  # Ceiling division
-            logger.info(f"🔄 Pagination: Fetching {max_coins} coins across {num_pages} pages...")
+            logger.info(f"🔄 Pagination: Fetching {max_coins} coins across {(max_coins + 99) // 100} pages...")
+            items = await self._fetch_listing(max_coins)
             
-            for page in range(num_pages):
-                url = f'{self.base_url}/top/mktcapfull'
-                params = {
-                    'limit': 100,
-                    'tsym': 'USD',
-                    'page': page
-                }
-                
-                try:
-                    async with session.get(url, params=params, timeout=30) as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            
-                            if data.get('Message') == 'Success':
-                                page_coins = 0
-                                for item in data.get('Data', []):
-                                    coin_info = item.get('CoinInfo', {})
-                                    raw_data = item.get('RAW', {}).get('USD', {})
-                                    
-                                    symbol = coin_info.get('Name')
-                                    full_name = coin_info.get('FullName')
-                                    price = raw_data.get('PRICE', 0)
-                                    
-                                    # Avoid duplicates and ensure valid data
-                                    if symbol and price > 0 and symbol not in seen_symbols:
-                                        all_coins.append((symbol, full_name or symbol, price))
-                                        seen_symbols.add(symbol)
-                                        page_coins += 1
-                                        
-                                        # Stop if we've reached max_coins
-                                        if len(all_coins) >= max_coins:
-                                            break
-                                
-                                logger.info(f"  Page {page + 1}/{num_pages}: +{page_coins} coins (total: {len(all_coins)})")
-                            else:
-                                logger.warning(f"Page {page + 1} error: {data.get('Message')}")
-                        else:
-                            logger.warning(f"Page {page + 1} HTTP error: {response.status}")
-                        
-                        # Stop if we've reached max_coins
-                        if len(all_coins) >= max_coins:
-                            break
-                        
-                        # Small delay between requests to be nice to the API
-                        await asyncio.sleep(0.5)
-                        
-                except Exception as e:
-                    logger.error(f"Error fetching page {page + 1}: {e}")
-                    continue
+            all_coins = []
+            for item in items:
+                coin_info = item['CoinInfo']
+                symbol = coin_info['Name']
+                all_coins.append((symbol, coin_info.get('FullName') or symbol, item['RAW']['USD']['PRICE']))
             
             logger.info(f"✅ Pagination complete: Fetched {len(all_coins)} total coins")
-            return all_coins[:max_coins]  # Ensure we don't exceed max_coins
+            return all_coins
             
         except Exception as e:
             logger.error(f"Exception in pagination: {e}")
             return []
     
+    @staticmethod
+    def _market_entry(symbol: str, name: str, raw: Dict, rank: Optional[int] = None) -> Dict:
+        """Market snapshot entry from a CryptoCompare RAW USD quote."""
+        return {
+            'symbol': symbol,
+            'name': name,
+            'price': raw.get('PRICE', 0),
+            'volume_24h': raw.get('TOTALVOLUME24HTO') or raw.get('VOLUME24HOURTO', 0),
+            'market_cap': raw.get('MKTCAP', 0),
+            'change_24h_pct': raw.get('CHANGEPCT24HOUR', 0),
+            'rank': rank
+        }
+    
+    async def get_market_listing(self, max_coins: int = 1000) -> List[Dict]:
+        """Fetch top coins by market cap with price, 24h volume and market cap.
+        
+        Args:
+            max_coins: Number of coins to fetch (pages of 100, fetched concurrently)
+        
+        Returns list of market entry dicts ordered by market cap rank
+        """
+        items = await self._fetch_listing(max_coins)
+        return [
+            self._market_entry(item['CoinInfo']['Name'],
+                               item['CoinInfo'].get('FullName') or item['CoinInfo']['Name'],
+                               item['RAW']['USD'], rank=rank)
+            for rank, item in enumerate(items, start=1)
+        ]
+    
+    async def get_prices(self, symbols: List[str]) -> Dict[str, Dict]:
+        """Fetch current quotes for arbitrary symbols via the multi-symbol price endpoint.
+        
+        Args:
+            symbols: Coin symbols (any number; requests are chunked to the fsyms limit)
+        
+        Returns dict mapping symbol -> market entry (symbols without a quote are omitted)
+        """
+        session = await self._get_session()
+        quotes = {}
+        
+        # fsyms is limited to 300 characters per request
+        chunks, chunk, length = [], [], 0
+        for symbol in dict.fromkeys(s.upper() for s in symbols):
+            if chunk and length + len(symbol) + 1 > 300:
+                chunks.append(chunk)
+                chunk, length = [], 0
+            chunk.append(symbol)
+            length += len(symbol) + 1
+        if chunk:
+            chunks.append(chunk)
+        
+        for chunk in chunks:
+            params = {'fsyms': ','.join(chunk), 'tsyms': 'USD'}
+            try:
+                async with session.get(f'{self.base_url}/pricemultifull', params=params) as response:
+                    if response.status != 200:
+                        logger.warning(f"CryptoCompare pricemultifull HTTP error: {response.status}")
+                        continue
+                    data = await read_json(response)
+            except Exception as e:
+                logger.error(f"Exception fetching CryptoCompare prices: {e}")
+                continue
+            
+            for symbol, raw in data.get('RAW', {}).items():
+                raw_data = raw.get('USD', {})
+                if raw_data.get('PRICE', 0) > 0:
+                    quotes[symbol] = self._market_entry(symbol, symbol, raw_data)
+        
+        return quotes
+    
     async def get_historical_data(self, symbol: str, days: int = 365) -> List[Dict]:
         """Get historical daily OHLCV data.
         
@@ -175,24 +246,12 @@ class CryptoCompareClient:
                 'toTs': int(datetime.now(timezone.utc).timestamp())
             }
             
-            async with session.get(url, params=params, timeout=30) as response:
+            async with session.get(url, params=params) as response:
                 if response.status == 200:
-                    data = await response.json()
+                    data = await read_json(response)
                     
                     if data.get('Response') == 'Success':
-                        raw_data = data.get('Data', {}).get('Data', [])
-                        candles = []
-                        
-                        for candle in raw_data:
-                            if candle.get('close', 0) > 0:
-                                candles.append({
-                                    'timestamp': candle.get('time'),
-                                    'open': float(candle.get('open', 0)),
-                                    'high': float(candle.get('high', 0)),
-                                    'low': float(candle.get('low', 0)),
-                                    'close': float(candle.get('close', 0)),
-                                    'volume': float(candle.get('volumeto', 0))
-                                })
+                        candles = candles_from_records(data.get('Data', {}).get('Data', []))
                         
                         logger.info(f"Fetched {len(candles)} candles from CryptoCompare for {symbol}")
                         return candles
@@ -230,24 +289,12 @@ class CryptoCompareClient:
                 'toTs': int(datetime.now(timezone.utc).timestamp())
             }
             
-            async with session.get(url, params=params, timeout=30) as response:
+            async with session.get(url, params=params) as response:
                 if response.status == 200:
-                    data = await response.json()
+                    data = await read_json(response)
                     
                     if data.get('Response') == 'Success':
-                        raw_data = data.get('Data', {}).get('Data', [])
-                        candles = []
-                        
-                        for candle in raw_data:
-                            if candle.get('close', 0) > 0:
-                                candles.append({
-                                    'timestamp': candle.get('time'),
-                                    'open': float(candle.get('open', 0)),
-                                    'high': float(candle.get('high', 0)),
-                                    'low': float(candle.get('low', 0)),
-                                    'close': float(candle.get('close', 0)),
-                                    'volume': float(candle.get('volumeto', 0))
-                                })
+                        candles = candles_from_records(data.get('Data', {}).get('Data', []))
                         
                         logger.info(f"CryptoCompare: Fetched {len(candles)} 4h candles for {symbol}")
                         return candles
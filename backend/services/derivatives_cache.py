@@ -0,0 +1,155 @@
+"""
+Per-metric TTL cache for derivatives metrics (open interest, funding, long/short).
+
+Every scan, alert check and repeated custom scan used to refetch all three
+metrics through MultiFuturesClient.get_all_derivatives_metrics, although they
+change on very different time scales:
+
+- funding: until the symbol's next funding time (fallback
+  DERIVATIVES_FUNDING_TTL_SECONDS when the provider gives none)
+- open interest: DERIVATIVES_OI_TTL_SECONDS (default 60)
+- long/short ratio: DERIVATIVES_LONG_SHORT_TTL_SECONDS (default 300)
+
+Each metric expires on its own, so only expired metrics are refetched.
+Concurrent requests for the same symbol share one fetch (single flight).
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Metric -> fields it contributes to the metrics dict
+METRIC_FIELDS = {
+    'open_interest': ('open_interest',),
+    'funding': ('funding_rate', 'next_funding_time', 'mark_price', 'liquidation_risk', 'funding_direction'),
+    'long_short': ('long_short_ratio', 'long_account_percent', 'short_account_percent')
+}
+
+
+class DerivativesMetricsCache:
+    """Symbol -> {metric: fields} with one expiry per metric."""
+
+    def __init__(self):
+        self.ttls = {
+            'open_interest': float(os.getenv('DERIVATIVES_OI_TTL_SECONDS', '60')),
+            'funding': float(os.getenv('DERIVATIVES_FUNDING_TTL_SECONDS', '900')),
+            'long_short': float(os.getenv('DERIVATIVES_LONG_SHORT_TTL_SECONDS', '300'))
+        }
+        # Funding is kept until the next funding time, but never longer than this
+        self.funding_max_ttl = float(os.getenv('DERIVATIVES_FUNDING_MAX_TTL_SECONDS', str(8 * 3600)))
+        # symbol -> {'provider': str, 'metrics': {metric: {'fields', 'timestamp', 'expires_at'}}}
+        self.entries: Dict[str, Dict] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.stats = {metric: {'hits': 0, 'misses': 0} for metric in METRIC_FIELDS}
+        self.coalesced = 0
+
+    def lookup(self, symbol: str) -> Dict[str, Dict]:
+        """Fresh metrics of a symbol ({metric: fields}); counts hits per metric."""
+        entry = self.entries.get(symbol.upper())
+        now = time.time()
+        fresh = {}
+        for metric in METRIC_FIELDS:
+            cached = entry['metrics'].get(metric) if entry else None
+            if cached is not None and cached['expires_at'] > now:
+                fresh[metric] = cached['fields']
+                self.stats[metric]['hits'] += 1
+        return fresh
+
+    def provider(self, symbol: str) -> Optional[str]:
+        entry = self.entries.get(symbol.upper())
+        return entry['provider'] if entry else None
+
+    def _expires_at(self, metric: str, fields: Dict, now: float) -> float:
+        if metric == 'funding':
+            next_funding_time = fields.get('next_funding_time') or 0
+            if now < next_funding_time <= now + self.funding_max_ttl:
+                return next_funding_time
+        return now + self.ttls[metric]
+
+    def store(self, symbol: str, metrics: Dict, fetched=None) -> Dict[str, Dict]:
+        """Cache the metrics of a successful fetch (counted as misses).
+
+        Failed fetches are not stored, so symbols without derivatives markets do not
+        count towards the hit rates.
+
+        Args:
+            symbol: Coin symbol
+            metrics: Metrics dict as returned by the provider clients
+            fetched: Metrics that were requested (default all). Those missing from
+                the dict are cached as unavailable until their TTL expires.
+
+        Returns the stored {metric: fields}
+        """
+        now = time.time()
+        entry = self.entries.setdefault(symbol.upper(), {'provider': None, 'metrics': {}})
+        entry['provider'] = metrics.get('provider') or entry['provider']
+        stored = {}
+        for metric in fetched or METRIC_FIELDS:
+            fields = {field: metrics[field] for field in METRIC_FIELDS[metric] if field in metrics}
+            entry['metrics'][metric] = {
+                'fields': fields,
+                'timestamp': metrics.get('timestamp', now),
+                'expires_at': self._expires_at(metric, fields, now)
+            }
+            stored[metric] = fields
+            self.stats[metric]['misses'] += 1
+        return stored
+
+    def assemble(self, symbol: str, fresh: Dict[str, Dict]) -> Dict:
+        """Metrics dict (same shape as the provider clients') from cached metrics."""
+        entry = self.entries.get(symbol.upper(), {'provider': None, 'metrics': {}})
+        timestamps = [cached['timestamp'] for metric, cached in entry['metrics'].items() if metric in fresh]
+        metrics = {
+            'symbol': symbol,
+            'has_derivatives_data': any(fresh.values()),
+            'provider': entry['provider'],
+            'source': 'cache',
+            'timestamp': min(timestamps) if timestamps else time.time()
+        }
+        for fields in fresh.values():
+            metrics.update(fields)
+        return metrics
+
+    async def single_flight(self, symbol: str, load: Callable[[], Awaitable[Dict]]) -> Dict:
+        """Run load() unless a fetch for the symbol is already in flight, then share its result."""
+        key = symbol.upper()
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return dict(await asyncio.shield(task))
+
+        task = asyncio.ensure_future(load())
+        self._inflight[key] = task
+        try:
+            return dict(await asyncio.shield(task))
+        finally:
+            if self._inflight.get(key) is task:
+                del self._inflight[key]
+
+    def purge_expired(self):
+        now = time.time()
+        for symbol in list(self.entries):
+            metrics = self.entries[symbol]['metrics']
+            if all(cached['expires_at'] <= now for cached in metrics.values()):
+                del self.entries[symbol]
+
+    def get_stats(self) -> Dict:
+        self.purge_expired()
+        metrics = {}
+        for metric, counts in self.stats.items():
+            lookups = counts['hits'] + counts['misses']
+            metrics[metric] = {
+                **counts,
+                'hit_rate': round(counts['hits'] / lookups * 100, 1) if lookups else 0,
+                'ttl_seconds': self.ttls[metric]
+            }
+        return {
+            'symbols': len(self.entries),
+            'metrics': metrics,
+            'coalesced': self.coalesced,
+            'in_flight': len(self._inflight)
+        }
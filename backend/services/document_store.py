@@ -0,0 +1,80 @@
+"""
+Small keyed JSON document stores for service state that must survive restarts
+(provider ID maps, the derivatives negative cache).
+
+- DbDocumentStore: one row per key in a Supabase table
+- FileDocumentStore: all documents in one JSON file
+
+create_document_store() picks the backend from an env variable: 'supabase'
+(default when a database is available) or 'file'.
+"""
+
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Default directory of file stores (backend/data, git-ignored)
+DATA_DIR = Path(__file__).resolve().parent.parent / 'data'
+
+
+class FileDocumentStore:
+    """All documents in one JSON file, keyed by name."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+
+    def _read_all(self) -> Dict:
+        if not self.path.exists():
+            return {}
+        try:
+            return json.loads(self.path.read_text())
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Could not read {self.path}: {e}")
+            return {}
+
+    async def read(self, key: str) -> Optional[Dict]:
+        return self._read_all().get(key)
+
+    async def write(self, key: str, document: Dict):
+        data = self._read_all()
+        data[key] = document
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(data))
+        tmp_path.replace(self.path)
+
+
+class DbDocumentStore:
+    """One row per key in a table (upserted on write)."""
+
+    def __init__(self, table, key_field: str):
+        self.table = table
+        self.key_field = key_field
+
+    async def read(self, key: str) -> Optional[Dict]:
+        return await self.table.find_one({self.key_field: key})
+
+    async def write(self, key: str, document: Dict):
+        await self.table.update_one({self.key_field: key}, {'$set': document}, upsert=True)
+
+
+def create_document_store(db, table_name: str, key_field: str, store_env: str, path_env: str,
+                          default_filename: str):
+    """Store selected by the store_env variable ('supabase' or 'file').
+
+    Args:
+        db: Database interface (None forces the file store)
+        table_name: Table of the database store
+        key_field: Key column of the table
+        store_env: Env variable naming the backend
+        path_env: Env variable overriding the JSON file path
+        default_filename: File name under backend/data for the file store
+    """
+    backend = os.getenv(store_env, 'supabase' if db is not None else 'file').lower()
+    if backend == 'supabase' and db is not None:
+        return DbDocumentStore(getattr(db, table_name), key_field)
+    return FileDocumentStore(os.getenv(path_env, str(DATA_DIR / default_filename)))
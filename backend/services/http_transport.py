@@ -0,0 +1,305 @@
+"""
+Shared HTTP transport for all provider clients.
+
+Every client used to open its own aiohttp.ClientSession with a default
+connector, so each provider kept a separate connection pool, DNS lookups were
+repeated per pool and nothing bounded connections per host. Clients now get
+their session from the process-wide HttpTransport:
+
+- one TCPConnector (HTTP_POOL_LIMIT total, HTTP_LIMIT_PER_HOST per host,
+  DNS cache, keep-alive) shared by every provider session
+- gzip/deflate response compression
+- per-provider timeout profiles (override with HTTP_TIMEOUT_<PROVIDER>=seconds)
+- request latency histograms per provider, plus metrics hooks for exporters
+- per-provider token-bucket rate limiting (services.rate_limiter): a request
+  waits for a token before it is sent, and 429 / rate-limit headers of the
+  response feed back into the provider's bucket
+- answer tracking (HttpTransport.track_answers): tells a caller whether every
+  request it made got an answer, so "no data" can be told apart from errors
+  that clients swallow
+
+Provider sessions only carry provider headers and the timeout profile; closing
+one does not close the shared connector (see HttpTransport.close).
+"""
+
+import asyncio
+import bisect
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+
+import aiohttp
+
+from services.rate_limiter import RateLimiterRegistry, TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Total request timeout (seconds) per provider
+TIMEOUT_PROFILES = {
+    'cryptocompare': 30,
+    'coingecko': 30,
+    'coinmarketcap': 15,
+    'binance': 30,
+    'tokenmetrics': 30,
+    'coinalyze': 30,
+    'okx_futures': 10,
+    'bybit_futures': 10,
+    'binance_futures': 10,
+    'default': 30
+}
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0]
+
+MetricsHook = Callable[[str, str, str, Optional[int], float], None]
+
+
+class RequestOutcomes:
+    """Requests made inside one HttpTransport.track_answers() block."""
+
+    def __init__(self):
+        self.answered = 0
+        self.failed = 0
+
+    @property
+    def all_answered(self) -> bool:
+        """At least one request was made and every one got an answer (not 429 / 5xx / error)."""
+        return self.answered > 0 and self.failed == 0
+
+
+# Outcomes of the current track_answers() block; tasks started inside it share the object
+_request_outcomes: ContextVar[Optional[RequestOutcomes]] = ContextVar('request_outcomes', default=None)
+
+
+def _record_outcome(answered: bool):
+    outcomes = _request_outcomes.get()
+    if outcomes is not None:
+        if answered:
+            outcomes.answered += 1
+        else:
+            outcomes.failed += 1
+
+
+class LatencyHistogram:
+    """Fixed-bucket request latency histogram for one provider."""
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0
+        self.errors = 0
+        self.sum_seconds = 0.0
+
+    def observe(self, seconds: float, error: bool = False):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.total += 1
+        self.sum_seconds += seconds
+        if error:
+            self.errors += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile (None without samples)."""
+        if not self.total:
+            return None
+        rank = q * self.total
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS + [float('inf')], self.counts):
+            seen += count
+            if seen >= rank:
+                return bound if bound != float('inf') else LATENCY_BUCKETS[-1]
+        return LATENCY_BUCKETS[-1]
+
+    def to_dict(self) -> Dict:
+        labels = [f"<={bound}s" for bound in LATENCY_BUCKETS] + [f">{LATENCY_BUCKETS[-1]}s"]
+        return {
+            'requests': self.total,
+            'errors': self.errors,
+            'avg_seconds': round(self.sum_seconds / self.total, 4) if self.total else None,
+            'p50_seconds': self.quantile(0.5),
+            'p90_seconds': self.quantile(0.9),
+            'buckets': dict(zip(labels, self.counts))
+        }
+
+
+class _RateLimitedRequest:
+    """`async with` / `await` wrapper that takes a rate-limit token before sending."""
+
+    def __init__(self, bucket: TokenBucket, request_coro_factory):
+        self._bucket = bucket
+        self._factory = request_coro_factory
+        self._ctx = None
+
+    async def _send(self) -> aiohttp.ClientResponse:
+        await self._bucket.acquire()
+        return await self._factory()
+
+    def __await__(self):
+        return self._send().__await__()
+
+    async def __aenter__(self) -> aiohttp.ClientResponse:
+        await self._bucket.acquire()
+        self._ctx = self._factory()
+        return await self._ctx.__aenter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            # e.g. a timeout while reading the body of an answered request
+            _record_outcome(False)
+        return await self._ctx.__aexit__(exc_type, exc, tb)
+
+
+class ProviderSession:
+    """ClientSession of one provider whose requests pass through its rate limiter.
+
+    The token wait happens before the request is created, so it does not count
+    against the provider's timeout profile. Everything except the request
+    methods is delegated to the underlying ClientSession.
+    """
+
+    def __init__(self, session: aiohttp.ClientSession, bucket: TokenBucket):
+        self._session = session
+        self.rate_limiter = bucket
+
+    def request(self, method: str, url, **kwargs) -> _RateLimitedRequest:
+        return _RateLimitedRequest(self.rate_limiter, lambda: self._session.request(method, url, **kwargs))
+
+    def get(self, url, **kwargs) -> _RateLimitedRequest:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs) -> _RateLimitedRequest:
+        return self.request('POST', url, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+
+class HttpTransport:
+    """Process-wide connection pool and session factory for provider clients."""
+
+    def __init__(self):
+        self.pool_limit = int(os.getenv('HTTP_POOL_LIMIT', '100'))
+        self.limit_per_host = int(os.getenv('HTTP_LIMIT_PER_HOST', '10'))
+        self.dns_cache_ttl = int(os.getenv('HTTP_DNS_CACHE_TTL', '300'))
+        self.keepalive_timeout = float(os.getenv('HTTP_KEEPALIVE_TIMEOUT', '30'))
+        self._connector: Optional[aiohttp.TCPConnector] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self._metrics_hooks: List[MetricsHook] = []
+        self.rate_limiters = RateLimiterRegistry()
+
+    def _get_connector(self) -> aiohttp.TCPConnector:
+        loop = asyncio.get_running_loop()
+        if self._connector is None or self._connector.closed or self._loop is not loop:
+            self._connector = aiohttp.TCPConnector(
+                limit=self.pool_limit,
+                limit_per_host=self.limit_per_host,
+                use_dns_cache=True,
+                ttl_dns_cache=self.dns_cache_ttl,
+                keepalive_timeout=self.keepalive_timeout,
+                enable_cleanup_closed=True
+            )
+            self._loop = loop
+        return self._connector
+
+    def timeout_for(self, provider: str) -> aiohttp.ClientTimeout:
+        """Timeout profile of a provider (HTTP_TIMEOUT_<PROVIDER> overrides the default)."""
+        default = TIMEOUT_PROFILES.get(provider, TIMEOUT_PROFILES['default'])
+        total = float(os.getenv(f'HTTP_TIMEOUT_{provider.upper()}', default))
+        return aiohttp.ClientTimeout(total=total, sock_connect=min(10.0, total))
+
+    def session(self, provider: str, headers: Optional[Dict[str, str]] = None) -> ProviderSession:
+        """New rate-limited ClientSession for a provider on the shared connector.
+
+        Must be called from within the running event loop (clients create their
+        session lazily in _get_session).
+        """
+        session_headers = {'Accept-Encoding': 'gzip, deflate'}
+        session_headers.update(headers or {})
+        session = aiohttp.ClientSession(
+            connector=self._get_connector(),
+            connector_owner=False,
+            headers=session_headers,
+            timeout=self.timeout_for(provider),
+            trace_configs=[self._trace_config(provider)]
+        )
+        return ProviderSession(session, self.rate_limiters.bucket(provider))
+
+    def add_metrics_hook(self, hook: MetricsHook):
+        """Register hook(provider, method, url, status, seconds), called after every request."""
+        self._metrics_hooks.append(hook)
+
+    def _trace_config(self, provider: str) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig(trace_config_ctx_factory=SimpleNamespace)
+
+        async def on_request_start(session, ctx, params):
+            ctx.start = time.monotonic()
+
+        async def on_request_end(session, ctx, params):
+            status = params.response.status
+            self.rate_limiters.bucket(provider).observe_response(status, params.response.headers)
+            _record_outcome(status < 500 and status != 429)
+            self._observe(provider, params.method, str(params.url), params.response.status,
+                          time.monotonic() - ctx.start)
+
+        async def on_request_exception(session, ctx, params):
+            _record_outcome(False)
+            self._observe(provider, params.method, str(params.url), None,
+                          time.monotonic() - ctx.start)
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_request_exception.append(on_request_exception)
+        return trace_config
+
+    @contextmanager
+    def track_answers(self):
+        """Collect the outcomes of the requests made inside the block.
+
+        Only requests of the current task and of tasks it starts are counted,
+        so concurrent callers of the same provider don't see each other's
+        answers. Yields a RequestOutcomes.
+        """
+        outcomes = RequestOutcomes()
+        token = _request_outcomes.set(outcomes)
+        try:
+            yield outcomes
+        finally:
+            _request_outcomes.reset(token)
+
+    def _observe(self, provider: str, method: str, url: str, status: Optional[int], seconds: float):
+        histogram = self.histograms.setdefault(provider, LatencyHistogram())
+        histogram.observe(seconds, error=status is None or status >= 400)
+        for hook in self._metrics_hooks:
+            try:
+                hook(provider, method, url, status, seconds)
+            except Exception as e:
+                logger.debug(f"HTTP metrics hook failed: {e}")
+
+    def get_stats(self) -> Dict:
+        """Connection pool settings, latency histograms and rate limiters per provider."""
+        return {
+            'pool_limit': self.pool_limit,
+            'limit_per_host': self.limit_per_host,
+            'providers': {provider: histogram.to_dict() for provider, histogram in self.histograms.items()},
+            'rate_limits': self.rate_limiters.get_stats()
+        }
+
+    async def close(self):
+        """Close the shared connector (on application shutdown, after the clients)."""
+        if self._connector is not None and not self._connector.closed:
+            await self._connector.close()
+        self._connector = None
+
+
+_transport: Optional[HttpTransport] = None
+
+
+def get_transport() -> HttpTransport:
+    """The process-wide HttpTransport."""
+    global _transport
+    if _transport is None:
+        _transport = HttpTransport()
+    return _transport
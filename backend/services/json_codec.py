@@ -0,0 +1,73 @@
+"""
+JSON decoding for provider responses.
+
+Provider clients used aiohttp's response.json(), which decodes the body to a str
+and parses it with the stdlib json module. Listing pages (top/mktcapfull with
+full RAW blocks), 2000-point histoday arrays and CMC historical quotes make this
+a visible share of scan time. read_json() parses the raw bytes with orjson when
+it is installed and falls back to json.loads otherwise (same result types).
+
+The candle helpers build the candle lists in one pass over the provider rows,
+reading only the OHLCV fields.
+"""
+
+import json
+from typing import Any, Dict, List, Sequence, Union
+
+try:
+    import orjson
+except ImportError:  # Optional speed-up; the stdlib decoder is used without it
+    orjson = None
+
+JSON_BACKEND = 'orjson' if orjson is not None else 'json'
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Parse a JSON document (bytes or str) with the fastest available decoder."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+async def read_json(response) -> Any:
+    """Drop-in replacement for `await response.json()` on an aiohttp response.
+
+    The body is parsed as bytes, without the str decode and content-type check of
+    response.json(). Invalid JSON raises ValueError.
+    """
+    return loads(await response.read())
+
+
+def candles_from_records(rows: Sequence[Dict], volume_key: str = 'volumeto') -> List[Dict]:
+    """Candles from CryptoCompare-style histo rows ({'time', 'open', ..., volume_key}).
+
+    Rows without a positive close (no trading) are skipped.
+    """
+    return [
+        {
+            'timestamp': row.get('time'),
+            'open': float(row.get('open', 0)),
+            'high': float(row.get('high', 0)),
+            'low': float(row.get('low', 0)),
+            'close': float(close),
+            'volume': float(row.get(volume_key, 0))
+        }
+        for row in rows
+        if (close := row.get('close', 0)) > 0
+    ]
+
+
+def candles_from_arrays(rows: Sequence[Sequence]) -> List[Dict]:
+    """Candles from Binance-style kline arrays ([open_time_ms, open, high, low, close, volume, ...])."""
+    return [
+        {
+            'timestamp': int(row[0] / 1000),  # Convert ms to seconds
+            'open': float(row[1]),
+            'high': float(row[2]),
+            'low': float(row[3]),
+            'close': float(row[4]),
+            'volume': float(row[5])
+        }
+        for row in rows
+        if len(row) >= 6
+    ]
@@ -4,7 +4,8 @@ Phase 2 Enhancement: Detect market conditions (BULL, BEAR, SIDEWAYS)
 """
 
 import logging
-from typing import Dict, List, Optional
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
 from datetime import datetime, timezone
 import statistics
 
@@ -14,10 +15,68 @@ logger = logging.getLogger(__name__)
 class MarketRegimeClassifier:
     """Classifies market regime to help bots adapt their strategies."""
     
+    REGIMES = ('BULL', 'BEAR', 'SIDEWAYS')
+    
+    # Bot behavior in different regimes
+    BOT_REGIME_AFFINITY = {
+        'BULL': {
+            'trend_following': 1.3,
+            'momentum': 1.2,
+            'mean_reversion': 0.7,
+            'breakout': 1.1,
+            'default': 1.0
+        },
+        'BEAR': {
+            'trend_following': 1.3,
+            'momentum': 1.2,
+            'mean_reversion': 0.7,
+            'breakout': 0.8,
+            'default': 1.0
+        },
+        'SIDEWAYS': {
+            'trend_following': 0.7,
+            'momentum': 0.8,
+            'mean_reversion': 1.4,
+            'breakout': 0.9,
+            'default': 1.0
+        }
+    }
+    
+    # Per-coin regime results kept for repeated scans within the same candle period
+    MAX_CACHED_REGIMES = 5000
+    
     def __init__(self):
+        # Regime x bot type multipliers in use (BOT_REGIME_AFFINITY unless a weight set overrides them)
+        self.bot_regime_affinity = self.BOT_REGIME_AFFINITY
         self.current_regime = None
         self.regime_confidence = 0.0
         self.last_update = None
+        self._regime_cache: "OrderedDict[Tuple[str, int], Dict]" = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+    
+    def classify_regime_cached(self, symbol: str, candles: List[Dict], features: Dict) -> Dict:
+        """classify_regime memoized per coin by the timestamp of its last candle.
+        
+        Scans that run again within the same candle period reuse the regime of the
+        first scan instead of reclassifying the coin.
+        """
+        if not candles or 'timestamp' not in candles[-1]:
+            return self.classify_regime(candles, features)
+        
+        key = (symbol, int(candles[-1]['timestamp']))
+        cached = self._regime_cache.get(key)
+        if cached is not None:
+            self._regime_cache.move_to_end(key)
+            self.cache_hits += 1
+            return dict(cached)
+        
+        self.cache_misses += 1
+        regime_data = self.classify_regime(candles, features)
+        self._regime_cache[key] = regime_data
+        if len(self._regime_cache) > self.MAX_CACHED_REGIMES:
+            self._regime_cache.popitem(last=False)
+        return dict(regime_data)
     
     def classify_regime(self, candles: List[Dict], features: Dict) -> Dict:
         """Classify the current market regime based on price action and indicators.
@@ -283,30 +342,40 @@ class MarketRegimeClassifier:
         Returns:
             Weight modifier (0.5 to 1.5)
         """
-        # Define bot behavior in different regimes
-        bot_regime_affinity = {
-            'BULL': {
-                'trend_following': 1.3,
-                'momentum': 1.2,
-                'mean_reversion': 0.7,
-                'breakout': 1.1,
-                'default': 1.0
-            },
-            'BEAR': {
-                'trend_following': 1.3,
-                'momentum': 1.2,
-                'mean_reversion': 0.7,
-                'breakout': 0.8,
-                'default': 1.0
-            },
-            'SIDEWAYS': {
-                'trend_following': 0.7,
-                'momentum': 0.8,
-                'mean_reversion': 1.4,
-                'breakout': 0.9,
-                'default': 1.0
-            }
-        }
-        
-        regime_modifiers = bot_regime_affinity.get(regime, {})
+        regime_modifiers = self.bot_regime_affinity.get(regime, {})
         return regime_modifiers.get(bot_type, regime_modifiers.get('default', 1.0))
+    
+    def set_regime_affinity(self, affinity: Optional[Dict[str, Dict[str, float]]]):
+        """Use the regime affinity of a weight set (None restores BOT_REGIME_AFFINITY).
+        
+        Regimes and bot types missing from the weight set keep their built-in multipliers.
+        """
+        merged = {regime: dict(modifiers) for regime, modifiers in self.BOT_REGIME_AFFINITY.items()}
+        for regime, modifiers in (affinity or {}).items():
+            merged.setdefault(regime, {}).update(modifiers)
+        self.bot_regime_affinity = merged
+
+
+class ScanRegimeContext:
+    """Regime state shared by every coin of one scan.
+    
+    - market_regime: BTC-based market regime (BotPerformanceService), computed once
+      at scan start and reused when the scan saves its bot predictions
+    - weight table: get_bot_weight_modifier precomputed for every (regime, bot_type)
+      of the scan's bots, so per (coin, bot) weighting is a dict lookup
+    """
+    
+    def __init__(self, classifier: MarketRegimeClassifier, market_regime: str, bot_types: Iterable[str]):
+        self.classifier = classifier
+        self.market_regime = market_regime
+        self.weight_table = {
+            (regime, bot_type): classifier.get_bot_weight_modifier(regime, bot_type)
+            for regime in classifier.REGIMES
+            for bot_type in set(bot_types) | {'default'}
+        }
+    
+    def get_bot_weight_modifier(self, regime: str, bot_type: str) -> float:
+        weight = self.weight_table.get((regime, bot_type))
+        if weight is None:
+            weight = self.classifier.get_bot_weight_modifier(regime, bot_type)
+        return weight
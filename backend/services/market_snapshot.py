@@ -0,0 +1,180 @@
+"""
+In-memory market snapshot: symbol -> price / 24h volume / market cap.
+
+Portfolio valuation, alert checks and bot outcome evaluation used to call
+get_all_coins(max_coins=200..500) for every holding, alert or evaluation run and
+then scan the list for one symbol. They now share one MarketSnapshotService:
+
+- the index is refreshed in bulk (top MARKET_SNAPSHOT_SIZE coins, paged listing)
+  by the scheduler every MARKET_SNAPSHOT_REFRESH_SECONDS, and lazily when older
+  than that on first use
+- get() / get_price() are O(1) dict lookups
+- get_prices(symbols) serves arbitrary symbols: the index first, the rest with
+  multi-symbol price requests; those quotes are added to the index (symbols
+  without a quote are not re-requested until the next refresh)
+- with a MarketStreamService, streamed prices younger than its max age take
+  precedence over the snapshot
+- every refresh is recorded into a rolling PriceHistory (percent-change alerts)
+- listeners (add_listener) are run after every successful refresh, e.g. the
+  alert engine evaluates its threshold index on each new snapshot
+"""
+
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+from services.price_history import PriceHistory
+
+logger = logging.getLogger(__name__)
+
+
+class MarketSnapshotService:
+    """Shared, periodically refreshed symbol -> market data index."""
+
+    def __init__(self, client, stream=None):
+        """
+        Args:
+            client: Provider client with get_market_listing(max_coins) and get_prices(symbols)
+                (CryptoCompareClient)
+            stream: Optional MarketStreamService with live prices
+        """
+        self.client = client
+        self.stream = stream
+        self.size = int(os.getenv('MARKET_SNAPSHOT_SIZE', '1000'))
+        self.refresh_seconds = float(os.getenv('MARKET_SNAPSHOT_REFRESH_SECONDS', '60'))
+        self.index: Dict[str, Dict] = {}
+        self.unquoted: set = set()  # Symbols the price endpoint had no quote for (until next refresh)
+        self.history = PriceHistory()
+        self.refreshed_at: Optional[datetime] = None
+        self._refreshed_monotonic = 0.0
+        self._refresh_lock: Optional[asyncio.Lock] = None
+        self.listeners: List[Callable[[], Awaitable]] = []
+        self._listener_tasks: set = set()
+        self.stats = {'refreshes': 0, 'refresh_errors': 0, 'lookups': 0, 'misses_fetched': 0, 'stream_hits': 0}
+
+    @property
+    def is_stale(self) -> bool:
+        return not self.index or time.monotonic() - self._refreshed_monotonic > self.refresh_seconds
+
+    async def refresh(self) -> int:
+        """Rebuild the index from the bulk listing. Returns the number of symbols indexed.
+
+        On failure the previous snapshot is kept.
+        """
+        try:
+            entries = await self.client.get_market_listing(self.size)
+        except Exception as e:
+            self.stats['refresh_errors'] += 1
+            logger.error(f"❌ Market snapshot refresh failed: {e}")
+            return len(self.index)
+
+        if not entries:
+            self.stats['refresh_errors'] += 1
+            logger.warning("⚠️ Market snapshot refresh returned no coins, keeping previous snapshot")
+            return len(self.index)
+
+        index = {}
+        for entry in entries:
+            # Listing is ordered by market cap: the highest-ranked coin keeps a shared symbol
+            index.setdefault(entry['symbol'], entry)
+
+        self.index = index
+        self.unquoted = set()
+        self.refreshed_at = datetime.now(timezone.utc)
+        self._refreshed_monotonic = time.monotonic()
+        self.history.record({symbol: entry['price'] for symbol, entry in index.items()})
+        self.stats['refreshes'] += 1
+        logger.info(f"📸 Market snapshot refreshed: {len(index)} symbols")
+        self._notify_listeners()
+        return len(index)
+
+    def add_listener(self, listener: Callable[[], Awaitable]):
+        """Run listener() (a coroutine function) after every successful refresh."""
+        self.listeners.append(listener)
+
+    def _notify_listeners(self):
+        # Listeners run as tasks so refresh() (and ensure_fresh() callers) do not wait for them
+        for listener in self.listeners:
+            task = asyncio.ensure_future(listener())
+            self._listener_tasks.add(task)
+            task.add_done_callback(self._listener_done)
+
+    def _listener_done(self, task: asyncio.Task):
+        self._listener_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"❌ Market snapshot listener failed: {task.exception()}")
+
+    async def ensure_fresh(self):
+        """Refresh if stale; concurrent callers share one refresh."""
+        if not self.is_stale:
+            return
+        if self._refresh_lock is None:
+            self._refresh_lock = asyncio.Lock()
+        async with self._refresh_lock:
+            if self.is_stale:
+                await self.refresh()
+
+    def _stream_price(self, symbol: str) -> Optional[float]:
+        price = self.stream.get_price(symbol) if self.stream is not None else None
+        if price is not None:
+            self.stats['stream_hits'] += 1
+        return price
+
+    def get(self, symbol: str) -> Optional[Dict]:
+        """Market entry of a symbol from the current snapshot (no I/O)."""
+        self.stats['lookups'] += 1
+        entry = self.index.get(symbol.upper())
+        price = self._stream_price(symbol)
+        if entry and price is not None:
+            return {**entry, 'price': price}
+        return entry
+
+    def get_price(self, symbol: str) -> Optional[float]:
+        entry = self.get(symbol)
+        return entry['price'] if entry else None
+
+    async def get_prices(self, symbols: Iterable[str]) -> Dict[str, float]:
+        """Current prices of arbitrary symbols.
+
+        Args:
+            symbols: Coin symbols
+
+        Returns dict mapping symbol -> price (symbols without any quote are omitted)
+        """
+        await self.ensure_fresh()
+        requested = list(dict.fromkeys(s.upper() for s in symbols))
+        self.stats['lookups'] += len(requested)
+
+        prices = {}
+        missing: List[str] = []
+        for symbol in requested:
+            entry = self.index.get(symbol)
+            price = self._stream_price(symbol)
+            if price is not None:
+                prices[symbol] = price
+            elif entry:
+                prices[symbol] = entry['price']
+            elif symbol not in self.unquoted:
+                missing.append(symbol)
+
+        if missing:
+            quotes = await self.client.get_prices(missing)
+            self.stats['misses_fetched'] += len(quotes)
+            for symbol, entry in quotes.items():
+                self.index[symbol] = entry
+                prices[symbol] = entry['price']
+            self.unquoted.update(symbol for symbol in missing if symbol not in quotes)
+
+        return prices
+
+    def get_stats(self) -> Dict:
+        return {
+            'symbols': len(self.index),
+            'refreshed_at': self.refreshed_at.isoformat() if self.refreshed_at else None,
+            'refresh_seconds': self.refresh_seconds,
+            'history': self.history.get_stats(),
+            **self.stats
+        }
@@ -0,0 +1,566 @@
+"""
+Streaming market data from exchange WebSockets (OKX, Bybit, Binance USDT perpetuals).
+
+All market data used to be REST-polled at scan time. MarketStreamService keeps
+public ticker, funding / mark price, open interest and 1m kline streams
+subscribed and maintains an in-memory latest-state table per symbol:
+
+- state[symbol][exchange]: latest price, 24h quote volume, funding rate, next
+  funding time, mark price and open interest, each with its receive time
+- closed 1m klines per (symbol, exchange) (MARKET_STREAM_KLINE_HISTORY)
+
+Readers (MarketSnapshotService prices for portfolio / alerts, the derivatives
+snapshot of MultiFuturesClient for scans) only use values younger than
+MARKET_STREAM_MAX_AGE_SECONDS and fall back to REST otherwise.
+
+Connections reconnect with jittered exponential backoff and resubscribe to the
+current symbol set; connections silent for MARKET_STREAM_STALE_SECONDS are
+recycled. Per-stream lag (receive time - exchange event time), message counts
+and reconnects are exposed via get_stats().
+
+Endpoints can be overridden (MARKET_STREAM_<NAME>_URL, e.g. for a local
+WebSocket stand-in). The service is opt-in: MARKET_STREAM_ENABLED=true.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# EWMA weight of the newest sample in the average lag
+LAG_EWMA_ALPHA = 0.1
+
+
+def _chunks(items: List, size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class ExchangeConnection:
+    """One exchange WebSocket endpoint: subscription messages and message parsing.
+
+    parse() returns events: (channel, symbol, fields, event_time, kline). kline is a
+    candle dict with a 'closed' flag or None; event_time is the exchange timestamp
+    in seconds (None if the message has none).
+    """
+
+    name = ''
+    exchange = ''
+    default_url = ''
+    ping_message: Optional[str] = None
+    batch_size = 10
+
+    def __init__(self, url: Optional[str] = None):
+        self.url = url or os.getenv(f'MARKET_STREAM_{self.name.upper()}_URL', self.default_url)
+
+    def topics(self, symbol: str) -> List:
+        raise NotImplementedError
+
+    def subscribe_messages(self, symbols: Iterable[str], unsubscribe: bool = False) -> List[str]:
+        raise NotImplementedError
+
+    def parse(self, message: Dict) -> List[Tuple[str, str, Dict, Optional[float], Optional[Dict]]]:
+        raise NotImplementedError
+
+
+class OKXPublicConnection(ExchangeConnection):
+    """OKX public channels: tickers, funding-rate, open-interest."""
+
+    name = 'okx'
+    exchange = 'okx'
+    default_url = 'wss://ws.okx.com:8443/ws/v5/public'
+    ping_message = 'ping'
+    batch_size = 30
+    channels = ('tickers', 'funding-rate', 'open-interest')
+
+    def topics(self, symbol: str) -> List[Dict]:
+        return [{'channel': channel, 'instId': f"{symbol}-USDT-SWAP"} for channel in self.channels]
+
+    def subscribe_messages(self, symbols, unsubscribe=False):
+        args = [topic for symbol in symbols for topic in self.topics(symbol)]
+        op = 'unsubscribe' if unsubscribe else 'subscribe'
+        return [json.dumps({'op': op, 'args': batch}) for batch in _chunks(args, self.batch_size)]
+
+    @staticmethod
+    def _symbol(inst_id: str) -> Optional[str]:
+        return inst_id[:-len('-USDT-SWAP')] if inst_id.endswith('-USDT-SWAP') else None
+
+    def parse(self, message):
+        if message.get('event') == 'error':
+            logger.warning(f"⚠️ OKX stream error: {message.get('msg')}")
+        arg = message.get('arg') or {}
+        channel = arg.get('channel')
+        events = []
+        for item in message.get('data') or []:
+            if channel == 'candle1m':
+                symbol = self._symbol(arg.get('instId', ''))
+                kline = {
+                    'timestamp': int(item[0]) // 1000,
+                    'open': float(item[1]),
+                    'high': float(item[2]),
+                    'low': float(item[3]),
+                    'close': float(item[4]),
+                    'volume': float(item[7]),
+                    'closed': item[8] == '1'
+                }
+                # Candle pushes carry no event time (item[0] is the candle's open time)
+                events.append((channel, symbol, {}, None, kline))
+                continue
+
+            symbol = self._symbol(item.get('instId', ''))
+            if channel == 'tickers':
+                fields = {'price': float(item['last']), 'volume_24h': float(item.get('volCcy24h') or 0) * float(item['last'])}
+            elif channel == 'funding-rate':
+                fields = {
+                    'funding_rate': float(item['fundingRate']) * 100,  # Percentage, as the REST clients
+                    'next_funding_time': int(item.get('nextFundingTime') or 0) / 1000
+                }
+            elif channel == 'open-interest':
+                fields = {'open_interest': float(item['oi'])}
+            else:
+                continue
+            event_time = int(item['ts']) / 1000 if item.get('ts') else None
+            events.append((channel, symbol, fields, event_time, None))
+        return events
+
+
+class OKXBusinessConnection(OKXPublicConnection):
+    """OKX candles (served on the business endpoint)."""
+
+    name = 'okx_business'
+    default_url = 'wss://ws.okx.com:8443/ws/v5/business'
+    channels = ('candle1m',)
+
+
+class BybitConnection(ExchangeConnection):
+    """Bybit linear perpetuals: tickers (price, funding, OI, mark price) and 1m klines."""
+
+    name = 'bybit'
+    exchange = 'bybit'
+    default_url = 'wss://stream.bybit.com/v5/public/linear'
+    ping_message = json.dumps({'op': 'ping'})
+    batch_size = 10
+
+    def __init__(self, url: Optional[str] = None):
+        super().__init__(url)
+        self._tickers: Dict[str, Dict] = {}
+
+    def topics(self, symbol: str) -> List[str]:
+        return [f"tickers.{symbol}USDT", f"kline.1.{symbol}USDT"]
+
+    def subscribe_messages(self, symbols, unsubscribe=False):
+        args = [topic for symbol in symbols for topic in self.topics(symbol)]
+        op = 'unsubscribe' if unsubscribe else 'subscribe'
+        return [json.dumps({'op': op, 'args': batch}) for batch in _chunks(args, self.batch_size)]
+
+    def parse(self, message):
+        if message.get('op') == 'subscribe' and message.get('success') is False:
+            logger.warning(f"⚠️ Bybit stream subscribe failed: {message.get('ret_msg')}")
+        topic = message.get('topic', '')
+        data = message.get('data')
+        event_time = message['ts'] / 1000 if message.get('ts') else None
+
+        if topic.startswith('tickers.'):
+            symbol = topic[len('tickers.'):]
+            if not symbol.endswith('USDT') or not isinstance(data, dict):
+                return []
+            mapping = {
+                'lastPrice': 'price',
+                'turnover24h': 'volume_24h',
+                'markPrice': 'mark_price',
+                'openInterest': 'open_interest'
+            }
+            fields = {field: float(data[key]) for key, field in mapping.items() if data.get(key) not in (None, '')}
+            if data.get('fundingRate') not in (None, ''):
+                fields['funding_rate'] = float(data['fundingRate']) * 100
+            if data.get('nextFundingTime') not in (None, ''):
+                fields['next_funding_time'] = int(data['nextFundingTime']) / 1000
+            # Delta messages only carry changed fields: merge them into the full ticker
+            ticker = self._tickers.setdefault(symbol, {})
+            if message.get('type') == 'snapshot':
+                ticker.clear()
+            ticker.update(fields)
+            return [('tickers', symbol[:-len('USDT')], dict(ticker), event_time, None)]
+
+        if topic.startswith('kline.'):
+            symbol = topic.split('.')[-1]
+            if not symbol.endswith('USDT'):
+                return []
+            return [
+                ('kline', symbol[:-len('USDT')], {}, event_time, {
+                    'timestamp': int(item['start']) // 1000,
+                    'open': float(item['open']),
+                    'high': float(item['high']),
+                    'low': float(item['low']),
+                    'close': float(item['close']),
+                    'volume': float(item['turnover']),
+                    'closed': bool(item.get('confirm'))
+                })
+                for item in data or []
+            ]
+        return []
+
+
+class BinanceConnection(ExchangeConnection):
+    """Binance USD-M futures combined streams: 24h ticker, mark price (funding) and 1m klines."""
+
+    name = 'binance'
+    exchange = 'binance'
+    default_url = 'wss://fstream.binance.com/stream'
+    batch_size = 50
+
+    def __init__(self, url: Optional[str] = None):
+        super().__init__(url)
+        self._request_id = 0
+
+    def topics(self, symbol: str) -> List[str]:
+        stream = f"{symbol.lower()}usdt"
+        return [f"{stream}@ticker", f"{stream}@markPrice@1s", f"{stream}@kline_1m"]
+
+    def subscribe_messages(self, symbols, unsubscribe=False):
+        params = [topic for symbol in symbols for topic in self.topics(symbol)]
+        messages = []
+        for batch in _chunks(params, self.batch_size):
+            self._request_id += 1
+            messages.append(json.dumps({
+                'method': 'UNSUBSCRIBE' if unsubscribe else 'SUBSCRIBE',
+                'params': batch,
+                'id': self._request_id
+            }))
+        return messages
+
+    def parse(self, message):
+        data = message.get('data')
+        if not isinstance(data, dict):
+            return []
+        binance_symbol = data.get('s', '')
+        if not binance_symbol.endswith('USDT'):
+            return []
+        symbol = binance_symbol[:-len('USDT')]
+        event_time = data['E'] / 1000 if data.get('E') else None
+        event_type = data.get('e')
+
+        if event_type == '24hrTicker':
+            return [('ticker', symbol, {'price': float(data['c']), 'volume_24h': float(data['q'])}, event_time, None)]
+        if event_type == 'markPriceUpdate':
+            return [('markPrice', symbol, {
+                'mark_price': float(data['p']),
+                'funding_rate': float(data['r'] or 0) * 100,
+                'next_funding_time': int(data.get('T') or 0) / 1000
+            }, event_time, None)]
+        if event_type == 'kline':
+            k = data['k']
+            return [('kline', symbol, {}, event_time, {
+                'timestamp': int(k['t']) // 1000,
+                'open': float(k['o']),
+                'high': float(k['h']),
+                'low': float(k['l']),
+                'close': float(k['c']),
+                'volume': float(k['q']),
+                'closed': bool(k['x'])
+            })]
+        return []
+
+
+CONNECTION_TYPES = {
+    'okx': (OKXPublicConnection, OKXBusinessConnection),
+    'bybit': (BybitConnection,),
+    'binance': (BinanceConnection,)
+}
+
+
+class MarketStreamService:
+    """Exchange WebSocket subscriptions feeding a per-symbol latest-state table."""
+
+    def __init__(self, exchanges: Optional[Iterable[str]] = None, urls: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            exchanges: Exchanges to stream (default MARKET_STREAM_EXCHANGES, okx,bybit,binance)
+            urls: Endpoint overrides by connection name ('okx', 'okx_business', 'bybit', 'binance')
+        """
+        self.enabled = os.getenv('MARKET_STREAM_ENABLED', 'false').lower() == 'true'
+        if exchanges is None:
+            exchanges = [e.strip() for e in os.getenv('MARKET_STREAM_EXCHANGES', 'okx,bybit,binance').split(',') if e.strip()]
+        urls = urls or {}
+        self.connections: List[ExchangeConnection] = [
+            connection_type(urls.get(connection_type.name))
+            for exchange in exchanges
+            for connection_type in CONNECTION_TYPES.get(exchange, ())
+        ]
+
+        self.max_age = float(os.getenv('MARKET_STREAM_MAX_AGE_SECONDS', '30'))
+        # Funding is pushed less often (OKX: every 30-90s)
+        funding_max_age = float(os.getenv('MARKET_STREAM_FUNDING_MAX_AGE_SECONDS', '180'))
+        self.field_max_age = {'funding_rate': funding_max_age, 'next_funding_time': funding_max_age}
+        self.ping_interval = float(os.getenv('MARKET_STREAM_PING_SECONDS', '20'))
+        self.stale_seconds = float(os.getenv('MARKET_STREAM_STALE_SECONDS', '60'))
+        self.min_backoff = float(os.getenv('MARKET_STREAM_MIN_BACKOFF_SECONDS', '1'))
+        self.max_backoff = float(os.getenv('MARKET_STREAM_MAX_BACKOFF_SECONDS', '60'))
+        self.kline_history = int(os.getenv('MARKET_STREAM_KLINE_HISTORY', '240'))
+        # Streamed symbols: top MARKET_STREAM_TOP_N by market cap plus MARKET_STREAM_SYMBOLS
+        self.top_n = int(os.getenv('MARKET_STREAM_TOP_N', '100'))
+        self.extra_symbols = [s.strip().upper() for s in os.getenv('MARKET_STREAM_SYMBOLS', '').split(',') if s.strip()]
+
+        # symbol -> exchange -> {'values': {field: value}, 'updated': {field: receive time}}
+        self.state: Dict[str, Dict[str, Dict]] = {}
+        # (symbol, exchange) -> closed 1m candles, oldest first
+        self.klines: Dict[Tuple[str, str], deque] = {}
+        self.symbols: Dict[str, set] = {exchange: set() for exchange in CONNECTION_TYPES}
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._sockets: Dict[str, aiohttp.ClientWebSocketResponse] = {}
+        self._subscribed: Dict[str, set] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._running = False
+        self.connection_stats = {
+            connection.name: {'connected': False, 'connects': 0, 'reconnects': 0, 'last_error': None}
+            for connection in self.connections
+        }
+        self.stream_stats: Dict[str, Dict] = {}
+
+    # ---------- lifecycle ----------
+
+    async def start(self):
+        if self._running:
+            return
+        self._running = True
+        # Own session: long-lived sockets should not hold slots of the REST connection pool
+        self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=None, sock_connect=10))
+        self._tasks = [asyncio.create_task(self._run(connection)) for connection in self.connections]
+        logger.info(f"📡 Market stream started: {', '.join(c.name for c in self.connections)}")
+
+    async def stop(self):
+        self._running = False
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def set_symbols(self, exchange: str, symbols: Iterable[str]):
+        """Set the symbols streamed from an exchange (subscriptions of open connections are updated)."""
+        self.symbols[exchange] = {symbol.upper() for symbol in symbols}
+        for connection in self.connections:
+            if connection.exchange == exchange and connection.name in self._sockets:
+                await self._sync_subscriptions(connection, self._sockets[connection.name])
+
+    async def sync_symbols(self, ranked_symbols: Iterable[str], listings: Dict[str, Iterable[str]]):
+        """Stream the top symbols (plus the configured extras) from every exchange listing them.
+
+        Args:
+            ranked_symbols: Symbols ordered by market cap
+            listings: Exchange -> symbols with a USDT perpetual (exchanges without a listing keep their symbols)
+        """
+        wanted = list(dict.fromkeys([s.upper() for s in ranked_symbols][:self.top_n] + self.extra_symbols))
+        for exchange, listed in listings.items():
+            if exchange in self.symbols:
+                listed = set(listed)
+                await self.set_symbols(exchange, [symbol for symbol in wanted if symbol in listed])
+        counts = ", ".join(f"{exchange} {len(symbols)}" for exchange, symbols in self.symbols.items())
+        logger.info(f"📡 Market stream symbols: {counts}")
+
+    # ---------- connection loop ----------
+
+    async def _run(self, connection: ExchangeConnection):
+        backoff = self.min_backoff
+        stats = self.connection_stats[connection.name]
+        while self._running:
+            try:
+                async with self._session.ws_connect(connection.url, autoping=True) as ws:
+                    stats['connected'] = True
+                    stats['connects'] += 1
+                    self._sockets[connection.name] = ws
+                    self._subscribed[connection.name] = set()
+                    await self._sync_subscriptions(connection, ws)
+                    logger.info(f"📡 {connection.name} stream connected ({len(self._subscribed[connection.name])} symbols)")
+                    backoff = self.min_backoff
+                    await self._read(connection, ws)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                stats['last_error'] = f"{type(e).__name__}: {e}"
+                logger.warning(f"⚠️ {connection.name} stream error: {stats['last_error']}")
+            finally:
+                stats['connected'] = False
+                self._sockets.pop(connection.name, None)
+
+            if not self._running:
+                break
+            stats['reconnects'] += 1
+            await asyncio.sleep(backoff * random.uniform(0.5, 1.0))
+            backoff = min(backoff * 2, self.max_backoff)
+
+    async def _sync_subscriptions(self, connection: ExchangeConnection, ws):
+        """Subscribe new symbols and unsubscribe removed ones (all symbols after a reconnect)."""
+        subscribed = self._subscribed.setdefault(connection.name, set())
+        wanted = self.symbols.get(connection.exchange, set())
+        added = sorted(wanted - subscribed)
+        removed = sorted(subscribed - wanted)
+        for message in connection.subscribe_messages(removed, unsubscribe=True) if removed else []:
+            await ws.send_str(message)
+        for message in connection.subscribe_messages(added) if added else []:
+            await ws.send_str(message)
+        subscribed.difference_update(removed)
+        subscribed.update(added)
+
+    async def _read(self, connection: ExchangeConnection, ws):
+        last_message = last_ping = time.monotonic()
+        while self._running:
+            timeout = max(0.1, last_ping + self.ping_interval - time.monotonic())
+            try:
+                message = await ws.receive(timeout=timeout)
+            except asyncio.TimeoutError:
+                message = None
+
+            now = time.monotonic()
+            if message is not None:
+                if message.type == aiohttp.WSMsgType.TEXT:
+                    last_message = now
+                    self._handle(connection, message.data)
+                elif message.type in (aiohttp.WSMsgType.CLOSE, aiohttp.WSMsgType.CLOSING,
+                                      aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                    raise ConnectionError(f"socket closed ({message.type.name})")
+
+            # Without subscriptions an exchange may legitimately stay silent
+            if now - last_message > self.stale_seconds and self._subscribed.get(connection.name):
+                raise ConnectionError(f"no messages for {self.stale_seconds:.0f}s")
+            if now - last_ping >= self.ping_interval:
+                if connection.ping_message:
+                    await ws.send_str(connection.ping_message)
+                last_ping = now
+
+    def _handle(self, connection: ExchangeConnection, raw: str):
+        if raw == 'pong':
+            return
+        try:
+            message = json.loads(raw)
+            events = connection.parse(message) if isinstance(message, dict) else []
+        except (ValueError, KeyError, TypeError, IndexError) as e:
+            logger.debug(f"{connection.name} stream: unparseable message ({e}): {raw[:200]}")
+            return
+
+        received_at = time.time()
+        for channel, symbol, fields, event_time, kline in events:
+            if not symbol:
+                continue
+            self._record_lag(f"{connection.exchange}:{channel}", received_at, event_time)
+            if fields:
+                record = self.state.setdefault(symbol, {}).setdefault(
+                    connection.exchange, {'values': {}, 'updated': {}}
+                )
+                record['values'].update(fields)
+                for field in fields:
+                    record['updated'][field] = received_at
+            if kline is not None:
+                self._apply_kline(symbol, connection.exchange, kline, received_at)
+
+    def _apply_kline(self, symbol: str, exchange: str, kline: Dict, received_at: float):
+        record = self.state.setdefault(symbol, {}).setdefault(exchange, {'values': {}, 'updated': {}})
+        # The forming candle's close is the latest trade price when no ticker stream carries it
+        if 'price' not in record['values'] or received_at - record['updated'].get('price', 0) > self.max_age:
+            record['values']['price'] = kline['close']
+            record['updated']['price'] = received_at
+        if not kline['closed']:
+            return
+        history = self.klines.setdefault((symbol, exchange), deque(maxlen=self.kline_history))
+        candle = {key: value for key, value in kline.items() if key != 'closed'}
+        if history and history[-1]['timestamp'] == candle['timestamp']:
+            history[-1] = candle
+        elif not history or history[-1]['timestamp'] < candle['timestamp']:
+            history.append(candle)
+
+    def _record_lag(self, stream: str, received_at: float, event_time: Optional[float]):
+        stats = self.stream_stats.setdefault(stream, {
+            'messages': 0, 'lag_ms_last': None, 'lag_ms_avg': None, 'lag_ms_max': None, 'last_message_at': None
+        })
+        stats['messages'] += 1
+        stats['last_message_at'] = received_at
+        if event_time is None:
+            return
+        lag_ms = max(0.0, (received_at - event_time) * 1000)
+        stats['lag_ms_last'] = round(lag_ms, 1)
+        stats['lag_ms_max'] = round(max(lag_ms, stats['lag_ms_max'] or 0), 1)
+        previous = stats['lag_ms_avg']
+        stats['lag_ms_avg'] = round(lag_ms if previous is None else previous + LAG_EWMA_ALPHA * (lag_ms - previous), 1)
+
+    # ---------- latest-state readers ----------
+
+    def _fresh(self, record: Dict, field: str, max_age: Optional[float]) -> bool:
+        updated = record['updated'].get(field)
+        limit = self.field_max_age.get(field, self.max_age) if max_age is None else max_age
+        return updated is not None and time.time() - updated <= limit
+
+    def get_value(self, symbol: str, field: str, max_age: Optional[float] = None) -> Optional[Tuple[Any, str]]:
+        """Freshest value of a field across exchanges as (value, exchange), or None if stale."""
+        best = None
+        for exchange, record in self.state.get(symbol.upper(), {}).items():
+            if self._fresh(record, field, max_age):
+                updated = record['updated'][field]
+                if best is None or updated > best[2]:
+                    best = (record['values'][field], exchange, updated)
+        return best[:2] if best else None
+
+    def get_price(self, symbol: str, max_age: Optional[float] = None) -> Optional[float]:
+        value = self.get_value(symbol, 'price', max_age)
+        return value[0] if value else None
+
+    def get_derivatives_entry(self, exchange: str, symbol: str, max_age: Optional[float] = None) -> Optional[Dict]:
+        """Fresh open interest / funding / mark price of a symbol on one exchange (snapshot entry shape)."""
+        record = self.state.get(symbol.upper(), {}).get(exchange)
+        if not record:
+            return None
+        entry = {
+            field: record['values'][field]
+            for field in ('open_interest', 'funding_rate', 'next_funding_time', 'mark_price')
+            if self._fresh(record, field, max_age)
+        }
+        return entry or None
+
+    def get_klines(self, symbol: str, exchange: Optional[str] = None) -> List[Dict]:
+        """Closed 1m candles of a symbol (the exchange with the longest history by default)."""
+        if exchange:
+            return list(self.klines.get((symbol.upper(), exchange), ()))
+        histories = [history for (s, _), history in self.klines.items() if s == symbol.upper()]
+        return list(max(histories, key=len)) if histories else []
+
+    def get_state(self, symbol: str) -> Dict[str, Dict]:
+        """Latest values per exchange with their age in seconds."""
+        now = time.time()
+        return {
+            exchange: {
+                **record['values'],
+                'age_seconds': {field: round(now - updated, 1) for field, updated in record['updated'].items()}
+            }
+            for exchange, record in self.state.get(symbol.upper(), {}).items()
+        }
+
+    def get_stats(self) -> Dict:
+        now = time.time()
+        streams = {
+            stream: {
+                **{key: value for key, value in stats.items() if key != 'last_message_at'},
+                'last_message_age_seconds': round(now - stats['last_message_at'], 1) if stats['last_message_at'] else None
+            }
+            for stream, stats in self.stream_stats.items()
+        }
+        return {
+            'enabled': self.enabled,
+            'running': self._running,
+            'connections': {
+                name: {**stats, 'subscribed_symbols': len(self._subscribed.get(name, ()))}
+                for name, stats in self.connection_stats.items()
+            },
+            'streams': streams,
+            'symbols': len(self.state),
+            'max_age_seconds': self.max_age
+        }
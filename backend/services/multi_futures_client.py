@@ -3,21 +3,35 @@ from typing import Dict, Optional
 from datetime import datetime, timezone
 import logging
 import os
+import time
 
 from services.binance_futures_client import BinanceFuturesClient
 from services.bybit_futures_client import BybitFuturesClient
 from services.okx_futures_client import OKXFuturesClient
 from services.coinalyze_client import CoinalyzeClient
+from services.derivatives_cache import METRIC_FIELDS, DerivativesMetricsCache
+from services.http_transport import get_transport
+from services.negative_cache import NegativeCache
 
 logger = logging.getLogger(__name__)
 
+SNAPSHOT_RETRY_SECONDS = 60
+
 class MultiFuturesClient:
     """Multi-provider futures/derivatives client with automatic fallback.
     
     Tries providers in order: OKX (Primary) → Coinalyze (Backup) → Bybit → Binance
+    Providers known to have no derivatives market for a symbol are skipped (negative cache).
+    
+    Snapshot mode (DERIVATIVES_SNAPSHOT, default on): open interest and funding of every
+    perpetual come from exchange-wide ticker endpoints (OKX, Bybit, Binance), fetched once
+    per scan; only the long/short ratio is still requested per symbol.
+    
+    Results go through a per-metric TTL cache (services/derivatives_cache.py): funding until
+    the next funding time, open interest and long/short ratio for short TTLs.
     """
     
-    def __init__(self):
+    def __init__(self, db=None, stream=None):
         # Initialize all providers
         self.okx = OKXFuturesClient()
         self.coinalyze = CoinalyzeClient(api_key=os.getenv('COINALYZE_API_KEY'))
@@ -43,6 +57,33 @@ class MultiFuturesClient:
         # Cache successful provider per symbol
         self.symbol_providers = {}  # {symbol: provider_name}
         
+        # Persistent (provider, symbol, 'derivatives') misses. A "no data" result only counts
+        # as a miss if every request of the call was answered: the clients report request
+        # errors as "no data" too.
+        self.negative_cache = NegativeCache('futures', db)
+        self.skipped_calls = 0
+        
+        # Exchange-wide derivatives snapshot: {provider: {base symbol: metrics}}
+        self.snapshot_enabled = os.getenv('DERIVATIVES_SNAPSHOT', 'true').lower() == 'true'
+        self.snapshot_max_age = float(os.getenv('DERIVATIVES_SNAPSHOT_MAX_AGE_SECONDS', '300'))
+        self.snapshot_long_short = os.getenv('DERIVATIVES_SNAPSHOT_LONG_SHORT', 'true').lower() == 'true'
+        self.snapshot_providers = [
+            ('okx', self.okx),
+            ('bybit', self.bybit),
+            ('binance', self.binance)
+        ]
+        self.snapshot: Dict[str, Dict[str, Dict]] = {}
+        self._snapshot_monotonic = 0.0
+        self._snapshot_attempted = float('-inf')  # Failed refreshes are retried after SNAPSHOT_RETRY_SECONDS
+        self._snapshot_lock: Optional[asyncio.Lock] = None
+        self.snapshot_stats = {'refreshes': 0, 'refresh_errors': 0, 'hits': 0, 'unlisted': 0}
+        
+        # Optional MarketStreamService: fresh streamed OI / funding override snapshot entries
+        self.stream = stream
+        
+        # Per-metric TTL cache with single-flight fetches per symbol
+        self.metrics_cache = DerivativesMetricsCache()
+        
         logger.info(f"🔄 MultiFuturesClient initialized: OKX (Primary) → Coinalyze (Backup) → Bybit → Binance")
     
     async def close(self):
@@ -67,18 +108,200 @@ class MultiFuturesClient:
             'providers': self.stats,
             'symbol_providers': self.symbol_providers,
             'total_calls': sum(p['calls'] for p in self.stats.values()),
-            'total_success': sum(p['success'] for p in self.stats.values())
+            'total_success': sum(p['success'] for p in self.stats.values()),
+            'skipped_calls': self.skipped_calls,
+            'negative_cache': self.negative_cache.get_stats(),
+            'snapshot': {
+                'enabled': self.snapshot_enabled,
+                'age_seconds': round(time.monotonic() - self._snapshot_monotonic, 1) if self.snapshot else None,
+                'symbols': {name: len(index) for name, index in self.snapshot.items()},
+                **self.snapshot_stats
+            },
+            'metrics_cache': self.metrics_cache.get_stats()
         }
     
+    @property
+    def snapshot_is_stale(self) -> bool:
+        return not self.snapshot or time.monotonic() - self._snapshot_monotonic > self.snapshot_max_age
+    
+    async def refresh_snapshot(self) -> int:
+        """Fetch the exchange-wide derivatives snapshot (called once per scan).
+        
+        Providers whose request fails are left out (their symbols fall back to
+        per-symbol calls); if all fail the previous snapshot is kept.
+        
+        Returns:
+            Number of (provider, symbol) entries in the snapshot
+        """
+        self._snapshot_attempted = time.monotonic()
+        results = await asyncio.gather(
+            *(client.get_market_snapshot() for _, client in self.snapshot_providers),
+            return_exceptions=True
+        )
+        snapshot = {
+            name: result for (name, _), result in zip(self.snapshot_providers, results)
+            if isinstance(result, dict) and result
+        }
+        if not snapshot:
+            self.snapshot_stats['refresh_errors'] += 1
+            logger.warning("⚠️ Derivatives snapshot refresh failed on all exchanges")
+            return sum(len(index) for index in self.snapshot.values())
+        
+        self.snapshot = snapshot
+        self._snapshot_monotonic = time.monotonic()
+        self.snapshot_stats['refreshes'] += 1
+        counts = ", ".join(f"{name} {len(index)}" for name, index in snapshot.items())
+        logger.info(f"📸 Derivatives snapshot refreshed: {counts}")
+        return sum(len(index) for index in snapshot.values())
+    
+    async def _ensure_snapshot(self):
+        """Refresh the snapshot if stale; concurrent callers share one refresh."""
+        if not self.snapshot_is_stale or time.monotonic() - self._snapshot_attempted < SNAPSHOT_RETRY_SECONDS:
+            return
+        if self._snapshot_lock is None:
+            self._snapshot_lock = asyncio.Lock()
+        async with self._snapshot_lock:
+            if self.snapshot_is_stale and time.monotonic() - self._snapshot_attempted >= SNAPSHOT_RETRY_SECONDS:
+                await self.refresh_snapshot()
+    
+    def _snapshot_entry(self, provider_name: str, base: str) -> Optional[Dict]:
+        """Snapshot entry of a symbol on an exchange, updated with fresh streamed values."""
+        entry = self.snapshot.get(provider_name, {}).get(base)
+        streamed = self.stream.get_derivatives_entry(provider_name, base) if self.stream is not None else None
+        if streamed:
+            return {**(entry or {}), **streamed}
+        return entry
+    
+    @staticmethod
+    def _add_funding_fields(metrics: Dict):
+        """Liquidation risk and funding direction from the funding rate (as the provider clients do)."""
+        if 'funding_rate' not in metrics:
+            return
+        funding_abs = abs(metrics['funding_rate'])
+        if funding_abs > 0.1:
+            metrics['liquidation_risk'] = 'high'
+        elif funding_abs > 0.05:
+            metrics['liquidation_risk'] = 'medium'
+        else:
+            metrics['liquidation_risk'] = 'low'
+        metrics['funding_direction'] = 'longs_pay' if metrics['funding_rate'] > 0 else 'shorts_pay'
+    
+    async def _get_snapshot_metrics(self, symbol: str) -> Optional[Dict]:
+        """Metrics of a symbol from the first exchange listing it in the snapshot."""
+        base = symbol.upper()
+        for provider_name, client in self.snapshot_providers:
+            entry = self._snapshot_entry(provider_name, base)
+            if entry is None:
+                continue
+            
+            metrics = {
+                'symbol': symbol,
+                'has_derivatives_data': True,
+                'provider': provider_name,
+                'source': 'snapshot',
+                'timestamp': datetime.now(timezone.utc).timestamp(),
+                **entry
+            }
+            self._add_funding_fields(metrics)
+            
+            # The long/short ratio has no exchange-wide endpoint
+            if self.snapshot_long_short:
+                long_short = await client.get_long_short_ratio(symbol)
+                if isinstance(long_short, dict):
+                    metrics['long_short_ratio'] = long_short.get('long_short_ratio', 1.0)
+                    metrics['long_account_percent'] = long_short.get('long_account_percent', 50)
+                    metrics['short_account_percent'] = long_short.get('short_account_percent', 50)
+            
+            self._record_call(provider_name, True)
+            self.symbol_providers[symbol] = provider_name
+            self.snapshot_stats['hits'] += 1
+            return metrics
+        return None
+    
     async def get_all_derivatives_metrics(self, symbol: str) -> Dict:
         """Get derivatives metrics with automatic provider fallback.
         
+        Metrics within their TTL are served from the metrics cache; expired ones are
+        refetched from the provider that served the symbol. Concurrent calls for a
+        symbol share one fetch.
+        
         Args:
             symbol: Trading pair symbol (e.g., 'BTC')
             
         Returns:
             Dict with derivatives metrics or empty dict if all providers fail
         """
+        fresh = self.metrics_cache.lookup(symbol)
+        if len(fresh) == len(METRIC_FIELDS):
+            return self.metrics_cache.assemble(symbol, fresh)
+        return await self.metrics_cache.single_flight(symbol, lambda: self._load_metrics(symbol, fresh))
+    
+    async def _load_metrics(self, symbol: str, fresh: Dict[str, Dict]) -> Dict:
+        """Fetch the metrics missing from the cache and cache them."""
+        provider_name = self.metrics_cache.provider(symbol)
+        if fresh and provider_name in self.stats:
+            expired = [metric for metric in METRIC_FIELDS if metric not in fresh]
+            metrics = await self._fetch_expired_metrics(provider_name, symbol, expired)
+            if any(field in metrics for metric in expired for field in METRIC_FIELDS[metric]):
+                fresh = {**fresh, **self.metrics_cache.store(symbol, metrics, expired)}
+            return self.metrics_cache.assemble(symbol, fresh)
+        
+        metrics = await self._fetch_all_metrics(symbol)
+        # Failures are not cached (symbols without markets are in the negative cache)
+        if metrics.get('has_derivatives_data'):
+            self.metrics_cache.store(symbol, metrics)
+        return metrics
+    
+    async def _fetch_expired_metrics(self, provider_name: str, symbol: str, expired) -> Dict:
+        """Refetch only the expired metrics of a symbol from one provider.
+        
+        Open interest and funding come from the exchange-wide snapshot when it lists the symbol.
+        """
+        client = getattr(self, provider_name)
+        metrics = {
+            'symbol': symbol,
+            'provider': provider_name,
+            'timestamp': datetime.now(timezone.utc).timestamp()
+        }
+        
+        entry = None
+        if self.snapshot_enabled and not self.snapshot_is_stale:
+            entry = self._snapshot_entry(provider_name, symbol.upper())
+        fetchers = {
+            'open_interest': client.get_open_interest,
+            'funding': client.get_funding_rate,
+            'long_short': client.get_long_short_ratio
+        }
+        to_fetch = []
+        for metric in expired:
+            if entry and metric != 'long_short' and METRIC_FIELDS[metric][0] in entry:
+                metrics.update({field: entry[field] for field in METRIC_FIELDS[metric] if field in entry})
+            elif metric != 'long_short' or not self.snapshot_enabled or self.snapshot_long_short:
+                to_fetch.append(metric)
+        
+        results = await asyncio.gather(*(fetchers[metric](symbol) for metric in to_fetch), return_exceptions=True)
+        for metric, result in zip(to_fetch, results):
+            if isinstance(result, dict):
+                metrics.update({field: result[field] for field in METRIC_FIELDS[metric] if field in result})
+        self._add_funding_fields(metrics)
+        
+        if to_fetch:
+            self._record_call(provider_name, any(isinstance(result, dict) for result in results))
+        return metrics
+    
+    async def _fetch_all_metrics(self, symbol: str) -> Dict:
+        """Fetch all metrics of a symbol: snapshot first, then providers in fallback order."""
+        # Exchanges in a fresh snapshot that don't list the symbol are not asked again
+        unlisted = set()
+        if self.snapshot_enabled:
+            await self._ensure_snapshot()
+            if not self.snapshot_is_stale:
+                metrics = await self._get_snapshot_metrics(symbol)
+                if metrics:
+                    return metrics
+                unlisted = set(self.snapshot)
+                self.snapshot_stats['unlisted'] += 1
+        
         # Check if we have a known good provider for this symbol
         if symbol in self.symbol_providers:
             preferred_provider = self.symbol_providers[symbol]
@@ -92,20 +315,40 @@ class MultiFuturesClient:
         else:
             providers_to_try = self.providers
         
-        for provider_name, client in providers_to_try:
+        # Skip providers known to have no market for this symbol
+        available = [
+            (name, client) for name, client in providers_to_try
+            if name not in unlisted and not self.negative_cache.is_negative(name, symbol, 'derivatives')
+        ]
+        self.skipped_calls += len(providers_to_try) - len(available)
+        if not available:
+            logger.debug(f"🚫 {symbol}: no derivatives markets (negative cache)")
+            return {
+                'symbol': symbol,
+                'has_derivatives_data': False,
+                'error': 'No derivatives markets (cached)',
+                'timestamp': datetime.now(timezone.utc).timestamp()
+            }
+        
+        for provider_name, client in available:
             try:
                 logger.debug(f"📡 Trying {provider_name} for {symbol} derivatives data...")
                 
-                metrics = await client.get_all_derivatives_metrics(symbol)
+                with get_transport().track_answers() as outcomes:
+                    metrics = await client.get_all_derivatives_metrics(symbol)
                 
                 self._record_call(provider_name, metrics.get('has_derivatives_data', False))
                 
                 if metrics.get('has_derivatives_data'):
                     # Success! Cache this provider for this symbol
                     self.symbol_providers[symbol] = provider_name
+                    self.negative_cache.clear(provider_name, symbol, 'derivatives')
                     logger.info(f"✅ {provider_name}: Got derivatives data for {symbol}")
                     return metrics
                 else:
+                    # Only a definite "no market" is cached, not timeouts / 5xx swallowed by the client
+                    if outcomes.all_answered:
+                        self.negative_cache.record_miss(provider_name, symbol, 'derivatives')
                     logger.debug(f"⚠️ {provider_name}: No data for {symbol}, trying next provider...")
                     
             except Exception as e:
@@ -3,10 +3,15 @@ from typing import List, Dict, Optional, Tuple
 from datetime import datetime, timezone
 import logging
 import os
+import time
 
 from services.coinmarketcap_client import CoinMarketCapClient
 from services.coingecko_client import CoinGeckoClient
 from services.cryptocompare_client import CryptoCompareClient
+from services.candle_store import CandleStore
+from services.http_transport import get_transport
+from services.provider_health import ProviderRouter
+from services.provider_id_map import ProviderIdMap
 
 logger = logging.getLogger(__name__)
 
@@ -14,16 +19,20 @@ class MultiProviderClient:
     """Multi-provider crypto data client with automatic fallback.
     
     Features:
-    - Primary and backup provider configuration
-    - Automatic failover on rate limits or errors
-    - Provider health tracking
+    - Primary and backup provider configuration (preference order on equal health)
+    - Per-provider, per-operation circuit breakers (closed / open / half-open)
+    - Health-scored routing: the fastest healthy provider is tried first
+    - Optional hedged candle requests (PROVIDER_HEDGING=true)
     - Usage statistics
     """
     
-    def __init__(self):
+    def __init__(self, db=None):
+        # Persistent symbol -> provider ID maps (stored in the database when one is given)
+        self.id_map = ProviderIdMap(db)
+        
         # Initialize providers
-        self.coinmarketcap = CoinMarketCapClient(api_key=os.getenv('COINMARKETCAP_API_KEY'))
-        self.coingecko = CoinGeckoClient(api_key=os.getenv('COINGECKO_API_KEY'))
+        self.coinmarketcap = CoinMarketCapClient(api_key=os.getenv('COINMARKETCAP_API_KEY'), id_map=self.id_map)
+        self.coingecko = CoinGeckoClient(api_key=os.getenv('COINGECKO_API_KEY'), id_map=self.id_map)
         self.cryptocompare = CryptoCompareClient(api_key=os.getenv('CRYPTOCOMPARE_API_KEY'))
         
         # Configuration
@@ -39,12 +48,41 @@ class MultiProviderClient:
         
         # Statistics tracking
         self.stats = {
-            'coinmarketcap': {'calls': 0, 'errors': 0, 'rate_limits': 0},
-            'coingecko': {'calls': 0, 'errors': 0, 'rate_limits': 0},
-            'cryptocompare': {'calls': 0, 'errors': 0, 'rate_limits': 0}
+            'coinmarketcap': {'calls': 0, 'errors': 0, 'rate_limits': 0, 'not_found': 0},
+            'coingecko': {'calls': 0, 'errors': 0, 'rate_limits': 0, 'not_found': 0},
+            'cryptocompare': {'calls': 0, 'errors': 0, 'rate_limits': 0, 'not_found': 0}
+        }
+        
+        # Candidate providers per operation, in configured preference order
+        preference = [self.primary_provider, self.backup_provider] + [
+            name for name in self.providers if name not in (self.primary_provider, self.backup_provider)
+        ]
+        self.operation_providers = {
+            'listing': [self.primary_provider, self.backup_provider],
+            'daily_candles': preference,
+            '4h_candles': preference
         }
+        self.router = ProviderRouter(preference)
+        
+        # Hedged candle requests (tail-latency control), capped by a hedge budget
+        self.hedging_enabled = os.getenv('PROVIDER_HEDGING', 'false').lower() == 'true'
+        self.hedge_budget_ratio = float(os.getenv('HEDGE_BUDGET_RATIO', '0.1'))
+        self.hedge_burst = float(os.getenv('HEDGE_BUDGET_BURST', '5'))
+        self.hedge_min_delay = float(os.getenv('HEDGE_MIN_DELAY_SECONDS', '0.25'))
+        self.hedge_default_delay = float(os.getenv('HEDGE_DEFAULT_DELAY_SECONDS', '2.0'))
+        self.hedge_tokens = self.hedge_burst
+        self.hedge_stats = {'fired': 0, 'won': 0, 'skipped_budget': 0}
+        
+        # Short-lived cache of the merged coin listing: (fetched_at, max_coins, coins)
+        self.listing_cache_ttl = float(os.getenv('LISTING_CACHE_TTL_SECONDS', '60'))
+        self._listing_cache: Optional[Tuple[float, int, List[tuple]]] = None
+        self._listing_lock: Optional[asyncio.Lock] = None
+        self.listing_cache_stats = {'hits': 0, 'misses': 0}
         
-        # Current active provider
+        # Daily / 4h candles shared by scans, prediction evaluation, outcome tracking and alerts
+        self.candle_store = CandleStore()
+        
+        # Provider that served the last coin listing
         self.current_provider = self.primary_provider
         
         logger.info(f"🔄 MultiProviderClient initialized: Primary={self.primary_provider}, Backup={self.backup_provider}")
@@ -55,6 +93,16 @@ class MultiProviderClient:
         await self.coingecko.close()
         await self.cryptocompare.close()
     
+    async def warm_id_maps(self, force: bool = False):
+        """Load the persistent ID maps, re-warming stale or missing ones from the providers' map endpoints.
+        
+        Args:
+            force: Re-warm even if the stored maps are still fresh
+        """
+        if self.coinmarketcap.api_key:
+            await self.id_map.warm('coinmarketcap', self.coinmarketcap.get_id_map, force=force)
+        await self.id_map.warm('coingecko', self.coingecko.get_id_map, force=force)
+    
     def _get_provider(self, provider_name: str):
         """Get provider instance by name."""
         return self.providers.get(provider_name)
@@ -71,13 +119,10 @@ class MultiProviderClient:
             if is_rate_limit:
                 self.stats[provider_name]['rate_limits'] += 1
     
-    def _switch_provider(self):
-        """Switch to backup provider."""
-        if self.current_provider == self.primary_provider:
-            self.current_provider = self.backup_provider
-            logger.warning(f"🔄 Switching from {self.primary_provider} to {self.backup_provider}")
-        else:
-            logger.error(f"⚠️ Backup provider {self.backup_provider} also failed!")
+    def _record_not_found(self, provider_name: str):
+        """Record an empty answer (symbol not listed by the provider)."""
+        if provider_name in self.stats:
+            self.stats[provider_name]['not_found'] += 1
     
     def get_stats(self) -> Dict:
         """Get provider usage statistics."""
@@ -85,122 +130,240 @@ class MultiProviderClient:
             'current_provider': self.current_provider,
             'primary_provider': self.primary_provider,
             'backup_provider': self.backup_provider,
-            'stats': self.stats
+            'stats': self.stats,
+            'routing': self.router.get_status(),
+            'id_maps': self.id_map.get_stats(),
+            'listing_cache': {
+                'ttl_seconds': self.listing_cache_ttl,
+                **self.listing_cache_stats
+            },
+            'candle_store': self.candle_store.get_stats(),
+            'hedging': {
+                'enabled': self.hedging_enabled,
+                'budget_ratio': self.hedge_budget_ratio,
+                **self.hedge_stats
+            }
         }
     
-    async def get_all_coins(self, max_coins: int = 100) -> List[tuple]:
-        """Fetch top coins with automatic provider fallback and timeout protection.
+    def _take_hedge_token(self) -> bool:
+        """Spend one hedge from the budget (HEDGE_BUDGET_RATIO hedges per routed call)."""
+        if self.hedge_tokens >= 1:
+            self.hedge_tokens -= 1
+            return True
+        self.hedge_stats['skipped_budget'] += 1
+        return False
+    
+    def _hedge_delay(self, provider_name: str, operation: str) -> float:
+        """p90 latency of the provider for this operation, or HEDGE_DEFAULT_DELAY without history."""
+        p90 = self.router.latency_quantile(provider_name, operation, 0.9)
+        if p90 is None:
+            return self.hedge_default_delay
+        return max(self.hedge_min_delay, p90)
+    
+    async def _attempt(self, provider_name: str, operation: str, method_name: str, *args) -> Optional[list]:
+        """One provider call; records stats and health, returns the data or None on failure.
+        
+        The clients return [] both for errors they caught and for symbols they don't
+        list. Only requests that failed (exception, timeout, 429 / 5xx) count against
+        the provider; an empty answer without one is a neutral "not found".
+        """
+        provider = self._get_provider(provider_name)
+        start = time.monotonic()
+        try:
+            with get_transport().track_answers() as outcomes:
+                data = await getattr(provider, method_name)(*args)
+            
+            self._record_call(provider_name)
+            
+            if data and len(data) > 0:
+                self.router.record(provider_name, operation, True, time.monotonic() - start)
+                return data
+            
+            if outcomes.failed:
+                logger.warning(f"⚠️ {provider_name} {operation} failed for {args[0] if args else ''}")
+                self._record_error(provider_name)
+                self.router.record(provider_name, operation, False, time.monotonic() - start)
+            else:
+                logger.info(f"{provider_name} has no {operation} data for {args[0] if args else ''}")
+                self._record_not_found(provider_name)
+                self.router.release(provider_name, operation)
+            
+        except asyncio.CancelledError:
+            # Lost a hedge race: no outcome to record
+            self.router.release(provider_name, operation)
+            raise
+        except Exception as e:
+            error_msg = str(e).lower()
+            is_rate_limit = 'rate limit' in error_msg or '429' in error_msg
+            
+            self._record_error(provider_name, is_rate_limit)
+            self.router.record(provider_name, operation, False, time.monotonic() - start)
+            
+            if is_rate_limit:
+                logger.warning(f"⚠️ {provider_name} rate limit exceeded for {operation}")
+            else:
+                logger.error(f"❌ {provider_name} {operation} error: {e}")
+        return None
+    
+    async def _call_with_routing(self, operation: str, method_name: str, *args,
+                                 hedge: bool = False) -> Tuple[Optional[str], list]:
+        """Call the healthiest available provider of an operation, falling back in rank order.
+        
+        Providers whose circuit breaker is open are skipped without a request, so a
+        dead provider no longer adds its timeout to every call. Exceptions, timeouts
+        and 429 / 5xx responses count as failures of the provider; an empty answer
+        ("not found") counts neither way, and the next provider is tried.
+        
+        With hedge=True, if the provider in flight hasn't answered within its p90
+        latency, the same request is also sent to the next available provider (at
+        most once per call, within the hedge budget); the first valid response
+        wins and the other request is cancelled.
         
         Args:
-            max_coins: Maximum number of coins to fetch
+            operation: Routing operation ('listing', 'daily_candles', '4h_candles')
+            method_name: Provider client method to call
+            hedge: Allow a hedged request
         
-        Returns list of tuples: (symbol, name, current_price_usd)
+        Returns (provider_name, data), or (None, []) when every provider failed
         """
-        providers_to_try = [self.current_provider]
+        candidates = iter(self.router.rank(operation, self.operation_providers[operation]))
+        pending: Dict[asyncio.Task, str] = {}
         
-        # If current is primary, also try backup
-        if self.current_provider == self.primary_provider:
-            providers_to_try.append(self.backup_provider)
+        def launch_next() -> Optional[str]:
+            for provider_name in candidates:
+                provider = self._get_provider(provider_name)
+                if not provider or not hasattr(provider, method_name):
+                    continue
+                if not self.router.allow_request(provider_name, operation):
+                    continue
+                task = asyncio.ensure_future(self._attempt(provider_name, operation, method_name, *args))
+                pending[task] = provider_name
+                return provider_name
+            return None
         
-        for provider_name in providers_to_try:
-            provider = self._get_provider(provider_name)
-            if not provider:
-                continue
-            
-            try:
-                logger.info(f"📡 Fetching coins from {provider_name}...")
-                coins = await provider.get_all_coins(max_coins)
-                
-                self._record_call(provider_name)
-                
-                if coins and len(coins) > 0:
-                    logger.info(f"✅ Success: {len(coins)} coins from {provider_name}")
-                    self.current_provider = provider_name  # Update current provider
-                    return coins
-                else:
-                    logger.warning(f"⚠️ {provider_name} returned no coins")
-                    self._record_error(provider_name)
-                    
-            except Exception as e:
-                error_msg = str(e).lower()
-                is_rate_limit = 'rate limit' in error_msg or '429' in error_msg
-                
-                self._record_error(provider_name, is_rate_limit)
+        first_provider = launch_next()
+        if hedge and first_provider:
+            self.hedge_tokens = min(self.hedge_burst, self.hedge_tokens + self.hedge_budget_ratio)
+        hedge_delay = self._hedge_delay(first_provider, operation) if hedge and first_provider else None
+        hedged = False
+        
+        try:
+            while pending:
+                timeout = hedge_delay if not hedged else None
+                done, _ = await asyncio.wait(list(pending), timeout=timeout,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Slower than p90: hedge to the next provider if the budget allows
+                    hedged = True
+                    if self._take_hedge_token():
+                        hedge_provider = launch_next()
+                        if hedge_provider:
+                            self.hedge_stats['fired'] += 1
+                            logger.debug(f"🪁 Hedging {operation} {args[0]} to {hedge_provider} "
+                                         f"after {hedge_delay:.2f}s")
+                        else:
+                            self.hedge_tokens += 1  # nothing to hedge to
+                    continue
                 
-                if is_rate_limit:
-                    logger.warning(f"⚠️ {provider_name} rate limit exceeded")
-                else:
-                    logger.error(f"❌ {provider_name} error: {e}")
+                for task in done:
+                    provider_name = pending.pop(task)
+                    data = task.result()
+                    if data:
+                        if hedged and provider_name != first_provider:
+                            self.hedge_stats['won'] += 1
+                        return provider_name, data
                 
-                # Try next provider
-                continue
+                if not pending:
+                    launch_next()
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
         
-        # All providers failed
-        logger.error("❌ All providers failed to fetch coins!")
-        raise Exception("All crypto data providers failed")
+        return None, []
     
-    async def get_historical_data(self, symbol: str, days: int = 30) -> List[tuple]:
-        """Fetch historical data with automatic provider fallback.
+    def _cached_listing(self, max_coins: int) -> Optional[List[tuple]]:
+        """Top max_coins of the cached listing, if it is fresh and at least that long."""
+        if self._listing_cache is None:
+            return None
+        fetched_at, cached_max, coins = self._listing_cache
+        if time.monotonic() - fetched_at > self.listing_cache_ttl or cached_max < max_coins:
+            return None
+        return coins[:max_coins]
+    
+    async def get_all_coins(self, max_coins: int = 100) -> List[tuple]:
+        """Fetch top coins from the healthiest available listing provider.
         
-        Fallback order: CoinMarketCap → CoinGecko → CryptoCompare
+        The merged listing is cached for LISTING_CACHE_TTL_SECONDS; any request for
+        up to as many coins as the cached one is served from it, and concurrent
+        callers share one fetch.
+        
+        Args:
+            max_coins: Maximum number of coins to fetch
+        
+        Returns list of tuples: (symbol, name, current_price_usd)
+        """
+        cached = self._cached_listing(max_coins)
+        if cached is not None:
+            self.listing_cache_stats['hits'] += 1
+            return cached
+        
+        if self._listing_lock is None:
+            self._listing_lock = asyncio.Lock()
+        async with self._listing_lock:
+            cached = self._cached_listing(max_coins)
+            if cached is not None:
+                self.listing_cache_stats['hits'] += 1
+                return cached
+            self.listing_cache_stats['misses'] += 1
+            
+            logger.info("📡 Fetching coin listing...")
+            provider_name, coins = await self._call_with_routing('listing', 'get_all_coins', max_coins)
+            
+            if provider_name is None:
+                logger.error("❌ All providers failed to fetch coins!")
+                raise Exception("All crypto data providers failed")
+            
+            logger.info(f"✅ Success: {len(coins)} coins from {provider_name}")
+            self.current_provider = provider_name
+            if self.listing_cache_ttl > 0:
+                self._listing_cache = (time.monotonic(), max_coins, coins)
+            return coins[:max_coins]
+    
+    async def get_historical_data(self, symbol: str, days: int = 30, use_store: bool = True) -> List[tuple]:
+        """Fetch daily candles from the healthiest available provider.
+        
+        Served from the shared candle store while fresh.
         
         Args:
             symbol: Coin symbol (e.g., 'BTC')
             days: Number of days of historical data
+            use_store: False for one-off bulk reads (backtests) that should
+                neither be served from nor fill the candle store
         
         Returns list of tuples: (timestamp, close_price, high, low, open)
         """
-        # Try all providers: primary → backup → cryptocompare
-        providers_to_try = [self.current_provider]
-        
-        # Add backup provider if not already in list
-        if self.backup_provider != self.current_provider and self.backup_provider not in providers_to_try:
-            providers_to_try.append(self.backup_provider)
+        if not use_store:
+            return await self._fetch_daily_candles(symbol, days)
+        return await self.candle_store.get('1d', symbol, days, lambda: self._fetch_daily_candles(symbol, days))
+    
+    async def _fetch_daily_candles(self, symbol: str, days: int) -> List[Dict]:
+        provider_name, data = await self._call_with_routing('daily_candles', 'get_historical_data', symbol, days,
+                                                            hedge=self.hedging_enabled)
         
-        # Always try cryptocompare as last resort
-        if 'cryptocompare' not in providers_to_try:
-            providers_to_try.append('cryptocompare')
+        if provider_name is None:
+            logger.warning(f"⚠️ All providers failed to fetch historical data for {symbol}")
+            return []
         
-        for provider_name in providers_to_try:
-            provider = self._get_provider(provider_name)
-            if not provider:
-                continue
-            
-            try:
-                data = await provider.get_historical_data(symbol, days)
-                
-                self._record_call(provider_name)
-                
-                if data and len(data) > 0:
-                    logger.info(f"✅ {provider_name}: Successfully fetched {len(data)} candles for {symbol}")
-                    return data
-                else:
-                    logger.warning(f"⚠️ {provider_name} returned no historical data for {symbol}")
-                    self._record_error(provider_name)
-                    
-            except Exception as e:
-                error_msg = str(e).lower()
-                is_rate_limit = 'rate limit' in error_msg or '429' in error_msg
-                
-                self._record_error(provider_name, is_rate_limit)
-                
-                if is_rate_limit:
-                    logger.warning(f"⚠️ {provider_name} rate limit exceeded for historical data")
-                else:
-                    logger.error(f"❌ {provider_name} historical data error: {e}")
-                
-                # Try next provider
-                continue
-        
-        # All providers failed - return empty list
-        logger.warning(f"⚠️ All providers failed to fetch historical data for {symbol}")
-        return []
+        logger.info(f"✅ {provider_name}: Successfully fetched {len(data)} candles for {symbol}")
+        return data
     
     async def get_4h_candles(self, symbol: str, limit: int = 168) -> List[Dict]:
-        """Fetch 4-hour candles with automatic provider fallback.
+        """Fetch 4-hour candles from the healthiest available provider.
         
         Phase 4: Multi-timeframe analysis
-        Fallback order: CoinMarketCap → CoinGecko → CryptoCompare
+        Served from the shared candle store while fresh.
         
         Args:
             symbol: Coin symbol (e.g., 'BTC')
@@ -208,54 +371,15 @@ class MultiProviderClient:
         
         Returns list of dicts with OHLCV data for 4h timeframe
         """
-        # Try all providers in order: primary → backup → tertiary (cryptocompare)
-        providers_to_try = [self.current_provider]
-        
-        # Add backup provider if not already in list
-        if self.backup_provider != self.current_provider and self.backup_provider not in providers_to_try:
-            providers_to_try.append(self.backup_provider)
-        
-        # Always try cryptocompare as last resort for 4h candles
-        if 'cryptocompare' not in providers_to_try:
-            providers_to_try.append('cryptocompare')
+        return await self.candle_store.get('4h', symbol, limit, lambda: self._fetch_4h_candles(symbol, limit))
+    
+    async def _fetch_4h_candles(self, symbol: str, limit: int) -> List[Dict]:
+        provider_name, candles = await self._call_with_routing('4h_candles', 'get_4h_candles', symbol, limit,
+                                                               hedge=self.hedging_enabled)
         
-        for provider_name in providers_to_try:
-            provider = self._get_provider(provider_name)
-            if not provider:
-                continue
-            
-            # Check if provider supports 4h candles
-            if not hasattr(provider, 'get_4h_candles'):
-                logger.debug(f"⚠️ {provider_name} does not support 4h candles")
-                continue
-            
-            try:
-                logger.debug(f"📊 Fetching 4h candles from {provider_name} for {symbol}...")
-                candles = await provider.get_4h_candles(symbol, limit)
-                
-                self._record_call(provider_name)
-                
-                if candles and len(candles) > 0:
-                    logger.info(f"✅ Success: {len(candles)} 4h candles from {provider_name} for {symbol}")
-                    return candles
-                else:
-                    logger.warning(f"⚠️ {provider_name} returned no 4h candles for {symbol}")
-                    self._record_error(provider_name)
-                    
-            except Exception as e:
-                error_msg = str(e).lower()
-                is_rate_limit = 'rate limit' in error_msg or '429' in error_msg
-                
-                self._record_error(provider_name, is_rate_limit)
-                
-                if is_rate_limit:
-                    logger.warning(f"⚠️ {provider_name} rate limit exceeded for 4h candles")
-                else:
-                    logger.error(f"❌ {provider_name} 4h candles error: {e}")
-                
-                # Try next provider
-                continue
+        if provider_name is None:
+            logger.warning(f"⚠️ All providers failed to fetch 4h candles for {symbol}")
+            return []
         
-        # All providers failed - return empty list
-        logger.warning(f"⚠️ All providers failed to fetch 4h candles for {symbol}")
-        return []
\ No newline at end of file
+        logger.info(f"✅ Success: {len(candles)} 4h candles from {provider_name} for {symbol}")
+        return candles
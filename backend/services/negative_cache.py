@@ -0,0 +1,117 @@
+"""
+Persistent negative cache for (provider, symbol, capability) misses.
+
+Most altcoins have no perpetual futures, yet every scan asked OKX, Coinalyze,
+Bybit and Binance for their derivatives data (three calls each, some with
+several symbol formats). A provider that answered "no data" for a symbol is
+now remembered for NEGATIVE_CACHE_TTL_HOURS and skipped until then.
+
+Only definite misses are cached (the provider answered, without data); errors
+and timeouts are not. Entries persist via a document store (negative_caches
+table, or a JSON file with NEGATIVE_CACHE_STORE=file / NEGATIVE_CACHE_PATH),
+loaded at startup and flushed periodically and on shutdown.
+"""
+
+import logging
+import os
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from services.document_store import create_document_store
+
+logger = logging.getLogger(__name__)
+
+
+class NegativeCache:
+    """TTL set of (provider, symbol, capability) lookups known to return no data."""
+
+    def __init__(self, name: str, db=None, ttl_seconds: Optional[float] = None):
+        """
+        Args:
+            name: Cache name (document key in the store)
+            db: Database interface for the supabase store
+            ttl_seconds: Miss lifetime (default NEGATIVE_CACHE_TTL_HOURS, 12h)
+        """
+        self.name = name
+        self.ttl = ttl_seconds if ttl_seconds is not None else float(os.getenv('NEGATIVE_CACHE_TTL_HOURS', '12')) * 3600
+        self.store = create_document_store(db, 'negative_caches', 'name', 'NEGATIVE_CACHE_STORE',
+                                           'NEGATIVE_CACHE_PATH', 'negative_cache.json')
+        self.entries: Dict[str, float] = {}  # "provider|symbol|capability" -> expiry (epoch seconds)
+        self._dirty = False
+        self.stats = {'hits': 0, 'recorded': 0, 'cleared': 0}
+
+    @staticmethod
+    def _key(provider: str, symbol: str, capability: str) -> str:
+        return f"{provider}|{symbol.upper()}|{capability}"
+
+    def is_negative(self, provider: str, symbol: str, capability: str) -> bool:
+        """True while a recorded miss has not expired."""
+        key = self._key(provider, symbol, capability)
+        expires_at = self.entries.get(key)
+        if expires_at is None:
+            return False
+        if expires_at <= time.time():
+            del self.entries[key]
+            self._dirty = True
+            return False
+        self.stats['hits'] += 1
+        return True
+
+    def record_miss(self, provider: str, symbol: str, capability: str):
+        self.entries[self._key(provider, symbol, capability)] = time.time() + self.ttl
+        self._dirty = True
+        self.stats['recorded'] += 1
+
+    def clear(self, provider: str, symbol: str, capability: str):
+        """Drop a miss (the provider has data for the symbol after all)."""
+        if self.entries.pop(self._key(provider, symbol, capability), None) is not None:
+            self._dirty = True
+            self.stats['cleared'] += 1
+
+    def _purge_expired(self):
+        now = time.time()
+        expired = [key for key, expires_at in self.entries.items() if expires_at <= now]
+        for key in expired:
+            del self.entries[key]
+
+    async def load(self):
+        """Load persisted misses (expired ones are dropped)."""
+        try:
+            document = await self.store.read(self.name)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not load negative cache '{self.name}': {e}")
+            return
+        if not document:
+            return
+        stored = document.get('entries') or {}
+        stored.update(self.entries)
+        self.entries = stored
+        self._purge_expired()
+        logger.info(f"🚫 Loaded negative cache '{self.name}': {len(self.entries)} entries")
+
+    async def flush(self):
+        """Persist the cache if it changed since the last flush."""
+        if not self._dirty:
+            return
+        self._purge_expired()
+        try:
+            await self.store.write(self.name, {
+                'name': self.name,
+                'entries': self.entries,
+                'updated_at': datetime.now(timezone.utc).isoformat()
+            })
+            self._dirty = False
+        except Exception as e:
+            logger.error(f"❌ Could not persist negative cache '{self.name}': {e}")
+
+    def get_stats(self) -> Dict:
+        self._purge_expired()
+        by_provider = Counter(key.split('|', 1)[0] for key in self.entries)
+        return {
+            'entries': len(self.entries),
+            'ttl_hours': round(self.ttl / 3600, 2),
+            'by_provider': dict(by_provider),
+            **self.stats
+        }
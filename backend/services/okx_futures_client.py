@@ -3,6 +3,8 @@ import asyncio
 from typing import List, Dict, Optional
 from datetime import datetime, timezone
 import logging
+from services.http_transport import get_transport
+from services.json_codec import read_json
 
 logger = logging.getLogger(__name__)
 
@@ -19,7 +21,7 @@ class OKXFuturesClient:
     
     async def _get_session(self):
         if self.session is None or self.session.closed:
-            self.session = aiohttp.ClientSession()
+            self.session = get_transport().session('okx_futures')
         return self.session
     
     async def close(self):
@@ -44,9 +46,9 @@ class OKXFuturesClient:
             url = f'{self.base_url}/api/v5/public/open-interest'
             params = {'instId': okx_symbol}
             
-            async with session.get(url, params=params, timeout=10) as response:
+            async with session.get(url, params=params) as response:
                 if response.status == 200:
-                    data = await response.json()
+                    data = await read_json(response)
                     if data.get('code') == '0':
                         result = data.get('data', [])
                         if result and len(result) > 0:
@@ -81,9 +83,9 @@ class OKXFuturesClient:
             url = f'{self.base_url}/api/v5/public/funding-rate'
             params = {'instId': okx_symbol}
             
-            async with session.get(url, params=params, timeout=10) as response:
+            async with session.get(url, params=params) as response:
                 if response.status == 200:
-                    data = await response.json()
+                    data = await read_json(response)
                     if data.get('code') == '0':
                         result = data.get('data', [])
                         if result and len(result) > 0:
@@ -122,9 +124,9 @@ class OKXFuturesClient:
                 'limit': min(limit, 100)
             }
             
-            async with session.get(url, params=params, timeout=10) as response:
+            async with session.get(url, params=params) as response:
                 if response.status == 200:
-                    data = await response.json()
+                    data = await read_json(response)
                     if data.get('code') == '0':
                         history = []
                         for item in data.get('data', []):
@@ -159,9 +161,9 @@ class OKXFuturesClient:
                 'period': '5m'
             }
             
-            async with session.get(url, params=params, timeout=10) as response:
+            async with session.get(url, params=params) as response:
                 if response.status == 200:
-                    data = await response.json()
+                    data = await read_json(response)
                     if data.get('code') == '0':
                         result = data.get('data', [])
                         if result and len(result) > 0:
@@ -183,6 +185,48 @@ class OKXFuturesClient:
             logger.debug(f"Error fetching OKX long/short ratio for {symbol}: {e}")
             return None
     
+    async def get_market_snapshot(self) -> Dict[str, Dict]:
+        """Get open interest and funding rates of all USDT swaps (two requests).
+        
+        Returns:
+            Dict mapping base symbol (e.g. 'BTC') -> open_interest, funding_rate, next_funding_time
+        """
+        try:
+            session = await self._get_session()
+            
+            async def fetch(path, params):
+                async with session.get(f'{self.base_url}{path}', params=params) as response:
+                    if response.status == 200:
+                        data = await read_json(response)
+                        if data.get('code') == '0':
+                            return data.get('data', [])
+                    logger.debug(f"OKX snapshot error {response.status} for {path}")
+                    return []
+            
+            open_interest, funding = await asyncio.gather(
+                fetch('/api/v5/public/open-interest', {'instType': 'SWAP'}),
+                fetch('/api/v5/public/funding-rate', {'instId': 'ANY'}),
+                return_exceptions=True
+            )
+            
+            snapshot = {}
+            for item in open_interest if isinstance(open_interest, list) else []:
+                inst_id = item.get('instId', '')
+                if inst_id.endswith('-USDT-SWAP'):
+                    snapshot.setdefault(inst_id[:-len('-USDT-SWAP')], {})['open_interest'] = float(item.get('oi', 0))
+            for item in funding if isinstance(funding, list) else []:
+                inst_id = item.get('instId', '')
+                if inst_id.endswith('-USDT-SWAP'):
+                    snapshot.setdefault(inst_id[:-len('-USDT-SWAP')], {}).update({
+                        'funding_rate': float(item.get('fundingRate', 0)) * 100,  # Convert to percentage
+                        'next_funding_time': int(item.get('nextFundingTime', 0)) / 1000
+                    })
+            return snapshot
+        
+        except Exception as e:
+            logger.debug(f"Error fetching OKX market snapshot: {e}")
+            return {}
+    
     async def get_all_derivatives_metrics(self, symbol: str) -> Dict:
         """Get all available derivatives metrics for a symbol.
         
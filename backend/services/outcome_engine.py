@@ -0,0 +1,171 @@
+"""
+Vectorized first-touch TP/SL resolution.
+
+Outcome tracking used to walk the candles of every recommendation in a Python
+loop. first_touch() resolves many positions on the same price path at once:
+one (positions x candles) boolean matrix per level, masked to the candles at or
+after each position's start, and argmax for the first touching candle.
+
+When TP and SL are touched by the same candle the order inside the candle is
+unknown; like the original loop, SL counts as hit first (conservative).
+
+adverse_excursion() gives the worst move against each position over the same
+windows (max adverse excursion), so one candle fetch yields outcome, time to
+outcome and risk taken along the way.
+"""
+
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Outcome codes returned by first_touch
+OPEN = 0
+TAKE_PROFIT = 1
+STOP_LOSS = 2
+
+
+def candle_arrays(candles: Sequence[Dict]) -> Dict[str, np.ndarray]:
+    """timestamp / high / low / close arrays of a candle list."""
+    return {
+        'timestamp': np.array([candle.get('timestamp', 0) for candle in candles], dtype=float),
+        'high': np.array([candle.get('high', 0) for candle in candles], dtype=float),
+        'low': np.array([candle.get('low', 0) for candle in candles], dtype=float),
+        'close': np.array([candle.get('close', 0) for candle in candles], dtype=float)
+    }
+
+
+def first_touch(
+    highs: np.ndarray,
+    lows: np.ndarray,
+    starts: np.ndarray,
+    is_long: np.ndarray,
+    take_profits: np.ndarray,
+    stop_losses: np.ndarray,
+    ends: Optional[np.ndarray] = None
+) -> Dict[str, np.ndarray]:
+    """First candle at which each position reaches its TP or SL.
+
+    Args:
+        highs, lows: Candle highs / lows of one price path (length T)
+        starts: First candle index each position is live on (length N)
+        is_long: True for long positions, False for short (length N)
+        take_profits, stop_losses: Levels per position (length N)
+        ends: Candle index each position stops being live at, exclusive (length N,
+            default: live until the end of the path)
+
+    Returns:
+        Dict with
+        - outcome: OPEN, TAKE_PROFIT or STOP_LOSS per position
+        - index: candle index of the first touch (-1 while open)
+    """
+    count = len(starts)
+    candles = len(highs)
+    if count == 0 or candles == 0:
+        return {'outcome': np.full(count, OPEN, dtype=np.int8), 'index': np.full(count, -1, dtype=np.int64)}
+
+    positions = np.arange(candles)[None, :]
+    live = positions >= starts[:, None]
+    if ends is not None:
+        live &= positions < ends[:, None]
+
+    outcome, index = _resolve_hits(highs[None, :], lows[None, :], live, is_long, take_profits, stop_losses)
+    return {'outcome': outcome, 'index': index}
+
+
+def first_touch_window(
+    highs: np.ndarray,
+    lows: np.ndarray,
+    starts: np.ndarray,
+    horizon: int,
+    is_long: np.ndarray,
+    take_profits: np.ndarray,
+    stop_losses: np.ndarray
+) -> Dict[str, np.ndarray]:
+    """first_touch over the `horizon` candles from each start.
+
+    Gathers a (positions x horizon) window instead of masking the whole path, so
+    tens of thousands of short-lived positions on a long path stay cheap.
+
+    Returns:
+        Dict with outcome and index (absolute candle index, -1 while open) as in
+        first_touch, plus complete: True where the whole window lies on the path
+    """
+    count = len(starts)
+    candles = len(highs)
+    if count == 0 or candles == 0 or horizon <= 0:
+        return {
+            'outcome': np.full(count, OPEN, dtype=np.int8),
+            'index': np.full(count, -1, dtype=np.int64),
+            'complete': np.zeros(count, dtype=bool)
+        }
+
+    offsets = starts[:, None] + np.arange(horizon)[None, :]
+    inside = offsets < candles
+    clipped = np.minimum(offsets, candles - 1)
+    outcome, relative = _resolve_hits(highs[clipped], lows[clipped], inside, is_long, take_profits, stop_losses)
+    index = np.where(outcome == OPEN, -1, starts + relative)
+    return {'outcome': outcome, 'index': index, 'complete': inside[:, -1]}
+
+
+def _resolve_hits(highs, lows, live, is_long, take_profits, stop_losses):
+    """Outcome and first touching column of (positions x columns) highs / lows where live."""
+    columns = live.shape[1]
+    is_long = is_long[:, None]
+    tp = take_profits[:, None]
+    sl = stop_losses[:, None]
+
+    # Long: TP above (high >= tp), SL below (low <= sl); short: mirrored
+    tp_hit = live & np.where(is_long, highs >= tp, lows <= tp)
+    sl_hit = live & np.where(is_long, lows <= sl, highs >= sl)
+
+    tp_any = tp_hit.any(axis=1)
+    sl_any = sl_hit.any(axis=1)
+    tp_index = np.where(tp_any, tp_hit.argmax(axis=1), columns)
+    sl_index = np.where(sl_any, sl_hit.argmax(axis=1), columns)
+
+    outcome = np.full(live.shape[0], OPEN, dtype=np.int8)
+    outcome[sl_any & (sl_index <= tp_index)] = STOP_LOSS
+    outcome[tp_any & (tp_index < sl_index)] = TAKE_PROFIT
+    index = np.where(outcome == OPEN, -1, np.minimum(tp_index, sl_index))
+    return outcome, index
+
+
+def start_indices(timestamps: np.ndarray, start_times: List[float]) -> np.ndarray:
+    """Index of the first candle opening at or after each start time.
+
+    The candle containing a start time is skipped: its high / low may come from
+    before the position existed.
+    """
+    return np.searchsorted(timestamps, np.asarray(start_times, dtype=float), side='left')
+
+
+def adverse_excursion(
+    highs: np.ndarray,
+    lows: np.ndarray,
+    starts: np.ndarray,
+    stops: np.ndarray,
+    is_long: np.ndarray,
+    entries: np.ndarray
+) -> np.ndarray:
+    """Max adverse excursion of each position, in percent of its entry (<= 0).
+
+    Args:
+        highs, lows: Candle highs / lows of one price path (length T)
+        starts, stops: First and last candle index (inclusive) of each window (length N)
+        is_long: True for long positions, False for short (length N)
+        entries: Entry price per position (length N)
+
+    Returns:
+        Lowest low below entry for longs, highest high above entry for shorts, as a
+        percentage of entry; 0 when the price never moved against the position
+    """
+    count = len(starts)
+    if count == 0 or len(highs) == 0:
+        return np.zeros(count)
+
+    positions = np.arange(len(highs))[None, :]
+    window = (positions >= starts[:, None]) & (positions <= stops[:, None])
+    worst_low = np.where(window, lows[None, :], np.inf).min(axis=1)
+    worst_high = np.where(window, highs[None, :], -np.inf).max(axis=1)
+    excursion = np.where(is_long, worst_low - entries, entries - worst_high) / entries * 100
+    return np.where(window.any(axis=1), np.minimum(excursion, 0.0), 0.0)
@@ -5,21 +5,38 @@ by comparing actual coin prices to predicted TP/SL levels.
 """
 import asyncio
 import logging
+import os
+import time
 from datetime import datetime, timedelta, timezone
-from typing import List, Dict, Optional
+from typing import List, Dict
+
+import numpy as np
+
+from services.outcome_engine import OPEN, STOP_LOSS, TAKE_PROFIT, candle_arrays, first_touch, start_indices
 
 logger = logging.getLogger(__name__)
 
+# Recommendation ids per bulk outcome update
+BULK_UPDATE_CHUNK = 200
+
 class OutcomeTracker:
     """Tracks recommendation outcomes by monitoring actual price movements"""
 
     def __init__(self, db, crypto_client):
         self.db = db
         self.crypto_client = crypto_client
+        self.concurrency = int(os.getenv('OUTCOME_TRACKER_CONCURRENCY', '8'))
     
     async def track_all_pending_recommendations(self):
-        """Check all pending recommendations and update their outcomes"""
+        """Check all pending recommendations and update their outcomes.
+        
+        Recommendations are grouped by ticker: each ticker's price path is fetched once
+        (OUTCOME_TRACKER_CONCURRENCY tickers at a time), all of its recommendations are
+        resolved with one vectorized first-touch search, and outcomes are written with one
+        update per distinct result instead of one per recommendation.
+        """
         logger.info("Starting outcome tracking for pending recommendations...")
+        started = time.perf_counter()
         
         try:
             # Find all recommendations without outcome_7d set or still pending
@@ -32,189 +49,138 @@ class OutcomeTracker:
             
             logger.info(f"Found {len(pending_recs)} pending recommendations to track")
             
-            tracked_count = 0
-            success_count = 0
-            failed_count = 0
-            still_pending = 0
-            
+            now = datetime.now(timezone.utc)
+            by_ticker: Dict[str, List[Dict]] = {}
+            expired_ids = []
             for rec in pending_recs:
-                outcome = await self._check_recommendation_outcome(rec)
+                if not all([rec.get('ticker'), rec.get('consensus_direction'), rec.get('avg_entry'),
+                            rec.get('avg_take_profit'), rec.get('avg_stop_loss')]):
+                    logger.warning(f"Recommendation {rec.get('id')} missing required fields")
+                    continue
+                try:
+                    created_at = self._created_at(rec)
+                except Exception as e:
+                    logger.warning(f"Recommendation {rec.get('id')} has invalid created_at: {e}")
+                    continue
+                rec['_created_ts'] = created_at.timestamp()
+                # Only track for 7 days; beyond the tracking window mark as incomplete
+                if now - created_at > timedelta(days=7):
+                    expired_ids.append(rec['id'])
+                else:
+                    by_ticker.setdefault(rec['ticker'], []).append(rec)
+            
+            # Price path per ticker, fetched once each with bounded concurrency
+            semaphore = asyncio.Semaphore(self.concurrency)
+            
+            async def fetch(ticker: str):
+                async with semaphore:
+                    try:
+                        return ticker, await self.crypto_client.get_historical_data(ticker, days=7)
+                    except Exception as e:
+                        logger.error(f"Error fetching price data for {ticker}: {e}")
+                        return ticker, None
+            
+            histories = dict(await asyncio.gather(*(fetch(ticker) for ticker in by_ticker)))
+            
+            # (outcome, actual price) -> recommendation ids sharing that update
+            updates: Dict[tuple, List[str]] = {}
+            counts = {'success': 0, 'failed': 0, 'pending': 0}
+            for ticker, recs in by_ticker.items():
+                historical_data = histories.get(ticker)
+                if not historical_data:
+                    logger.warning(f"No historical data available for {ticker}")
+                    counts['pending'] += len(recs)
+                    continue
                 
-                if outcome:
-                    tracked_count += 1
-                    if outcome == 'success':
-                        success_count += 1
-                    elif outcome == 'failed':
-                        failed_count += 1
-                    else:
-                        still_pending += 1
-            
-            logger.info(f"Outcome tracking complete: {tracked_count} tracked, {success_count} success, {failed_count} failed, {still_pending} still pending")
+                latest_price = historical_data[-1].get('close')
+                for rec, outcome in zip(recs, self._evaluate_outcomes(historical_data, recs)):
+                    counts[outcome] += 1
+                    price = latest_price if latest_price is not None else rec['avg_entry']
+                    updates.setdefault((outcome, price), []).append(rec['id'])
+            
+            writes = 0
+            if expired_ids:
+                writes += await self._bulk_update(expired_ids, {'outcome_7d': 'expired', 'updated_at': now})
+            for (outcome, price), ids in updates.items():
+                writes += await self._bulk_update(ids, {
+                    'outcome_7d': outcome,
+                    'actual_price_7d': price,
+                    'outcome_checked_at': now,
+                    'updated_at': now
+                })
+            
+            duration = time.perf_counter() - started
+            tracked_count = sum(counts.values()) + len(expired_ids)
+            logger.info(f"Outcome tracking complete: {tracked_count} tracked, {counts['success']} success, "
+                        f"{counts['failed']} failed, {counts['pending']} still pending, {len(expired_ids)} expired "
+                        f"({len(by_ticker)} tickers, {writes} writes, {duration:.2f}s, "
+                        f"{tracked_count / duration if duration > 0 else 0:.0f} recs/s)")
             
             return {
                 'tracked': tracked_count,
-                'success': success_count,
-                'failed': failed_count,
-                'pending': still_pending
+                'success': counts['success'],
+                'failed': counts['failed'],
+                'pending': counts['pending'],
+                'expired': len(expired_ids),
+                'tickers': len(by_ticker),
+                'writes': writes,
+                'duration_seconds': round(duration, 3),
+                'recs_per_second': round(tracked_count / duration, 1) if duration > 0 else None
             }
             
         except Exception as e:
             logger.error(f"Error tracking outcomes: {e}", exc_info=True)
             return None
     
-    async def _check_recommendation_outcome(self, rec: Dict) -> Optional[str]:
-        """Check if a recommendation hit TP or SL
-        
-        Returns:
-            'success' if TP hit first
-            'failed' if SL hit first
-            'pending' if neither hit yet and still within tracking window
-            None if beyond tracking window with no conclusion
-        """
-        try:
-            # Get recommendation details
-            ticker = rec.get('ticker')
-            coin = rec.get('coin')
-            direction = rec.get('consensus_direction')
-            entry_price = rec.get('avg_entry')
-            take_profit = rec.get('avg_take_profit')
-            stop_loss = rec.get('avg_stop_loss')
-            created_at = rec.get('created_at')
-            
-            if not all([ticker, direction, entry_price, take_profit, stop_loss]):
-                logger.warning(f"Recommendation {rec.get('id')} missing required fields")
-                return None
-            
-            # Calculate time elapsed
-            if isinstance(created_at, str):
-                created_at = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-            
-            if created_at.tzinfo is None:
-                created_at = created_at.replace(tzinfo=timezone.utc)
-            
-            now = datetime.now(timezone.utc)
-            time_elapsed = now - created_at
-            
-            # Only track for 7 days
-            if time_elapsed > timedelta(days=7):
-                # Beyond tracking window - mark as incomplete
-                await self.db.recommendations.update_one(
-                    {'id': rec['id']},
-                    {'$set': {
-                        'outcome_7d': 'expired',
-                        'updated_at': now
-                    }}
-                )
-                return 'expired'
-            
-            # Fetch recent price data for this coin
+    @staticmethod
+    def _created_at(rec: Dict) -> datetime:
+        created_at = rec.get('created_at')
+        if isinstance(created_at, str):
+            created_at = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        return created_at
+    
+    async def _bulk_update(self, ids: List[str], fields: Dict) -> int:
+        """Set the same fields on many recommendations; returns the number of requests."""
+        writes = 0
+        for i in range(0, len(ids), BULK_UPDATE_CHUNK):
+            chunk = ids[i:i + BULK_UPDATE_CHUNK]
             try:
-                # Get 7 days of hourly data
-                historical_data = await self.crypto_client.get_historical_data(ticker, days=7)
-                
-                if not historical_data or len(historical_data) == 0:
-                    logger.warning(f"No historical data available for {ticker}")
-                    return 'pending'
-                
-                # Check if TP or SL was hit
-                outcome = self._evaluate_outcome(
-                    historical_data, 
-                    direction, 
-                    entry_price, 
-                    take_profit, 
-                    stop_loss
-                )
-                
-                if outcome:
-                    # TP or SL was hit - update with final outcome
-                    latest_price = historical_data[-1].get('close', entry_price)
-                    
-                    await self.db.recommendations.update_one(
-                        {'id': rec['id']},
-                        {'$set': {
-                            'outcome_7d': outcome,
-                            'actual_price_7d': latest_price,
-                            'outcome_checked_at': now,
-                            'updated_at': now
-                        }}
-                    )
-                    
-                    logger.info(f"Updated {ticker} outcome: {outcome}")
-                    return outcome
-                else:
-                    # Still pending - neither TP nor SL hit yet
-                    # Update last checked timestamp but keep status as pending
-                    latest_price = historical_data[-1].get('close', entry_price)
-                    
-                    await self.db.recommendations.update_one(
-                        {'id': rec['id']},
-                        {'$set': {
-                            'outcome_7d': 'pending',
-                            'actual_price_7d': latest_price,
-                            'outcome_checked_at': now,
-                            'updated_at': now
-                        }}
-                    )
-                    
-                    return 'pending'
-                    
+                await self.db.recommendations.update_many({'id': {'$in': chunk}}, {'$set': fields})
+                writes += 1
             except Exception as e:
-                logger.error(f"Error fetching price data for {ticker}: {e}")
-                return 'pending'
-                
-        except Exception as e:
-            logger.error(f"Error checking recommendation outcome: {e}", exc_info=True)
-            return None
+                logger.error(f"Error updating {len(chunk)} recommendation outcomes: {e}")
+        return writes
     
-    def _evaluate_outcome(
-        self, 
-        historical_data: List[Dict], 
-        direction: str, 
-        entry: float, 
-        tp: float, 
-        sl: float
-    ) -> Optional[str]:
-        """Evaluate if TP or SL was hit first
+    def _evaluate_outcomes(self, historical_data: List[Dict], recs: List[Dict]) -> List[str]:
+        """Evaluate which of TP or SL each recommendation on one price path hit first
+        
+        Only candles opening at or after the recommendation's creation time count (the
+        candle it was created in may include earlier prices).
         
         Args:
             historical_data: List of candles with high/low prices
-            direction: 'long' or 'short'
-            entry: Entry price
-            tp: Take profit level
-            sl: Stop loss level
+            recs: Recommendations on this ticker (consensus_direction, avg_take_profit,
+                avg_stop_loss, _created_ts)
         
         Returns:
-            'success' if TP hit first, 'failed' if SL hit first, None if neither
+            'success' if TP hit first, 'failed' if SL hit first, 'pending' if neither, per rec
         """
-        try:
-            for candle in historical_data:
-                high = candle.get('high', 0)
-                low = candle.get('low', 0)
-                
-                if direction == 'long':
-                    # Long position: TP is above entry, SL is below
-                    # Check if price hit SL first (low touches or goes below SL)
-                    if low <= sl:
-                        return 'failed'
-                    # Check if price hit TP (high touches or goes above TP)
-                    if high >= tp:
-                        return 'success'
-                        
-                elif direction == 'short':
-                    # Short position: TP is below entry, SL is above
-                    # Check if price hit SL first (high touches or goes above SL)
-                    if high >= sl:
-                        return 'failed'
-                    # Check if price hit TP (low touches or goes below TP)
-                    if low <= tp:
-                        return 'success'
-            
-            # Neither TP nor SL hit yet
-            return None
-            
-        except Exception as e:
-            logger.error(f"Error evaluating outcome: {e}")
-            return None
+        candles = candle_arrays(historical_data)
+        result = first_touch(
+            candles['high'],
+            candles['low'],
+            start_indices(candles['timestamp'], [rec['_created_ts'] for rec in recs]),
+            np.array([rec['consensus_direction'] == 'long' for rec in recs]),
+            np.array([rec['avg_take_profit'] for rec in recs], dtype=float),
+            np.array([rec['avg_stop_loss'] for rec in recs], dtype=float)
+        )
+        labels = {TAKE_PROFIT: 'success', STOP_LOSS: 'failed', OPEN: 'pending'}
+        return [
+            labels[outcome] if rec['consensus_direction'] in ('long', 'short') else 'pending'
+            for rec, outcome in zip(recs, result['outcome'].tolist())
+        ]
     
     async def calculate_bot_success_rates(self) -> Dict[str, float]:
         """Calculate success rate for each bot based on historical outcomes
@@ -6,11 +6,21 @@ Features:
 - AI-powered portfolio analysis and recommendations
 - Risk assessment and diversification scoring
 - Performance tracking with historical comparisons
+
+Valuation prices all holdings with one market snapshot lookup and computes the
+holding and total figures with NumPy. AI analyses are cached by a hash of the
+holdings (symbol, quantity, average buy price) for PORTFOLIO_ANALYSIS_TTL_SECONDS;
+concurrent requests for the same holdings share one LLM call.
 """
 
+import asyncio
+import hashlib
 import logging
+import time
+from collections import OrderedDict
 from datetime import datetime, timezone
 from typing import List, Dict, Optional
+import numpy as np
 from emergentintegrations.llm.chat import LlmChat, UserMessage
 import os
 
@@ -20,10 +30,16 @@ logger = logging.getLogger(__name__)
 class PortfolioService:
     """Service for tracking and analyzing user portfolios with AI insights."""
 
-    def __init__(self, db, crypto_client):
+    def __init__(self, db, crypto_client, market_snapshot=None):
         self.db = db
         self.crypto_client = crypto_client
+        self.market_snapshot = market_snapshot
         self.api_key = os.environ.get('EMERGENT_LLM_KEY')
+        self.analysis_ttl = float(os.getenv('PORTFOLIO_ANALYSIS_TTL_SECONDS', '3600'))
+        self.analysis_cache_size = int(os.getenv('PORTFOLIO_ANALYSIS_CACHE_SIZE', '1000'))
+        # Holdings hash -> (analysis, expires_at), oldest first
+        self.analysis_cache: OrderedDict = OrderedDict()
+        self._analysis_inflight: Dict[str, asyncio.Future] = {}
         logger.info("📊 Portfolio Service initialized")
 
     async def get_portfolio(self, user_id: str) -> Optional[Dict]:
@@ -36,32 +52,34 @@ class PortfolioService:
 
             # Calculate current values for all holdings
             holdings = portfolio.get('holdings', [])
-            total_value = 0
-            total_cost = 0
-
-            for holding in holdings:
-                symbol = holding['symbol']
-                quantity = holding['quantity']
-                avg_buy_price = holding['avg_buy_price']
-
-                # Get current price
-                all_coins = await self.crypto_client.get_all_coins(max_coins=500)
-                current_price = next(
-                    (coin[2] for coin in all_coins if coin[0] == symbol),
-                    avg_buy_price
-                )
 
+            # Current prices of all holdings in one lookup
+            prices = await self._get_prices([holding['symbol'] for holding in holdings])
+
+            quantities = np.array([holding['quantity'] for holding in holdings], dtype=float)
+            avg_buy_prices = np.array([holding['avg_buy_price'] for holding in holdings], dtype=float)
+            current_prices = np.array([
+                prices.get(holding['symbol'], holding['avg_buy_price']) for holding in holdings
+            ], dtype=float)
+
+            current_values = quantities * current_prices
+            cost_bases = quantities * avg_buy_prices
+            profit_losses = current_values - cost_bases
+            profit_loss_pcts = np.divide(profit_losses * 100, cost_bases,
+                                         out=np.zeros_like(profit_losses), where=cost_bases > 0)
+
+            for holding, current_price, current_value, cost_basis, profit_loss, profit_loss_pct in zip(
+                holdings, current_prices.tolist(), current_values.tolist(), cost_bases.tolist(),
+                profit_losses.tolist(), profit_loss_pcts.tolist()
+            ):
                 holding['current_price'] = current_price
-                holding['current_value'] = quantity * current_price
-                holding['cost_basis'] = quantity * avg_buy_price
-                holding['profit_loss'] = holding['current_value'] - holding['cost_basis']
-                holding['profit_loss_pct'] = (
-                    (holding['profit_loss'] / holding['cost_basis'] * 100)
-                    if holding['cost_basis'] > 0 else 0
-                )
+                holding['current_value'] = current_value
+                holding['cost_basis'] = cost_basis
+                holding['profit_loss'] = profit_loss
+                holding['profit_loss_pct'] = profit_loss_pct
 
-                total_value += holding['current_value']
-                total_cost += holding['cost_basis']
+            total_value = float(current_values.sum())
+            total_cost = float(cost_bases.sum())
 
             portfolio['total_value'] = total_value
             portfolio['total_cost'] = total_cost
@@ -78,6 +96,15 @@ class PortfolioService:
             logger.error(f"Error fetching portfolio: {e}")
             return None
 
+    async def _get_prices(self, symbols: List[str]) -> Dict[str, float]:
+        """Current prices of symbols from the market snapshot (or one listing fetch without it)."""
+        if not symbols:
+            return {}
+        if self.market_snapshot:
+            return await self.market_snapshot.get_prices(symbols)
+        all_coins = await self.crypto_client.get_all_coins(max_coins=500)
+        return {coin[0]: coin[2] for coin in all_coins if coin[0] in symbols}
+
     async def add_holding(self, user_id: str, symbol: str, quantity: float, buy_price: float) -> Dict:
         """Add or update a holding in user's portfolio."""
         try:
@@ -178,8 +205,37 @@ class PortfolioService:
             logger.error(f"Error removing holding: {e}")
             return {'success': False, 'error': str(e)}
 
+    @staticmethod
+    def _holdings_hash(holdings: List[Dict]) -> str:
+        """Stable hash of the holdings (symbol, quantity, average buy price)."""
+        key = '|'.join(sorted(
+            f"{holding['symbol']}:{holding['quantity']:.10g}:{holding['avg_buy_price']:.10g}"
+            for holding in holdings
+        ))
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    def _cached_analysis(self, holdings_hash: str) -> Optional[Dict]:
+        cached = self.analysis_cache.get(holdings_hash)
+        if cached is None:
+            return None
+        analysis, expires_at = cached
+        if expires_at <= time.time():
+            del self.analysis_cache[holdings_hash]
+            return None
+        return analysis
+
+    def _store_analysis(self, holdings_hash: str, analysis: Dict):
+        self.analysis_cache[holdings_hash] = (analysis, time.time() + self.analysis_ttl)
+        self.analysis_cache.move_to_end(holdings_hash)
+        while len(self.analysis_cache) > self.analysis_cache_size:
+            self.analysis_cache.popitem(last=False)
+
     async def analyze_portfolio_with_ai(self, user_id: str) -> Dict:
-        """Use AI to analyze portfolio and provide insights."""
+        """Use AI to analyze portfolio and provide insights.
+
+        Analyses are cached per holdings hash for PORTFOLIO_ANALYSIS_TTL_SECONDS; concurrent
+        requests for the same holdings share one analysis.
+        """
         if not self.api_key:
             return {
                 'analysis': 'AI analysis unavailable - missing API key',
@@ -188,17 +244,39 @@ class PortfolioService:
                 'recommendations': []
             }
 
-        try:
-            portfolio = await self.get_portfolio(user_id)
-
-            if not portfolio or not portfolio.get('holdings'):
-                return {
-                    'analysis': 'No holdings in portfolio',
-                    'risk_score': 0,
-                    'diversification_score': 0,
-                    'recommendations': ['Add holdings to your portfolio to get AI insights']
-                }
+        portfolio = await self.get_portfolio(user_id)
+        if not portfolio or not portfolio.get('holdings'):
+            return {
+                'analysis': 'No holdings in portfolio',
+                'risk_score': 0,
+                'diversification_score': 0,
+                'recommendations': ['Add holdings to your portfolio to get AI insights']
+            }
 
+        holdings_hash = self._holdings_hash(portfolio['holdings'])
+        cached = self._cached_analysis(holdings_hash)
+        if cached is not None:
+            logger.debug(f"Portfolio analysis cache hit for user {user_id}")
+            return {**cached, 'cached': True}
+
+        task = self._analysis_inflight.get(holdings_hash)
+        if task is not None:
+            return {**await asyncio.shield(task), 'cached': True}
+
+        task = asyncio.ensure_future(self._analyze_portfolio(user_id, portfolio))
+        self._analysis_inflight[holdings_hash] = task
+        try:
+            result = await asyncio.shield(task)
+        finally:
+            self._analysis_inflight.pop(holdings_hash, None)
+        if 'analyzed_at' in result:
+            # Errors are not cached
+            self._store_analysis(holdings_hash, result)
+        return result
+
+    async def _analyze_portfolio(self, user_id: str, portfolio: Dict) -> Dict:
+        """Run the LLM analysis of a valued portfolio."""
+        try:
             # Prepare portfolio data for AI
             holdings_summary = []
             for holding in portfolio['holdings']:
@@ -0,0 +1,177 @@
+"""
+Rolling in-memory price history for percent-change alerts.
+
+percent_change alerts were skipped because evaluating them needed historical
+data per alert. The market snapshot refresher now records every refresh into
+two NumPy ring buffers (one row per symbol, float32):
+
+- minute ring: PRICE_HISTORY_MINUTES slots (default 1500, 25h), for the 1h and
+  24h windows
+- hour ring: PRICE_HISTORY_HOURS slots (default 170, just over 7d; last price
+  of each hour), for windows longer than the minute ring
+
+A ring covers windows shorter than its length (the slot of "now - length" is
+the current slot again).
+
+The price `window` seconds ago is one array read (slot = time // resolution
+modulo the ring size), so a change costs O(1) per symbol and windows can be
+evaluated for all symbols at once with fancy indexing. Memory is bounded by
+PRICE_HISTORY_MAX_SYMBOLS rows: 1000 symbols use ~6.7 MB.
+"""
+
+import logging
+import os
+import re
+import time
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Alert timeframe unit -> seconds ('15m', '1h', '24h', '7d')
+TIMEFRAME_UNITS = {'m': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_timeframe(timeframe: str) -> Optional[int]:
+    """Window in seconds of a timeframe like '1h', '24h' or '7d'; None if invalid."""
+    match = re.fullmatch(r'(\d+)([mhd])', str(timeframe).strip().lower())
+    if not match:
+        return None
+    return int(match.group(1)) * TIMEFRAME_UNITS[match.group(2)]
+
+
+class _Ring:
+    """Symbols x slots float32 ring at a fixed resolution; missing values are NaN."""
+
+    def __init__(self, slots: int, resolution: int, rows: int):
+        self.slots = slots
+        self.resolution = resolution
+        self.values = np.full((rows, slots), np.nan, dtype=np.float32)
+        # Time bucket (time // resolution) each slot currently holds, -1 = empty
+        self.buckets = np.full(slots, -1, dtype=np.int64)
+
+    def grow(self, rows: int):
+        extra = np.full((rows - self.values.shape[0], self.slots), np.nan, dtype=np.float32)
+        self.values = np.vstack([self.values, extra])
+
+    def write(self, rows: np.ndarray, prices: np.ndarray, timestamp: float):
+        bucket = int(timestamp // self.resolution)
+        slot = bucket % self.slots
+        if self.buckets[slot] != bucket:
+            # Slot held an older bucket: forget it for every symbol
+            self.values[:, slot] = np.nan
+            self.buckets[slot] = bucket
+        self.values[rows, slot] = prices
+
+    def covers(self, seconds: float) -> bool:
+        return seconds < self.slots * self.resolution
+
+    def read(self, rows: np.ndarray, timestamp: float, tolerance: int) -> np.ndarray:
+        """Values at the bucket of timestamp (or up to tolerance buckets earlier); NaN if none."""
+        bucket = int(timestamp // self.resolution)
+        result = np.full(len(rows), np.nan, dtype=np.float32)
+        for candidate in range(bucket, bucket - tolerance - 1, -1):
+            slot = candidate % self.slots
+            if self.buckets[slot] != candidate:
+                continue
+            missing = np.isnan(result)
+            if not missing.any():
+                break
+            result[missing] = self.values[rows[missing], slot]
+        return result
+
+
+class PriceHistory:
+    """Per-symbol minute / hour price ring buffers fed by the market snapshot."""
+
+    def __init__(self):
+        self.max_symbols = int(os.getenv('PRICE_HISTORY_MAX_SYMBOLS', '10000'))
+        # Missed refreshes tolerated when reading a past price (in ring resolution units)
+        self.tolerance = int(os.getenv('PRICE_HISTORY_TOLERANCE_SLOTS', '5'))
+        initial_rows = min(1024, self.max_symbols)
+        self.minutes = _Ring(int(os.getenv('PRICE_HISTORY_MINUTES', '1500')), 60, initial_rows)
+        self.hours = _Ring(int(os.getenv('PRICE_HISTORY_HOURS', '170')), 3600, initial_rows)
+        self.rows: Dict[str, int] = {}
+        self.first_recorded: Optional[float] = None
+        self.stats = {'records': 0, 'dropped_symbols': 0}
+
+    def _row(self, symbol: str) -> Optional[int]:
+        row = self.rows.get(symbol)
+        if row is not None:
+            return row
+        if len(self.rows) >= self.max_symbols:
+            if not self.stats['dropped_symbols']:
+                logger.warning(f"⚠️ Price history full ({self.max_symbols} symbols), new symbols are not recorded")
+            self.stats['dropped_symbols'] += 1
+            return None
+        row = len(self.rows)
+        capacity = self.minutes.values.shape[0]
+        if row >= capacity:
+            new_capacity = min(capacity * 2, self.max_symbols)
+            self.minutes.grow(new_capacity)
+            self.hours.grow(new_capacity)
+        self.rows[symbol] = row
+        return row
+
+    def record(self, prices: Dict[str, float], timestamp: Optional[float] = None):
+        """Record a price snapshot (symbol -> price) at timestamp (default now)."""
+        timestamp = time.time() if timestamp is None else timestamp
+        rows, values = [], []
+        for symbol, price in prices.items():
+            if not price or price <= 0:
+                continue
+            row = self._row(symbol)
+            if row is not None:
+                rows.append(row)
+                values.append(price)
+        if not rows:
+            return
+        rows_array = np.fromiter(rows, dtype=np.int64, count=len(rows))
+        values_array = np.fromiter(values, dtype=np.float32, count=len(values))
+        self.minutes.write(rows_array, values_array, timestamp)
+        self.hours.write(rows_array, values_array, timestamp)
+        if self.first_recorded is None:
+            self.first_recorded = timestamp
+        self.stats['records'] += 1
+
+    def _ring(self, seconds: float) -> _Ring:
+        return self.minutes if self.minutes.covers(seconds) else self.hours
+
+    def prices_ago(self, symbols: Iterable[str], seconds: float, now: Optional[float] = None) -> Dict[str, float]:
+        """Recorded price of each symbol `seconds` ago (symbols without one are omitted)."""
+        now = time.time() if now is None else now
+        known = [symbol for symbol in symbols if symbol in self.rows]
+        if not known:
+            return {}
+        ring = self._ring(seconds)
+        if not ring.covers(seconds):
+            return {}
+        rows = np.fromiter((self.rows[symbol] for symbol in known), dtype=np.int64, count=len(known))
+        values = ring.read(rows, now - seconds, self.tolerance)
+        return {symbol: float(value) for symbol, value in zip(known, values) if not np.isnan(value)}
+
+    def changes(self, prices: Dict[str, float], seconds: float, now: Optional[float] = None) -> Dict[str, float]:
+        """Percent change over the window for each symbol with a recorded past price.
+
+        Args:
+            prices: Symbol -> current price
+            seconds: Window length (e.g. parse_timeframe('24h'))
+        """
+        past = self.prices_ago(prices, seconds, now)
+        return {
+            symbol: (prices[symbol] - past_price) / past_price * 100
+            for symbol, past_price in past.items()
+            if past_price > 0
+        }
+
+    def get_stats(self) -> Dict:
+        return {
+            'symbols': len(self.rows),
+            'max_symbols': self.max_symbols,
+            'minute_slots': self.minutes.slots,
+            'hour_slots': self.hours.slots,
+            'memory_mb': round((self.minutes.values.nbytes + self.hours.values.nbytes) / 1024 / 1024, 1),
+            'covers_seconds': int(time.time() - self.first_recorded) if self.first_recorded else 0,
+            **self.stats
+        }
@@ -0,0 +1,247 @@
+"""
+Circuit breakers and health scores for data provider routing.
+
+Each (provider, operation) pair - e.g. ('coinmarketcap', 'daily_candles') - has:
+
+- a CircuitBreaker: closed -> open after CIRCUIT_FAILURE_THRESHOLD consecutive
+  failures; open -> half-open after CIRCUIT_COOLDOWN_SECONDS, when a single probe
+  request is let through; the probe closes the breaker again or re-opens it with
+  a doubled cooldown (capped at CIRCUIT_MAX_COOLDOWN_SECONDS)
+- a rolling window (last PROVIDER_HEALTH_WINDOW calls, at most
+  PROVIDER_HEALTH_MAX_AGE_SECONDS old) of latency and outcome, from which a
+  health score in [0, 1] is derived. Samples expire, so a provider that lost
+  traffic is scored as unknown again later and gets re-tried - routing returns
+  to the primary once it has recovered.
+
+ProviderRouter orders the candidate providers of an operation: providers whose
+breaker rejects requests are skipped, the rest are sorted by health score
+(fastest healthy provider first), with the configured order as tie-breaker.
+"""
+
+import logging
+import os
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Score of a provider/operation without samples yet (a measured healthy provider beats it)
+UNKNOWN_HEALTH_SCORE = 0.5
+# Latency (seconds) at which the latency factor of the score halves
+REFERENCE_LATENCY_SECONDS = 1.0
+
+
+class CircuitBreaker:
+    """Closed / open / half-open circuit breaker for one provider operation."""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int, cooldown_seconds: float, max_cooldown_seconds: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown_seconds
+        self.max_cooldown = max_cooldown_seconds
+        self.cooldown = cooldown_seconds
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.times_opened = 0
+
+    @property
+    def is_open(self) -> bool:
+        """Open and still cooling down (requests are rejected without a probe)."""
+        return self.state == self.OPEN and time.monotonic() - self.opened_at < self.cooldown
+
+    def allow_request(self) -> bool:
+        """Whether a request may be sent now (moves open -> half-open after the cooldown)."""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if self.is_open:
+                return False
+            self.state = self.HALF_OPEN
+            self.probe_in_flight = False
+            logger.info(f"🟡 Circuit {self.name}: half-open, probing")
+        # Half-open: one probe at a time
+        if self.probe_in_flight:
+            return False
+        self.probe_in_flight = True
+        return True
+
+    def record_success(self):
+        if self.state != self.CLOSED:
+            logger.info(f"🟢 Circuit {self.name}: closed again")
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.cooldown = self.base_cooldown
+        self.probe_in_flight = False
+
+    def release(self):
+        """Give back a half-open probe slot whose request ended without an outcome."""
+        self.probe_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN:
+            # Failed probe: back off longer before the next one
+            self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+            self._open()
+        elif self.state == self.CLOSED and self.consecutive_failures >= self.failure_threshold:
+            self._open()
+
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.probe_in_flight = False
+        self.times_opened += 1
+        logger.warning(f"🔴 Circuit {self.name}: open for {self.cooldown:.0f}s "
+                       f"after {self.consecutive_failures} consecutive failures")
+
+    def to_dict(self) -> Dict:
+        retry_in = 0.0
+        if self.state == self.OPEN:
+            retry_in = max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+        return {
+            'state': self.state,
+            'consecutive_failures': self.consecutive_failures,
+            'times_opened': self.times_opened,
+            'retry_in_seconds': round(retry_in, 1)
+        }
+
+
+class ProviderHealth:
+    """Rolling latency / error-rate window of one provider operation."""
+
+    def __init__(self, window: int, max_age_seconds: float):
+        self.samples: deque = deque(maxlen=window)  # (observed_at, latency_seconds, success)
+        self.max_age = max_age_seconds
+
+    def observe(self, latency: float, success: bool):
+        self.samples.append((time.monotonic(), latency, success))
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.max_age
+        while self.samples and self.samples[0][0] < cutoff:
+            self.samples.popleft()
+
+    @property
+    def error_rate(self) -> Optional[float]:
+        self._expire()
+        if not self.samples:
+            return None
+        return sum(1 for _, _, ok in self.samples if not ok) / len(self.samples)
+
+    @property
+    def avg_latency(self) -> Optional[float]:
+        self._expire()
+        latencies = [latency for _, latency, ok in self.samples if ok]
+        if not latencies:
+            return None
+        return sum(latencies) / len(latencies)
+
+    def latency_quantile(self, q: float, min_samples: int = 5) -> Optional[float]:
+        """q-quantile of successful call latencies (None with fewer than min_samples)."""
+        self._expire()
+        latencies = sorted(latency for _, latency, ok in self.samples if ok)
+        if len(latencies) < min_samples:
+            return None
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+    @property
+    def score(self) -> float:
+        """(1 - error rate) x latency factor; a failing-only window scores 0."""
+        self._expire()
+        if not self.samples:
+            return UNKNOWN_HEALTH_SCORE
+        latency = self.avg_latency
+        if latency is None:
+            return 0.0
+        return (1 - self.error_rate) / (1 + latency / REFERENCE_LATENCY_SECONDS)
+
+    def to_dict(self) -> Dict:
+        self._expire()
+        error_rate = self.error_rate
+        latency = self.avg_latency
+        return {
+            'samples': len(self.samples),
+            'error_rate': round(error_rate, 3) if error_rate is not None else None,
+            'avg_latency_seconds': round(latency, 3) if latency is not None else None,
+            'health_score': round(self.score, 3)
+        }
+
+
+class ProviderRouter:
+    """Circuit breakers and health-scored ordering of providers per operation."""
+
+    def __init__(self, providers: List[str]):
+        """
+        Args:
+            providers: Provider names in configured preference order (tie-breaker)
+        """
+        self.providers = providers
+        self.failure_threshold = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '5'))
+        self.cooldown_seconds = float(os.getenv('CIRCUIT_COOLDOWN_SECONDS', '60'))
+        self.max_cooldown_seconds = float(os.getenv('CIRCUIT_MAX_COOLDOWN_SECONDS', '600'))
+        self.window = int(os.getenv('PROVIDER_HEALTH_WINDOW', '50'))
+        self.max_age_seconds = float(os.getenv('PROVIDER_HEALTH_MAX_AGE_SECONDS', '900'))
+        self.breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+        self.health: Dict[Tuple[str, str], ProviderHealth] = {}
+
+    def breaker(self, provider: str, operation: str) -> CircuitBreaker:
+        key = (provider, operation)
+        breaker = self.breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker(f"{provider}/{operation}", self.failure_threshold,
+                                     self.cooldown_seconds, self.max_cooldown_seconds)
+            self.breakers[key] = breaker
+        return breaker
+
+    def _health(self, provider: str, operation: str) -> ProviderHealth:
+        key = (provider, operation)
+        health = self.health.get(key)
+        if health is None:
+            health = ProviderHealth(self.window, self.max_age_seconds)
+            self.health[key] = health
+        return health
+
+    def rank(self, operation: str, candidates: Optional[List[str]] = None) -> List[str]:
+        """Candidate providers of an operation, healthiest first.
+
+        Providers with an open breaker are left out. Half-open providers are not
+        reserved here; call allow_request() right before each attempt.
+        """
+        candidates = candidates or self.providers
+        available = [p for p in candidates if not self.breaker(p, operation).is_open]
+        return sorted(available, key=lambda p: (-self._health(p, operation).score, candidates.index(p)))
+
+    def allow_request(self, provider: str, operation: str) -> bool:
+        return self.breaker(provider, operation).allow_request()
+
+    def latency_quantile(self, provider: str, operation: str, q: float) -> Optional[float]:
+        return self._health(provider, operation).latency_quantile(q)
+
+    def release(self, provider: str, operation: str):
+        """Undo allow_request() for a call that ended without an outcome (not found or cancelled)."""
+        self.breaker(provider, operation).release()
+
+    def record(self, provider: str, operation: str, success: bool, latency: float):
+        """Record the outcome of one call."""
+        self._health(provider, operation).observe(latency, success)
+        breaker = self.breaker(provider, operation)
+        if success:
+            breaker.record_success()
+        else:
+            breaker.record_failure()
+
+    def get_status(self) -> Dict:
+        """{operation: {provider: breaker state + health}} for every operation seen so far."""
+        status: Dict[str, Dict] = {}
+        for (provider, operation), breaker in self.breakers.items():
+            entry = breaker.to_dict()
+            entry.update(self._health(provider, operation).to_dict())
+            status.setdefault(operation, {})[provider] = entry
+        return status
@@ -0,0 +1,160 @@
+"""
+Persistent symbol -> provider ID map (CoinMarketCap IDs, CoinGecko coin IDs).
+
+CoinMarketCapClient._get_cmc_id and CoinGeckoClient._get_coin_id used to resolve
+IDs with one API call per symbol into an in-memory dict, so the first scan after
+every restart paid hundreds of extra requests (CoinGecko even downloaded its
+full coins/list for every symbol). ProviderIdMap keeps the maps:
+
+- warmed in bulk from each provider's full map endpoint (at startup and every
+  PROVIDER_ID_MAP_REFRESH_HOURS), ambiguous symbols resolved to the highest rank
+- persisted per provider with a version (bumped on every warm-up) and a schema
+  version (maps written by an older format are ignored)
+- per-symbol lookups only for unknown symbols; their results are remembered and
+  flushed to the store
+
+Stores (PROVIDER_ID_MAP_STORE): 'supabase' (provider_id_maps table, default when
+a database is available) or 'file' (JSON at PROVIDER_ID_MAP_PATH).
+"""
+
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from services.document_store import create_document_store
+
+logger = logging.getLogger(__name__)
+
+# Bump when the stored map format changes; older maps are then re-warmed
+ID_MAP_SCHEMA_VERSION = 1
+
+
+class ProviderIdMap:
+    """Versioned, persistent symbol -> ID maps for all providers."""
+
+    def __init__(self, db=None):
+        self.store = create_document_store(db, 'provider_id_maps', 'provider', 'PROVIDER_ID_MAP_STORE',
+                                           'PROVIDER_ID_MAP_PATH', 'provider_id_map.json')
+        self.max_age = timedelta(hours=float(os.getenv('PROVIDER_ID_MAP_REFRESH_HOURS', '24')))
+        self.maps: Dict[str, Dict[str, Any]] = {}
+        self.versions: Dict[str, int] = {}
+        self.updated_at: Dict[str, datetime] = {}
+        self._dirty: set = set()
+        self.stats = {'hits': 0, 'misses': 0, 'remembered': 0, 'warmups': 0}
+
+    def symbols(self, provider: str) -> Dict[str, Any]:
+        """Current symbol -> ID dict of a provider (replaced on load and warm-up)."""
+        return self.maps.setdefault(provider, {})
+
+    def get(self, provider: str, symbol: str) -> Optional[Any]:
+        provider_id = self.symbols(provider).get(symbol.upper())
+        self.stats['hits' if provider_id is not None else 'misses'] += 1
+        return provider_id
+
+    def remember(self, provider: str, symbol: str, provider_id: Any):
+        """Add the ID of an unknown symbol, found outside a warm-up (persisted on the next flush).
+
+        Known symbols keep their ID: warm-ups resolve shared symbols by rank.
+        """
+        symbols = self.symbols(provider)
+        if provider_id is None or symbol.upper() in symbols:
+            return
+        symbols[symbol.upper()] = provider_id
+        self._dirty.add(provider)
+        self.stats['remembered'] += 1
+
+    def is_fresh(self, provider: str) -> bool:
+        updated_at = self.updated_at.get(provider)
+        return updated_at is not None and datetime.now(timezone.utc) - updated_at < self.max_age
+
+    async def load(self, provider: str) -> bool:
+        """Load a provider's map from the store. Returns False if missing or of an older schema."""
+        try:
+            document = await self.store.read(provider)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not load {provider} ID map: {e}")
+            return False
+
+        if not document or document.get('schema_version') != ID_MAP_SCHEMA_VERSION:
+            return False
+
+        symbols = document.get('symbols') or {}
+        # Keep IDs remembered since startup on top of the stored map
+        symbols.update(self.maps.get(provider, {}))
+        self.maps[provider] = symbols
+        self.versions[provider] = document.get('version', 0)
+        updated_at = document.get('updated_at')
+        if isinstance(updated_at, str):
+            updated_at = datetime.fromisoformat(updated_at.replace('Z', '+00:00'))
+        self.updated_at[provider] = updated_at
+        logger.info(f"🗺️ Loaded {provider} ID map v{self.versions[provider]}: {len(symbols)} symbols")
+        return True
+
+    async def save(self, provider: str):
+        updated_at = self.updated_at.get(provider) or datetime.now(timezone.utc)
+        document = {
+            'provider': provider,
+            'schema_version': ID_MAP_SCHEMA_VERSION,
+            'version': self.versions.get(provider, 0),
+            'symbols': self.symbols(provider),
+            'updated_at': updated_at.isoformat()
+        }
+        await self.store.write(provider, document)
+        self._dirty.discard(provider)
+
+    async def warm(self, provider: str, fetch_map: Callable[[], Awaitable[Dict[str, Any]]],
+                   force: bool = False) -> int:
+        """Make sure a provider's map is loaded and fresh, re-warming it in bulk if needed.
+
+        Args:
+            provider: Provider name
+            fetch_map: Coroutine function returning the provider's full symbol -> ID map
+            force: Re-warm even if the stored map is still fresh
+
+        Returns number of symbols in the map
+        """
+        if not force and (self.is_fresh(provider) or (await self.load(provider) and self.is_fresh(provider))):
+            return len(self.symbols(provider))
+
+        try:
+            fetched = await fetch_map()
+        except Exception as e:
+            logger.error(f"❌ {provider} ID map warm-up failed: {e}")
+            return len(self.symbols(provider))
+
+        if not fetched:
+            logger.warning(f"⚠️ {provider} ID map warm-up returned no symbols")
+            return len(self.symbols(provider))
+
+        self.maps[provider] = {symbol.upper(): provider_id for symbol, provider_id in fetched.items()}
+        self.versions[provider] = self.versions.get(provider, 0) + 1
+        self.updated_at[provider] = datetime.now(timezone.utc)
+        self.stats['warmups'] += 1
+        try:
+            await self.save(provider)
+        except Exception as e:
+            logger.error(f"❌ Could not persist {provider} ID map: {e}")
+        logger.info(f"🗺️ Warmed {provider} ID map v{self.versions[provider]}: {len(self.maps[provider])} symbols")
+        return len(self.maps[provider])
+
+    async def flush(self):
+        """Persist maps that gained per-symbol lookups since the last save."""
+        for provider in list(self._dirty):
+            try:
+                await self.save(provider)
+            except Exception as e:
+                logger.error(f"❌ Could not persist {provider} ID map: {e}")
+
+    def get_stats(self) -> Dict:
+        return {
+            'providers': {
+                provider: {
+                    'symbols': len(symbols),
+                    'version': self.versions.get(provider, 0),
+                    'updated_at': self.updated_at[provider].isoformat() if self.updated_at.get(provider) else None
+                }
+                for provider, symbols in self.maps.items()
+            },
+            **self.stats
+        }
@@ -0,0 +1,198 @@
+"""
+Per-provider token-bucket rate limiting.
+
+Every request made through a provider session (see http_transport) first takes a
+token from that provider's bucket. Buckets are sized from each API's documented
+quota, waiters are served strictly in arrival order so concurrent scan tasks
+share a provider fairly, and the bucket adapts to what the provider reports:
+
+- 429 / Retry-After: pause the provider until the given time and halve the rate
+- X-RateLimit-Remaining: 0 (or similar headers): pause until the reported reset
+- successful responses: additive recovery back to the configured rate
+
+Override a quota with RATE_LIMIT_<PROVIDER>="<requests per second>[:<burst>]".
+"""
+
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Documented quotas as (requests per second, burst)
+PROVIDER_QUOTAS = {
+    'coinmarketcap': (0.5, 5),      # Basic plan: 30 requests/minute
+    'coingecko': (0.5, 5),          # Demo plan: 30 calls/minute
+    'cryptocompare': (20.0, 20),    # Free: 20 calls/second
+    'binance': (20.0, 40),          # Spot: 6000 weight/minute, klines weigh 2
+    'tokenmetrics': (1.0, 5),
+    'coinalyze': (0.66, 5),         # 40 calls/minute
+    'okx_futures': (10.0, 20),      # Public market data: 20 requests/2 seconds
+    'bybit_futures': (20.0, 40),    # 600 requests/5 seconds per IP
+    'binance_futures': (10.0, 20),  # Futures: 2400 weight/minute
+    'default': (5.0, 10)
+}
+
+# Lowest fraction of the configured rate the adaptive backoff goes down to
+MIN_RATE_FRACTION = 0.1
+# Pause when a provider answers 429 without Retry-After
+DEFAULT_BACKOFF_SECONDS = 5.0
+
+
+def _quota_for(provider: str) -> Tuple[float, float]:
+    override = os.getenv(f'RATE_LIMIT_{provider.upper()}')
+    if override:
+        try:
+            rate, _, burst = override.partition(':')
+            return float(rate), float(burst or max(1.0, float(rate)))
+        except ValueError:
+            logger.warning(f"Invalid RATE_LIMIT_{provider.upper()}={override!r}, using default quota")
+    return PROVIDER_QUOTAS.get(provider, PROVIDER_QUOTAS['default'])
+
+
+def _parse_retry_after(value: str) -> Optional[float]:
+    """Retry-After as seconds to wait (delta-seconds or HTTP-date)."""
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def _header(headers: Mapping[str, str], *names: str) -> Optional[str]:
+    for name in names:
+        value = headers.get(name)
+        if value is not None:
+            return value
+    return None
+
+
+class TokenBucket:
+    """Fair (FIFO) async token bucket with adaptive rate for one provider."""
+
+    def __init__(self, provider: str, rate: float, burst: float):
+        self.provider = provider
+        self.base_rate = rate
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+        self._lock_loop = None
+        self.stats = {'acquired': 0, 'waited_seconds': 0.0, 'throttled': 0}
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _get_lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        return self._lock
+
+    async def acquire(self):
+        """Wait for a token. asyncio.Lock wakes waiters in FIFO order, so the
+        lock holder is always the oldest waiting request."""
+        start = time.monotonic()
+        async with self._get_lock():
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self.paused_until - now
+                if wait <= 0:
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        break
+                    wait = (1 - self.tokens) / self.rate
+                await asyncio.sleep(wait)
+        self.stats['acquired'] += 1
+        self.stats['waited_seconds'] += time.monotonic() - start
+
+    def pause(self, seconds: float, reason: str):
+        until = time.monotonic() + seconds
+        if until > self.paused_until:
+            self.paused_until = until
+            logger.warning(f"⏳ {self.provider}: pausing requests for {seconds:.1f}s ({reason})")
+
+    def observe_response(self, status: int, headers: Mapping[str, str]):
+        """Adapt to the provider's rate-limit feedback."""
+        if status == 429:
+            self.stats['throttled'] += 1
+            self.rate = max(self.base_rate * MIN_RATE_FRACTION, self.rate * 0.5)
+            retry_after = _header(headers, 'Retry-After', 'retry-after')
+            seconds = _parse_retry_after(retry_after) if retry_after else None
+            self.pause(seconds if seconds is not None else DEFAULT_BACKOFF_SECONDS, 'HTTP 429')
+            self.tokens = 0.0
+            return
+
+        remaining = _header(headers, 'X-RateLimit-Remaining', 'x-ratelimit-remaining',
+                            'X-Bapi-Limit-Status', 'RateLimit-Remaining')
+        if remaining is not None:
+            try:
+                if float(remaining) <= 0:
+                    reset = _header(headers, 'X-RateLimit-Reset', 'x-ratelimit-reset',
+                                    'X-Bapi-Limit-Reset-Timestamp', 'RateLimit-Reset')
+                    self.pause(self._reset_delay(reset), 'quota exhausted')
+                    self.tokens = 0.0
+            except ValueError:
+                pass
+
+        if 200 <= status < 400 and self.rate < self.base_rate:
+            # Additive recovery: back to the configured rate after ~20 good responses
+            self.rate = min(self.base_rate, self.rate + self.base_rate * 0.05)
+
+    def _reset_delay(self, reset: Optional[str]) -> float:
+        """Seconds until a reset header (delta seconds, epoch seconds or epoch ms)."""
+        if reset is None:
+            return 1.0 / self.rate
+        try:
+            value = float(reset)
+        except ValueError:
+            return 1.0 / self.rate
+        now = time.time()
+        if value > 1e12:  # epoch milliseconds
+            return max(0.0, value / 1000 - now)
+        if value > 1e9:  # epoch seconds
+            return max(0.0, value - now)
+        return value
+
+    def get_stats(self) -> Dict:
+        acquired = self.stats['acquired']
+        return {
+            'configured_rate': self.base_rate,
+            'current_rate': round(self.rate, 3),
+            'burst': self.burst,
+            'requests': acquired,
+            'throttled': self.stats['throttled'],
+            'avg_wait_seconds': round(self.stats['waited_seconds'] / acquired, 4) if acquired else 0.0,
+            'paused_for_seconds': round(max(0.0, self.paused_until - time.monotonic()), 2)
+        }
+
+
+class RateLimiterRegistry:
+    """One TokenBucket per provider, created on first use."""
+
+    def __init__(self):
+        self.buckets: Dict[str, TokenBucket] = {}
+
+    def bucket(self, provider: str) -> TokenBucket:
+        bucket = self.buckets.get(provider)
+        if bucket is None:
+            rate, burst = _quota_for(provider)
+            bucket = TokenBucket(provider, rate, burst)
+            self.buckets[provider] = bucket
+        return bucket
+
+    def get_stats(self) -> Dict:
+        return {provider: bucket.get_stats() for provider, bucket in self.buckets.items()}
@@ -0,0 +1,58 @@
+"""
+Per-coin Pass 1 checkpoints for resumable scans.
+
+Every coin that finishes Pass 1 is written to scan_checkpoints together with
+its aggregated result and bot results. When a long scan times out, fails or the
+process restarts, POST /api/scan/resume/{run_id} reloads these checkpoints,
+analyzes only the coins that are missing and then runs Pass 2, ranking and
+persistence as usual. SCAN_CHECKPOINTS=false turns the writes off.
+"""
+
+import logging
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import Dict
+
+from database.jsonb import to_jsonable
+
+logger = logging.getLogger(__name__)
+
+
+class ScanCheckpointStore:
+    """Records and reloads completed coins of a scan run."""
+
+    def __init__(self, db):
+        self.db = db
+        self.enabled = os.getenv('SCAN_CHECKPOINTS', 'true').lower() == 'true'
+
+    async def record_coin(self, run_id: str, symbol: str, coin_result: Dict):
+        """Checkpoint one coin's Pass 1 result. Failures are logged, never raised."""
+        if not self.enabled:
+            return
+        try:
+            await self.db.scan_checkpoints.insert_one({
+                'id': str(uuid.uuid4()),
+                'run_id': run_id,
+                'symbol': symbol,
+                'aggregated': to_jsonable(coin_result.get('aggregated')),
+                'bot_results': to_jsonable(coin_result.get('bot_results', [])),
+                'created_at': datetime.now(timezone.utc).isoformat()
+            })
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to checkpoint {symbol} for run {run_id}: {e}")
+
+    async def load(self, run_id: str) -> Dict[str, Dict]:
+        """Checkpointed coins of a run.
+
+        Returns:
+            Dict of symbol -> {'aggregated', 'bot_results'}
+        """
+        checkpoints = await self.db.scan_checkpoints.find({'run_id': run_id}).to_list(10000)
+        return {
+            checkpoint['symbol']: {
+                'aggregated': checkpoint['aggregated'],
+                'bot_results': checkpoint.get('bot_results') or []
+            }
+            for checkpoint in checkpoints
+        }
@@ -1,6 +1,7 @@
 import asyncio
 from typing import List, Dict, Optional
 import logging
+import os
 from datetime import datetime, timezone
 
 from services.multi_provider_client import MultiProviderClient
@@ -12,8 +13,14 @@ from services.aggregation_engine import AggregationEngine
 from services.email_service import EmailService
 from services.google_sheets_service import GoogleSheetsService
 from services.bot_performance_service import BotPerformanceService
-from services.market_regime_classifier import MarketRegimeClassifier  # Phase 2: Market regime detection
+from services.market_snapshot import MarketSnapshotService
+from services.market_stream import MarketStreamService
+from services.market_regime_classifier import MarketRegimeClassifier, ScanRegimeContext  # Phase 2: Market regime detection
 from bots.bot_strategies import get_all_bots
+from bots.batch_engine import run_bots_batch
+from services.analysis_pool import AnalysisPool, compute_coin_features
+from services.scan_shards import create_shard_queue, run_sharded_pass
+from services.scan_checkpoints import ScanCheckpointStore
 from models.models import ScanRun, BotResult, Recommendation
 
 logger = logging.getLogger(__name__)
@@ -31,15 +38,28 @@ class ScanOrchestrator:
     
     def __init__(self, db):
         self.db = db
-        self.crypto_client = MultiProviderClient()
-        self.futures_client = MultiFuturesClient()  # Multi-provider futures/derivatives data
+        self.crypto_client = MultiProviderClient(db)
+        self.market_stream = MarketStreamService()  # Exchange WebSocket latest-state table (opt-in)
+        self.futures_client = MultiFuturesClient(db, self.market_stream)  # Multi-provider futures/derivatives data
         self.indicator_engine = IndicatorEngine()
         self.llm_service = LLMSynthesisService()  # Layer 3
         self.sentiment_service = SentimentAnalysisService()  # Layer 1
         self.aggregation_engine = AggregationEngine(db)  # Pass DB for weight lookup
-        self.bot_performance_service = BotPerformanceService(db, self.crypto_client)
+        self.market_snapshot = MarketSnapshotService(self.crypto_client.cryptocompare, self.market_stream)  # Shared price index
+        self.bot_performance_service = BotPerformanceService(db, self.crypto_client, self.market_snapshot)
         self.market_regime = MarketRegimeClassifier()  # Phase 2: Market regime classifier
+        self.regime_context: Optional[ScanRegimeContext] = None  # Set per scan in _run_scan_with_config
         self.bots = get_all_bots()  # Now includes 50 bots (Layer 2 includes AIAnalystBot)
+        # Vectorized mode: run each bot once over all coins of Pass 1 (see bots/batch_engine.py)
+        self.vectorized_bots = os.getenv('VECTORIZED_BOTS', 'false').lower() == 'true'
+        # Optional worker processes for indicators/regime/bots (ANALYSIS_WORKERS, 0 = in-process)
+        self.analysis_pool = AnalysisPool()
+        # Sharded Pass 1 on a job queue (see services/scan_shards.py)
+        self.distributed_scans = os.getenv('DISTRIBUTED_SCANS', 'false').lower() == 'true'
+        self.shard_queue = create_shard_queue(db) if self.distributed_scans else None
+        self.local_shard_workers = int(os.getenv('SCAN_LOCAL_WORKERS', '1'))
+        # Per-coin Pass 1 checkpoints for resumable scans
+        self.checkpoints = ScanCheckpointStore(db)
         
         logger.info(f"🤖 Scan Orchestrator initialized with {len(self.bots)} bots (including AI Analyst)")
         logger.info("📊 Futures/derivatives data enabled: Bybit → OKX → Binance fallback")
@@ -140,6 +160,57 @@ class ScanOrchestrator:
             }
     
     
+    async def resume_scan(self, run_id: str) -> Dict:
+        """Resume an interrupted scan (timeout, failure or restart) from its checkpoints.
+        
+        Only coins without a Pass 1 checkpoint are analyzed again, replacing any
+        bot_results rows they got before the interruption; Pass 2 and the top lists
+        then run over all coins of the original run, and persistence steps the
+        original run finished (recommendations, bot predictions) are skipped.
+        
+        Args:
+            run_id: ID of the scan run to resume
+        
+        Returns:
+            Dict with run_id, status, recommendations (same as run_scan)
+        """
+        run_doc = await self.db.scan_runs.find_one({'id': run_id})
+        if not run_doc:
+            raise ValueError(f"Scan run {run_id} not found")
+        if run_doc.get('status') == 'completed':
+            raise ValueError(f"Scan run {run_id} already completed")
+        if not (run_doc.get('scan_config') or {}).get('tokens'):
+            raise ValueError(f"Scan run {run_id} has no saved coin list to resume from")
+        
+        scan_run = ScanRun(**run_doc)
+        scan_run.status = 'running'
+        scan_run.error_message = None
+        scan_run.completed_at = None
+        await self.db.scan_runs.update_one(
+            {'id': scan_run.id},
+            {'$set': {'status': 'running', 'error_message': None, 'completed_at': None}}
+        )
+        
+        config = scan_run.scan_config
+        logger.info(f"♻️ Resuming {scan_run.scan_type.upper()} run {scan_run.id}")
+        
+        # Run with the same bot set as the original run (speed runs use a subset)
+        original_bots = self.bots
+        bot_names = set(config.get('bot_names') or [])
+        if bot_names:
+            self.bots = [bot for bot in self.bots if bot.name in bot_names]
+        try:
+            return await self._run_scan_with_config(
+                scan_run, scan_run.filter_scope, scan_run.min_price, scan_run.max_price, None, scan_run.user_id,
+                skip_sentiment=config.get('skip_sentiment', False),
+                parallel=config.get('parallel', False),
+                batch_size=config.get('batch_size', 1),
+                ai_top_n=config.get('ai_top_n', 15),
+                resume=True
+            )
+        finally:
+            self.bots = original_bots
+    
     async def _run_quick_scan(self, scan_run: ScanRun, filter_scope: str, min_price: Optional[float], max_price: Optional[float], custom_symbols: Optional[List[str]], user_id: Optional[str]) -> Dict:
         """Quick Scan: 100 coins with parallel processing (3 concurrent), ~7-10 minutes."""
         logger.info("⚡ QUICK SCAN: 100 coins (3 concurrent), 48 bots, NO AI (~7-10 min)")
@@ -247,56 +318,111 @@ class ScanOrchestrator:
         return await self._run_scan_with_config(scan_run, filter_scope, min_price, 5.0, custom_symbols, user_id,
                                                max_coins=500, skip_sentiment=False, parallel=True, batch_size=8, ai_top_n=25)
     
-    async def _run_scan_with_config(self, scan_run: ScanRun, filter_scope: str, min_price: Optional[float], max_price: Optional[float], custom_symbols: Optional[List[str]], user_id: Optional[str], max_coins: int = 80, skip_sentiment: bool = False, parallel: bool = False, batch_size: int = 1, ai_top_n: int = 15) -> Dict:
+    async def _select_scan_tokens(self, scan_run: ScanRun, filter_scope: str, min_price: Optional[float], max_price: Optional[float], custom_symbols: Optional[List[str]], max_coins: int) -> tuple:
+        """Fetch the coin universe and apply the scope/price/custom filters.
+        
+        Returns:
+            (tokens, selected_tokens): all filtered (symbol, display_name, price) tuples
+            and the ones this scan analyzes
+        """
+        # 1. Fetch coins from CryptoCompare (primary data source)
+        logger.info(f"Fetching up to {max_coins} coins and prices from CryptoCompare...")
+        all_coins = await self.crypto_client.get_all_coins(max_coins=max_coins)
+        
+        if not all_coins:
+            raise Exception("No coins fetched from CryptoCompare")
+        
+        # Store total available coins
+        scan_run.total_available_coins = len(all_coins)
+        logger.info(f"Fetched {len(all_coins)} coins from CryptoCompare")
+        
+        # 2. Apply filters
+        tokens = all_coins
+        
+        # Custom symbols filter (takes precedence)
+        if custom_symbols and len(custom_symbols) > 0:
+            tokens = [t for t in all_coins if t[0] in custom_symbols]
+            logger.info(f"Custom scan: filtering to {len(tokens)} specific symbols found")
+        elif filter_scope == 'alt':
+            exclusions = ['BTC', 'ETH', 'USDT', 'USDC', 'DAI', 'TUSD', 'BUSD', 'USDD']
+            tokens = [t for t in tokens if t[0] not in exclusions]
+        
+        # Apply price filters if specified
+        if min_price is not None and min_price > 0:
+            tokens = [t for t in tokens if t[2] >= min_price]
+            logger.info(f"Applied price filter: min_price=${min_price}")
+        
+        if max_price is not None and max_price > 0:
+            tokens = [t for t in tokens if t[2] <= max_price]
+            logger.info(f"Applied price filter: max_price=${max_price}")
+        
+        # 3. Select tokens to analyze (configurable based on scan type)
+        if custom_symbols:
+            # Custom scan: analyze all selected symbols
+            selected_tokens = tokens[:min(max_coins, 50)]  # Limit even custom scans
+            logger.info(f"Custom scan: analyzing {len(selected_tokens)} tokens")
+        else:
+            # Take top N by market cap (configurable)
+            selected_tokens = tokens[:max_coins]
+            logger.info(f"Analyzing top {len(selected_tokens)} coins by market cap")
+        
+        scan_run.total_coins = len(selected_tokens)
+        
+        return tokens, selected_tokens
+    
+    async def _run_scan_with_config(self, scan_run: ScanRun, filter_scope: str, min_price: Optional[float], max_price: Optional[float], custom_symbols: Optional[List[str]], user_id: Optional[str], max_coins: int = 80, skip_sentiment: bool = False, parallel: bool = False, batch_size: int = 1, ai_top_n: int = 15, resume: bool = False) -> Dict:
         """Core scan logic with configurable parameters including parallel processing.
         
         Args:
             ai_top_n: Number of top coins to apply AI sentiment analysis (default 15)
+            resume: Continue an interrupted run from scan_run.scan_config and its
+                per-coin checkpoints instead of fetching a new coin list
         """
         
         try:
-            # 1. Fetch coins from CryptoCompare (primary data source)
-            logger.info(f"Fetching up to {max_coins} coins and prices from CryptoCompare...")
-            all_coins = await self.crypto_client.get_all_coins(max_coins=max_coins)
-            
-            if not all_coins:
-                raise Exception("No coins fetched from CryptoCompare")
-            
-            # Store total available coins
-            scan_run.total_available_coins = len(all_coins)
-            logger.info(f"Fetched {len(all_coins)} coins from CryptoCompare")
-            
-            # 2. Apply filters
-            tokens = all_coins
-            
-            # Custom symbols filter (takes precedence)
-            if custom_symbols and len(custom_symbols) > 0:
-                tokens = [t for t in all_coins if t[0] in custom_symbols]
-                logger.info(f"Custom scan: filtering to {len(tokens)} specific symbols found")
-            elif filter_scope == 'alt':
-                exclusions = ['BTC', 'ETH', 'USDT', 'USDC', 'DAI', 'TUSD', 'BUSD', 'USDD']
-                tokens = [t for t in tokens if t[0] not in exclusions]
-            
-            # Apply price filters if specified
-            if min_price is not None and min_price > 0:
-                tokens = [t for t in tokens if t[2] >= min_price]
-                logger.info(f"Applied price filter: min_price=${min_price}")
-            
-            if max_price is not None and max_price > 0:
-                tokens = [t for t in tokens if t[2] <= max_price]
-                logger.info(f"Applied price filter: max_price=${max_price}")
-            
-            # 3. Select tokens to analyze (configurable based on scan type)
-            if custom_symbols:
-                # Custom scan: analyze all selected symbols
-                selected_tokens = tokens[:min(max_coins, 50)]  # Limit even custom scans
-                logger.info(f"Custom scan: analyzing {len(selected_tokens)} tokens")
+            if resume:
+                # Resume: same coin list as the interrupted run, minus checkpointed coins
+                selected_tokens = [tuple(token) for token in scan_run.scan_config['tokens']]
+                tokens = selected_tokens
+                checkpointed = await self.checkpoints.load(scan_run.id)
+                logger.info(f"♻️ Resuming {scan_run.id}: {len(checkpointed)}/{len(selected_tokens)} coins already checkpointed")
             else:
-                # Take top N by market cap (configurable)
-                selected_tokens = tokens[:max_coins]
-                logger.info(f"Analyzing top {len(selected_tokens)} coins by market cap")
+                tokens, selected_tokens = await self._select_scan_tokens(
+                    scan_run, filter_scope, min_price, max_price, custom_symbols, max_coins
+                )
+                checkpointed = {}
+                
+                # Persist the coin list and settings so the run can be resumed
+                scan_run.scan_config = {
+                    'tokens': [list(token) for token in selected_tokens],
+                    'bot_names': [bot.name for bot in self.bots],
+                    'skip_sentiment': skip_sentiment,
+                    'parallel': parallel,
+                    'batch_size': batch_size,
+                    'ai_top_n': ai_top_n
+                }
+                await self.db.scan_runs.update_one(
+                    {'id': scan_run.id},
+                    {'$set': {
+                        'scan_config': scan_run.scan_config,
+                        'total_coins': scan_run.total_coins,
+                        'total_available_coins': scan_run.total_available_coins
+                    }}
+                )
+            
+            # Scan-scoped regime context: BTC market regime once, regime × bot_type weights
+            # (regime affinity of the active weight set, if any)
+            weight_set = await self.aggregation_engine.weight_sets.get_active()
+            self.market_regime.set_regime_affinity(weight_set.get('regime_affinity') if weight_set else None)
+            market_regime = await self.bot_performance_service.classify_market_regime()
+            self.regime_context = ScanRegimeContext(
+                self.market_regime, market_regime, [getattr(bot, 'bot_type', 'default') for bot in self.bots]
+            )
+            logger.info(f"📊 Market regime for this scan: {market_regime}")
             
-            scan_run.total_coins = len(selected_tokens)
+            # Exchange-wide open interest / funding once per scan instead of per coin
+            if self.futures_client.snapshot_enabled:
+                await self.futures_client.refresh_snapshot()
             
             # 🚀 PASS 1: Fast bot analysis (conditional sentiment based on scan type)
             if skip_sentiment:
@@ -307,13 +433,55 @@ class ScanOrchestrator:
             all_aggregated_results = []
             all_individual_bot_results = []  # NEW: Track individual bot predictions
             
+            # Restore checkpointed coins (resume) and only analyze the rest
+            for symbol, coin_result in checkpointed.items():
+                aggregated = coin_result.get('aggregated')
+                if aggregated:
+                    aggregated['ticker'] = symbol
+                    all_aggregated_results.append(aggregated)
+                    all_individual_bot_results.extend(coin_result.get('bot_results', []))
+            pending_tokens = [token for token in selected_tokens if token[0] not in checkpointed]
+            if resume and pending_tokens:
+                # bot_results of coins interrupted before their checkpoint are saved again below
+                await self.db.bot_results.delete_many({
+                    'run_id': scan_run.id,
+                    'coin': {'$in': [display_name for _, display_name, _ in pending_tokens]}
+                })
+            
+            # Sharded Pass 1 on the scan job queue if enabled
+            if self.distributed_scans:
+                logger.info(f"🧩 Using distributed scan shards ({self.local_shard_workers} local workers)")
+                
+                coin_results = await run_sharded_pass(
+                    self, self.shard_queue, pending_tokens, scan_run.id,
+                    batch_size if parallel else 1, self.local_shard_workers
+                )
+                for symbol, coin_result in coin_results:
+                    aggregated = coin_result.get('aggregated')
+                    if aggregated:
+                        aggregated['ticker'] = symbol
+                        all_aggregated_results.append(aggregated)
+                        all_individual_bot_results.extend(coin_result.get('bot_results', []))
+            # Vectorized bot execution across all coins if enabled
+            elif self.vectorized_bots:
+                logger.info(f"🧮 Using vectorized bot execution ({batch_size if parallel else 1} coins fetched at a time)")
+                
+                coin_results = await self._analyze_coins_vectorized(
+                    pending_tokens, scan_run.id, batch_size if parallel else 1
+                )
+                for symbol, coin_result in coin_results:
+                    aggregated = coin_result.get('aggregated')
+                    if aggregated:
+                        aggregated['ticker'] = symbol
+                        all_aggregated_results.append(aggregated)
+                        all_individual_bot_results.extend(coin_result.get('bot_results', []))
             # Parallel processing if enabled
-            if parallel and batch_size > 1:
+            elif parallel and batch_size > 1:
                 logger.info(f"🔀 Using parallel processing: {batch_size} coins at a time")
                 
                 # Process coins in batches
-                for i in range(0, len(selected_tokens), batch_size):
-                    batch = selected_tokens[i:i + batch_size]
+                for i in range(0, len(pending_tokens), batch_size):
+                    batch = pending_tokens[i:i + batch_size]
                     batch_tasks = []
                     
                     for symbol, display_name, current_price in batch:
@@ -341,10 +509,10 @@ class ScanOrchestrator:
                                 all_aggregated_results.append(aggregated)
                                 all_individual_bot_results.extend(bot_results)  # Collect all bot predictions
                     
-                    logger.debug(f"Batch {i//batch_size + 1}/{(len(selected_tokens) + batch_size - 1)//batch_size} complete")
+                    logger.debug(f"Batch {i//batch_size + 1}/{(len(pending_tokens) + batch_size - 1)//batch_size} complete")
             else:
                 # Sequential processing (original)
-                for symbol, display_name, current_price in selected_tokens:
+                for symbol, display_name, current_price in pending_tokens:
                     try:
                         coin_result = await self._analyze_coin_with_cryptocompare(
                             symbol, display_name, current_price, scan_run.id, skip_sentiment=True
@@ -460,28 +628,41 @@ class ScanOrchestrator:
                         all_top_recommendations.append(rec_data)
                         seen_coins.add(coin_name)
             
-            # 5. Save all recommendations to DB
-            for rec_data in all_top_recommendations:
-                recommendation = Recommendation(
+            # 5. Save all recommendations to DB (a resumed run skips steps the original run finished)
+            persisted = scan_run.scan_config.get('persisted', [])
+            if 'recommendations' not in persisted:
+                if resume:
+                    # Rows of an insert loop that was interrupted
+                    await self.db.recommendations.delete_many({'run_id': scan_run.id})
+                for rec_data in all_top_recommendations:
+                    recommendation = Recommendation(
+                        run_id=scan_run.id,
+                        user_id=user_id,
+                        **rec_data
+                    )
+                    await self.db.recommendations.insert_one(recommendation.dict())
+                await self._mark_persisted(scan_run, 'recommendations')
+            
+            # 5.5. Save individual bot predictions for learning (NEW!)
+            # Market regime for this scan (classified once at scan start)
+            market_regime = self.regime_context.market_regime
+            
+            if 'bot_predictions' in persisted:
+                logger.info("♻️ Bot predictions were saved before the run was interrupted")
+            elif resume and await self.db.bot_predictions.count_documents({'run_id': scan_run.id}):
+                # Saved in one insert_many just before the interruption
+                logger.info("♻️ Bot predictions were saved before the run was interrupted")
+                await self._mark_persisted(scan_run, 'bot_predictions')
+            else:
+                logger.info("💾 Saving individual bot predictions for performance tracking...")
+                saved_predictions = await self.bot_performance_service.save_bot_predictions(
                     run_id=scan_run.id,
                     user_id=user_id,
-                    **rec_data
+                    bot_results=all_individual_bot_results,  # Use collected individual bot results
+                    market_regime=market_regime  # Pass market regime
                 )
-                await self.db.recommendations.insert_one(recommendation.dict())
-            
-            # 5.5. Save individual bot predictions for learning (NEW!)
-            logger.info("💾 Saving individual bot predictions for performance tracking...")
-            
-            # Classify market regime for this scan
-            market_regime = await self.bot_performance_service.classify_market_regime()
-            
-            saved_predictions = await self.bot_performance_service.save_bot_predictions(
-                run_id=scan_run.id,
-                user_id=user_id,
-                bot_results=all_individual_bot_results,  # Use collected individual bot results
-                market_regime=market_regime  # Pass market regime
-            )
-            logger.info(f"✅ Saved {saved_predictions} bot predictions for learning (Market: {market_regime})")
+                await self._mark_persisted(scan_run, 'bot_predictions')
+                logger.info(f"✅ Saved {saved_predictions} bot predictions for learning (Market: {market_regime})")
             
             # 6. Update scan run status
             scan_run.status = 'completed'
@@ -542,6 +723,14 @@ class ScanOrchestrator:
                 'error': str(e)
             }
     
+    async def _mark_persisted(self, scan_run: ScanRun, step: str):
+        """Record a finished persistence step in the run's scan_config so a resume skips it."""
+        scan_run.scan_config.setdefault('persisted', []).append(step)
+        await self.db.scan_runs.update_one(
+            {'id': scan_run.id},
+            {'$set': {'scan_config': scan_run.scan_config}}
+        )
+    
     async def _analyze_coin_with_dual_source(self, symbol: str, display_name: str, current_price: float, run_id: str) -> Optional[Dict]:
         """Analyze a coin using CryptoCompare data enhanced with TokenMetrics AI analytics.
         
@@ -1021,85 +1210,24 @@ class ScanOrchestrator:
             Aggregated result dict or None if insufficient data
         """
         try:
-            # 1. Fetch historical data from CryptoCompare (1 year, daily candles)
-            candles = await self.crypto_client.get_historical_data(symbol, days=365)
+            active_bots = self._get_active_bots(skip_sentiment)
             
-            if len(candles) < 30:
-                logger.warning(f"Insufficient CryptoCompare data for {symbol}: {len(candles)} candles")
-                return None
+            # Pass 1 bots can run in the analysis pool worker right after the features
+            bot_names = [bot.name for bot in active_bots] if skip_sentiment and self.analysis_pool.enabled else None
             
-            # 2. Update most recent candle with current price
-            if candles and current_price > 0:
-                candles[-1]['close'] = current_price
-                candles[-1]['high'] = max(candles[-1]['high'], current_price)
-                candles[-1]['low'] = min(candles[-1]['low'], current_price)
-            
-            # 2.5. Fetch derivatives/futures data (NEW!)
-            derivatives_data = await self.futures_client.get_all_derivatives_metrics(symbol)
-            
-            # 2.6. PHASE 4: Fetch 4-hour candles for multi-timeframe analysis
-            candles_4h = await self.crypto_client.get_4h_candles(symbol, limit=168)  # 7 days of 4h candles
-            
-            # 3. Compute indicators (now includes derivatives data)
-            features = self.indicator_engine.compute_all_indicators(candles, derivatives_data)
-            
-            if not features:
-                logger.warning(f"Failed to compute indicators for {symbol}")
+            context = await self._prepare_coin_context(symbol, display_name, current_price, skip_sentiment, bot_names)
+            if not context:
                 return None
             
-            # Ensure current price is accurate
-            features['current_price'] = current_price
-            
-            # 3.5. PHASE 4: Compute 4h timeframe indicators
-            features_4h = self.indicator_engine.compute_4h_indicators(candles_4h)
-            
-            # 3.6. PHASE 4: Check timeframe alignment
-            timeframe_alignment = self.indicator_engine.check_timeframe_alignment(features, features_4h)
-            features['timeframe_alignment'] = timeframe_alignment.get('alignment', 'unknown')
-            features['timeframe_confidence_modifier'] = timeframe_alignment.get('confidence_modifier', 1.0)
-            
-            # Merge 4h indicators into features dict
-            features.update(features_4h)
-            
-            logger.debug(f"📊 {symbol} Timeframe Alignment: {timeframe_alignment.get('alignment')} (modifier: {timeframe_alignment.get('confidence_modifier')})")
-            
-            # 🎯 PHASE 2: Classify market regime
-            regime_data = self.market_regime.classify_regime(candles, features)
-            market_regime = regime_data['regime']
-            regime_confidence = regime_data['confidence']
-            
-            logger.info(f"📊 {symbol} Market Regime: {market_regime} (confidence: {regime_confidence:.2f})")
-            
-            # Add regime to features for bot access
-            features['market_regime'] = market_regime
-            features['regime_confidence'] = regime_confidence
-            
-            # 🔮 LAYER 1: Pre-Analysis Sentiment (CONDITIONAL - Skip in Pass 1)
-            if not skip_sentiment:
-                try:
-                    logger.debug(f"🔮 Layer 1: Running sentiment analysis for {symbol}...")
-                    sentiment_data = await self.sentiment_service.analyze_market_sentiment(
-                        symbol=symbol,
-                        coin_name=display_name,
-                        current_price=current_price
-                    )
-                    features = self.sentiment_service.enrich_features(features, sentiment_data)
-                    logger.info(f"✨ Layer 1 complete for {symbol}: {sentiment_data.get('sentiment_text', 'neutral')} (score: {sentiment_data.get('sentiment_score', 5)})")
-                except Exception as e:
-                    logger.warning(f"Layer 1 sentiment analysis skipped for {symbol}: {e}")
-            else:
-                logger.debug(f"⚡ Skipping sentiment for {symbol} (Pass 1 - speed optimization)")
+            if context['bot_results'] is not None:
+                bots_by_name = {bot.name: bot for bot in active_bots}
+                raw_results = [(bots_by_name[name], result) for name, result in context['bot_results']]
+                return await self._finalize_coin_analysis(context, raw_results, run_id, skip_sentiment)
             
             # 🤖 LAYER 2: Run all 49 bots
-            bot_results = []
+            raw_results = []
             bot_count = 0
             
-            # Filter bots: exclude AIAnalystBot if skip_sentiment is True (quick scans)
-            active_bots = self.bots
-            if skip_sentiment:
-                active_bots = [bot for bot in self.bots if bot.__class__.__name__ != 'AIAnalystBot']
-                logger.debug(f"⚡ Quick scan mode: using {len(active_bots)} bots (excluding AIAnalystBot)")
-            
             for bot in active_bots:
                 try:
                     # Yield to event loop every 5 bots to prevent blocking
@@ -1107,148 +1235,316 @@ class ScanOrchestrator:
                     if bot_count % 5 == 0:
                         await asyncio.sleep(0)  # Allow other tasks to run
                     
-                    # Phase 2: Apply regime-based weight modifier
-                    bot_name = bot.__class__.__name__
-                    bot_type = getattr(bot, 'bot_type', 'default')  # Bot should define its type
-                    regime_weight = self.market_regime.get_bot_weight_modifier(market_regime, bot_type)
-                    
-                    result = bot.analyze(features)
-                    
-                    # Phase 2 & 4: Apply regime weight AND timeframe confidence modifiers
-                    if result:
-                        original_confidence = result.get('confidence', 5)
-                        
-                        # Apply regime weight modifier
-                        confidence_after_regime = original_confidence * regime_weight
-                        
-                        # PHASE 4: Apply timeframe alignment modifier
-                        timeframe_modifier = features.get('timeframe_confidence_modifier', 1.0)
-                        final_confidence = confidence_after_regime * timeframe_modifier
-                        
-                        # Clamp confidence
-                        result['confidence'] = min(10, max(1, final_confidence))
-                        result['regime_weight'] = regime_weight
-                        result['timeframe_modifier'] = timeframe_modifier
-                        
-                        if regime_weight != 1.0 or timeframe_modifier != 1.0:
-                            logger.debug(f"   {bot_name}: {original_confidence:.1f} → {result['confidence']:.1f} (regime: {regime_weight}x, timeframe: {timeframe_modifier}x)")
-                    if result:
-                        # Ensure predicted prices exist
-                        if 'predicted_24h' not in result:
-                            result['predicted_24h'] = current_price
-                        if 'predicted_48h' not in result:
-                            result['predicted_48h'] = current_price
-                        if 'predicted_7d' not in result:
-                            result['predicted_7d'] = current_price
-                        
-                        # Calculate leverage if not provided by bot
-                        if 'recommended_leverage' not in result:
-                            # Default leverage based on confidence and stop loss distance
-                            confidence = result['confidence']
-                            entry = result['entry']
-                            stop_loss = result['stop_loss']
-                            sl_distance = abs(entry - stop_loss) / entry
-                            
-                            # Simple leverage calculation
-                            base_leverage = confidence  # 1-10 based on confidence
-                            if sl_distance < 0.03:  # Tight SL
-                                base_leverage *= 0.7
-                            elif sl_distance > 0.10:  # Wide SL
-                                base_leverage *= 0.6
-                            
-                            result['recommended_leverage'] = max(1.0, min(20.0, round(base_leverage, 1)))
-                        
-                        # Convert confidence to int for BotResult model (fixes validation error)
-                        confidence_int = int(round(result['confidence']))
-                        
-                        # Save bot result to DB
-                        bot_result = BotResult(
-                            run_id=run_id,
-                            coin=display_name,
-                            bot_name=bot.name,
-                            direction=result['direction'],
-                            entry_price=result['entry'],
-                            take_profit=result['take_profit'],
-                            stop_loss=result['stop_loss'],
-                            confidence=confidence_int,  # Use integer confidence
-                            rationale=result['rationale'],
-                            recommended_leverage=result.get('recommended_leverage', 5.0),
-                            predicted_24h=result.get('predicted_24h'),
-                            predicted_48h=result.get('predicted_48h'),
-                            predicted_7d=result.get('predicted_7d')
-                        )
-                        
-                        try:
-                            insert_result = await self.db.bot_results.insert_one(bot_result.dict())
-                            logger.debug(f"✅ Saved bot_result: {bot.name} for {display_name}, ID: {insert_result.inserted_id}")
-                        except Exception as db_error:
-                            logger.error(f"❌ Failed to save bot_result for {bot.name}/{display_name}: {db_error}")
-                            raise  # Re-raise to be caught by outer exception handler
-                        
-                        # Add bot name and coin info for prediction tracking
-                        result_with_context = result.copy()
-                        result_with_context['bot_name'] = bot.name
-                        result_with_context['ticker'] = symbol
-                        result_with_context['coin'] = display_name
-                        result_with_context['current_price'] = current_price
-                        
-                        bot_results.append(result_with_context)
+                    raw_results.append((bot, bot.analyze(context['features'])))
                 except Exception as e:
                     logger.error(f"Bot {bot.name} failed for {symbol}: {e}", exc_info=True)
             
-            if not bot_results:
-                logger.warning(f"No bot results for {symbol}")
-                return None
-            
-            logger.info(f"🤖 Layer 2 complete for {symbol}: {len(bot_results)}/49 bots analyzed")
-            
-            # 5. Aggregate results
-            aggregated = await self.aggregation_engine.aggregate_coin_results(display_name, bot_results, current_price)
-            
-            # PHASE 2: Add market regime data to aggregated results
-            aggregated['market_regime'] = market_regime
-            aggregated['regime_confidence'] = regime_confidence
-            
-            # 📝 LAYER 3: LLM Synthesis (CONDITIONAL - Basic for Pass 1, Enhanced for Pass 2)
-            try:
-                if not skip_sentiment:
-                    # Full synthesis with sentiment (Pass 2 - top coins)
-                    enhanced_rationale = await self.llm_service.synthesize_recommendations(display_name, bot_results, features)
-                    aggregated['rationale'] = enhanced_rationale
-                else:
-                    # Simple synthesis without sentiment (Pass 1 - all coins)
-                    consensus = 'LONG' if aggregated.get('consensus_direction') == 'long' else 'SHORT'
-                    bot_count = len(bot_results)
-                    confidence = aggregated.get('avg_confidence', 5)
-                    aggregated['rationale'] = f"{bot_count} bots analyzed: {consensus} consensus (confidence: {confidence:.1f}/10)"
-            except Exception as e:
-                logger.warning(f"LLM synthesis skipped for {symbol}: {e}")
-                aggregated['rationale'] = f"{len(bot_results)} bots analyzed"
-            
-            logger.info(f"✓ {symbol}: {len(bot_results)} bots, confidence={aggregated.get('avg_confidence', 0):.1f}, price=${current_price:.6f}, regime={market_regime}")
-            
-            # Return both aggregated and individual bot results
-            return {
-                'aggregated': aggregated,
-                'bot_results': bot_results  # Include individual bot predictions
-            }
+            return await self._finalize_coin_analysis(context, raw_results, run_id, skip_sentiment)
             
         except Exception as e:
             logger.error(f"Critical error analyzing {symbol}: {e}", exc_info=True)
             return None
+    
+    def _get_active_bots(self, skip_sentiment: bool) -> List:
+        """Bots to run for a coin: AIAnalystBot is excluded when skip_sentiment is True (quick scans)."""
+        if skip_sentiment:
+            return [bot for bot in self.bots if bot.__class__.__name__ != 'AIAnalystBot']
+        return self.bots
+    
+    async def _prepare_coin_context(self, symbol: str, display_name: str, current_price: float, skip_sentiment: bool = False, bot_names: Optional[List[str]] = None) -> Optional[Dict]:
+        """Fetch data and build the bot features for one coin (everything before Layer 2).
+        
+        Args:
+            bot_names: Bots to run in the analysis pool worker together with the
+                features (only used when the pool is enabled and skip_sentiment is True,
+                since sentiment enrichment has to happen before the bots run)
+        
+        Returns:
+            Dict with symbol, display_name, current_price, features, market_regime,
+            regime_confidence and bot_results ((bot name, result) pairs computed by a
+            pool worker, or None), or None if there is not enough data
+        """
+        # 1. Fetch historical data from CryptoCompare (1 year, daily candles)
+        candles = await self.crypto_client.get_historical_data(symbol, days=365)
+        
+        if len(candles) < 30:
+            logger.warning(f"Insufficient CryptoCompare data for {symbol}: {len(candles)} candles")
+            return None
+        
+        # 2. Update most recent candle with current price
+        if candles and current_price > 0:
+            candles[-1]['close'] = current_price
+            candles[-1]['high'] = max(candles[-1]['high'], current_price)
+            candles[-1]['low'] = min(candles[-1]['low'], current_price)
+        
+        # 2.5. Fetch derivatives/futures data (NEW!)
+        derivatives_data = await self.futures_client.get_all_derivatives_metrics(symbol)
+        
+        # 2.6. PHASE 4: Fetch 4-hour candles for multi-timeframe analysis
+        candles_4h = await self.crypto_client.get_4h_candles(symbol, limit=168)  # 7 days of 4h candles
+        
+        # 3. Compute indicators, 4h timeframe alignment and market regime (in a worker
+        # process when the analysis pool is enabled)
+        analysis = None
+        if self.analysis_pool.enabled:
+            try:
+                analysis = await self.analysis_pool.analyze(
+                    symbol, candles, candles_4h, derivatives_data, current_price, bot_names
+                )
+                if analysis is None:
+                    logger.warning(f"Failed to compute indicators for {symbol}")
+                    return None
+            except Exception as e:
+                logger.warning(f"⚠️ Analysis pool failed for {symbol}, computing in-process: {e}")
+        
+        if analysis is None:
+            computed = compute_coin_features(
+                symbol, candles, candles_4h, derivatives_data, current_price,
+                self.indicator_engine, self.market_regime
+            )
+            if computed is None:
+                return None
+            features, regime_data = computed
+            bot_results = None
+        else:
+            features = analysis['features']
+            regime_data = analysis['regime_data']
+            bot_results = analysis['bot_results']
+        
+        market_regime = regime_data['regime']
+        regime_confidence = regime_data['confidence']
+        
+        logger.info(f"📊 {symbol} Market Regime: {market_regime} (confidence: {regime_confidence:.2f})")
+        
+        # 🔮 LAYER 1: Pre-Analysis Sentiment (CONDITIONAL - Skip in Pass 1)
+        if not skip_sentiment:
+            try:
+                logger.debug(f"🔮 Layer 1: Running sentiment analysis for {symbol}...")
+                sentiment_data = await self.sentiment_service.analyze_market_sentiment(
+                    symbol=symbol,
+                    coin_name=display_name,
+                    current_price=current_price
+                )
+                features = self.sentiment_service.enrich_features(features, sentiment_data)
+                logger.info(f"✨ Layer 1 complete for {symbol}: {sentiment_data.get('sentiment_text', 'neutral')} (score: {sentiment_data.get('sentiment_score', 5)})")
+            except Exception as e:
+                logger.warning(f"Layer 1 sentiment analysis skipped for {symbol}: {e}")
+        else:
+            logger.debug(f"⚡ Skipping sentiment for {symbol} (Pass 1 - speed optimization)")
+        
+        return {
+            'symbol': symbol,
+            'display_name': display_name,
+            'current_price': current_price,
+            'features': features,
+            'market_regime': market_regime,
+            'regime_confidence': regime_confidence,
+            'bot_results': bot_results
+        }
+    
+    async def _finalize_coin_analysis(self, context: Dict, raw_results: List, run_id: str, skip_sentiment: bool = False) -> Optional[Dict]:
+        """Apply confidence modifiers, save bot results and aggregate one coin (after Layer 2).
+        
+        Args:
+            context: Output of _prepare_coin_context
+            raw_results: (bot, result) pairs as returned by bot.analyze / run_bots_batch
+            run_id: Scan run ID
+            skip_sentiment: Pass 1 (simple rationale) vs Pass 2 (LLM synthesis)
+        
+        Returns:
+            Dict with 'aggregated' and 'bot_results', or None if no bot produced a signal
+        """
+        symbol = context['symbol']
+        display_name = context['display_name']
+        current_price = context['current_price']
+        features = context['features']
+        market_regime = context['market_regime']
+        regime_confidence = context['regime_confidence']
+        
+        bot_results = []
+        
+        for bot, result in raw_results:
+            if not result:
+                continue
             try:
+                # Phase 2: Apply regime-based weight modifier
+                bot_name = bot.__class__.__name__
+                bot_type = getattr(bot, 'bot_type', 'default')  # Bot should define its type
+                regime_weight = (self.regime_context or self.market_regime).get_bot_weight_modifier(market_regime, bot_type)
+                
+                # Phase 2 & 4: Apply regime weight AND timeframe confidence modifiers
+                original_confidence = result.get('confidence', 5)
+                
+                # Apply regime weight modifier
+                confidence_after_regime = original_confidence * regime_weight
+                
+                # PHASE 4: Apply timeframe alignment modifier
+                timeframe_modifier = features.get('timeframe_confidence_modifier', 1.0)
+                final_confidence = confidence_after_regime * timeframe_modifier
+                
+                # Clamp confidence
+                result['confidence'] = min(10, max(1, final_confidence))
+                result['regime_weight'] = regime_weight
+                result['timeframe_modifier'] = timeframe_modifier
+                
+                if regime_weight != 1.0 or timeframe_modifier != 1.0:
+                    logger.debug(f"   {bot_name}: {original_confidence:.1f} → {result['confidence']:.1f} (regime: {regime_weight}x, timeframe: {timeframe_modifier}x)")
+                
+                # Ensure predicted prices exist
+                if 'predicted_24h' not in result:
+                    result['predicted_24h'] = current_price
+                if 'predicted_48h' not in result:
+                    result['predicted_48h'] = current_price
+                if 'predicted_7d' not in result:
+                    result['predicted_7d'] = current_price
+                
+                # Calculate leverage if not provided by bot
+                if 'recommended_leverage' not in result:
+                    # Default leverage based on confidence and stop loss distance
+                    confidence = result['confidence']
+                    entry = result['entry']
+                    stop_loss = result['stop_loss']
+                    sl_distance = abs(entry - stop_loss) / entry
+                    
+                    # Simple leverage calculation
+                    base_leverage = confidence  # 1-10 based on confidence
+                    if sl_distance < 0.03:  # Tight SL
+                        base_leverage *= 0.7
+                    elif sl_distance > 0.10:  # Wide SL
+                        base_leverage *= 0.6
+                    
+                    result['recommended_leverage'] = max(1.0, min(20.0, round(base_leverage, 1)))
+                
+                # Convert confidence to int for BotResult model (fixes validation error)
+                confidence_int = int(round(result['confidence']))
+                
+                # Save bot result to DB
+                bot_result = BotResult(
+                    run_id=run_id,
+                    coin=display_name,
+                    bot_name=bot.name,
+                    direction=result['direction'],
+                    entry_price=result['entry'],
+                    take_profit=result['take_profit'],
+                    stop_loss=result['stop_loss'],
+                    confidence=confidence_int,  # Use integer confidence
+                    rationale=result['rationale'],
+                    recommended_leverage=result.get('recommended_leverage', 5.0),
+                    predicted_24h=result.get('predicted_24h'),
+                    predicted_48h=result.get('predicted_48h'),
+                    predicted_7d=result.get('predicted_7d')
+                )
+                
+                try:
+                    insert_result = await self.db.bot_results.insert_one(bot_result.dict())
+                    logger.debug(f"✅ Saved bot_result: {bot.name} for {display_name}, ID: {insert_result.inserted_id}")
+                except Exception as db_error:
+                    logger.error(f"❌ Failed to save bot_result for {bot.name}/{display_name}: {db_error}")
+                    raise  # Re-raise to be caught by outer exception handler
+                
+                # Add bot name and coin info for prediction tracking (each result is a fresh
+                # dict from the bot, so it is annotated in place rather than copied)
+                result['bot_name'] = bot.name
+                result['ticker'] = symbol
+                result['coin'] = display_name
+                result['current_price'] = current_price
+                
+                bot_results.append(result)
+            except Exception as e:
+                logger.error(f"Bot {bot.name} failed for {symbol}: {e}", exc_info=True)
+        
+        if not bot_results:
+            logger.warning(f"No bot results for {symbol}")
+            return None
+        
+        logger.info(f"🤖 Layer 2 complete for {symbol}: {len(bot_results)}/49 bots analyzed")
+        
+        # 5. Aggregate results (regime boosts follow the coin's regime)
+        aggregated = await self.aggregation_engine.aggregate_coin_results(
+            display_name, bot_results, current_price, market_regime
+        )
+        
+        # PHASE 2: Add market regime data to aggregated results
+        aggregated['market_regime'] = market_regime
+        aggregated['regime_confidence'] = regime_confidence
+        
+        # 📝 LAYER 3: LLM Synthesis (CONDITIONAL - Basic for Pass 1, Enhanced for Pass 2)
+        try:
+            if not skip_sentiment:
+                # Full synthesis with sentiment (Pass 2 - top coins)
                 enhanced_rationale = await self.llm_service.synthesize_recommendations(display_name, bot_results, features)
                 aggregated['rationale'] = enhanced_rationale
-            except Exception as e:
-                logger.warning(f"LLM synthesis skipped for {symbol}: {e}")
-                aggregated['rationale'] = f"{len(bot_results)} bots analyzed"
-            
-            logger.info(f"✓ {symbol}: {len(bot_results)} bots, confidence={aggregated.get('avg_confidence', 0):.1f}, price=${current_price:.4f} (CryptoCompare data)")
-            return aggregated
-            
+            else:
+                # Simple synthesis without sentiment (Pass 1 - all coins)
+                consensus = 'LONG' if aggregated.get('consensus_direction') == 'long' else 'SHORT'
+                bot_count = len(bot_results)
+                confidence = aggregated.get('avg_confidence', 5)
+                aggregated['rationale'] = f"{bot_count} bots analyzed: {consensus} consensus (confidence: {confidence:.1f}/10)"
         except Exception as e:
-            logger.error(f"Critical error analyzing {symbol}: {e}", exc_info=True)
-            return None
+            logger.warning(f"LLM synthesis skipped for {symbol}: {e}")
+            aggregated['rationale'] = f"{len(bot_results)} bots analyzed"
+        
+        logger.info(f"✓ {symbol}: {len(bot_results)} bots, confidence={aggregated.get('avg_confidence', 0):.1f}, price=${current_price:.6f}, regime={market_regime}")
+        
+        coin_result = {
+            'aggregated': aggregated,
+            'bot_results': bot_results  # Include individual bot predictions
+        }
+        
+        # Pass 1 checkpoint so an interrupted scan can resume without this coin
+        if skip_sentiment:
+            await self.checkpoints.record_coin(run_id, symbol, coin_result)
+        
+        # Return both aggregated and individual bot results
+        return coin_result
+    
+    async def _analyze_coins_vectorized(self, tokens: List, run_id: str, batch_size: int = 1) -> List:
+        """PASS 1 in vectorized mode: every bot runs once over all coins of the scan.
+        
+        Data fetching and indicators still run per coin (batch_size at a time), then
+        run_bots_batch evaluates each bot across the whole feature table, and each
+        coin is finalized (modifiers, DB save, aggregation) as in the scalar path.
+        
+        Returns:
+            List of (symbol, coin_result) pairs for coins that produced results
+        """
+        contexts = []
+        batch_size = max(1, batch_size)
+        
+        for i in range(0, len(tokens), batch_size):
+            batch = tokens[i:i + batch_size]
+            prepared = await asyncio.gather(*[
+                self._prepare_coin_context(symbol, display_name, current_price, skip_sentiment=True)
+                for symbol, display_name, current_price in batch
+            ], return_exceptions=True)
+            
+            for (symbol, _, _), context in zip(batch, prepared):
+                if isinstance(context, Exception):
+                    logger.error(f"Error analyzing {symbol}: {context}")
+                elif context:
+                    contexts.append(context)
+        
+        if not contexts:
+            return []
+        
+        active_bots = self._get_active_bots(skip_sentiment=True)
+        per_coin_results = run_bots_batch(
+            active_bots,
+            [context['features'] for context in contexts],
+            [context['symbol'] for context in contexts]
+        )
+        logger.info(f"🧮 Vectorized bots: {len(active_bots)} bots × {len(contexts)} coins")
+        
+        coin_results = []
+        for context, raw_results in zip(contexts, per_coin_results):
+            try:
+                coin_result = await self._finalize_coin_analysis(context, raw_results, run_id, skip_sentiment=True)
+                if coin_result:
+                    coin_results.append((context['symbol'], coin_result))
+            except Exception as e:
+                logger.error(f"Critical error analyzing {context['symbol']}: {e}", exc_info=True)
+        
+        return coin_results
     
     async def _analyze_coin_with_coingecko(self, coin_id: str, symbol: str, current_price: float, run_id: str) -> Optional[Dict]:
         """Analyze a single coin with real CoinGecko data.
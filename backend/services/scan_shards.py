@@ -0,0 +1,401 @@
+"""
+Distributed scan shards.
+
+With DISTRIBUTED_SCANS=true, Pass 1 of a scan is split into shards of
+SCAN_SHARD_SIZE coins that are put on a job queue. Shard workers claim a shard,
+run the normal per-coin analysis (_analyze_coin_with_cryptocompare) on it while
+sending heartbeats, and write the coin results back onto the shard. The scan
+that created the shards acts as coordinator: it requeues shards whose worker
+stopped heartbeating, waits until every shard is done and merges the results,
+after which Pass 2, the top-N lists and persistence run as usual.
+
+Queue backends (SCAN_QUEUE_BACKEND):
+- 'local' (default): in-process table, shards are worked by SCAN_LOCAL_WORKERS
+  asyncio workers of the API process. Useful for development and single hosts.
+- 'supabase': the scan_shards Postgres table. Any number of worker processes on
+  other machines can join with ``python -m services.scan_shards`` (run from the
+  backend directory with the same .env).
+
+Claims and state changes are compare-and-set updates (UPDATE ... WHERE id = x
+AND status = y), so two workers can never own the same shard.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from database.jsonb import to_jsonable
+
+logger = logging.getLogger(__name__)
+
+SHARD_SIZE = int(os.getenv('SCAN_SHARD_SIZE', '25'))
+SHARD_MAX_ATTEMPTS = int(os.getenv('SCAN_SHARD_MAX_ATTEMPTS', '3'))
+HEARTBEAT_INTERVAL = float(os.getenv('SCAN_HEARTBEAT_INTERVAL', '15'))
+HEARTBEAT_TIMEOUT = float(os.getenv('SCAN_HEARTBEAT_TIMEOUT', '90'))
+POLL_INTERVAL = float(os.getenv('SCAN_QUEUE_POLL_INTERVAL', '2'))
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class LocalShardTable:
+    """In-process stand-in for the scan_shards table (same subset of the DB API)."""
+
+    def __init__(self):
+        self._rows: Dict[str, Dict] = {}
+
+    def _matches(self, row: Dict, query: Dict) -> bool:
+        return all(row.get(key) == value for key, value in query.items())
+
+    async def insert_one(self, document: Dict) -> Dict:
+        self._rows[document['id']] = dict(document)
+        return document
+
+    async def update_one(self, query: Dict, update: Dict, upsert: bool = False) -> Dict:
+        update_data = update.get('$set', update)
+        for row in self._rows.values():
+            if self._matches(row, query):
+                row.update(update_data)
+                return {'matched_count': 1, 'modified_count': 1}
+        return {'matched_count': 0, 'modified_count': 0}
+
+    def find(self, query: Dict = None) -> 'LocalShardCursor':
+        rows = [dict(row) for row in self._rows.values() if self._matches(row, query or {})]
+        return LocalShardCursor(rows)
+
+
+class LocalShardCursor:
+    def __init__(self, rows: List[Dict]):
+        self._rows = rows
+        self._limit_count = None
+
+    def sort(self, field: str, direction: int = 1):
+        self._rows.sort(key=lambda row: row.get(field) or '', reverse=direction == -1)
+        return self
+
+    def limit(self, count: int):
+        self._limit_count = count
+        return self
+
+    async def to_list(self, length: int = None):
+        limit = length if length is not None else self._limit_count
+        return self._rows[:limit] if limit is not None else self._rows
+
+
+class ShardQueue:
+    """Job queue of scan shards on top of a scan_shards table."""
+
+    def __init__(self, table, max_attempts: int = SHARD_MAX_ATTEMPTS):
+        self.table = table
+        self.max_attempts = max_attempts
+
+    async def enqueue(self, run_id: str, tokens: List, batch_size: int = 1,
+                      shard_size: int = SHARD_SIZE) -> List[str]:
+        """Split (symbol, display_name, price) tokens into shards and queue them.
+
+        Returns:
+            Shard IDs in token order
+        """
+        shard_size = max(1, shard_size)
+        shard_ids = []
+        for index, start in enumerate(range(0, len(tokens), shard_size)):
+            shard_id = str(uuid.uuid4())
+            await self.table.insert_one({
+                'id': shard_id,
+                'run_id': run_id,
+                'shard_index': index,
+                'tokens': [list(token) for token in tokens[start:start + shard_size]],
+                'batch_size': batch_size,
+                'status': 'pending',
+                'worker_id': None,
+                'attempts': 0,
+                'heartbeat_at': None,
+                'results': None,
+                'error': None,
+                'created_at': _now(),
+                'updated_at': _now()
+            })
+            shard_ids.append(shard_id)
+        return shard_ids
+
+    async def get_shards(self, run_id: str) -> List[Dict]:
+        shards = await self.table.find({'run_id': run_id}).to_list(10000)
+        return sorted(shards, key=lambda shard: shard['shard_index'])
+
+    async def claim(self, worker_id: str, run_id: Optional[str] = None) -> Optional[Dict]:
+        """Claim the oldest pending shard (of run_id, or of any run)."""
+        query = {'status': 'pending'}
+        if run_id:
+            query['run_id'] = run_id
+        candidates = await self.table.find(query).sort('created_at', 1).limit(20).to_list()
+
+        for shard in candidates:
+            claimed = await self.table.update_one(
+                {'id': shard['id'], 'status': 'pending'},
+                {'$set': {
+                    'status': 'running',
+                    'worker_id': worker_id,
+                    'heartbeat_at': _now(),
+                    'updated_at': _now()
+                }}
+            )
+            if claimed.get('matched_count'):
+                shard['worker_id'] = worker_id
+                return shard
+        return None
+
+    async def heartbeat(self, shard_id: str, worker_id: str) -> bool:
+        """Refresh the heartbeat; False if the shard was taken away from this worker."""
+        result = await self.table.update_one(
+            {'id': shard_id, 'status': 'running', 'worker_id': worker_id},
+            {'$set': {'heartbeat_at': _now()}}
+        )
+        return bool(result.get('matched_count'))
+
+    async def complete(self, shard_id: str, worker_id: str, results: List[Dict]) -> bool:
+        result = await self.table.update_one(
+            {'id': shard_id, 'status': 'running', 'worker_id': worker_id},
+            {'$set': {
+                'status': 'completed',
+                'results': to_jsonable(results),
+                'updated_at': _now()
+            }}
+        )
+        return bool(result.get('matched_count'))
+
+    async def _release(self, shard: Dict, condition: Dict, error: str) -> str:
+        """Put a shard back to pending, or mark it failed once attempts run out."""
+        attempts = (shard.get('attempts') or 0) + 1
+        status = 'pending' if attempts < self.max_attempts else 'failed'
+        result = await self.table.update_one(
+            {'id': shard['id'], **condition},
+            {'$set': {
+                'status': status,
+                'worker_id': None,
+                'attempts': attempts,
+                'error': error,
+                'updated_at': _now()
+            }}
+        )
+        return status if result.get('matched_count') else shard['status']
+
+    async def fail(self, shard: Dict, worker_id: str, error: str) -> str:
+        return await self._release(shard, {'status': 'running', 'worker_id': worker_id}, error)
+
+    async def requeue_stale(self, run_id: str, timeout: float = HEARTBEAT_TIMEOUT) -> int:
+        """Release running shards whose worker has not sent a heartbeat within timeout."""
+        requeued = 0
+        now = datetime.now(timezone.utc)
+        for shard in await self.get_shards(run_id):
+            if shard['status'] != 'running' or not shard.get('heartbeat_at'):
+                continue
+            heartbeat_at = datetime.fromisoformat(str(shard['heartbeat_at']))
+            if (now - heartbeat_at).total_seconds() <= timeout:
+                continue
+            status = await self._release(
+                shard,
+                {'status': 'running', 'worker_id': shard['worker_id'], 'heartbeat_at': shard['heartbeat_at']},
+                f"worker {shard['worker_id']} stopped heartbeating"
+            )
+            logger.warning(f"⚠️ Shard {shard['shard_index']} of run {run_id}: worker {shard['worker_id']} lost, shard {status}")
+            requeued += 1
+        return requeued
+
+    async def cancel_run(self, run_id: str):
+        """Stop handing out the remaining shards of a run (scan cancelled or timed out)."""
+        for shard in await self.get_shards(run_id):
+            if shard['status'] in ('pending', 'running'):
+                await self.table.update_one(
+                    {'id': shard['id'], 'status': shard['status']},
+                    {'$set': {'status': 'cancelled', 'updated_at': _now()}}
+                )
+
+
+def create_shard_queue(db=None) -> ShardQueue:
+    """Queue for SCAN_QUEUE_BACKEND ('local' or 'supabase')."""
+    backend = os.getenv('SCAN_QUEUE_BACKEND', 'local').lower()
+    if backend == 'supabase':
+        if db is None:
+            raise ValueError("SCAN_QUEUE_BACKEND=supabase requires a database")
+        return ShardQueue(db.scan_shards)
+    return ShardQueue(LocalShardTable())
+
+
+class ShardWorker:
+    """Claims shards and runs the per-coin Pass 1 analysis for them."""
+
+    def __init__(self, orchestrator, queue: ShardQueue, worker_id: Optional[str] = None):
+        self.orchestrator = orchestrator
+        self.queue = queue
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.shards_completed = 0
+
+    async def _heartbeat_loop(self, shard_id: str):
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            if not await self.queue.heartbeat(shard_id, self.worker_id):
+                logger.warning(f"⚠️ Worker {self.worker_id} lost shard {shard_id}")
+                return
+
+    async def process_shard(self, shard: Dict) -> List[Dict]:
+        """Analyze the coins of one shard, batch_size coins at a time.
+
+        A retried or requeued shard reuses the Pass 1 checkpoints of coins an
+        earlier attempt already finished, so their bot_results are not saved twice,
+        and replaces the bot_results rows of coins the attempt left unfinished.
+
+        Returns:
+            One {'symbol', 'aggregated', 'bot_results'} dict per coin with results
+        """
+        batch_size = max(1, shard.get('batch_size') or 1)
+        coin_results = {}
+
+        checkpointed = {}
+        if shard.get('attempts'):
+            checkpointed = await self.orchestrator.checkpoints.load(shard['run_id'])
+        tokens = [token for token in shard['tokens'] if token[0] not in checkpointed]
+        for symbol, _, _ in shard['tokens']:
+            if symbol in checkpointed:
+                coin_results[symbol] = {'symbol': symbol, **checkpointed[symbol]}
+        if coin_results:
+            logger.info(f"♻️ Shard {shard['shard_index']}: {len(coin_results)} coins restored from checkpoints")
+        if shard.get('attempts') and tokens:
+            await self.orchestrator.db.bot_results.delete_many({
+                'run_id': shard['run_id'],
+                'coin': {'$in': [display_name for _, display_name, _ in tokens]}
+            })
+
+        for i in range(0, len(tokens), batch_size):
+            batch = tokens[i:i + batch_size]
+            batch_results = await asyncio.gather(*[
+                self.orchestrator._analyze_coin_with_cryptocompare(
+                    symbol, display_name, current_price, shard['run_id'], skip_sentiment=True
+                )
+                for symbol, display_name, current_price in batch
+            ], return_exceptions=True)
+
+            for (symbol, _, _), result in zip(batch, batch_results):
+                if isinstance(result, Exception):
+                    logger.error(f"Error analyzing {symbol}: {result}")
+                elif result and isinstance(result, dict) and result.get('aggregated'):
+                    coin_results[symbol] = {
+                        'symbol': symbol,
+                        'aggregated': result['aggregated'],
+                        'bot_results': result.get('bot_results', [])
+                    }
+        return [coin_results[token[0]] for token in shard['tokens'] if token[0] in coin_results]
+
+    async def run_once(self, run_id: Optional[str] = None) -> bool:
+        """Claim and process one shard. Returns False when there was nothing to claim."""
+        shard = await self.queue.claim(self.worker_id, run_id)
+        if not shard:
+            return False
+
+        logger.info(f"🧩 Worker {self.worker_id} processing shard {shard['shard_index']} of run {shard['run_id']} ({len(shard['tokens'])} coins)")
+        heartbeat = asyncio.create_task(self._heartbeat_loop(shard['id']))
+        try:
+            results = await self.process_shard(shard)
+            if await self.queue.complete(shard['id'], self.worker_id, results):
+                self.shards_completed += 1
+            else:
+                logger.warning(f"⚠️ Shard {shard['shard_index']} was reassigned, results of {self.worker_id} dropped")
+        except asyncio.CancelledError:
+            await self.queue.fail(shard, self.worker_id, 'worker cancelled')
+            raise
+        except Exception as e:
+            status = await self.queue.fail(shard, self.worker_id, str(e))
+            logger.error(f"❌ Shard {shard['shard_index']} failed on {self.worker_id}: {e} (now {status})")
+        finally:
+            heartbeat.cancel()
+        return True
+
+    async def run(self, run_id: Optional[str] = None):
+        """Work shards until cancelled, polling the queue when it is empty."""
+        logger.info(f"🧩 Shard worker {self.worker_id} started")
+        while True:
+            try:
+                if not await self.run_once(run_id):
+                    await asyncio.sleep(POLL_INTERVAL)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Shard worker {self.worker_id} error: {e}", exc_info=True)
+                await asyncio.sleep(POLL_INTERVAL)
+
+
+async def run_sharded_pass(orchestrator, queue: ShardQueue, tokens: List, run_id: str,
+                           batch_size: int = 1, local_workers: int = 1) -> List:
+    """Coordinator side of a sharded Pass 1.
+
+    Queues the shards, optionally starts in-process workers, requeues shards of
+    dead workers and waits until every shard is completed or failed.
+
+    Returns:
+        List of (symbol, coin_result) pairs from all completed shards, in token order
+    """
+    await queue.enqueue(run_id, tokens, batch_size)
+    workers = [
+        asyncio.create_task(ShardWorker(orchestrator, queue).run(run_id))
+        for _ in range(local_workers)
+    ]
+
+    try:
+        while True:
+            await queue.requeue_stale(run_id)
+            shards = await queue.get_shards(run_id)
+            done = [shard for shard in shards if shard['status'] in ('completed', 'failed')]
+            if len(done) == len(shards):
+                break
+            await asyncio.sleep(POLL_INTERVAL)
+    except asyncio.CancelledError:
+        await queue.cancel_run(run_id)
+        raise
+    finally:
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    coin_results = []
+    for shard in shards:
+        if shard['status'] == 'failed':
+            symbols = [token[0] for token in shard['tokens']]
+            logger.error(f"❌ Shard {shard['shard_index']} failed after {shard['attempts']} attempts, skipping {symbols}: {shard.get('error')}")
+            continue
+        for coin in shard.get('results') or []:
+            coin_results.append((coin['symbol'], {
+                'aggregated': coin['aggregated'],
+                'bot_results': coin['bot_results']
+            }))
+
+    logger.info(f"🧩 Merged {len(coin_results)} coin results from {len(shards)} shards")
+    return coin_results
+
+
+async def _worker_main():
+    from pathlib import Path
+    from dotenv import load_dotenv
+    from database.supabase_client import DBInterface, get_supabase_client
+    from services.scan_orchestrator import ScanOrchestrator
+
+    load_dotenv(Path(__file__).parent.parent / '.env')
+    db = DBInterface(get_supabase_client())
+    orchestrator = ScanOrchestrator(db)
+    worker = ShardWorker(orchestrator, ShardQueue(db.scan_shards))
+    try:
+        await worker.run()
+    finally:
+        await orchestrator.crypto_client.close()
+        orchestrator.analysis_pool.shutdown()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    asyncio.run(_worker_main())
@@ -3,6 +3,8 @@ import asyncio
 from typing import List, Dict, Optional
 from datetime import datetime, timedelta, timezone
 import logging
+from services.http_transport import get_transport
+from services.json_codec import read_json
 
 logger = logging.getLogger(__name__)
 
@@ -16,8 +18,8 @@ class TokenMetricsClient:
     
     async def _get_session(self):
         if self.session is None or self.session.closed:
-            self.session = aiohttp.ClientSession(
-                headers={'x-api-key': self.api_key}
+            self.session = get_transport().session(
+                'tokenmetrics', headers={'x-api-key': self.api_key}
             )
         return self.session
     
@@ -39,9 +41,9 @@ class TokenMetricsClient:
             url = f'{self.base_url}/tokens'
             params = {'limit': actual_limit}
             
-            async with session.get(url, params=params, timeout=30) as response:
+            async with session.get(url, params=params) as response:
                 if response.status == 200:
-                    data = await response.json()
+                    data = await read_json(response)
                     tokens = []
                     
                     if data.get('data'):
@@ -92,7 +94,7 @@ class TokenMetricsClient:
             
             async with session.get(url, params=params, timeout=20) as response:
                 if response.status == 200:
-                    data = await response.json()
+                    data = await read_json(response)
                     if data.get('data') and len(data['data']) > 0:
                         latest = data['data'][-1]
                         return {
@@ -118,7 +120,7 @@ class TokenMetricsClient:
             
             async with session.get(url, params=params, timeout=20) as response:
                 if response.status == 200:
-                    data = await response.json()
+                    data = await read_json(response)
                     if data.get('data') and len(data['data']) > 0:
                         latest = data['data'][0]
                         return {
@@ -154,7 +156,7 @@ class TokenMetricsClient:
                 try:
                     async with session.get(url, params=params, timeout=10) as response:
                         if response.status == 200:
-                            data = await response.json()
+                            data = await read_json(response)
                             if data.get('data') and len(data['data']) > 0:
                                 token_id = data['data'][0].get('TOKEN_ID')
                                 grades['token_id'] = token_id
@@ -193,9 +195,9 @@ class TokenMetricsClient:
                 'endDate': end_date
             }
             
-            async with session.get(url, params=params, timeout=30) as response:
+            async with session.get(url, params=params) as response:
                 if response.status == 200:
-                    data = await response.json()
+                    data = await read_json(response)
                     
                     if data.get('data'):
                         candles = []
@@ -252,7 +254,7 @@ class TokenMetricsClient:
             
             async with session.get(url, params=params, timeout=20) as response:
                 if response.status == 200:
-                    data = await response.json()
+                    data = await read_json(response)
                     
                     if data.get('data') and len(data['data']) > 0:
                         grades = data['data']
@@ -290,7 +292,7 @@ class TokenMetricsClient:
             
             async with session.get(url, params=params, timeout=20) as response:
                 if response.status == 200:
-                    data = await response.json()
+                    data = await read_json(response)
                     
                     if data.get('data') and len(data['data']) > 0:
                         latest = data['data'][0]
@@ -0,0 +1,638 @@
+"""
+Walk-forward optimizer for the aggregation weights.
+
+Bot weights only came from live bot_predictions (_recalculate_weights,
+AdaptiveLearningEngine.update_bot_weights_from_outcomes), which take weeks to
+accumulate, and the regime multipliers were hand-picked. WeightOptimizer fits
+all three on backtester replays instead:
+
+- bot_weights: performance_weight() of each bot's replayed outcomes
+- regime_affinity: MarketRegimeClassifier multipliers per (coin regime, bot type)
+- aggregation_boosts: AggregationEngine._apply_regime_weighting boosts per
+  (coin regime, bot)
+
+The objective is the AggregationEngine consensus itself: per coin and day,
+bot confidences are scaled by the regime affinity and gated at
+CONFIDENCE_THRESHOLD, long / short votes are weighed by bot weight x regime
+boost, and the consensus direction is scored by the coin's close-to-close move
+over the horizon (mean return per call, in percent). Rows of different coin
+regimes never share a parameter, so each regime is fitted on its own by
+coordinate ascent over AFFINITY_GRID / BOOST_GRID.
+
+Pipeline of a run:
+1. Replay: coins are replayed with backtest_coin in the worker processes of the
+   BacktestService. Each coin's signal matrices are cached as .npz in
+   BACKTEST_CACHE_DIR, keyed by its closed candles, bots, horizon and seed, so
+   later runs only replay coins whose candles changed; a coin keeps only its
+   latest replay per bots / horizon / seed.
+2. Stack: the cached rows are concatenated into .npy files that the fold
+   workers memory-map instead of receiving them by pickle.
+3. Walk forward: every fold fits on train_days of history (purged by the
+   horizon) and is scored out of sample on the next test_days, next to the
+   weights in use today; folds run in parallel.
+4. Publish: a final fit on the latest train_days becomes a new weight set
+   version (WeightSetStore). It is activated only when asked to and when it
+   beat the current weights out of sample.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from services.aggregation_engine import CONFIDENCE_THRESHOLD, default_regime_boost
+from services.backtest_engine import COIN_REGIMES, LOSS, PARTIAL_WIN, WIN, backtest_coin
+from services.backtester import backtest_bots
+from services.bot_performance_service import performance_weight
+from services.market_regime_classifier import MarketRegimeClassifier
+
+logger = logging.getLogger(__name__)
+
+# Bump when backtest_coin's output changes, so older cached replays are not reused
+CACHE_VERSION = 1
+CACHED_ARRAYS = ('timestamps', 'coin_regime', 'direction', 'confidence', 'status', 'profit_loss', 'forward_return')
+
+# Candidate values (get_bot_weight_modifier's 0.5 - 1.5 range; boosts around the built-in 1.2 / 1.3)
+AFFINITY_GRID = tuple(round(0.5 + 0.1 * step, 1) for step in range(11))
+BOOST_GRID = (0.7, 0.8, 0.9, 1.0, 1.1, 1.2, 1.3, 1.4, 1.5)
+
+# A coordinate step must raise the mean return per call by this much (percent points)
+MIN_GAIN = 0.0005
+
+# Regimes with fewer training rows keep their current parameters
+MIN_REGIME_ROWS = 200
+
+DAY_SECONDS = 86400
+
+
+def closed_candles(candles: List[Dict], now: Optional[float] = None) -> List[Dict]:
+    """Candles without the still-forming last one (its values change until the day closes)."""
+    now = time.time() if now is None else now
+    return [candle for candle in candles if (candle.get('timestamp') or 0) + DAY_SECONDS <= now]
+
+
+def _replay_prefix(symbol: str, bot_names: Sequence[str], horizon: int, seed: Optional[int]) -> str:
+    """Cache file name prefix shared by every replay of a coin with the same bots, horizon and seed."""
+    digest = hashlib.sha1(f"{CACHE_VERSION}|{symbol}|{horizon}|{seed}|{','.join(bot_names)}".encode())
+    name = ''.join(ch for ch in symbol if ch.isalnum()) or 'coin'
+    return f"{name}-{digest.hexdigest()[:12]}-"
+
+
+def _replay_file(symbol: str, candles: List[Dict], bot_names: Sequence[str], horizon: int,
+                 seed: Optional[int]) -> str:
+    """Cache file name of a coin replay: changes with its candles, the bots, horizon and seed."""
+    digest = hashlib.sha1(np.array(
+        [[candle.get(key) or 0 for key in ('timestamp', 'open', 'high', 'low', 'close', 'volume')] for candle in candles],
+        dtype=np.float64
+    ).tobytes())
+    return f"{_replay_prefix(symbol, bot_names, horizon, seed)}{digest.hexdigest()[:20]}.npz"
+
+
+def _prune_replays(cache_dir: str, prefix: str, keep: str):
+    """Remove the cached replays starting with prefix, except the file named keep."""
+    for name in os.listdir(cache_dir):
+        # Partial files belong to writers that are still running
+        if name.startswith(prefix) and name != keep and not name.endswith('.partial.npz'):
+            try:
+                os.remove(os.path.join(cache_dir, name))
+            except FileNotFoundError:
+                pass
+
+
+def _replay_chunk(coins: List[Tuple[str, List[Dict]]], bot_names: List[str], btc_timestamps: np.ndarray,
+                  btc_codes: np.ndarray, horizon: int, seed: Optional[int], cache_dir: str) -> Dict:
+    """Worker entry point: replay a chunk of coins into the cache (cached coins are not replayed).
+
+    Only closed candles are replayed, so a coin's cache key stays the same
+    until its next daily candle closes. Writing a replay removes the coin's
+    older replays.
+    """
+    bots = None
+    paths, skipped, cache_hits = [], [], 0
+    for symbol, candles in coins:
+        candles = closed_candles(candles)
+        path = os.path.join(cache_dir, _replay_file(symbol, candles, bot_names, horizon, seed))
+        if os.path.exists(path):
+            paths.append(path)
+            cache_hits += 1
+            continue
+
+        bots = bots or backtest_bots(bot_names)
+        try:
+            coin = backtest_coin(symbol, candles, bots, btc_timestamps, btc_codes, horizon, seed)
+        except Exception as e:
+            logger.error(f"Replay failed for {symbol}: {e}", exc_info=True)
+            coin = None
+        if coin is None:
+            skipped.append(symbol)
+            continue
+
+        # Write under a temporary name first: concurrent runs must never read half a file
+        partial = f"{path[:-4]}.{os.getpid()}.partial.npz"
+        np.savez(partial, **{key: coin[key] for key in CACHED_ARRAYS})
+        os.replace(partial, path)
+        _prune_replays(cache_dir, _replay_prefix(symbol, bot_names, horizon, seed), os.path.basename(path))
+        paths.append(path)
+    return {'paths': paths, 'skipped': skipped, 'cache_hits': cache_hits}
+
+
+def stack_replays(paths: Sequence[str], data_dir: str) -> Dict:
+    """Concatenate the rows of cached replays into one .npy file per array.
+
+    Only rows with a known forward return and at least one signal are kept (the
+    rows a scan would aggregate). Written through memory maps, so memory stays
+    at one coin's arrays.
+
+    Returns:
+        Dict with rows, start and end (timestamps of the first / last row)
+    """
+    keep = []
+    for path in paths:
+        with np.load(path) as replay:
+            keep.append(np.isfinite(replay['forward_return']) & (replay['direction'] != 0).any(axis=1))
+    rows = int(sum(int(mask.sum()) for mask in keep))
+
+    os.makedirs(data_dir, exist_ok=True)
+    outputs = {}
+    offset = 0
+    start, end = None, None
+    for path, mask in zip(paths, keep):
+        count = int(mask.sum())
+        if count == 0:
+            continue
+        with np.load(path) as replay:
+            for key in CACHED_ARRAYS:
+                values = replay[key][mask]
+                if key not in outputs:
+                    outputs[key] = np.lib.format.open_memmap(
+                        os.path.join(data_dir, f"{key}.npy"), mode='w+', dtype=values.dtype,
+                        shape=(rows,) + values.shape[1:]
+                    )
+                outputs[key][offset:offset + count] = values
+            timestamps = replay['timestamps'][mask]
+        start = int(timestamps.min()) if start is None else min(start, int(timestamps.min()))
+        end = int(timestamps.max()) if end is None else max(end, int(timestamps.max()))
+        offset += count
+
+    for output in outputs.values():
+        output.flush()
+    return {'rows': rows, 'start': start, 'end': end}
+
+
+def load_stacked(data_dir: str) -> Dict[str, np.ndarray]:
+    """Memory-mapped stack_replays arrays."""
+    return {key: np.load(os.path.join(data_dir, f"{key}.npy"), mmap_mode='r') for key in CACHED_ARRAYS}
+
+
+def replay_weights(direction: np.ndarray, status: np.ndarray, profit_loss: np.ndarray) -> np.ndarray:
+    """performance_weight of every bot from replayed outcomes (rows x bots), as summarize() computes it."""
+    totals = np.count_nonzero(direction, axis=0)
+    wins = np.count_nonzero(status == WIN, axis=0)
+    partial_wins = np.count_nonzero(status == PARTIAL_WIN, axis=0)
+    losses = np.count_nonzero(status == LOSS, axis=0)
+    closed = wins + partial_wins + losses
+    profit_loss_sums = np.nansum(profit_loss, axis=0, dtype=np.float64)
+
+    weights = []
+    for total, win, partial_win, closed_count, profit_loss_sum in zip(totals, wins, partial_wins, closed,
+                                                                      profit_loss_sums):
+        accuracy = (win + partial_win * 0.5) / closed_count * 100 if closed_count else 0.0
+        average = profit_loss_sum / closed_count if closed_count else 0.0
+        weights.append(performance_weight(accuracy, average, int(total)))
+    return np.array(weights, dtype=np.float32)
+
+
+def consensus_votes(direction: np.ndarray, confidence: np.ndarray, multipliers: np.ndarray) -> np.ndarray:
+    """Votes that reach the consensus: +1 long, -1 short, 0 none (rows x bots).
+
+    Confidence is scaled by each bot's regime multiplier and clamped to 1-10 as in
+    the scan; bots below CONFIDENCE_THRESHOLD drop out, unless none passes (then
+    the engine falls back to all bots).
+    """
+    signaled = direction != 0
+    adjusted = np.clip(confidence * multipliers.astype(np.float32)[None, :], 1, 10)
+    gated = signaled & (adjusted >= CONFIDENCE_THRESHOLD)
+    gated |= signaled & ~gated.any(axis=1)[:, None]
+    return np.where(gated, direction, 0).astype(np.float32)
+
+
+def _call_returns(net: np.ndarray, forward_return: np.ndarray) -> np.ndarray:
+    """Return of the consensus call per row (long on ties, like the engine)."""
+    return np.where(net >= 0, forward_return, -forward_return)
+
+
+def fit_regime(direction: np.ndarray, confidence: np.ndarray, forward_return: np.ndarray,
+               type_index: np.ndarray, weights: np.ndarray, affinity: np.ndarray, boosts: np.ndarray,
+               sweeps: int = 2) -> Tuple[np.ndarray, np.ndarray]:
+    """Coordinate ascent of one regime's affinity (per bot type) and boosts (per bot).
+
+    Args:
+        direction, confidence: Signals of the regime's rows (rows x bots)
+        forward_return: Close-to-close move per row over the horizon (percent)
+        type_index: Bot type of each bot, as an index into affinity
+        weights: Bot weights (bots,)
+        affinity, boosts: Starting values (types,) and (bots,)
+        sweeps: Maximum passes over all parameters
+
+    Returns:
+        Fitted (affinity, boosts)
+    """
+    affinity = affinity.astype(np.float32)
+    boosts = boosts.astype(np.float32)
+    weights = weights.astype(np.float32)
+    forward_return = forward_return.astype(np.float64)
+    min_gain = MIN_GAIN * len(forward_return)
+
+    def total(votes: np.ndarray) -> float:
+        return float(_call_returns(votes @ (weights * boosts), forward_return).sum())
+
+    for _ in range(sweeps):
+        changed = False
+
+        # Regime affinity per bot type: changes which bots pass the confidence gate
+        for t in range(len(affinity)):
+            if not (type_index == t).any():
+                continue
+            best = total(consensus_votes(direction, confidence, affinity[type_index]))
+            for value in AFFINITY_GRID:
+                if np.isclose(value, affinity[t]):
+                    continue
+                trial = affinity.copy()
+                trial[t] = value
+                score = total(consensus_votes(direction, confidence, trial[type_index]))
+                if score > best + min_gain:
+                    best, affinity, changed = score, trial, True
+
+        # Boost per bot: only the rows the bot votes on change, so candidates are scored on those
+        votes = consensus_votes(direction, confidence, affinity[type_index])
+        net = votes @ (weights * boosts)
+        for b in range(len(boosts)):
+            rows = np.flatnonzero(votes[:, b])
+            if len(rows) == 0:
+                continue
+            bot_votes = votes[rows, b] * weights[b]
+            row_returns = forward_return[rows]
+            best_value, best = boosts[b], float(_call_returns(net[rows], row_returns).sum())
+            for value in BOOST_GRID:
+                if np.isclose(value, boosts[b]):
+                    continue
+                score = float(_call_returns(net[rows] + bot_votes * (value - boosts[b]), row_returns).sum())
+                if score > best + min_gain:
+                    best_value, best = value, score
+            if best_value != boosts[b]:
+                net[rows] += bot_votes * (best_value - boosts[b])
+                boosts[b] = best_value
+                changed = True
+
+        if not changed:
+            break
+    return affinity, boosts
+
+
+def fit_weights(data: Dict[str, np.ndarray], rows: np.ndarray, type_index: np.ndarray, start: Dict,
+                sweeps: int = 2) -> Dict[str, np.ndarray]:
+    """Fit bot weights, regime affinity and boosts on the given rows.
+
+    Args:
+        data: load_stacked arrays
+        rows: Training rows
+        type_index: Bot type index of each bot
+        start: Affinity and boosts the regime fits start from (weights come from the rows' outcomes)
+        sweeps: Coordinate ascent passes per regime
+
+    Returns:
+        Dict with weights (bots,), affinity (regimes x types) and boosts (regimes x bots)
+    """
+    direction = data['direction'][rows]
+    weights = replay_weights(direction, data['status'][rows], data['profit_loss'][rows])
+    affinity = start['affinity'].astype(np.float32)
+    boosts = start['boosts'].astype(np.float32)
+
+    regimes = data['coin_regime'][rows]
+    for r in range(len(COIN_REGIMES)):
+        regime_rows = rows[regimes == r]
+        if len(regime_rows) < MIN_REGIME_ROWS:
+            continue
+        affinity[r], boosts[r] = fit_regime(
+            data['direction'][regime_rows], data['confidence'][regime_rows], data['forward_return'][regime_rows],
+            type_index, weights, affinity[r], boosts[r], sweeps
+        )
+    return {'weights': weights, 'affinity': affinity, 'boosts': boosts}
+
+
+def evaluate_weights(data: Dict[str, np.ndarray], rows: np.ndarray, type_index: np.ndarray,
+                     params: Dict[str, np.ndarray]) -> Dict:
+    """Score parameters on the given rows.
+
+    Returns:
+        Dict with rows, return_sum and hits (consensus calls that made money)
+    """
+    regimes = data['coin_regime'][rows]
+    return_sum, hits = 0.0, 0
+    for r in range(len(COIN_REGIMES)):
+        regime_rows = rows[regimes == r]
+        if len(regime_rows) == 0:
+            continue
+        votes = consensus_votes(data['direction'][regime_rows], data['confidence'][regime_rows],
+                                params['affinity'][r][type_index])
+        net = votes @ (params['weights'].astype(np.float32) * params['boosts'][r].astype(np.float32))
+        returns = _call_returns(net, data['forward_return'][regime_rows].astype(np.float64))
+        return_sum += float(returns.sum())
+        hits += int(np.count_nonzero(returns > 0))
+    return {'rows': int(len(rows)), 'return_sum': return_sum, 'hits': hits}
+
+
+def _score_summary(score: Dict) -> Dict:
+    rows = score['rows']
+    return {
+        'rows': rows,
+        'mean_return_percent': round(score['return_sum'] / rows, 4) if rows else 0.0,
+        'hit_rate': round(score['hits'] / rows * 100, 2) if rows else 0.0
+    }
+
+
+def _fit_window(data_dir: str, train: Tuple[int, int], test: Optional[Tuple[int, int]], type_index: np.ndarray,
+                baseline: Dict, sweeps: int) -> Dict:
+    """Worker entry point: fit on one train window and score it (and the baseline) on its test window."""
+    data = load_stacked(data_dir)
+    timestamps = np.asarray(data['timestamps'])
+    train_rows = np.flatnonzero((timestamps >= train[0]) & (timestamps < train[1]))
+    fitted = fit_weights(data, train_rows, type_index, baseline, sweeps)
+    result = {
+        'train_start': train[0],
+        'train_end': train[1],
+        'params': fitted,
+        'in_sample': evaluate_weights(data, train_rows, type_index, fitted),
+        'in_sample_baseline': evaluate_weights(data, train_rows, type_index, baseline)
+    }
+    if test is not None:
+        test_rows = np.flatnonzero((timestamps >= test[0]) & (timestamps < test[1]))
+        result.update({
+            'test_start': test[0],
+            'test_end': test[1],
+            'fitted': evaluate_weights(data, test_rows, type_index, fitted),
+            'baseline': evaluate_weights(data, test_rows, type_index, baseline)
+        })
+    return result
+
+
+def walk_forward_windows(start: int, end: int, train_days: int, test_days: int,
+                         horizon_days: int) -> List[Tuple[Tuple[int, int], Tuple[int, int]]]:
+    """(train, test) timestamp windows stepping test_days at a time.
+
+    Training ends horizon_days before its test window, so no training row's
+    forward return reaches into the test period.
+    """
+    windows = []
+    test_start = start + train_days * DAY_SECONDS
+    while test_start <= end:
+        test_end = test_start + test_days * DAY_SECONDS
+        train = (test_start - train_days * DAY_SECONDS, test_start - horizon_days * DAY_SECONDS)
+        windows.append((train, (test_start, test_end)))
+        test_start = test_end
+    return windows
+
+
+class WeightOptimizer:
+    """Fits aggregation weights on historical replays and publishes them as weight sets."""
+
+    def __init__(self, db, backtest_service, weight_sets, cache_dir: Optional[str] = None):
+        self.db = db
+        self.backtest_service = backtest_service
+        self.weight_sets = weight_sets
+        self.cache_dir = cache_dir or os.getenv('BACKTEST_CACHE_DIR') or os.path.join(
+            tempfile.gettempdir(), 'backtest_cache'
+        )
+        self.train_days = int(os.getenv('WEIGHT_OPTIMIZER_TRAIN_DAYS', '365'))
+        self.test_days = int(os.getenv('WEIGHT_OPTIMIZER_TEST_DAYS', '90'))
+        self.sweeps = int(os.getenv('WEIGHT_OPTIMIZER_SWEEPS', '2'))
+        self._task: Optional[asyncio.Task] = None
+        self.progress: Dict = {}
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, **options) -> str:
+        """Start an optimization run in the background (options as for run()).
+
+        Returns:
+            Run ID
+
+        Raises:
+            RuntimeError: if an optimization is already running
+        """
+        if self.running:
+            raise RuntimeError("A weight optimization is already running")
+        run_id = str(uuid.uuid4())
+        self._task = asyncio.create_task(self.run(run_id=run_id, **options))
+        return run_id
+
+    async def baseline(self, bot_names: List[str], bot_types: List[str]) -> Dict[str, np.ndarray]:
+        """The weights in use today, in fit_weights form: active weight set over the built-in weights."""
+        active = await self.weight_sets.get_active(refresh=True)
+        live_weights = {
+            perf.get('bot_name'): perf.get('performance_weight', 1.0)
+            for perf in await self.db.bot_performance.find({}).to_list(1000)
+        }
+        if active:
+            live_weights.update(active.get('bot_weights') or {})
+
+        classifier = MarketRegimeClassifier()
+        classifier.set_regime_affinity(active.get('regime_affinity') if active else None)
+        boosts = (active.get('aggregation_boosts') or {}) if active else {}
+        return {
+            'weights': np.array([live_weights.get(name, 1.0) for name in bot_names], dtype=np.float32),
+            'affinity': np.array(
+                [[classifier.get_bot_weight_modifier(regime, bot_type) for bot_type in bot_types]
+                 for regime in COIN_REGIMES], dtype=np.float32
+            ),
+            'boosts': np.array(
+                [[boosts.get(regime, {}).get(name, default_regime_boost(name, regime)) for name in bot_names]
+                 for regime in COIN_REGIMES], dtype=np.float32
+            )
+        }
+
+    async def _replay(self, symbols: List[str], bot_names: List[str], days: int, horizon: int,
+                      seed: Optional[int]) -> Dict:
+        """Replay (or load from the cache) every coin; returns cache paths and counts."""
+        service = self.backtest_service
+        btc_timestamps, btc_codes = await service.btc_regimes(days)
+        loop = asyncio.get_running_loop()
+        executor = service.get_executor()
+
+        futures = []
+        for i in range(0, len(symbols), service.chunk_coins):
+            coins = [(symbol, candles) for symbol, candles in
+                     await service.fetch_candles(symbols[i:i + service.chunk_coins], days) if candles]
+            if coins:
+                futures.append(loop.run_in_executor(
+                    executor, _replay_chunk, coins, bot_names, btc_timestamps, btc_codes, horizon, seed,
+                    self.cache_dir
+                ))
+
+        replay = {'paths': [], 'skipped': [], 'cache_hits': 0}
+        for future in asyncio.as_completed(futures):
+            chunk = await future
+            replay['paths'].extend(chunk['paths'])
+            replay['skipped'].extend(chunk['skipped'])
+            replay['cache_hits'] += chunk['cache_hits']
+            self.progress['coins_done'] = len(replay['paths']) + len(replay['skipped'])
+        return replay
+
+    async def run(self, symbols: Optional[List[str]] = None, max_coins: Optional[int] = None,
+                  days: Optional[int] = None, horizon_days: Optional[int] = None,
+                  train_days: Optional[int] = None, test_days: Optional[int] = None, seed: Optional[int] = 0,
+                  activate: bool = False, run_id: Optional[str] = None) -> Dict:
+        """Walk-forward fit of the aggregation weights, published as a new weight set.
+
+        Args:
+            symbols: Coins to replay (default: the top max_coins of the coin listing)
+            max_coins, days, horizon_days: Replay settings (defaults as for backtests)
+            train_days: History each fit sees (default WEIGHT_OPTIMIZER_TRAIN_DAYS)
+            test_days: Out-of-sample period after each fit (default WEIGHT_OPTIMIZER_TEST_DAYS)
+            seed: Seed for bots that draw random inputs
+            activate: Activate the new set if it beat the current weights out of sample
+            run_id: Run ID to use (start() passes its own)
+
+        Returns:
+            Run summary with the published weight set version and walk-forward metrics
+        """
+        service = self.backtest_service
+        max_coins = max_coins or service.default_coins
+        days = days or service.default_days
+        horizon = horizon_days or service.default_horizon
+        train_days = train_days or self.train_days
+        test_days = test_days or self.test_days
+        run_id = run_id or str(uuid.uuid4())
+        started = time.perf_counter()
+        data_dir = os.path.join(self.cache_dir, f"optimizer-{run_id}")
+
+        bots = backtest_bots()
+        bot_names = [bot.name for bot in bots]
+        bot_types = sorted({getattr(bot, 'bot_type', 'default') for bot in bots})
+        type_index = np.array([bot_types.index(getattr(bot, 'bot_type', 'default')) for bot in bots])
+        config = {'max_coins': max_coins, 'days': days, 'horizon_days': horizon, 'train_days': train_days,
+                  'test_days': test_days, 'seed': seed, 'symbols': symbols, 'bots': len(bot_names)}
+        result = {'run_id': run_id, 'status': 'running', 'config': config,
+                  'started_at': datetime.now(timezone.utc).isoformat()}
+        self.progress = {'run_id': run_id, 'status': 'running', 'stage': 'replay', 'coins_total': 0, 'coins_done': 0}
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            selected = await service.select_symbols(symbols, max_coins)
+            self.progress['coins_total'] = len(selected)
+            logger.info(f"⚖️ Weight optimization {run_id}: {len(selected)} coins x {days} days, "
+                        f"train {train_days}d / test {test_days}d")
+
+            replay = await self._replay(selected, bot_names, days, horizon, seed)
+            self.progress['stage'] = 'fit'
+            loop = asyncio.get_running_loop()
+            stacked = await loop.run_in_executor(None, stack_replays, replay['paths'], data_dir)
+            if not stacked['rows']:
+                raise ValueError("No replayed signals to fit on")
+
+            windows = walk_forward_windows(stacked['start'], stacked['end'], train_days, test_days, horizon)
+            if not windows:
+                raise ValueError(f"Replayed history is shorter than {train_days} training days plus a test window")
+
+            baseline = await self.baseline(bot_names, bot_types)
+            final_train = (stacked['end'] - train_days * DAY_SECONDS + 1, stacked['end'] + 1)
+            executor = service.get_executor()
+            fits = await asyncio.gather(
+                *(loop.run_in_executor(executor, _fit_window, data_dir, train, test, type_index, baseline, self.sweeps)
+                  for train, test in windows),
+                loop.run_in_executor(executor, _fit_window, data_dir, final_train, None, type_index, baseline,
+                                     self.sweeps)
+            )
+            folds, final = fits[:-1], fits[-1]
+
+            totals = {
+                name: {'rows': sum(fold[name]['rows'] for fold in folds),
+                       'return_sum': sum(fold[name]['return_sum'] for fold in folds),
+                       'hits': sum(fold[name]['hits'] for fold in folds)}
+                for name in ('baseline', 'fitted')
+            }
+            walk_forward = {
+                'baseline': _score_summary(totals['baseline']),
+                'fitted': _score_summary(totals['fitted']),
+                'folds': [
+                    {
+                        'test_start': datetime.fromtimestamp(fold['test_start'], timezone.utc).date().isoformat(),
+                        'test_end': datetime.fromtimestamp(fold['test_end'], timezone.utc).date().isoformat(),
+                        'baseline': _score_summary(fold['baseline']),
+                        'fitted': _score_summary(fold['fitted'])
+                    }
+                    for fold in folds
+                ]
+            }
+            improved = (walk_forward['fitted']['rows'] > 0
+                        and walk_forward['fitted']['mean_return_percent'] > walk_forward['baseline']['mean_return_percent'])
+            metrics = {
+                'walk_forward': walk_forward,
+                'in_sample': _score_summary(final['in_sample']),
+                'in_sample_baseline': _score_summary(final['in_sample_baseline']),
+                'improved': improved,
+                'coins': len(replay['paths']),
+                'rows': stacked['rows']
+            }
+
+            params = final['params']
+            weight_set = await self.weight_sets.publish(
+                bot_weights={name: round(float(weight), 3) for name, weight in zip(bot_names, params['weights'])},
+                regime_affinity={
+                    regime: {bot_type: round(float(params['affinity'][r][t]), 2) for t, bot_type in enumerate(bot_types)}
+                    for r, regime in enumerate(COIN_REGIMES)
+                },
+                aggregation_boosts={
+                    regime: {name: round(float(params['boosts'][r][b]), 2) for b, name in enumerate(bot_names)}
+                    for r, regime in enumerate(COIN_REGIMES)
+                },
+                metrics=metrics,
+                config={**config, 'run_id': run_id},
+                activate=activate and improved
+            )
+
+            duration = time.perf_counter() - started
+            result.update({
+                'status': 'completed',
+                'weight_set_version': weight_set['version'],
+                'weight_set_status': weight_set['status'],
+                'coins': len(replay['paths']),
+                'coins_skipped': len(replay['skipped']),
+                'cache_hits': replay['cache_hits'],
+                'metrics': metrics,
+                'duration_seconds': round(duration, 1)
+            })
+            logger.info(
+                f"✅ Weight optimization {run_id}: v{weight_set['version']} ({weight_set['status']}), out of sample "
+                f"{walk_forward['fitted']['mean_return_percent']}% vs {walk_forward['baseline']['mean_return_percent']}% "
+                f"per call, {duration:.1f}s"
+            )
+
+        except Exception as e:
+            logger.error(f"❌ Weight optimization {run_id} failed: {e}", exc_info=True)
+            result.update({'status': 'failed', 'error': str(e)})
+
+        finally:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+        result['completed_at'] = datetime.now(timezone.utc).isoformat()
+        self.progress.update({'status': result['status'], 'stage': None, 'result': result})
+        return result
+
+    def get_status(self) -> Dict:
+        return {'running': self.running, 'cache_dir': self.cache_dir, **self.progress}
+
+    def shutdown(self):
+        """Cancel a running optimization (its workers belong to the BacktestService)."""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
@@ -0,0 +1,129 @@
+"""
+Versioned aggregation weight sets.
+
+A weight set bundles everything the scan uses to weigh bots against each other:
+
+- bot_weights: bot name -> performance weight (AggregationEngine.get_bot_weights)
+- regime_affinity: regime -> bot type -> confidence multiplier
+  (MarketRegimeClassifier.get_bot_weight_modifier)
+- aggregation_boosts: regime -> bot name -> weight boost
+  (AggregationEngine._apply_regime_weighting)
+
+Sets are published by the weight optimizer (or by hand) into the weight_sets
+table with an increasing version; at most one is active. Readers go through
+WeightSetStore.get_active(), which re-reads the table at most every
+WEIGHT_SET_REFRESH_SECONDS (default 300), so activating a version takes effect
+without a restart. Without an active set the built-in defaults apply.
+"""
+
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+WEIGHT_SET_FIELDS = ('bot_weights', 'regime_affinity', 'aggregation_boosts')
+
+
+class WeightSetStore:
+    """Reads, publishes and activates weight sets."""
+
+    def __init__(self, db):
+        self.db = db
+        self.refresh_seconds = float(os.getenv('WEIGHT_SET_REFRESH_SECONDS', '300'))
+        self._active: Optional[Dict] = None
+        self._loaded_at: Optional[float] = None
+
+    async def get_active(self, refresh: bool = False) -> Optional[Dict]:
+        """The active weight set, re-read from the database when stale.
+
+        Args:
+            refresh: Re-read even if the cached set is fresh
+
+        Returns:
+            The weight_sets record, or None when no set is active
+        """
+        if self.db is None:
+            return None
+        if not refresh and self._loaded_at is not None and time.monotonic() - self._loaded_at < self.refresh_seconds:
+            return self._active
+
+        try:
+            active = await self.db.weight_sets.find_one({'status': 'active'}, sort=[('version', -1)])
+            if (active or {}).get('version') != (self._active or {}).get('version'):
+                logger.info(f"⚖️ Active weight set: {'v' + str(active['version']) if active else 'built-in defaults'}")
+            self._active = active
+        except Exception as e:
+            logger.warning(f"Could not load active weight set: {e}")
+        self._loaded_at = time.monotonic()
+        return self._active
+
+    async def publish(self, bot_weights: Dict[str, float], regime_affinity: Dict[str, Dict[str, float]],
+                      aggregation_boosts: Dict[str, Dict[str, float]], metrics: Optional[Dict] = None,
+                      config: Optional[Dict] = None, activate: bool = False) -> Dict:
+        """Store a new weight set version.
+
+        Args:
+            bot_weights, regime_affinity, aggregation_boosts: The weights (see module docstring)
+            metrics: How the set was evaluated (e.g. walk-forward scores)
+            config: How the set was produced
+            activate: Make it the active set
+
+        Returns:
+            The stored record
+        """
+        latest = await self.db.weight_sets.find_one({}, sort=[('version', -1)])
+        record = {
+            'id': str(uuid.uuid4()),
+            'version': (latest or {}).get('version', 0) + 1,
+            'status': 'candidate',
+            'bot_weights': bot_weights,
+            'regime_affinity': regime_affinity,
+            'aggregation_boosts': aggregation_boosts,
+            'metrics': metrics or {},
+            'config': config or {},
+            'created_at': datetime.now(timezone.utc)
+        }
+        await self.db.weight_sets.insert_one(dict(record))
+        logger.info(f"⚖️ Published weight set v{record['version']}")
+
+        if activate:
+            record = await self.activate(record['version']) or record
+        return record
+
+    async def activate(self, version: int) -> Optional[Dict]:
+        """Make a version the active set (the previously active one is retired).
+
+        Returns:
+            The activated record, or None if the version does not exist
+        """
+        record = await self.db.weight_sets.find_one({'version': version})
+        if record is None:
+            return None
+
+        activated_at = datetime.now(timezone.utc)
+        await self.db.weight_sets.update_many({'status': 'active'}, {'$set': {'status': 'retired'}})
+        await self.db.weight_sets.update_one(
+            {'version': version}, {'$set': {'status': 'active', 'activated_at': activated_at}}
+        )
+        record.update({'status': 'active', 'activated_at': activated_at})
+        logger.info(f"⚖️ Activated weight set v{version}")
+
+        await self.get_active(refresh=True)
+        return record
+
+    async def deactivate(self):
+        """Retire the active set, falling back to the built-in defaults."""
+        await self.db.weight_sets.update_many({'status': 'active'}, {'$set': {'status': 'retired'}})
+        await self.get_active(refresh=True)
+
+    async def get(self, version: int) -> Optional[Dict]:
+        return await self.db.weight_sets.find_one({'version': version})
+
+    async def list_sets(self, limit: int = 20) -> List[Dict]:
+        """Latest versions without their weights."""
+        sets = await self.db.weight_sets.find({}).sort('version', -1).limit(limit).to_list(limit)
+        return [{key: value for key, value in record.items() if key not in WEIGHT_SET_FIELDS} for record in sets]
@@ -0,0 +1,60 @@
+"""
+Shared pytest setup.
+
+Backend modules import each other from the backend root (``from services...``),
+as server.py does, so the root is put on sys.path before tests are collected.
+Run from the backend directory: ``python -m pytest tests``.
+
+The llm_stub fixture lets services that import the LLM client package be
+imported without it.
+"""
+
+import importlib
+import os
+import sys
+import types
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+class StubLlmChat:
+    """Stand-in for emergentintegrations' LlmChat; tests that need answers replace it."""
+
+    def __init__(self, api_key=None, session_id=None, system_message=None):
+        pass
+
+    def with_model(self, provider, model):
+        return self
+
+    async def send_message(self, message):
+        raise RuntimeError('No LLM in tests')
+
+
+class StubUserMessage:
+    def __init__(self, text):
+        self.text = text
+
+
+@pytest.fixture
+def llm_stub(monkeypatch):
+    """Stub emergentintegrations.llm.chat modules (LlmChat, UserMessage).
+
+    emergentintegrations is not in requirements.txt; the LLM-backed services
+    (alerts, portfolio, synthesis) import it at module level.
+    """
+    chat = types.ModuleType('emergentintegrations.llm.chat')
+    chat.LlmChat, chat.UserMessage = StubLlmChat, StubUserMessage
+    for name in ('emergentintegrations', 'emergentintegrations.llm'):
+        monkeypatch.setitem(sys.modules, name, types.ModuleType(name))
+    monkeypatch.setitem(sys.modules, 'emergentintegrations.llm.chat', chat)
+    return chat
+
+
+@pytest.fixture
+def alert_service(llm_stub):
+    """services.alert_service, importable without the emergentintegrations package."""
+    return importlib.import_module('services.alert_service')
@@ -0,0 +1,99 @@
+"""ai_pattern alerts against a fake LLM: one history fetch and one prompt per symbol, cached per candle."""
+
+import asyncio
+import re
+
+import pytest
+
+from benchmarks.fakes import MemoryDB
+from benchmarks.synthetic import candles
+
+SYMBOLS = [f"S{i}" for i in range(10)]
+PATTERNS = ['double bottom', 'breakout', 'head and shoulders', 'bull flag']
+ALERTS = 200
+
+
+class FakeChat:
+    """LlmChat stand-in answering "<n>. YES" for breakout patterns and "<n>. NO" otherwise."""
+
+    prompts = []
+
+    def __init__(self, api_key=None, session_id=None, system_message=None):
+        pass
+
+    def with_model(self, provider, model):
+        return self
+
+    async def send_message(self, message):
+        numbered = re.findall(r'^(\d+)\. (.+)$', message.text, re.MULTILINE)
+        FakeChat.prompts.append([pattern for _, pattern in numbered])
+        await asyncio.sleep(0.01)
+        return '\n'.join(f"{number}. {'YES' if pattern == 'breakout' else 'NO'}" for number, pattern in numbered)
+
+
+class FakeCryptoClient:
+    def __init__(self):
+        self.history_fetches = []
+
+    async def get_historical_data(self, symbol, days=30):
+        self.history_fetches.append(symbol)
+        return candles(days, seed=SYMBOLS.index(symbol))
+
+
+class FakeSnapshot:
+    history = None
+    index = {}
+
+    def add_listener(self, listener):
+        pass
+
+    async def get_prices(self, symbols):
+        return {symbol: 1.0 for symbol in symbols}
+
+
+@pytest.fixture(autouse=True)
+def fake_llm(alert_service, monkeypatch):
+    monkeypatch.setattr(alert_service, 'LlmChat', FakeChat)
+    monkeypatch.setenv('EMERGENT_LLM_KEY', 'test-key')
+    FakeChat.prompts = []
+
+
+def make_service(alert_service):
+    db = MemoryDB()
+    for i in range(ALERTS):
+        db.alerts.documents.append({
+            'id': f'alert-{i}', 'user_id': f'user-{i}', 'symbol': SYMBOLS[i % len(SYMBOLS)], 'status': 'active',
+            'alert_type': 'ai_pattern', 'condition': {'pattern': PATTERNS[(i // len(SYMBOLS)) % len(PATTERNS)]}
+        })
+    crypto_client = FakeCryptoClient()
+    return db, crypto_client, alert_service.AlertService(db, crypto_client, market_snapshot=FakeSnapshot())
+
+
+def test_patterns_are_evaluated_once_per_symbol_and_cached(alert_service):
+    db, crypto_client, service = make_service(alert_service)
+
+    async def scenario():
+        first = await service.check_alerts()
+        # One history fetch and one prompt covering all four patterns per symbol, not per alert
+        assert len(FakeChat.prompts) == len(SYMBOLS)
+        assert sorted(crypto_client.history_fetches) == sorted(SYMBOLS)
+        assert all(sorted(patterns) == sorted(PATTERNS) for patterns in FakeChat.prompts)
+
+        triggered = [alert for alert in db.alerts.documents if alert['status'] == 'triggered']
+        assert first == {'checked': ALERTS, 'triggered': ALERTS // len(PATTERNS)}
+        assert triggered and all(alert['condition']['pattern'] == 'breakout' for alert in triggered)
+
+        # Same candle: the remaining alerts are answered from the cache
+        second = await service.check_alerts()
+        assert second == {'checked': ALERTS - len(triggered), 'triggered': 0}
+        assert len(FakeChat.prompts) == len(SYMBOLS)
+        assert service.stats['ai_pattern_cache_hits'] == len(SYMBOLS) * (len(PATTERNS) - 1)
+
+        # Next candle: recomputed, still one prompt per symbol for the patterns still watched
+        service.pattern_cache = {key: (detected, 0) for key, (detected, _) in service.pattern_cache.items()}
+        await service.check_alerts()
+        assert len(FakeChat.prompts) == 2 * len(SYMBOLS)
+        assert len(crypto_client.history_fetches) == 2 * len(SYMBOLS)
+        assert all('breakout' not in patterns for patterns in FakeChat.prompts[len(SYMBOLS):])
+
+    asyncio.run(scenario())
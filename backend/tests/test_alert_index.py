@@ -0,0 +1,94 @@
+"""Price alert threshold index, and alerts whose trigger could not be stored."""
+
+import asyncio
+
+from benchmarks.fakes import MemoryDB
+from services.alert_index import AlertThresholdIndex
+
+
+def price_alert(alert_id, symbol, alert_type, price):
+    return {'id': alert_id, 'user_id': 'user', 'symbol': symbol, 'alert_type': alert_type,
+            'condition': {'price': price}, 'status': 'active'}
+
+
+def crossed_ids(index, prices):
+    return sorted(alert['id'] for alert, _ in index.pop_crossed(prices))
+
+
+def test_price_equal_to_threshold_does_not_trigger():
+    index = AlertThresholdIndex()
+    index.build([price_alert('above', 'BTC', 'price_above', 100.0),
+                 price_alert('below', 'BTC', 'price_below', 100.0)])
+
+    assert crossed_ids(index, {'BTC': 100.0}) == []
+    assert len(index) == 2
+    assert crossed_ids(index, {'BTC': 100.01}) == ['above']
+    assert crossed_ids(index, {'BTC': 99.99}) == ['below']
+    assert len(index) == 0 and index.symbols() == set()
+
+
+def test_build_and_pop_crossed_on_mixed_thresholds():
+    alerts = [price_alert(f'above-{price}', 'ETH', 'price_above', price) for price in (30, 10, 20, 40)]
+    alerts += [price_alert(f'below-{price}', 'ETH', 'price_below', price) for price in (5, 25, 15)]
+    alerts += [price_alert('sol', 'sol', 'price_above', 1.0),
+               {'id': 'pattern', 'symbol': 'ETH', 'alert_type': 'ai_pattern', 'condition': {}}]
+    index = AlertThresholdIndex()
+
+    assert index.build(alerts) == 8
+    assert index.count('ETH') == 7 and index.symbols() == {'ETH', 'SOL'}
+    # 22 is above 10 and 20 and below 25
+    assert crossed_ids(index, {'ETH': 22.0}) == ['above-10', 'above-20', 'below-25']
+    assert crossed_ids(index, {'ETH': 22.0}) == []
+    assert crossed_ids(index, {'ETH': 12.0, 'SOL': 2.0, 'DOGE': 1.0}) == ['below-15', 'sol']
+    assert crossed_ids(index, {'ETH': 50.0}) == ['above-30', 'above-40']
+    assert index.count('ETH') == 1 and index.symbols() == {'ETH'}
+
+
+def test_remove():
+    index = AlertThresholdIndex()
+    index.build([price_alert('a', 'BTC', 'price_above', 100.0),
+                 price_alert('b', 'BTC', 'price_above', 100.0),
+                 price_alert('c', 'BTC', 'price_below', 50.0)])
+
+    assert index.remove('b')['id'] == 'b'
+    assert index.remove('b') is None
+    assert index.remove('c')['id'] == 'c'
+    assert crossed_ids(index, {'BTC': 200.0}) == ['a']
+    assert index.remove('a') is None
+
+
+class FailingAlerts:
+    """alerts collection whose status updates fail a given number of times."""
+
+    def __init__(self, collection, failures):
+        self.collection = collection
+        self.failures = failures
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+    async def update_one(self, *args, **kwargs):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError('database unavailable')
+        return await self.collection.update_one(*args, **kwargs)
+
+
+def test_alert_stays_indexed_when_its_trigger_is_not_stored(alert_service):
+    db = MemoryDB()
+    db.alerts.documents.append(price_alert('btc', 'BTC', 'price_above', 100.0))
+    service = alert_service.AlertService(db, crypto_client=None)
+
+    async def scenario():
+        await service.load_alerts()
+        db.alerts = FailingAlerts(db.alerts, failures=1)
+        failed = await service.evaluate_prices({'BTC': 120.0})
+        retried = await service.evaluate_prices({'BTC': 120.0})
+        return failed, retried
+
+    failed, retried = asyncio.run(scenario())
+
+    assert failed == {'checked': 1, 'triggered': 0}
+    assert retried == {'checked': 1, 'triggered': 1}
+    assert db.alerts.collection.documents[0]['status'] == 'triggered'
+    assert len(service.index) == 0
@@ -0,0 +1,160 @@
+"""Backtest engine against the scalar scan code, and simulated outcomes on hand-built paths."""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import candles
+from services.backtest_engine import (
+    COIN_REGIMES, FEATURE_KEYS, LOSS, MARKET_REGIMES, PARTIAL_WIN, PENDING, WIN, accumulate, classify_regimes,
+    empty_totals, merge_totals, rolling_features, simulate_signals, summarize
+)
+from services.indicator_engine import IndicatorEngine
+from services.market_regime_classifier import MarketRegimeClassifier
+from services.outcome_engine import OPEN, TAKE_PROFIT, first_touch, first_touch_window
+
+BARS = 240
+
+
+@pytest.fixture(scope='module')
+def history():
+    return candles(BARS, seed=5)
+
+
+@pytest.fixture(scope='module')
+def features(history):
+    return rolling_features(history)
+
+
+def test_rolling_features_match_compute_all_indicators(history, features):
+    for i in (49, 60, 120, 199, 200, BARS - 1):
+        expected = IndicatorEngine.compute_all_indicators(history[:i + 1])
+        for key in FEATURE_KEYS:
+            assert np.isclose(features[key][i], expected[key], rtol=1e-9, equal_nan=True), (i, key)
+    assert features['timestamp'][-1] == history[-1]['timestamp']
+
+
+def test_classify_regimes_match_classify_regime(history, features):
+    regimes, confidence = classify_regimes(features)
+    classifier = MarketRegimeClassifier()
+
+    seen = set()
+    for i in range(BARS):
+        bar_features = IndicatorEngine.compute_all_indicators(history[:i + 1]) if i >= 49 else {}
+        expected = classifier.classify_regime(history[:i + 1], bar_features)
+        assert COIN_REGIMES[regimes[i]] == expected['regime'], i
+        assert np.isclose(confidence[i], expected['confidence']), i
+        seen.add(expected['regime'])
+    assert seen == set(COIN_REGIMES)
+
+
+# Candle:           0      1      2      3      4      5      6      7
+PATH = {
+    'high': np.array([101.0, 103.0, 111.0, 104.0, 102.0, 103.0, 104.0, 105.0]),
+    'low': np.array([99.0, 98.0, 100.0, 92.0, 100.0, 101.0, 102.0, 103.0]),
+    'close': np.array([100.0, 101.0, 108.0, 95.0, 101.0, 102.0, 103.0, 104.0])
+}
+BARS_OF_ROWS = np.array([0, 0, 0, 0, 3, 5])
+
+
+def path_signals():
+    """Bot 0 signals on every row, bot 1 never does."""
+    rows = len(BARS_OF_ROWS)
+    direction = np.zeros((rows, 2), dtype=np.int8)
+    direction[:, 0] = [1, 1, 1, -1, 1, 1]
+    entry = np.full((rows, 2), np.nan)
+    take_profit = np.full((rows, 2), np.nan)
+    stop_loss = np.full((rows, 2), np.nan)
+    entry[:, 0] = [100, 100, 100, 100, 95, 102]
+    take_profit[:, 0] = [110, 110, 120, 90, 120, 200]
+    stop_loss[:, 0] = [95, 99, np.nan, 115, 90, 50]
+    return {'direction': direction, 'confidence': np.full((rows, 2), 7.0, dtype=np.float32),
+            'entry': entry, 'take_profit': take_profit, 'stop_loss': stop_loss}
+
+
+def test_simulated_statuses_on_a_hand_built_path():
+    outcomes = simulate_signals(path_signals(), BARS_OF_ROWS, PATH, horizon=3)
+
+    assert outcomes['status'][:, 0].tolist() == [
+        WIN,          # TP 110 at candle 2
+        LOSS,         # own stop 99 at candle 1
+        LOSS,         # no stop: default 5% stop (95) at candle 3
+        LOSS,         # short: default stop 105 comes before its own 115 (candle 2)
+        PARTIAL_WIN,  # untouched over candles 4-6: force-closed at 103, in profit
+        PENDING       # horizon runs past the data
+    ]
+    assert np.allclose(outcomes['profit_loss'][:5, 0], [10.0, -1.0, -5.0, -5.0, (103 - 95) / 95 * 100])
+    assert np.isnan(outcomes['profit_loss'][5, 0])
+    # No signal: pending without P/L
+    assert (outcomes['status'][:, 1] == PENDING).all() and np.isnan(outcomes['profit_loss'][:, 1]).all()
+
+
+def test_accumulate_and_summarize():
+    signals = path_signals()
+    coin = {
+        **signals,
+        **simulate_signals(signals, BARS_OF_ROWS, PATH, horizon=3),
+        'coin_regime': np.array([COIN_REGIMES.index(name) for name in ['BULL'] * 2 + ['SIDEWAYS'] * 4]),
+        'market_regime': np.array([MARKET_REGIMES.index(name)
+                                   for name in ['bull_market'] * 3 + ['sideways'] * 3])
+    }
+    bots = [SimpleNamespace(name='Trend', bot_type='trend'), SimpleNamespace(name='Idle')]
+
+    totals = empty_totals(len(bots))
+    accumulate(totals, coin)
+    twice = empty_totals(len(bots))
+    merge_totals(twice, totals)
+    merge_totals(twice, totals)
+    summary = summarize(totals, bots)
+
+    trend, idle = summary['bots']
+    assert (trend['total_predictions'], trend['successful_predictions'], trend['partial_wins'],
+            trend['failed_predictions'], trend['pending_predictions']) == (6, 1, 1, 3, 1)
+    assert trend['accuracy_rate'] == pytest.approx(30.0)
+    assert trend['avg_profit_loss'] == pytest.approx((10 - 1 - 5 - 5 + (103 - 95) / 95 * 100) / 5)
+    assert idle['total_predictions'] == 0 and idle['bot_type'] == 'default'
+
+    # BTC regimes count decided (win / loss) predictions only
+    by_regime = summary['regimes'][0]
+    assert (by_regime['bull_market_predictions'], by_regime['bull_market_accuracy']) == (3, 33.3)
+    assert (by_regime['sideways_predictions'], by_regime['sideways_accuracy']) == (1, 0.0)
+    assert by_regime['bear_market_accuracy'] is None and by_regime['best_regime'] == 'Bull Market'
+
+    bull = summary['coin_regimes'][0]['BULL']
+    assert (bull['total_predictions'], bull['accuracy_rate'], bull['avg_profit_loss']) == (2, 50.0, 4.5)
+    assert (twice['counts'] == 2 * totals['counts']).all()
+
+
+# Candle:            0      1      2      3      4      5
+HIGHS = np.array([101.0, 104.0, 111.0, 103.0, 115.0, 100.0])
+LOWS = np.array([99.0, 97.0, 100.0, 89.0, 85.0, 95.0])
+
+
+def test_first_touch_window_resolves_fixed_horizons():
+    window = first_touch_window(HIGHS, LOWS, np.array([0, 0, 3]), 2, np.array([True, True, True]),
+                                np.array([110.0, 104.0, 200.0]), np.array([50.0, 50.0, 10.0]))
+    assert window['outcome'].tolist() == [OPEN, TAKE_PROFIT, OPEN]
+    # Absolute candle index; every window (candles 0-1, 0-1, 3-4) lies on the path
+    assert window['index'].tolist() == [-1, 1, -1]
+    assert window['complete'].tolist() == [True, True, True]
+
+    tail = first_touch_window(HIGHS, LOWS, np.array([4, 5]), 3, np.array([True, True]),
+                              np.array([200.0, 200.0]), np.array([10.0, 10.0]))
+    assert tail['complete'].tolist() == [False, False]
+
+
+def test_first_touch_window_matches_first_touch():
+    rng = np.random.default_rng(3)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, 300)))
+    highs, lows = closes * 1.01, closes * 0.99
+    starts = rng.integers(0, 280, 200)
+    is_long = rng.random(200) < 0.5
+    entries = closes[starts]
+    take_profits = np.where(is_long, entries * 1.05, entries * 0.95)
+    stop_losses = np.where(is_long, entries * 0.97, entries * 1.03)
+
+    window = first_touch_window(highs, lows, starts, 20, is_long, take_profits, stop_losses)
+    full = first_touch(highs, lows, starts, is_long, take_profits, stop_losses, ends=starts + 20)
+    assert (window['outcome'] == full['outcome']).all()
+    assert (window['index'] == full['index']).all()
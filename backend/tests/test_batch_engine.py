@@ -0,0 +1,49 @@
+import random
+
+import pytest
+
+from benchmarks.synthetic import feature_rows
+from bots.batch_engine import _safe_analyze, run_bots_batch, verify_batch_equivalence
+from bots.bot_strategies import get_all_bots
+
+
+def deterministic_bots():
+    """Bots whose output only depends on the features (specialized_bots draw random inputs)."""
+    return [
+        bot for bot in get_all_bots()
+        if type(bot).__module__ != 'bots.specialized_bots' and type(bot).__name__ != 'AIAnalystBot'
+    ]
+
+
+@pytest.fixture(scope='module')
+def rows():
+    return feature_rows(400)
+
+
+def test_batch_matches_scalar_analyze(rows):
+    report = verify_batch_equivalence(deterministic_bots(), rows)
+
+    assert report['equivalent'], report['mismatches'][:3]
+    assert any(stats['vectorized'] for stats in report['bots'].values())
+
+
+def test_run_bots_batch_matches_per_coin_results(rows):
+    bots = deterministic_bots()
+    batch = run_bots_batch(bots, rows)
+
+    for i, row in enumerate(rows[:50]):
+        assert [bot for bot, _ in batch[i]] == bots
+        for (bot, actual), expected in zip(batch[i], (_safe_analyze(bot, row, str(i)) for bot in bots)):
+            assert (actual is None) == (expected is None), bot.name
+            if expected is not None:
+                assert actual['direction'] == expected['direction'], bot.name
+                assert actual['confidence'] == expected['confidence'], bot.name
+
+
+def test_randomized_bots_fall_back_to_scalar(rows):
+    random.seed(1)
+    random_bots = [bot for bot in get_all_bots() if type(bot).__module__ == 'bots.specialized_bots']
+    results = run_bots_batch(random_bots, rows[:20])
+
+    assert len(results) == 20
+    assert all(len(coin_results) == len(random_bots) for coin_results in results)
@@ -0,0 +1,41 @@
+"""json_codec against the stdlib decoder on provider-shaped payloads (benchmarks.synthetic)."""
+
+import json
+
+import pytest
+
+from benchmarks.synthetic import PROVIDER_PAYLOADS, provider_payloads
+from services import json_codec
+from services.json_codec import candles_from_arrays, candles_from_records
+
+
+@pytest.fixture(scope='module')
+def payloads():
+    return provider_payloads()
+
+
+@pytest.mark.parametrize('name', PROVIDER_PAYLOADS)
+def test_loads_matches_stdlib(payloads, name):
+    body = payloads[name]
+    assert json_codec.loads(body) == json.loads(body.decode('utf-8'))
+
+
+def test_histoday_candles_match_field_by_field_parse(payloads):
+    rows = json.loads(payloads['cryptocompare_histoday'])['Data']['Data']
+    expected = [
+        {'timestamp': row['time'], 'open': float(row['open']), 'high': float(row['high']),
+         'low': float(row['low']), 'close': float(row['close']), 'volume': float(row['volumeto'])}
+        for row in rows if row.get('close', 0) > 0
+    ]
+    assert len(expected) < len(rows)
+    assert candles_from_records(rows) == expected
+
+
+def test_kline_candles_match_field_by_field_parse(payloads):
+    klines = json.loads(payloads['binance_klines'])
+    expected = [
+        {'timestamp': int(k[0] / 1000), 'open': float(k[1]), 'high': float(k[2]), 'low': float(k[3]),
+         'close': float(k[4]), 'volume': float(k[5])}
+        for k in klines
+    ]
+    assert candles_from_arrays(klines) == expected
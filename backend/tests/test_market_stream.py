@@ -0,0 +1,232 @@
+"""MarketStreamService against a local WebSocket stand-in for OKX, Bybit and Binance."""
+
+import asyncio
+import json
+import time
+
+import pytest
+from aiohttp import WSMsgType, web
+from aiohttp.test_utils import TestServer
+
+from services.market_snapshot import MarketSnapshotService
+from services.market_stream import MarketStreamService
+
+# Event times of the stand-in lag this far behind the wall clock
+LAG_SECONDS = 0.05
+
+
+def _event_ms() -> int:
+    return int((time.time() - LAG_SECONDS) * 1000)
+
+
+class ExchangeStandIn:
+    """Speaks the public ticker / kline / funding protocols at /okx, /okx_business, /bybit and /binance.
+
+    Every subscribed topic gets a message every 0.1 s. Control messages
+    (subscribe / unsubscribe) are recorded per exchange.
+    """
+
+    def __init__(self):
+        self.control = {}
+        self.pings = {}
+        self.sockets = []
+        self.app = web.Application()
+        self.app.router.add_get('/{name}', self.handler)
+
+    async def drop_connections(self):
+        for ws in list(self.sockets):
+            await ws.close()
+        self.sockets.clear()
+
+    async def _push(self, name, ws, topics):
+        sent, tick = set(), 0
+        while not ws.closed:
+            tick += 1
+            for topic in list(topics):
+                await ws.send_str(json.dumps(self._message(name, topic, tick, topic not in sent)))
+                sent.add(topic)
+            await asyncio.sleep(0.1)
+
+    def _message(self, name, topic, tick, first):
+        if name == 'okx':
+            channel, inst_id = topic
+            item = {'instId': inst_id, 'ts': str(_event_ms())}
+            if channel == 'tickers':
+                item.update(last=str(100 + tick), volCcy24h='10')
+            elif channel == 'funding-rate':
+                item.update(fundingRate='0.0001', nextFundingTime=str(int(time.time() * 1000) + 3600000))
+            elif channel == 'open-interest':
+                item.update(oi='5000')
+            return {'arg': {'channel': channel, 'instId': inst_id}, 'data': [item]}
+        if name == 'okx_business':
+            channel, inst_id = topic
+            minute = int(time.time()) // 60 * 60000
+            return {'arg': {'channel': channel, 'instId': inst_id},
+                    'data': [[str(minute - 60000), '1', '2', '0.5', '1.5', '10', '10', '15', '1']]}
+        if name == 'bybit':
+            if topic.startswith('tickers.'):
+                symbol = topic[len('tickers.'):]
+                # A full snapshot first, then deltas that only carry the last price
+                data = {'symbol': symbol, 'lastPrice': '200', 'fundingRate': '0.0002',
+                        'nextFundingTime': '1900000000000', 'openInterest': '42', 'markPrice': '200',
+                        'turnover24h': '1000'} if first else {'symbol': symbol, 'lastPrice': str(200 + tick)}
+                return {'topic': topic, 'type': 'snapshot' if first else 'delta', 'data': data, 'ts': _event_ms()}
+            return {'topic': topic, 'ts': _event_ms(), 'data': [
+                {'start': _event_ms(), 'open': '1', 'high': '2', 'low': '1', 'close': '2', 'volume': '1',
+                 'turnover': '3', 'confirm': tick % 2 == 0}
+            ]}
+        symbol = topic.split('@')[0].upper()
+        if topic.endswith('@ticker'):
+            data = {'e': '24hrTicker', 'E': _event_ms(), 's': symbol, 'c': str(300 + tick), 'q': '99'}
+        elif '@markPrice' in topic:
+            data = {'e': 'markPriceUpdate', 'E': _event_ms(), 's': symbol, 'p': '300', 'r': '0.0003',
+                    'T': 1900000000000}
+        else:
+            data = {'e': 'kline', 'E': _event_ms(), 's': symbol,
+                    'k': {'t': _event_ms(), 'o': '1', 'h': '2', 'l': '1', 'c': '1', 'q': '5', 'x': True}}
+        return {'stream': topic, 'data': data}
+
+    async def handler(self, request):
+        name = request.match_info['name']
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.sockets.append(ws)
+        topics = set()
+        pusher = asyncio.create_task(self._push(name, ws, topics))
+
+        async for msg in ws:
+            if msg.type != WSMsgType.TEXT:
+                continue
+            if msg.data == 'ping':
+                self.pings[name] = self.pings.get(name, 0) + 1
+                await ws.send_str('pong')
+                continue
+            message = json.loads(msg.data)
+            if message.get('op') == 'ping':
+                self.pings[name] = self.pings.get(name, 0) + 1
+                await ws.send_str(json.dumps({'op': 'pong', 'success': True}))
+                continue
+
+            self.control.setdefault(name, []).append(message)
+            if name.startswith('okx'):
+                for arg in message['args']:
+                    key = (arg['channel'], arg['instId'])
+                    topics.add(key) if message['op'] == 'subscribe' else topics.discard(key)
+            elif name == 'bybit':
+                for arg in message['args']:
+                    topics.add(arg) if message['op'] == 'subscribe' else topics.discard(arg)
+                await ws.send_str(json.dumps({'op': message['op'], 'success': True}))
+            else:
+                for param in message['params']:
+                    topics.add(param) if message['method'] == 'SUBSCRIBE' else topics.discard(param)
+                await ws.send_str(json.dumps({'result': None, 'id': message['id']}))
+
+        pusher.cancel()
+        return ws
+
+
+async def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        await asyncio.sleep(0.05)
+
+
+@pytest.fixture(autouse=True)
+def fast_stream_settings(monkeypatch):
+    monkeypatch.setenv('MARKET_STREAM_MIN_BACKOFF_SECONDS', '0.2')
+    monkeypatch.setenv('MARKET_STREAM_PING_SECONDS', '0.5')
+
+
+def run_with_stream(scenario):
+    """Run scenario(service, stand_in) with a started service subscribed to BTC / ETH / SOL / DOGE."""
+    async def main():
+        stand_in = ExchangeStandIn()
+        async with TestServer(stand_in.app) as server:
+            base = str(server.make_url('')).replace('http://', 'ws://').rstrip('/')
+            service = MarketStreamService(urls={name: f'{base}/{name}'
+                                                for name in ('okx', 'okx_business', 'bybit', 'binance')})
+            await service.sync_symbols(['BTC', 'ETH', 'SOL', 'DOGE'], {
+                'okx': ['BTC', 'ETH'], 'bybit': ['BTC', 'SOL'], 'binance': ['BTC', 'ETH', 'DOGE']
+            })
+            await service.start()
+            try:
+                await scenario(service, stand_in)
+            finally:
+                await service.stop()
+            assert not service.get_stats()['running']
+
+    asyncio.run(main())
+
+
+def test_streams_fill_state_table_and_report_lag():
+    async def scenario(service, stand_in):
+        await wait_for(lambda: all(
+            service.get_klines('BTC', exchange) for exchange in ('okx', 'bybit', 'binance')
+        ) and service.get_derivatives_entry('okx', 'BTC'))
+
+        okx = service.get_derivatives_entry('okx', 'BTC')
+        assert okx['open_interest'] == 5000.0
+        assert okx['funding_rate'] == pytest.approx(0.01)  # percent, like the REST clients
+        # Deltas only carry the price: snapshot fields must survive them
+        await wait_for(lambda: (service.get_value('SOL', 'price') or (0,))[0] > 200)
+        bybit = service.get_derivatives_entry('bybit', 'SOL')
+        assert bybit['open_interest'] == 42.0 and bybit['funding_rate'] == pytest.approx(0.02)
+        assert set(service.get_state('BTC')) >= {'okx', 'bybit', 'binance'}
+
+        await wait_for(lambda: len(stand_in.pings) == 3, timeout=3)
+        streams = service.get_stats()['streams']
+        assert streams['okx:tickers']['messages'] > 0
+        assert streams['binance:ticker']['lag_ms_avg'] >= LAG_SECONDS * 1000 * 0.8
+
+    run_with_stream(scenario)
+
+
+def test_price_readers_prefer_streamed_prices():
+    class Listing:
+        async def get_market_listing(self, limit):
+            return [{'symbol': 'BTC', 'price': 1.0}, {'symbol': 'XRP', 'price': 0.5}]
+
+        async def get_prices(self, symbols):
+            return {}
+
+    async def scenario(service, stand_in):
+        await wait_for(lambda: service.get_price('BTC') is not None)
+        prices = await MarketSnapshotService(Listing(), service).get_prices(['BTC', 'XRP'])
+
+        assert prices['BTC'] > 100  # streamed, not the listing's 1.0
+        assert prices['XRP'] == 0.5  # not streamed: listing price
+
+    run_with_stream(scenario)
+
+
+def test_reconnects_and_resubscribes_after_a_drop():
+    async def scenario(service, stand_in):
+        await wait_for(lambda: len(stand_in.control) == 4 and 'okx:tickers' in service.stream_stats)
+        subscribes = {name: len(messages) for name, messages in stand_in.control.items()}
+
+        await stand_in.drop_connections()
+        await wait_for(lambda: all(
+            connection['reconnects'] >= 1 and connection['connected']
+            for connection in service.get_stats()['connections'].values()
+        ))
+        await wait_for(lambda: all(
+            len(stand_in.control[name]) == count + 1 for name, count in subscribes.items()
+        ))
+
+        before = service.stream_stats['okx:tickers']['messages']
+        await wait_for(lambda: service.stream_stats['okx:tickers']['messages'] > before)
+
+    run_with_stream(scenario)
+
+
+def test_symbol_changes_unsubscribe_dropped_topics():
+    async def scenario(service, stand_in):
+        await wait_for(lambda: 'okx' in stand_in.control)
+        await service.set_symbols('okx', ['BTC'])
+        await wait_for(lambda: stand_in.control['okx'][-1]['op'] == 'unsubscribe')
+
+        assert {arg['instId'] for arg in stand_in.control['okx'][-1]['args']} == {'ETH-USDT-SWAP'}
+
+    run_with_stream(scenario)
@@ -0,0 +1,76 @@
+"""First-touch TP/SL resolution and adverse excursion on hand-built price paths."""
+
+import numpy as np
+
+from services.outcome_engine import OPEN, STOP_LOSS, TAKE_PROFIT, adverse_excursion, first_touch, start_indices
+
+# Candle:       0      1      2      3      4      5
+HIGHS = np.array([101.0, 104.0, 111.0, 103.0, 115.0, 100.0])
+LOWS = np.array([99.0, 97.0, 100.0, 89.0, 85.0, 95.0])
+
+
+def resolve(starts, is_long, take_profits, stop_losses, ends=None):
+    result = first_touch(HIGHS, LOWS, np.array(starts), np.array(is_long), np.array(take_profits, dtype=float),
+                         np.array(stop_losses, dtype=float), None if ends is None else np.array(ends))
+    return result['outcome'].tolist(), result['index'].tolist()
+
+
+def test_long_positions():
+    outcome, index = resolve(
+        starts=[0, 0, 0, 4],
+        is_long=[True, True, True, True],
+        # TP first (candle 2), SL first (candle 1), never touched, both in candle 4
+        take_profits=[110, 110, 200, 112],
+        stop_losses=[90, 98, 10, 88]
+    )
+    assert outcome == [TAKE_PROFIT, STOP_LOSS, OPEN, STOP_LOSS]
+    assert index == [2, 1, -1, 4]
+
+
+def test_short_positions():
+    outcome, index = resolve(
+        starts=[0, 0, 4],
+        is_long=[False, False, False],
+        # TP first (low 89 at candle 3), SL first (high 111 at candle 2), both in candle 4
+        take_profits=[90, 80, 86],
+        stop_losses=[120, 110, 114]
+    )
+    assert outcome == [TAKE_PROFIT, STOP_LOSS, STOP_LOSS]
+    assert index == [3, 2, 4]
+
+
+def test_ends_truncate_the_window():
+    # TP at candle 2: outside [0, 2), inside [0, 3)
+    outcome, index = resolve(starts=[0, 0], is_long=[True, True], take_profits=[110, 110],
+                             stop_losses=[50, 50], ends=[2, 3])
+    assert outcome == [OPEN, TAKE_PROFIT]
+    assert index == [-1, 2]
+
+
+def test_candle_containing_the_prediction_is_skipped():
+    timestamps = np.array([0.0, 14400.0, 28800.0, 43200.0])
+    # Made inside candle 0, exactly at candle 1's open, inside candle 3, after the path
+    starts = start_indices(timestamps, [3600.0, 14400.0, 50000.0, 90000.0])
+    assert starts.tolist() == [1, 1, 4, 4]
+
+    # Candle 0 touches both levels before the prediction existed: only candles 1-3 count
+    highs = np.array([120.0, 101.0, 101.0, 101.0])
+    lows = np.array([90.0, 99.0, 99.0, 99.0])
+    result = first_touch(highs, lows, starts[:1], np.array([True]), np.array([110.0]), np.array([95.0]))
+    assert result['outcome'].tolist() == [OPEN]
+    assert first_touch(highs, lows, np.array([0]), np.array([True]), np.array([110.0]),
+                       np.array([95.0]))['outcome'].tolist() == [STOP_LOSS]
+
+
+def test_adverse_excursion_sign_and_magnitude():
+    excursion = adverse_excursion(
+        HIGHS, LOWS,
+        starts=np.array([0, 0, 2, 5]),
+        stops=np.array([1, 2, 2, 5]),
+        is_long=np.array([True, False, True, False]),
+        entries=np.array([100.0, 100.0, 100.0, 100.0])
+    )
+    # Long: lowest low 97 -> -3%; short: highest high 111 -> -11%; long never below entry -> 0;
+    # short with the high at entry -> 0
+    assert np.allclose(excursion, [-3.0, -11.0, 0.0, 0.0])
+    assert (excursion <= 0).all()
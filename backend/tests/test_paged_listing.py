@@ -0,0 +1,136 @@
+"""Paged coin listings against a local fake HTTP server (no upstream calls)."""
+
+import asyncio
+import time
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from services.coingecko_client import CoinGeckoClient
+from services.cryptocompare_client import CryptoCompareClient
+from services.http_transport import get_transport
+from services.multi_provider_client import MultiProviderClient
+
+COINS = 1000
+PAGE_LATENCY = 0.2
+# Rank 350 reuses the symbol of rank 349: only the higher-ranked coin may be kept
+SYMBOLS = [f"C{i}" if i != 350 else 'C349' for i in range(COINS)]
+
+
+class FakeListingServer:
+    """CryptoCompare top/mktcapfull and CoinGecko coins/markets, ranked by price, with page latency."""
+
+    def __init__(self):
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.app = web.Application()
+        self.app.router.add_get('/data/top/mktcapfull', self.cryptocompare_page)
+        self.app.router.add_get('/api/v3/coins/markets', self.coingecko_page)
+
+    async def _delay(self):
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(PAGE_LATENCY)
+        finally:
+            self.in_flight -= 1
+
+    async def cryptocompare_page(self, request):
+        await self._delay()
+        page, limit = int(request.query.get('page', 0)), int(request.query['limit'])
+        ranks = range(page * limit, min((page + 1) * limit, COINS))
+        return web.json_response({'Message': 'Success', 'Data': [
+            {'CoinInfo': {'Name': SYMBOLS[rank], 'FullName': SYMBOLS[rank]},
+             'RAW': {'USD': {'PRICE': float(COINS - rank)}}}
+            for rank in ranks
+        ]})
+
+    async def coingecko_page(self, request):
+        await self._delay()
+        page, per_page = int(request.query['page']), int(request.query['per_page'])
+        ranks = range((page - 1) * per_page, min(page * per_page, COINS))
+        return web.json_response([
+            {'symbol': SYMBOLS[rank].lower(), 'name': SYMBOLS[rank], 'current_price': float(COINS - rank)}
+            for rank in ranks
+        ])
+
+
+@pytest.fixture(autouse=True)
+def generous_rate_limits(monkeypatch):
+    """Quotas of the real APIs would dominate the timings; rebuild the buckets with test quotas."""
+    for provider in ('cryptocompare', 'coingecko'):
+        monkeypatch.setenv(f'RATE_LIMIT_{provider.upper()}', '100:20')
+        get_transport().rate_limiters.buckets.pop(provider, None)
+    yield
+    for provider in ('cryptocompare', 'coingecko'):
+        get_transport().rate_limiters.buckets.pop(provider, None)
+
+
+async def fetch_listing(client_factory, path, max_coins):
+    fake = FakeListingServer()
+    async with TestServer(fake.app) as server:
+        client = client_factory()
+        client.base_url = str(server.make_url(path))
+        try:
+            start = time.monotonic()
+            coins = await client.get_all_coins(max_coins)
+            elapsed = time.monotonic() - start
+        finally:
+            await client.close()
+            await get_transport().close()
+    return fake, coins, elapsed
+
+
+def assert_ranked_listing(coins, expected):
+    symbols = [symbol for symbol, _, _ in coins]
+    assert len(coins) == expected
+    assert len(set(symbols)) == len(symbols)
+    assert all(a[2] > b[2] for a, b in zip(coins, coins[1:]))
+    # The duplicate keeps the rank-349 price
+    assert dict((symbol, price) for symbol, _, price in coins)['C349'] == COINS - 349
+
+
+def test_cryptocompare_pages_are_fetched_concurrently():
+    fake, coins, elapsed = asyncio.run(fetch_listing(CryptoCompareClient, '/data', 1000))
+
+    assert fake.requests == 10
+    assert fake.max_in_flight > 1
+    # Sequential paging would take at least 10 x PAGE_LATENCY
+    assert elapsed < 10 * PAGE_LATENCY / 2
+    assert_ranked_listing(coins, COINS - 1)
+
+
+def test_coingecko_pages_are_fetched_concurrently():
+    fake, coins, elapsed = asyncio.run(fetch_listing(CoinGeckoClient, '/api/v3', 1000))
+
+    assert fake.requests == 4
+    assert fake.max_in_flight > 1
+    assert elapsed < 4 * PAGE_LATENCY / 2
+    assert_ranked_listing(coins, COINS - 1)
+
+
+def test_merged_listing_is_cached_and_shared():
+    async def scenario():
+        fake = FakeListingServer()
+        async with TestServer(fake.app) as server:
+            client = MultiProviderClient()
+            client.cryptocompare.base_url = str(server.make_url('/data'))
+            client.operation_providers['listing'] = ['cryptocompare']
+            try:
+                listings = await asyncio.gather(*(client.get_all_coins(n) for n in (500, 100, 200, 500, 300)))
+                stats = client.get_stats()['listing_cache']
+            finally:
+                await client.close()
+                await get_transport().close()
+        return fake, listings, stats
+
+    fake, listings, stats = asyncio.run(scenario())
+
+    # One 500-coin fetch (5 pages) serves every caller; the duplicate symbol leaves 499 coins
+    assert fake.requests == 5
+    assert stats['misses'] == 1 and stats['hits'] == 4
+    assert [len(listing) for listing in listings] == [499, 100, 200, 499, 300]
+    assert listings[1] == listings[0][:100]
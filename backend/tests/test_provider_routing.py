@@ -0,0 +1,70 @@
+"""Provider routing outcomes against a local fake histoday endpoint (no upstream calls)."""
+
+import asyncio
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from services.http_transport import get_transport
+from services.multi_provider_client import MultiProviderClient
+from services.provider_health import CircuitBreaker
+
+
+async def histoday(request):
+    """Candles for BTC, an empty answer for unlisted symbols and a 500 for DOWN."""
+    symbol = request.query['fsym']
+    if symbol == 'DOWN':
+        return web.Response(status=500)
+    rows = [{'time': 1_700_000_000 + i * 86400, 'open': 1.0, 'high': 2.0, 'low': 0.5, 'close': 1.5,
+             'volumeto': 10.0} for i in range(5)] if symbol == 'BTC' else []
+    return web.json_response({'Response': 'Success', 'Data': {'Data': rows}})
+
+
+@pytest.fixture(autouse=True)
+def generous_rate_limits(monkeypatch):
+    monkeypatch.setenv('RATE_LIMIT_CRYPTOCOMPARE', '100:20')
+    monkeypatch.setenv('CIRCUIT_FAILURE_THRESHOLD', '3')
+    get_transport().rate_limiters.buckets.pop('cryptocompare', None)
+    yield
+    get_transport().rate_limiters.buckets.pop('cryptocompare', None)
+
+
+def fetch_all(symbols):
+    async def scenario():
+        app = web.Application()
+        app.router.add_get('/data/v2/histoday', histoday)
+        async with TestServer(app) as server:
+            client = MultiProviderClient()
+            client.cryptocompare.base_url = str(server.make_url('/data'))
+            client.operation_providers['daily_candles'] = ['cryptocompare']
+            try:
+                results = [await client._call_with_routing('daily_candles', 'get_historical_data', symbol, 30)
+                           for symbol in symbols]
+            finally:
+                await client.close()
+                await get_transport().close()
+        return client, results
+
+    return asyncio.run(scenario())
+
+
+def test_unlisted_symbols_do_not_count_against_the_provider():
+    client, results = fetch_all([f'SMALL{i}' for i in range(10)] + ['BTC'])
+
+    assert results[:10] == [(None, [])] * 10
+    assert results[10][0] == 'cryptocompare' and len(results[10][1]) == 5
+    breaker = client.router.breaker('cryptocompare', 'daily_candles')
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.consecutive_failures == 0
+    assert client.router.get_status()['daily_candles']['cryptocompare']['error_rate'] == 0
+    stats = client.stats['cryptocompare']
+    assert stats['not_found'] == 10 and stats['errors'] == 0
+
+
+def test_server_errors_open_the_breaker():
+    client, results = fetch_all(['DOWN'] * 3 + ['BTC'])
+
+    assert client.stats['cryptocompare']['errors'] == 3
+    # The open breaker skips the provider without a request
+    assert client.router.breaker('cryptocompare', 'daily_candles').state == CircuitBreaker.OPEN
+    assert results[3] == (None, [])
@@ -0,0 +1,90 @@
+"""Resuming interrupted scans: no duplicate bot_results, recommendations or predictions."""
+
+import asyncio
+import importlib
+from collections import Counter
+
+import pytest
+
+from benchmarks.fakes import MemoryDB, NoDerivatives, SyntheticMarket
+
+COINS = 6
+
+
+class Interrupted(BaseException):
+    """Process stop in the middle of a scan (not handled by the scan's error paths)."""
+
+
+@pytest.fixture
+def orchestrator(llm_stub):
+    scan_orchestrator = importlib.import_module('services.scan_orchestrator')
+    orchestrator = scan_orchestrator.ScanOrchestrator(MemoryDB())
+    market = SyntheticMarket(COINS)
+    orchestrator.crypto_client = market
+    orchestrator.bot_performance_service.crypto_client = market
+    orchestrator.futures_client = NoDerivatives()
+
+    async def sideways():
+        return 'SIDEWAYS'
+    orchestrator.bot_performance_service.classify_market_regime = sideways
+    return orchestrator
+
+
+def run_interrupted(orchestrator):
+    """Start a focused scan that is expected to be interrupted; returns its run id."""
+    async def scan():
+        with pytest.raises(Interrupted):
+            await orchestrator.run_scan(run_id='run-1', scan_type='focused_scan')
+    asyncio.run(scan())
+    assert orchestrator.db.scan_runs.documents[0]['status'] == 'running'
+    return 'run-1'
+
+
+def assert_persisted_once(db):
+    rows = Counter((row['coin'], row['bot_name']) for row in db.bot_results.documents)
+    assert len({coin for coin, _ in rows}) == COINS
+    assert set(rows.values()) == {1}
+    coins = [row['coin'] for row in db.recommendations.documents]
+    assert coins and len(coins) == len(set(coins))
+    predictions = Counter((row['coin_symbol'], row['bot_name']) for row in db.bot_predictions.documents)
+    assert predictions and set(predictions.values()) == {1}
+    assert db.scan_runs.documents[0]['status'] == 'completed'
+
+
+def test_coin_interrupted_before_its_checkpoint_is_not_saved_twice(orchestrator):
+    record_coin = orchestrator.checkpoints.record_coin
+
+    async def stop_at_third_coin(run_id, symbol, coin_result):
+        # bot_results of the third coin are already saved, its checkpoint is not
+        if symbol == 'C2':
+            raise Interrupted()
+        await record_coin(run_id, symbol, coin_result)
+
+    orchestrator.checkpoints.record_coin = stop_at_third_coin
+    run_id = run_interrupted(orchestrator)
+    assert {row['coin'] for row in orchestrator.db.bot_results.documents} == {'C0', 'C1', 'C2'}
+
+    orchestrator.checkpoints.record_coin = record_coin
+    result = asyncio.run(orchestrator.resume_scan(run_id))
+
+    assert result['status'] == 'completed'
+    assert_persisted_once(orchestrator.db)
+
+
+def test_finished_persistence_steps_are_not_repeated(orchestrator):
+    save_bot_predictions = orchestrator.bot_performance_service.save_bot_predictions
+
+    async def stop_before_predictions(**kwargs):
+        raise Interrupted()
+
+    orchestrator.bot_performance_service.save_bot_predictions = stop_before_predictions
+    run_id = run_interrupted(orchestrator)
+    recommendations = len(orchestrator.db.recommendations.documents)
+    assert recommendations and not orchestrator.db.bot_predictions.documents
+
+    orchestrator.bot_performance_service.save_bot_predictions = save_bot_predictions
+    asyncio.run(orchestrator.resume_scan(run_id))
+
+    assert len(orchestrator.db.recommendations.documents) == recommendations
+    assert_persisted_once(orchestrator.db)
+    assert orchestrator.db.scan_runs.documents[0]['scan_config']['persisted'] == ['recommendations', 'bot_predictions']
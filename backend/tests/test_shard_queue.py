@@ -0,0 +1,128 @@
+"""ShardQueue on a database table (the SCAN_QUEUE_BACKEND=supabase path)."""
+
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from benchmarks.fakes import MemoryCollection
+from services.scan_shards import ShardQueue
+
+TOKENS = [(f"C{i}", f"Coin {i}", float(i + 1)) for i in range(7)]
+
+
+class JsonbTable(MemoryCollection):
+    """scan_shards table with SupabaseCollection semantics.
+
+    Filters are equality matches and update_one reports matched_count (UPDATE ...
+    WHERE a = x AND b = y). Rows round-trip through JSON like jsonb columns, and
+    writes yield to the event loop like a network request, so concurrent claims
+    interleave.
+    """
+
+    async def insert_one(self, document):
+        await asyncio.sleep(0)
+        return await super().insert_one(json.loads(json.dumps(document, allow_nan=False)))
+
+    async def update_one(self, query, update, upsert=False):
+        await asyncio.sleep(0)
+        update = {'$set': json.loads(json.dumps(update['$set'], allow_nan=False))}
+        return await super().update_one(query, update, upsert)
+
+
+def make_queue(max_attempts=2):
+    table = JsonbTable()
+    return table, ShardQueue(table, max_attempts=max_attempts)
+
+
+def test_concurrent_claims_never_share_a_shard():
+    table, queue = make_queue()
+
+    async def scenario():
+        shard_ids = await queue.enqueue('run-1', TOKENS, shard_size=3)
+        claims = await asyncio.gather(*(queue.claim(f'worker-{i}', 'run-1') for i in range(5)))
+        return shard_ids, claims
+
+    shard_ids, claims = asyncio.run(scenario())
+
+    claimed = [shard for shard in claims if shard]
+    assert len(shard_ids) == 3 and len(claimed) == 3
+    assert sorted(shard['id'] for shard in claimed) == sorted(shard_ids)
+    owners = {row['id']: row['worker_id'] for row in table.documents}
+    assert all(owners[shard['id']] == shard['worker_id'] for shard in claimed)
+    assert [len(row['tokens']) for row in sorted(table.documents, key=lambda row: row['shard_index'])] == [3, 3, 1]
+
+
+def test_heartbeat_and_complete_only_for_the_owner():
+    table, queue = make_queue()
+
+    async def scenario():
+        await queue.enqueue('run-1', TOKENS[:2], shard_size=2)
+        shard = await queue.claim('worker-a')
+        results = [{'symbol': 'C0', 'aggregated': {'avg_confidence': np.float64(7.5), 'rsi': float('nan')},
+                    'bot_results': [{'confidence': np.int64(8)}]}]
+        return (shard, await queue.heartbeat(shard['id'], 'worker-b'), await queue.heartbeat(shard['id'], 'worker-a'),
+                await queue.complete(shard['id'], 'worker-b', results),
+                await queue.complete(shard['id'], 'worker-a', results),
+                await queue.heartbeat(shard['id'], 'worker-a'))
+
+    shard, foreign_beat, own_beat, foreign_complete, own_complete, late_beat = asyncio.run(scenario())
+
+    assert (foreign_beat, own_beat, foreign_complete, own_complete, late_beat) == (False, True, False, True, False)
+    row = table.documents[0]
+    assert row['status'] == 'completed'
+    assert row['results'] == [{'symbol': 'C0', 'aggregated': {'avg_confidence': 7.5, 'rsi': None},
+                               'bot_results': [{'confidence': 8}]}]
+
+
+def test_stale_shards_are_requeued_then_failed():
+    table, queue = make_queue(max_attempts=2)
+
+    async def lose_worker(worker_id):
+        shard = await queue.claim(worker_id, 'run-1')
+        stale = (datetime.now(timezone.utc) - timedelta(seconds=300)).isoformat()
+        table.documents[0]['heartbeat_at'] = stale
+        return shard
+
+    async def scenario():
+        await queue.enqueue('run-1', TOKENS[:3], shard_size=3)
+        first = await lose_worker('worker-a')
+        fresh = await queue.requeue_stale('run-1', timeout=90)
+        requeued = await queue.requeue_stale('run-1', timeout=90)
+        after_first = dict(table.documents[0])
+        # The lost worker comes back: its shard now belongs to the queue again
+        lost_complete = await queue.complete(first['id'], 'worker-a', [])
+
+        await lose_worker('worker-b')
+        await queue.requeue_stale('run-1', timeout=90)
+        return fresh, requeued, after_first, lost_complete, await queue.claim('worker-c', 'run-1')
+
+    fresh, requeued, after_first, lost_complete, last_claim = asyncio.run(scenario())
+
+    assert fresh == 1 and requeued == 0
+    assert after_first['status'] == 'pending' and after_first['worker_id'] is None
+    assert after_first['attempts'] == 1 and 'worker-a' in after_first['error']
+    assert lost_complete is False
+    # Second lost worker: attempts run out
+    assert table.documents[0]['status'] == 'failed' and table.documents[0]['attempts'] == 2
+    assert last_claim is None
+
+
+def test_fail_and_cancel():
+    table, queue = make_queue(max_attempts=3)
+
+    async def scenario():
+        await queue.enqueue('run-1', TOKENS, shard_size=3)
+        shard = await queue.claim('worker-a', 'run-1')
+        status = await queue.fail(shard, 'worker-a', 'boom')
+        retried = await queue.claim('worker-b', 'run-1')
+        await queue.cancel_run('run-1')
+        return status, retried, await queue.get_shards('run-1'), await queue.claim('worker-c', 'run-1')
+
+    status, retried, shards, after_cancel = asyncio.run(scenario())
+
+    assert status == 'pending'
+    assert retried['id'] == shards[0]['id'] and retried['attempts'] == 1
+    assert [shard['status'] for shard in shards] == ['cancelled'] * 3
+    assert after_cancel is None
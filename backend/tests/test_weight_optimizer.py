@@ -0,0 +1,154 @@
+"""Weight optimizer: replay cache, regime fits and walk-forward windows."""
+
+import os
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import candles
+from services.aggregation_engine import CONFIDENCE_THRESHOLD
+from services.weight_optimizer import (
+    DAY_SECONDS, _call_returns, _replay_chunk, _replay_file, _replay_prefix, closed_candles, consensus_votes,
+    fit_regime, walk_forward_windows
+)
+
+BOT_NAMES = ['SMA_CrossBot', 'RSI_Bot']
+NO_BTC = np.array([], dtype=np.int64)
+
+
+def test_closed_candles_drop_the_forming_candle():
+    history = candles(3)
+    last_open = history[-1]['timestamp']
+
+    assert closed_candles(history, now=last_open + DAY_SECONDS) == history
+    assert closed_candles(history, now=last_open + DAY_SECONDS - 1) == history[:-1]
+
+
+def test_replay_file_changes_with_candles_bots_horizon_and_seed():
+    history = candles(60)
+    name = _replay_file('BTC', history, BOT_NAMES, 7, None)
+
+    assert name.startswith(_replay_prefix('BTC', BOT_NAMES, 7, None)) and name.endswith('.npz')
+    assert _replay_file('BTC', [dict(candle) for candle in history], BOT_NAMES, 7, None) == name
+    changed = [dict(candle) for candle in history]
+    changed[-1]['close'] *= 1.001
+    others = {
+        _replay_file('BTC', changed, BOT_NAMES, 7, None),
+        _replay_file('BTC', history + candles(1, start=history[-1]['timestamp'] + DAY_SECONDS), BOT_NAMES, 7, None),
+        _replay_file('BTC', history, BOT_NAMES[:1], 7, None),
+        _replay_file('BTC', history, BOT_NAMES, 14, None),
+        _replay_file('BTC', history, BOT_NAMES, 7, 1),
+        _replay_file('ETH', history, BOT_NAMES, 7, None)
+    }
+    assert len(others) == 6 and name not in others
+    # Symbols are reduced to file name characters
+    assert _replay_prefix('1000/PEPE', BOT_NAMES, 7, None).startswith('1000PEPE-')
+
+
+def test_replays_are_cached_and_superseded(tmp_path):
+    cache_dir = str(tmp_path)
+    coins = [('AAA', candles(120, seed=1)), ('BBB', candles(120, seed=2))]
+
+    def replay(coins, horizon=7):
+        return _replay_chunk(coins, BOT_NAMES, NO_BTC, NO_BTC, horizon, None, cache_dir)
+
+    first = replay(coins)
+    assert first['cache_hits'] == 0 and first['skipped'] == []
+    assert sorted(os.listdir(cache_dir)) == sorted(os.path.basename(path) for path in first['paths'])
+    with np.load(first['paths'][0]) as cached:
+        assert cached['direction'].shape == (120 - 49, len(BOT_NAMES))
+
+    assert replay(coins) == {**first, 'cache_hits': 2}
+
+    # Another horizon is cached next to the first; a writer's partial file is left alone
+    other_horizon = replay(coins[:1], horizon=14)['paths'][0]
+    partial = os.path.join(cache_dir, f"{_replay_prefix('AAA', BOT_NAMES, 7, None)}123.partial.npz")
+    open(partial, 'wb').close()
+
+    # A new candle supersedes AAA's replay for the same horizon only
+    grown = [('AAA', coins[0][1] + candles(1, seed=3, start=coins[0][1][-1]['timestamp'] + DAY_SECONDS))]
+    superseding = replay(grown)['paths'][0]
+    assert sorted(os.listdir(cache_dir)) == sorted(
+        os.path.basename(path) for path in [superseding, first['paths'][1], other_horizon, partial]
+    )
+
+
+def test_too_short_histories_are_skipped(tmp_path):
+    result = _replay_chunk([('NEW', candles(20))], BOT_NAMES, NO_BTC, NO_BTC, 7, None, str(tmp_path))
+
+    assert result == {'paths': [], 'skipped': ['NEW'], 'cache_hits': 0}
+    assert os.listdir(tmp_path) == []
+
+
+@pytest.fixture
+def forward_return():
+    rng = np.random.default_rng(11)
+    return rng.normal(0, 3, 400) + np.where(rng.random(400) < 0.5, 0.5, -0.5)
+
+
+def score(direction, confidence, forward_return, type_index, weights, affinity, boosts):
+    votes = consensus_votes(direction, confidence, affinity[type_index])
+    return float(_call_returns(votes @ (weights * boosts), forward_return).sum())
+
+
+def test_fit_regime_gates_out_a_wrong_bot_type(forward_return):
+    # Bot 0 always calls the move, bot 1 (another type) always calls the opposite
+    right = np.where(forward_return > 0, 1, -1)
+    direction = np.stack([right, -right], axis=1).astype(np.int8)
+    confidence = np.full(direction.shape, 7.0, dtype=np.float32)
+    type_index = np.array([0, 1])
+    weights = np.ones(2)
+    start = (np.ones(2), np.ones(2))
+
+    affinity, boosts = fit_regime(direction, confidence, forward_return, type_index, weights, *start)
+
+    assert affinity[0] == 1.0 and 7.0 * affinity[1] < CONFIDENCE_THRESHOLD
+    assert boosts.tolist() == [1.0, 1.0]
+    assert score(direction, confidence, forward_return, type_index, weights, affinity, boosts) == pytest.approx(
+        np.abs(forward_return).sum())
+    assert score(direction, confidence, forward_return, type_index, weights, *start) < np.abs(forward_return).sum()
+
+
+def test_fit_regime_boosts_the_right_bot_of_a_type(forward_return):
+    # Same type: the affinity gates both bots alike, only their boosts can separate them
+    right = np.where(forward_return > 0, 1, -1)
+    direction = np.stack([-right, right], axis=1).astype(np.int8)
+    confidence = np.full(direction.shape, 7.0, dtype=np.float32)
+    type_index = np.array([0, 0])
+    weights = np.ones(2)
+
+    affinity, boosts = fit_regime(direction, confidence, forward_return, type_index, weights,
+                                  np.ones(1), np.ones(2))
+
+    assert affinity.tolist() == [1.0]
+    assert boosts[1] > boosts[0]
+    assert score(direction, confidence, forward_return, type_index, weights, affinity, boosts) == pytest.approx(
+        np.abs(forward_return).sum())
+
+
+def test_fit_regime_keeps_parameters_without_a_real_gain(forward_return):
+    # A single bot that is right on every row: no grid value can do better than the start
+    direction = np.where(forward_return > 0, 1, -1).astype(np.int8)[:, None]
+    confidence = np.full(direction.shape, 7.0, dtype=np.float32)
+
+    affinity, boosts = fit_regime(direction, confidence, forward_return, np.array([0]), np.ones(1),
+                                  np.ones(1), np.ones(1))
+
+    assert affinity.tolist() == [1.0] and boosts.tolist() == [1.0]
+
+
+def test_walk_forward_windows_purge_the_horizon():
+    start = 1_700_000_000
+    end = start + 100 * DAY_SECONDS
+    windows = walk_forward_windows(start, end, train_days=30, test_days=10, horizon_days=7)
+
+    assert len(windows) == 8
+    assert windows[0] == ((start, start + 23 * DAY_SECONDS), (start + 30 * DAY_SECONDS, start + 40 * DAY_SECONDS))
+    for (train_start, train_end), (test_start, test_end) in windows:
+        assert train_start < train_end < test_start < test_end
+        # The last training row's forward return ends where the test window starts
+        assert train_end + 7 * DAY_SECONDS == test_start
+    # Test windows tile the period without overlapping
+    tests = [test for _, test in windows]
+    assert all(previous[1] == following[0] for previous, following in zip(tests, tests[1:]))
+    assert tests[-1][0] <= end < tests[-1][1]
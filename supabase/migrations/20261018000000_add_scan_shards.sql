@@ -0,0 +1,47 @@
+/*
+  # Add Scan Shards Job Queue
+
+  ## New Tables
+
+  ### 1. scan_shards
+  Pass 1 work units of a distributed scan (DISTRIBUTED_SCANS=true, SCAN_QUEUE_BACKEND=supabase)
+  - `id` (text, primary key) - Unique shard identifier
+  - `run_id` (text) - Scan run the shard belongs to
+  - `shard_index` (integer) - Position of the shard in the scan's token list
+  - `tokens` (jsonb) - Array of [symbol, display_name, current_price]
+  - `batch_size` (integer) - Coins analyzed concurrently by the worker
+  - `status` (text) - Status: 'pending', 'running', 'completed', 'failed', 'cancelled'
+  - `worker_id` (text) - Worker currently owning the shard
+  - `attempts` (integer) - Failed or abandoned attempts so far
+  - `heartbeat_at` (timestamptz) - Last heartbeat of the owning worker
+  - `results` (jsonb) - Per-coin aggregated and bot results written by the worker
+  - `error` (text) - Last error
+  - `created_at` (timestamptz) - Queue time
+  - `updated_at` (timestamptz) - Last state change
+
+  ## Security
+  - Enable RLS; only the service role (backend and shard workers) accesses this table
+*/
+
+CREATE TABLE IF NOT EXISTS scan_shards (
+  id text PRIMARY KEY,
+  run_id text NOT NULL,
+  shard_index integer NOT NULL,
+  tokens jsonb NOT NULL,
+  batch_size integer DEFAULT 1,
+  status text DEFAULT 'pending',
+  worker_id text,
+  attempts integer DEFAULT 0,
+  heartbeat_at timestamptz,
+  results jsonb,
+  error text,
+  created_at timestamptz DEFAULT now(),
+  updated_at timestamptz DEFAULT now()
+);
+
+-- Indexes for claiming and coordinator polling
+CREATE INDEX IF NOT EXISTS idx_scan_shards_run_id ON scan_shards(run_id);
+CREATE INDEX IF NOT EXISTS idx_scan_shards_status_created_at ON scan_shards(status, created_at);
+
+-- Enable Row Level Security
+ALTER TABLE scan_shards ENABLE ROW LEVEL SECURITY;
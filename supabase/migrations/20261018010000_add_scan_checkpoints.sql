@@ -0,0 +1,38 @@
+/*
+  # Add Resumable Scan Checkpoints
+
+  ## Modified Tables
+
+  ### 1. scan_runs
+  - `scan_config` (jsonb) - Selected coins ([symbol, display_name, price]) and scan settings needed to resume the run
+
+  ## New Tables
+
+  ### 2. scan_checkpoints
+  Pass 1 results of every coin a scan has finished, used by POST /api/scan/resume/{run_id}
+  - `id` (text, primary key) - Unique checkpoint identifier
+  - `run_id` (text) - Scan run the coin belongs to
+  - `symbol` (text) - Coin symbol
+  - `aggregated` (jsonb) - Aggregated coin result
+  - `bot_results` (jsonb) - Individual bot results of the coin
+  - `created_at` (timestamptz) - Checkpoint time
+
+  ## Security
+  - Enable RLS; only the service role (backend) accesses checkpoints
+*/
+
+ALTER TABLE scan_runs ADD COLUMN IF NOT EXISTS scan_config jsonb;
+
+CREATE TABLE IF NOT EXISTS scan_checkpoints (
+  id text PRIMARY KEY,
+  run_id text NOT NULL,
+  symbol text NOT NULL,
+  aggregated jsonb NOT NULL,
+  bot_results jsonb DEFAULT '[]'::jsonb,
+  created_at timestamptz DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_scan_checkpoints_run_id ON scan_checkpoints(run_id);
+
+-- Enable Row Level Security
+ALTER TABLE scan_checkpoints ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,28 @@
+/*
+  # Add Persistent Provider ID Maps
+
+  ## New Tables
+
+  ### 1. provider_id_maps
+  Symbol -> provider ID maps (CoinMarketCap IDs, CoinGecko coin IDs), warmed in bulk
+  from the providers' map endpoints so ID lookups survive restarts and deploys
+  - `provider` (text, primary key) - Provider name ('coinmarketcap', 'coingecko')
+  - `schema_version` (integer) - Map format version; maps of an older format are re-warmed
+  - `version` (integer) - Incremented on every bulk warm-up
+  - `symbols` (jsonb) - Object mapping symbol -> provider ID
+  - `updated_at` (timestamptz) - Time of the last bulk warm-up
+
+  ## Security
+  - Enable RLS; only the service role (backend) accesses the maps
+*/
+
+CREATE TABLE IF NOT EXISTS provider_id_maps (
+  provider text PRIMARY KEY,
+  schema_version integer NOT NULL DEFAULT 1,
+  version integer NOT NULL DEFAULT 0,
+  symbols jsonb NOT NULL DEFAULT '{}'::jsonb,
+  updated_at timestamptz DEFAULT now()
+);
+
+-- Enable Row Level Security
+ALTER TABLE provider_id_maps ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,24 @@
+/*
+  # Add Persistent Negative Caches
+
+  ## New Tables
+
+  ### 1. negative_caches
+  Lookups known to return no data, e.g. (provider, symbol, 'derivatives') for coins
+  without perpetual futures, so scans skip them until the entry expires
+  - `name` (text, primary key) - Cache name ('futures')
+  - `entries` (jsonb) - Object mapping "provider|SYMBOL|capability" -> expiry (epoch seconds)
+  - `updated_at` (timestamptz) - Last flush
+
+  ## Security
+  - Enable RLS; only the service role (backend) accesses the caches
+*/
+
+CREATE TABLE IF NOT EXISTS negative_caches (
+  name text PRIMARY KEY,
+  entries jsonb NOT NULL DEFAULT '{}'::jsonb,
+  updated_at timestamptz DEFAULT now()
+);
+
+-- Enable Row Level Security
+ALTER TABLE negative_caches ENABLE ROW LEVEL SECURITY;
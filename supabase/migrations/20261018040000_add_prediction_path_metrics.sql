@@ -0,0 +1,16 @@
+/*
+  # Add Prediction Path Metrics
+
+  ## Modified Tables
+
+  ### 1. bot_predictions
+  Filled when a prediction is resolved on the 4h candles between prediction and evaluation time
+  - `time_to_outcome_hours` (float) - Hours until the target or stop was first touched (nullable)
+  - `max_adverse_excursion_percent` (float) - Worst move against the position before the outcome, % of entry (nullable)
+
+  ## Security
+  - No changes; bot_predictions keeps its existing RLS policies
+*/
+
+ALTER TABLE bot_predictions ADD COLUMN IF NOT EXISTS time_to_outcome_hours float;
+ALTER TABLE bot_predictions ADD COLUMN IF NOT EXISTS max_adverse_excursion_percent float;
@@ -0,0 +1,46 @@
+/*
+  # Add Backtest Runs
+
+  ## New Tables
+
+  ### 1. backtest_runs
+  Historical replays of the scan bots over daily candles (POST /api/backtest/run)
+  - `id` (text, primary key) - Run identifier
+  - `status` (text) - Status: 'running', 'completed', 'failed'
+  - `config` (jsonb) - Coins, days of history, horizon, seed, bots and workers of the run
+  - `started_at` (timestamptz) - Start time
+  - `completed_at` (timestamptz) - End time
+  - `coins` (integer) - Coins replayed
+  - `coins_skipped` (integer) - Coins without enough candles or that failed
+  - `signals` (integer) - Long / short signals simulated
+  - `duration_seconds` (float) - Wall-clock duration
+  - `bot_stats` (jsonb) - Per-bot stats in bot_performance shape, with the resulting performance_weight
+  - `regime_stats` (jsonb) - Per-bot accuracy per BTC market regime, like /analytics/performance-by-regime
+  - `coin_regime_stats` (jsonb) - Per-bot stats per coin regime (BULL / BEAR / SIDEWAYS)
+  - `error` (text) - Error of a failed run
+
+  ## Security
+  - Enable RLS; only the service role (backend) accesses this table
+*/
+
+CREATE TABLE IF NOT EXISTS backtest_runs (
+  id text PRIMARY KEY,
+  status text DEFAULT 'running',
+  config jsonb,
+  started_at timestamptz DEFAULT now(),
+  completed_at timestamptz,
+  coins integer DEFAULT 0,
+  coins_skipped integer DEFAULT 0,
+  signals integer DEFAULT 0,
+  duration_seconds float,
+  bot_stats jsonb,
+  regime_stats jsonb,
+  coin_regime_stats jsonb,
+  error text
+);
+
+-- Index for listing the latest runs
+CREATE INDEX IF NOT EXISTS idx_backtest_runs_started_at ON backtest_runs(started_at DESC);
+
+-- Enable Row Level Security
+ALTER TABLE backtest_runs ENABLE ROW LEVEL SECURITY;
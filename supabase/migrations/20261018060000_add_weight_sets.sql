@@ -0,0 +1,40 @@
+/*
+  # Add Weight Sets
+
+  ## New Tables
+
+  ### 1. weight_sets
+  Versioned aggregation weights, published by the walk-forward weight optimizer (POST /api/weights/optimize)
+  - `id` (text, primary key) - Unique identifier
+  - `version` (integer, unique) - Increasing version number
+  - `status` (text) - Status: 'candidate', 'active', 'retired' (at most one active)
+  - `bot_weights` (jsonb) - Bot name -> performance weight (overrides bot_performance.performance_weight)
+  - `regime_affinity` (jsonb) - Regime -> bot type -> confidence multiplier (MarketRegimeClassifier)
+  - `aggregation_boosts` (jsonb) - Regime -> bot name -> weight boost (AggregationEngine)
+  - `metrics` (jsonb) - Walk-forward out-of-sample and in-sample scores against the weights in use
+  - `config` (jsonb) - Replay and fit settings of the optimizer run
+  - `created_at` (timestamptz) - Publication time
+  - `activated_at` (timestamptz) - Last activation time
+
+  ## Security
+  - Enable RLS; only the service role (backend) accesses this table
+*/
+
+CREATE TABLE IF NOT EXISTS weight_sets (
+  id text PRIMARY KEY,
+  version integer NOT NULL UNIQUE,
+  status text DEFAULT 'candidate',
+  bot_weights jsonb NOT NULL,
+  regime_affinity jsonb NOT NULL,
+  aggregation_boosts jsonb NOT NULL,
+  metrics jsonb,
+  config jsonb,
+  created_at timestamptz DEFAULT now(),
+  activated_at timestamptz
+);
+
+-- Index for the active-set lookup done by every scan
+CREATE INDEX IF NOT EXISTS idx_weight_sets_status_version ON weight_sets(status, version DESC);
+
+-- Enable Row Level Security
+ALTER TABLE weight_sets ENABLE ROW LEVEL SECURITY;